@@ -0,0 +1,35 @@
+"""cabinet_id on queue and payment: one queue per claw machine
+
+Revision ID: a8c0e2f4b6d7
+Revises: f6b8c0d2e4a5
+Create Date: 2026-10-18
+
+One backend now drives several cabinets (app/cabinet.py), each with its own
+queue. The queue table is partitioned by cabinet_id, and a payment records the
+cabinet it buys a play on until confirm_payment enqueues it. Existing rows
+belong to "main", the single-cabinet default.
+"""
+from alembic import op
+
+revision = "a8c0e2f4b6d7"
+down_revision = "f6b8c0d2e4a5"
+branch_labels = None
+depends_on = None
+
+
+_UPGRADE = [
+    "ALTER TABLE queue ADD COLUMN cabinet_id VARCHAR DEFAULT 'main' NOT NULL",
+    "ALTER TABLE payment ADD COLUMN cabinet_id VARCHAR DEFAULT 'main' NOT NULL",
+    "CREATE INDEX ix_queue_cabinet_status_created ON queue (cabinet_id, status, created_at)",
+]
+
+
+def upgrade() -> None:
+    for stmt in _UPGRADE:
+        op.execute(stmt)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_queue_cabinet_status_created")
+    op.execute("ALTER TABLE payment DROP COLUMN cabinet_id")
+    op.execute("ALTER TABLE queue DROP COLUMN cabinet_id")
@@ -0,0 +1,44 @@
+"""pooled dispatch: nullable queue/payment cabinet_id, ball.cabinet_id
+
+Revision ID: b9d1f3a5c7e8
+Revises: a8c0e2f4b6d7
+Create Date: 2026-10-18
+
+With QUEUE_DISPATCH=pool a play waits in one shared line and is given to
+whichever cabinet frees up first, so queue.cabinet_id (and the payment's
+target cabinet) is NULL until a cabinet claims it. ball.cabinet_id records
+which cabinet a ball is loaded in, so the dispatcher can skip an empty one;
+NULL counts toward every cabinet, which is what existing balls get.
+"""
+from alembic import op
+
+revision = "b9d1f3a5c7e8"
+down_revision = "a8c0e2f4b6d7"
+branch_labels = None
+depends_on = None
+
+
+_UPGRADE = [
+    "ALTER TABLE queue ALTER COLUMN cabinet_id DROP NOT NULL",
+    "ALTER TABLE queue ALTER COLUMN cabinet_id DROP DEFAULT",
+    "ALTER TABLE payment ALTER COLUMN cabinet_id DROP NOT NULL",
+    "ALTER TABLE payment ALTER COLUMN cabinet_id DROP DEFAULT",
+    "ALTER TABLE ball ADD COLUMN cabinet_id VARCHAR",
+    "CREATE INDEX ix_ball_cabinet_id ON ball (cabinet_id)",
+]
+
+
+def upgrade() -> None:
+    for stmt in _UPGRADE:
+        op.execute(stmt)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_ball_cabinet_id")
+    op.execute("ALTER TABLE ball DROP COLUMN cabinet_id")
+    op.execute("UPDATE payment SET cabinet_id = 'main' WHERE cabinet_id IS NULL")
+    op.execute("ALTER TABLE payment ALTER COLUMN cabinet_id SET DEFAULT 'main'")
+    op.execute("ALTER TABLE payment ALTER COLUMN cabinet_id SET NOT NULL")
+    op.execute("UPDATE queue SET cabinet_id = 'main' WHERE cabinet_id IS NULL")
+    op.execute("ALTER TABLE queue ALTER COLUMN cabinet_id SET DEFAULT 'main'")
+    op.execute("ALTER TABLE queue ALTER COLUMN cabinet_id SET NOT NULL")
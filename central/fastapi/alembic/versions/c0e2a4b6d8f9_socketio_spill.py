@@ -0,0 +1,34 @@
+"""socketio_spill: Socket.IO pub/sub payloads too big for NOTIFY
+
+Revision ID: c0e2a4b6d8f9
+Revises: b9d1f3a5c7e8
+Create Date: 2026-10-18
+
+With SOCKETIO_PUBSUB_URL set, workers share Socket.IO emits over Postgres
+LISTEN/NOTIFY (app/socket/pg_manager.py). NOTIFY payloads are capped under
+8000 bytes; a bigger batch is written here and the NOTIFY carries its id.
+Rows are short-lived — the manager sweeps them after SOCKETIO_SPILL_TTL.
+Raw-SQL op.execute style; RLS enabled (see b7c1d9e2f3a4).
+"""
+from alembic import op
+
+revision = "c0e2a4b6d8f9"
+down_revision = "b9d1f3a5c7e8"
+branch_labels = None
+depends_on = None
+
+
+_UPGRADE = [
+    "CREATE TABLE socketio_spill (\n\tid BIGSERIAL NOT NULL, \n\tpayload TEXT NOT NULL, \n\tcreated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (now() AT TIME ZONE 'utc') NOT NULL, \n\tPRIMARY KEY (id)\n)",
+    "CREATE INDEX ix_socketio_spill_created_at ON socketio_spill (created_at)",
+    'ALTER TABLE public."socketio_spill" ENABLE ROW LEVEL SECURITY',
+]
+
+
+def upgrade() -> None:
+    for stmt in _UPGRADE:
+        op.execute(stmt)
+
+
+def downgrade() -> None:
+    op.execute('DROP TABLE IF EXISTS "socketio_spill"')
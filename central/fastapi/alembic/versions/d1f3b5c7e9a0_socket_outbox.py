@@ -0,0 +1,33 @@
+"""socket_outbox: Socket.IO emits committed with the state they announce
+
+Revision ID: d1f3b5c7e9a0
+Revises: c0e2a4b6d8f9
+Create Date: 2026-10-18
+
+Emits that announce a commit (player_queued, player_win, turn_end, ...) are
+written here in the same transaction and delivered by the leader's outbox
+dispatcher (app/outbox.py), so a crash between commit and emit no longer loses
+them. Rows are deleted on delivery. Raw-SQL op.execute style; RLS enabled (see
+b7c1d9e2f3a4).
+"""
+from alembic import op
+
+revision = "d1f3b5c7e9a0"
+down_revision = "c0e2a4b6d8f9"
+branch_labels = None
+depends_on = None
+
+
+_UPGRADE = [
+    "CREATE TABLE socket_outbox (\n\tid BIGSERIAL NOT NULL, \n\tevent VARCHAR NOT NULL, \n\troom VARCHAR, \n\tpayload JSONB, \n\tattempts INTEGER NOT NULL, \n\tcreated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, \n\tPRIMARY KEY (id)\n)",
+    'ALTER TABLE public."socket_outbox" ENABLE ROW LEVEL SECURITY',
+]
+
+
+def upgrade() -> None:
+    for stmt in _UPGRADE:
+        op.execute(stmt)
+
+
+def downgrade() -> None:
+    op.execute('DROP TABLE IF EXISTS "socket_outbox"')
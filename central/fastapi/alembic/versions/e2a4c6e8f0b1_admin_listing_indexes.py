@@ -0,0 +1,41 @@
+"""indexes for the keyset-paginated, filtered admin listings
+
+Revision ID: e2a4c6e8f0b1
+Revises: d1f3b5c7e9a0
+Create Date: 2026-10-18
+
+The admin balls / cards / opened-boosters / card-types / plays listings are
+served a page at a time with server-side filters (admin/router.py). Each
+filter gets an index that also yields the page order, so a page is an index
+range scan rather than a sort over the table.
+"""
+from alembic import op
+
+revision = "e2a4c6e8f0b1"
+down_revision = "d1f3b5c7e9a0"
+branch_labels = None
+depends_on = None
+
+
+_INDEXES = [
+    ("ix_ball_status_serial", "ball (status, serial)"),
+    ("ix_card_status_id", "card (status, id)"),
+    ("ix_card_acquired_at", "card (acquired_at)"),
+    ("ix_card_type_rarity_sku", "card_type (rarity, sku)"),
+    ("ix_card_type_set_sku", "card_type (set, sku)"),
+    ("ix_card_type_sku_pattern", "card_type (sku text_pattern_ops)"),
+    ("ix_opened_booster_sku_id", "opened_booster ((coalesce(sku, '')), id)"),
+    ("ix_opened_booster_status_sku_id", "opened_booster (status, (coalesce(sku, '')), id)"),
+    ("ix_queue_status_id", "queue (status, id)"),
+    ("ix_queue_address_id", "queue (address, id)"),
+]
+
+
+def upgrade() -> None:
+    for name, target in _INDEXES:
+        op.execute(f"CREATE INDEX {name} ON {target}")
+
+
+def downgrade() -> None:
+    for name, _ in reversed(_INDEXES):
+        op.execute(f"DROP INDEX IF EXISTS {name}")
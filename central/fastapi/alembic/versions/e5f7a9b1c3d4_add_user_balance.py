@@ -0,0 +1,69 @@
+"""add user_balance materialization and ledger_entry.held_until
+
+Revision ID: e5f7a9b1c3d4
+Revises: 382488dd0106
+Create Date: 2026-10-18
+
+Balance reads used to SUM the whole ledger for the user (plus a three-way join
+for the chargeback hold) on every login, balance check and withdrawal. This
+adds:
+  - user_balance: total and held cents per user, kept current by app/balances.py
+    in the same transaction as each ledger write.
+  - ledger_entry.held_until: when a held (card-funded) credit's chargeback hold
+    ends. A scheduled sweep releases expired holds from user_balance.held_cents.
+
+Both are backfilled from the existing ledger, using the CHARGEBACK_HOLD_DAYS
+the app is configured with. Raw-SQL op.execute style; RLS enabled on the new
+table (see b7c1d9e2f3a4).
+"""
+import os
+
+from alembic import op
+
+revision = "e5f7a9b1c3d4"
+down_revision = "382488dd0106"
+branch_labels = None
+depends_on = None
+
+
+_HOLD_DAYS = int(os.environ.get("CHARGEBACK_HOLD_DAYS", 7))
+
+_UPGRADE = [
+    "ALTER TABLE ledger_entry ADD COLUMN held_until TIMESTAMP WITHOUT TIME ZONE",
+    "CREATE INDEX ix_ledger_held_until ON ledger_entry (held_until) WHERE held_until IS NOT NULL",
+
+    "CREATE TABLE user_balance (\n\tuser_id UUID NOT NULL, \n\ttotal_cents BIGINT NOT NULL, \n\theld_cents BIGINT NOT NULL, \n\tupdated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, \n\tPRIMARY KEY (user_id), \n\tFOREIGN KEY(user_id) REFERENCES user_account (id)\n)",
+
+    # Backfill the holds: credits traceable (win -> payment) to a CARD ticket
+    # whose charge confirmed inside the hold window.
+    f"""UPDATE ledger_entry l
+        SET held_until = p.confirmed_at + interval '{_HOLD_DAYS} days'
+        FROM win w JOIN payment p ON p.queue_entry_id = w.queue_entry_id
+        WHERE w.id = l.win_id
+          AND l.kind IN ('DEPOSIT', 'RESELL', 'AUTO_RESELL', 'CARD_RESELL', 'BET_REFUND')
+          AND p.method = 'CARD'
+          AND p.confirmed_at IS NOT NULL
+          AND p.confirmed_at + interval '{_HOLD_DAYS} days' > (now() AT TIME ZONE 'utc')""",
+
+    """INSERT INTO user_balance (user_id, total_cents, held_cents, updated_at)
+       SELECT user_id,
+              SUM(CASE WHEN kind IN ('WITHDRAWAL', 'BET_PLACED') THEN -amount_cents
+                       ELSE amount_cents END),
+              SUM(CASE WHEN held_until IS NOT NULL THEN amount_cents ELSE 0 END),
+              now() AT TIME ZONE 'utc'
+       FROM ledger_entry
+       GROUP BY user_id""",
+
+    'ALTER TABLE public."user_balance" ENABLE ROW LEVEL SECURITY',
+]
+
+
+def upgrade() -> None:
+    for stmt in _UPGRADE:
+        op.execute(stmt)
+
+
+def downgrade() -> None:
+    op.execute('DROP TABLE IF EXISTS "user_balance"')
+    op.execute("DROP INDEX IF EXISTS ix_ledger_held_until")
+    op.execute("ALTER TABLE ledger_entry DROP COLUMN IF EXISTS held_until")
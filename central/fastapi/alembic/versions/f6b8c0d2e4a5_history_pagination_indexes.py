@@ -0,0 +1,32 @@
+"""composite indexes for keyset-paginated bet / withdrawal history
+
+Revision ID: f6b8c0d2e4a5
+Revises: e5f7a9b1c3d4
+Create Date: 2026-10-18
+
+Bet and withdrawal history is served a page at a time, newest first, keyed on
+(timestamp, id) — see helpers.bets_page / withdrawals_page. These let a page be
+an index range scan for one address instead of a sort over all of its rows.
+"""
+from alembic import op
+
+revision = "f6b8c0d2e4a5"
+down_revision = "e5f7a9b1c3d4"
+branch_labels = None
+depends_on = None
+
+
+_UPGRADE = [
+    "CREATE INDEX ix_queue_address_status_played ON queue (address, status, played_at)",
+    "CREATE INDEX ix_withdrawal_address_timestamp ON withdrawal (address, timestamp)",
+]
+
+
+def upgrade() -> None:
+    for stmt in _UPGRADE:
+        op.execute(stmt)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_withdrawal_address_timestamp")
+    op.execute("DROP INDEX IF EXISTS ix_queue_address_status_played")
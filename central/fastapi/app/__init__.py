@@ -4,11 +4,14 @@ from .socket.sio_instance import sio, sio_app
 from .db import engine, Base
 from .deps import async_session, ensure_first_round
 from .pi_client import connect_pi
-from .schedulers import turn_scheduler, sync_scheduler
+from .schedulers import turn_scheduler, sync_scheduler, balance_scheduler
 from .notifier import alertBot
 from .admin import router as admin_router
 from .stripe_rail import router as stripe_router
 from .versioning import version_watch
+from .queue_index import hydrate as hydrate_queue_index
+from .cabinet import cabinets
+from . import handoff, leader, machine, outbox
 import asyncio
 
 api = FastAPI()
@@ -35,7 +38,13 @@ async def on_startup():
     # first round
     async with async_session() as db:
         await ensure_first_round(db)
-        
+
+    # The queue order lives in memory from here on (see queue_index.py); load
+    # each line's before the schedulers or any socket handler can ask for a
+    # position.
+    for index in cabinets.queues():
+        await hydrate_queue_index(index)
+
     # background tasks
     #
     # The on-chain Claw contract is retired: rounds/odds were dead weight, so
@@ -44,9 +53,34 @@ async def on_startup():
     # perpetual round is seeded by ensure_first_round above; wins are marked
     # off-chain in pi_client.on_turn_win. The schedulers/listeners modules are
     # left in the tree as dead code pending cleanup.
-    asyncio.create_task(connect_pi())
-    asyncio.create_task(turn_scheduler())
-    asyncio.create_task(sync_scheduler())
-    asyncio.create_task(version_watch())
+    #
+    # They drive the cabinets, so they run in one process only: whichever
+    # worker holds the leader lock (app/leader.py). With a single worker that's
+    # this one, a moment after boot.
+    asyncio.create_task(leader.elect(_lead, _stand_down))
+
+
+async def _lead() -> list:
+    # A follower's copy of the queues is only as fresh as its last write; the
+    # new leader starts from the database.
+    for index in cabinets.queues():
+        await hydrate_queue_index(index)
+    machine.invalidate()
+    tasks = []
+    # Each cabinet (app/cabinet.py) gets its own Pi link and turn scheduler.
+    for cab in cabinets:
+        tasks.append(asyncio.create_task(connect_pi(cab)))
+        tasks.append(asyncio.create_task(turn_scheduler(cab)))
+    tasks.append(asyncio.create_task(sync_scheduler()))
+    tasks.append(asyncio.create_task(balance_scheduler()))
+    tasks.append(asyncio.create_task(version_watch()))
+    tasks.append(asyncio.create_task(outbox.dispatcher()))
+    return tasks
+
+
+def _stand_down() -> None:
+    for cab in cabinets:
+        cab.reset()
+    handoff.release_all()
 
 __all__ = ["app"]   # for `uvicorn app:app`
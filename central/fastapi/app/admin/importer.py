@@ -0,0 +1,386 @@
+"""Bulk inventory import: a stream of rows in, a report per row out.
+
+The import used to take one JSON array, whole, and build ORM objects from it a
+row at a time — a card type lookup per card — in a transaction that one bad row
+threw away. Loading a new set took minutes.
+
+Now the body is read as it arrives (NDJSON or CSV; the JSON array still works)
+and every row stands on its own: a bad one is reported by line and skipped, the
+rest go in. Catalog rows (closed boosters, card types) are merged by SKU in
+memory, since the catalog is small; inventory rows (opened boosters, cards) go
+to temp staging tables through COPY, IMPORT_BATCH at a time. `finish` then does
+the rest in a few set-based statements: upsert the catalog, reject the staged
+rows that point at something missing or collide with something already there,
+and insert what's left. Card types are resolved with one join, and a row can
+refer to catalog entries from anywhere in the same upload.
+
+Everything happens in the caller's transaction, so a dry run is the same work
+followed by a rollback.
+"""
+import codecs
+import csv
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional, Tuple, Union
+
+from sqlalchemy import text
+
+from ..config import IMPORT_BATCH, IMPORT_MAX_ERRORS
+from ..models import CardOrigin, CardRarity
+
+KINDS = ("closed_booster", "card_type", "opened_booster", "card")
+
+# A row as a source yields it: its line (item index, for a JSON array) and the
+# row, or why it couldn't be read.
+Row = Tuple[int, Union[dict, ValueError]]
+
+# What each kind can set; a catalog row only writes the fields it carries.
+_CATALOG_FIELDS = {
+	"closed_booster": ("name", "image_front_url", "image_back_url", "card_count", "in_stock"),
+	"card_type": ("name", "image_url", "type", "rarity", "set", "number"),
+}
+_STAGED_COLUMNS = {
+	"opened_booster": ("line", "sku", "video_url", "video_hash", "filmed_at"),
+	"card": ("line", "card_type_sku", "origin", "opened_booster_id", "position", "condition"),
+}
+
+_STAGING_TABLES = (
+	"""CREATE TEMP TABLE import_closed_booster (
+		sku text PRIMARY KEY, name text, image_front_url text, image_back_url text,
+		card_count integer, in_stock boolean
+	) ON COMMIT DROP""",
+	"""CREATE TEMP TABLE import_card_type (
+		sku text PRIMARY KEY, name text, image_url text, "type" text, rarity text,
+		"set" text, "number" text
+	) ON COMMIT DROP""",
+	"""CREATE TEMP TABLE import_opened_booster (
+		line integer, id uuid DEFAULT gen_random_uuid(), sku text, video_url text,
+		video_hash text, filmed_at timestamp
+	) ON COMMIT DROP""",
+	"""CREATE TEMP TABLE import_card (
+		line integer, id uuid DEFAULT gen_random_uuid(), card_type_sku text, origin text,
+		opened_booster_id uuid,
+		"position" integer, condition text
+	) ON COMMIT DROP""",
+)
+
+# Fields the staged catalog row left out keep their current value; a new closed
+# booster is in stock unless it says otherwise.
+_UPSERT_CATALOG = (
+	"""UPDATE closed_booster c SET
+		name = coalesce(s.name, c.name),
+		image_front_url = coalesce(s.image_front_url, c.image_front_url),
+		image_back_url = coalesce(s.image_back_url, c.image_back_url),
+		card_count = coalesce(s.card_count, c.card_count),
+		in_stock = coalesce(s.in_stock, c.in_stock)
+	FROM import_closed_booster s WHERE c.sku = s.sku""",
+	"""INSERT INTO closed_booster (id, sku, name, image_front_url, image_back_url, card_count, in_stock)
+	SELECT gen_random_uuid(), sku, name, image_front_url, image_back_url, card_count,
+		coalesce(in_stock, true)
+	FROM import_closed_booster
+	ON CONFLICT (sku) DO NOTHING""",
+	"""UPDATE card_type c SET
+		name = coalesce(s.name, c.name),
+		image_url = coalesce(s.image_url, c.image_url),
+		"type" = coalesce(s."type", c."type"),
+		rarity = coalesce(s.rarity::card_rarity, c.rarity),
+		"set" = coalesce(s."set", c."set"),
+		"number" = coalesce(s."number", c."number")
+	FROM import_card_type s WHERE c.sku = s.sku""",
+	"""INSERT INTO card_type (id, sku, name, image_url, "type", rarity, "set", "number")
+	SELECT gen_random_uuid(), sku, name, image_url, "type", rarity::card_rarity, "set", "number"
+	FROM import_card_type
+	ON CONFLICT (sku) DO NOTHING""",
+)
+
+# (kind, statement deleting the staged rows that can't go in, RETURNING their
+# line and the reason). Runs after the catalog upsert.
+_REJECT = (
+	("opened_booster", """DELETE FROM import_opened_booster s USING import_opened_booster f
+		WHERE s.video_hash = f.video_hash AND f.line < s.line
+		RETURNING s.line, 'video_hash ' || s.video_hash || ' is also on line ' || f.line"""),
+	("opened_booster", """DELETE FROM import_opened_booster s USING opened_booster o
+		WHERE o.video_hash = s.video_hash
+		RETURNING s.line, 'video_hash ' || s.video_hash || ' is already taken'"""),
+	("card", """DELETE FROM import_card s
+		WHERE NOT EXISTS (SELECT 1 FROM card_type t WHERE t.sku = s.card_type_sku)
+		RETURNING s.line, 'unknown card_type_sku ' || s.card_type_sku"""),
+	("card", """DELETE FROM import_card s
+		WHERE s.opened_booster_id IS NOT NULL
+		  AND NOT EXISTS (SELECT 1 FROM opened_booster o WHERE o.id = s.opened_booster_id)
+		RETURNING s.line, 'unknown opened_booster_id ' || s.opened_booster_id"""),
+)
+
+# A video with no content hash gets a placeholder (video_hash is UNIQUE), as
+# the single-booster endpoint gives it.
+_INSERT_INVENTORY = (
+	"""INSERT INTO opened_booster (id, closed_booster_id, sku, video_url, video_hash, filmed_at, status)
+	SELECT s.id, c.id, s.sku, s.video_url,
+		coalesce(s.video_hash, CASE WHEN s.video_url IS NOT NULL THEN
+			'0x' || encode(sha256(convert_to(
+				concat_ws('|', 'opened-booster', s.sku, s.video_url, s.id::text), 'UTF8')), 'hex')
+		END),
+		s.filmed_at, 'AVAILABLE'::inventory_status
+	FROM import_opened_booster s LEFT JOIN closed_booster c ON c.sku = s.sku""",
+	"""INSERT INTO card (id, card_type_id, origin, opened_booster_id, "position", condition, status)
+	SELECT s.id, t.id, s.origin::card_origin, s.opened_booster_id, s."position", s.condition, 'IN_POOL'::card_status
+	FROM import_card s JOIN card_type t ON t.sku = s.card_type_sku""",
+)
+
+
+# ─── Sources ─────────────────────────────────────────────────────────────
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+	"""Number and text of each line of a UTF-8 byte stream, as it arrives."""
+	decoder = codecs.getincrementaldecoder("utf-8-sig")()
+	pending, n = "", 0
+	async for chunk in chunks:
+		*complete, pending = (pending + decoder.decode(chunk)).split("\n")
+		for line in complete:
+			n += 1
+			yield n, line.rstrip("\r")
+	pending += decoder.decode(b"", final=True)
+	if pending:
+		yield n + 1, pending.rstrip("\r")
+
+
+async def ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+	"""One JSON object per line; blank lines are skipped."""
+	async for n, line in _lines(chunks):
+		if not line.strip():
+			continue
+		try:
+			row = json.loads(line)
+		except ValueError as e:
+			yield n, ValueError(f"invalid JSON: {e}")
+			continue
+		yield n, row if isinstance(row, dict) else ValueError("expected a JSON object")
+
+
+async def csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+	"""A header line, then one row per record; empty cells are left out. A
+	quoted field may run over several lines — the row is numbered by the
+	first."""
+	header, record, start = None, [], 0
+	async for n, line in _lines(chunks):
+		if not record:
+			start = n
+		record.append(line)
+		joined = "\n".join(record)
+		if joined.count('"') % 2:
+			continue   # inside a quoted field
+		record = []
+		if not joined.strip():
+			continue
+		try:
+			fields = next(csv.reader([joined]))
+		except csv.Error as e:
+			yield start, ValueError(f"invalid CSV: {e}")
+			continue
+		if header is None:
+			header = [h.strip() for h in fields]
+		elif len(fields) > len(header):
+			yield start, ValueError(f"{len(fields)} fields for {len(header)} columns")
+		else:
+			yield start, {h: v for h, v in zip(header, fields) if v != ""}
+	if record:
+		yield start, ValueError("quoted field never closed")
+
+
+async def json_rows(items: list) -> AsyncIterator[Row]:
+	"""A JSON array already in memory, numbered by item index."""
+	for i, item in enumerate(items):
+		yield i, item if isinstance(item, dict) else ValueError("expected a JSON object")
+
+
+# ─── Row parsing ─────────────────────────────────────────────────────────
+# NDJSON brings typed values and CSV brings strings; both go through these.
+
+def _text(row: dict, *names: str) -> Optional[str]:
+	for name in names:
+		v = row.get(name)
+		if v is not None and str(v).strip():
+			return str(v).strip()
+	return None
+
+
+def _int(row: dict, name: str) -> Optional[int]:
+	v = row.get(name)
+	if v is None or v == "":
+		return None
+	if isinstance(v, int) and not isinstance(v, bool):
+		return v
+	try:
+		return int(str(v).strip())
+	except ValueError:
+		raise ValueError(f"{name} must be an integer, not {v!r}")
+
+
+def _bool(row: dict, name: str) -> Optional[bool]:
+	v = row.get(name)
+	if v is None or v == "":
+		return None
+	if isinstance(v, bool):
+		return v
+	s = str(v).strip().lower()
+	if s in ("true", "t", "yes", "y", "1"):
+		return True
+	if s in ("false", "f", "no", "n", "0"):
+		return False
+	raise ValueError(f"{name} must be true or false, not {v!r}")
+
+
+def _uuid(row: dict, name: str) -> Optional[uuid.UUID]:
+	v = _text(row, name)
+	try:
+		return uuid.UUID(v) if v else None
+	except ValueError:
+		raise ValueError(f"{name} is not a UUID: {v!r}")
+
+
+def _datetime(row: dict, name: str) -> datetime:
+	"""Naive UTC, like the inventory columns; now when absent."""
+	v = _text(row, name)
+	if not v:
+		return datetime.utcnow()
+	try:
+		dt = datetime.fromisoformat(v.replace("Z", "+00:00"))
+	except ValueError:
+		raise ValueError(f"invalid {name}: {v!r}")
+	if dt.tzinfo is not None:
+		dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+	return dt
+
+
+def _catalog_entry(kind: str, row: dict, own_type: bool) -> Tuple[str, dict]:
+	"""(sku, the fields the row sets)."""
+	sku = _text(row, "sku")
+	if not sku:
+		raise ValueError(f"{kind.replace('_', ' ')} needs sku")
+	fields = {}
+	for f in _CATALOG_FIELDS[kind]:
+		if f == "type" and not own_type:
+			continue   # `type` names the row's kind here
+		if f == "card_count":
+			v = _int(row, f)
+		elif f == "in_stock":
+			v = _bool(row, f)
+		else:
+			v = _text(row, f)
+		if f == "rarity" and v is not None:
+			if v not in CardRarity.__members__:
+				raise ValueError(f"invalid rarity {v!r}; one of {list(CardRarity.__members__)}")
+		if v is not None:
+			fields[f] = v
+	return sku, fields
+
+
+def _opened_booster(line: int, row: dict) -> tuple:
+	sku = _text(row, "closed_booster_sku", "sku")
+	if not sku:
+		raise ValueError("opened booster needs a closed booster sku")
+	video_url = _text(row, "video_url")
+	return (line, sku, video_url,
+			_text(row, "video_hash") if video_url else None, _datetime(row, "filmed_at"))
+
+
+def _card(line: int, row: dict) -> tuple:
+	sku = _text(row, "card_type_sku", "sku")
+	if not sku:
+		raise ValueError("card needs a card_type_sku")
+	origin = _text(row, "origin") or CardOrigin.SINGLE_PRIZE.value
+	if origin not in CardOrigin.__members__:
+		raise ValueError(f"invalid origin {origin!r}; one of {list(CardOrigin.__members__)}")
+	return (line, sku, origin, _uuid(row, "opened_booster_id"),
+			_int(row, "position"), _text(row, "condition"))
+
+
+# ─── The import ──────────────────────────────────────────────────────────
+
+class Import:
+	"""One upload, loaded in `db`'s transaction. `kind`, when given, is the
+	kind of every row; otherwise each row's `type` says. (A card type's own
+	`type` field can only be set in an upload of card types alone, where
+	`type` isn't needed to tell the kinds apart.)"""
+
+	def __init__(self, db, kind: Optional[str] = None):
+		self.db = db
+		self.kind = kind
+		self.counts = dict.fromkeys(KINDS, 0)
+		self.errors: list = []
+		self.error_count = 0
+		self._catalog = {k: {} for k in _CATALOG_FIELDS}
+		self._staged = {k: [] for k in _STAGED_COLUMNS}
+
+	def reject(self, line: int, error: str) -> None:
+		self.error_count += 1
+		if len(self.errors) < IMPORT_MAX_ERRORS:
+			self.errors.append({"line": line, "error": error})
+
+	async def start(self) -> None:
+		for ddl in _STAGING_TABLES:
+			await self.db.execute(text(ddl))
+
+	async def add(self, line: int, row: Union[dict, ValueError]) -> None:
+		if isinstance(row, ValueError):
+			self.reject(line, str(row))
+			return
+		kind = self.kind or row.get("type")
+		try:
+			if not isinstance(kind, str) or kind not in KINDS:
+				raise ValueError(f"unknown type {kind!r}")
+			if kind in self._catalog:
+				sku, fields = _catalog_entry(kind, row, own_type=self.kind is not None)
+				self._catalog[kind].setdefault(sku, {}).update(fields)
+			elif kind == "opened_booster":
+				self._staged[kind].append(_opened_booster(line, row))
+			else:
+				self._staged[kind].append(_card(line, row))
+		except ValueError as e:
+			self.reject(line, str(e))
+			return
+		self.counts[kind] += 1
+		if len(self._staged.get(kind, ())) >= IMPORT_BATCH:
+			await self._copy(kind, self._staged[kind])
+			self._staged[kind] = []
+
+	async def _copy(self, kind: str, rows: list, columns=None) -> None:
+		if not rows:
+			return
+		columns = columns or _STAGED_COLUMNS[kind]
+		quoted = ", ".join(f'"{c}"' for c in columns)
+		conn = await (await self.db.connection()).get_raw_connection()
+		async with conn.driver_connection.cursor() as cur:
+			async with cur.copy(f"COPY import_{kind} ({quoted}) FROM STDIN") as copy:
+				for row in rows:
+					await copy.write_row(row)
+
+	async def finish(self) -> None:
+		for kind, entries in self._catalog.items():
+			columns = ("sku",) + _CATALOG_FIELDS[kind]
+			rows = [(sku,) + tuple(f.get(c) for c in columns[1:]) for sku, f in entries.items()]
+			await self._copy(kind, rows, columns)
+		for kind, rows in self._staged.items():
+			await self._copy(kind, rows)
+			await self.db.execute(text(f"ANALYZE import_{kind}"))
+		for stmt in _UPSERT_CATALOG:
+			await self.db.execute(text(stmt))
+		for kind, stmt in _REJECT:
+			for line, error in await self.db.execute(text(stmt)):
+				self.counts[kind] -= 1
+				self.reject(line, error)
+		for stmt in _INSERT_INVENTORY:
+			await self.db.execute(text(stmt))
+		self.errors.sort(key=lambda e: e["line"])
+
+
+async def run(db, rows: AsyncIterator[Row], kind: Optional[str] = None) -> Import:
+	"""Load `rows` in `db`'s transaction, leaving the commit (or the rollback,
+	for a dry run) to the caller."""
+	imp = Import(db, kind)
+	await imp.start()
+	async for line, row in rows:
+		await imp.add(line, row)
+	await imp.finish()
+	return imp
@@ -6,35 +6,48 @@ revised stack lands — they're well-formed but not cryptographically
 meaningful.
 """
 
+import asyncio
+import functools
 import hashlib
+import inspect
+import json
 import time
+import typing
 import uuid
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Annotated, List, Optional
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy import select, exists, and_, func
+from sqlalchemy import select, exists, and_, or_, false, func, literal_column, tuple_
 
 from .. import state as _state
 from .. import win_transitions as wt
-from ..pi_client import safe_pi_emit, turn_end, request_test_arm
+from .. import latency
+from .. import loaders
+from .. import enrollment
+from .. import leader
+from .. import machine
+from ..cabinet import Cabinet, cabinets
+from ..sessions import sessions
+from ..handoff import handoff_stats
+from ..pi_client import safe_pi_emit, turn_end, request_test_arm, move_stats, arm_enroll_batch
+from . import importer
 from .auth import AdminIdentity, RequireAdmin
 from ..deps import async_session
 import httpx
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from ..config import PI_SERVER_URL
+from ..config import ADMIN_PAGE_MAX, ADMIN_PAGE_SIZE, ENROLL_WINDOW_SECONDS
 from ..versioning import PI_VPS_PROTO
 
 from ..models import (
-	Ball, OpenedBooster, ClosedBooster, Card, CardType, CommitmentBatch, QueueEntry, Win,
+	Ball, OpenedBooster, ClosedBooster, Card, CardType, CommitmentBatch, QueueEntry, User, Win,
 	BallStatus, InventoryStatus, PrizeKind, CardStatus, CardRarity, CardOrigin,
 )
 
-# Hard ceiling on the admin enrollment window — matches the ESP-side default.
-ENROLL_WINDOW_SECONDS = 10
-
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
@@ -42,6 +55,122 @@ def _placeholder_hash(*parts: str) -> str:
 	return "0x" + hashlib.sha256("|".join(parts).encode()).hexdigest()
 
 
+def _cabinet(cabinet_id: Optional[str]) -> Cabinet:
+	"""The cabinet named by an endpoint's `cabinet` query parameter — the
+	default cabinet when it's omitted."""
+	cab = cabinets.get(cabinet_id)
+	if cab is None:
+		raise HTTPException(status_code=404, detail=f"Cabinet {cabinet_id} not found")
+	return cab
+
+
+# ─── The leader's endpoints ──────────────────────────────────────────────
+#
+# The Pi links, the turns in play and enrollment live in the leader process
+# (app/leader.py). An endpoint that needs them is marked @_on_leader: on a
+# follower worker the call is forwarded there, and its reply — or its
+# HTTPException — comes back as if it had run here.
+
+_leader_endpoints: dict = {}
+
+
+def _on_leader(endpoint):
+	_leader_endpoints[endpoint.__name__] = endpoint
+	signature = inspect.signature(endpoint)
+
+	@functools.wraps(endpoint)
+	async def forwarding(*args, **kwargs):
+		if leader.is_leader:
+			return await endpoint(*args, **kwargs)
+		kwargs = signature.bind_partial(*args, **kwargs).arguments
+		kwargs.pop("_", None)   # the admin identity, checked here already
+		args = {k: v.model_dump() if isinstance(v, BaseModel) else v for k, v in kwargs.items()}
+		try:
+			reply = json.loads(await leader.call(
+				"admin", json.dumps({"endpoint": endpoint.__name__, "args": args}),
+			))
+		except leader.LeaderCallError as e:
+			raise HTTPException(status_code=503, detail=f"Cabinet controller unavailable: {e}")
+		if "error" in reply:
+			raise HTTPException(status_code=reply["status"], detail=reply["error"])
+		return reply["result"]
+
+	return forwarding
+
+
+async def _serve_forwarded(arg: str) -> str:
+	call = json.loads(arg)
+	endpoint = _leader_endpoints[call["endpoint"]]
+	hints = typing.get_type_hints(endpoint)
+	kwargs = {}
+	for name, value in call["args"].items():
+		hint = hints.get(name)
+		is_body = isinstance(hint, type) and issubclass(hint, BaseModel)
+		kwargs[name] = hint(**value) if is_body else value
+	try:
+		result = await endpoint(**kwargs)
+	except HTTPException as e:
+		return json.dumps({"status": e.status_code, "error": e.detail})
+	return json.dumps({"result": jsonable_encoder(result)})
+
+
+leader.on_call("admin", _serve_forwarded)
+
+
+# ─── Listing pages ───────────────────────────────────────────────────────
+#
+# Every listing is served a page at a time, keyset-paginated like the account
+# history (helpers.bets_page): `cursor` is the sort key of the last row the
+# client has and `next_cursor` is None on the last page, so a page costs the
+# same however deep it is. Filters narrow the same query, and each listing has
+# a /count twin taking the same filters for the page header's total.
+#
+# A cursor is the row's sort key joined with "~". Only the first key can be free
+# text (a serial, a SKU); the rest are ids, so it splits from the right.
+
+def _page_limit(limit: Optional[int]) -> int:
+	return max(1, min(limit or ADMIN_PAGE_SIZE, ADMIN_PAGE_MAX))
+
+
+def _cursor_value(key, part: str):
+	kind = key.type.python_type
+	return datetime.fromisoformat(part) if kind is datetime else kind(part)
+
+
+async def _keyset_page(db, q, keys, key_of, cursor: Optional[str], limit: Optional[int],
+		descending: bool = False):
+	"""One page of the entities `q` selects, ordered by `keys` (together unique
+	per row) and resuming after `cursor`; `key_of(row)` is a row's key values.
+	Returns (rows, next_cursor)."""
+	limit = _page_limit(limit)
+	if cursor:
+		parts = cursor.rsplit("~", len(keys) - 1)
+		try:
+			if len(parts) != len(keys):
+				raise ValueError
+			after = [_cursor_value(k, p) for k, p in zip(keys, parts)]
+		except ValueError:
+			raise HTTPException(status_code=400, detail=f"bad cursor {cursor!r}")
+		key = tuple_(*keys)
+		last = tuple_(*after, types=[k.type for k in keys])
+		q = q.where(key < last if descending else key > last)
+	q = q.order_by(*[k.desc() if descending else k for k in keys]).limit(limit + 1)
+	rows = (await db.execute(q)).scalars().all()
+	more = len(rows) > limit
+	rows = rows[:limit]
+	next_cursor = None
+	if more:
+		values = key_of(rows[-1])
+		next_cursor = "~".join(v.isoformat() if isinstance(v, datetime) else str(v) for v in values)
+	return rows, next_cursor
+
+
+async def _count(model, conditions) -> dict:
+	async with async_session() as db:
+		n = await db.scalar(select(func.count()).select_from(model).where(*conditions))
+	return {"count": n}
+
+
 async def _ensure_batch(db) -> CommitmentBatch:
 	"""Return the most recent CommitmentBatch, creating a placeholder one if
 	none exists yet. Real batch publishing comes back when the crypto stack
@@ -67,12 +196,41 @@ async def whoami(admin: AdminIdentity = RequireAdmin):
 
 # ─── Balls ──────────────────────────────────────────────────────────────
 
+class BallFilters(BaseModel):
+	status: Optional[BallStatus] = None
+	prize_kind: Optional[PrizeKind] = None
+	cabinet: Optional[str] = None
+	# The SKU of the opened booster a ball is bound to.
+	sku: Optional[str] = None
+
+	def conditions(self) -> list:
+		c = []
+		if self.status is not None:
+			c.append(Ball.status == self.status)
+		if self.prize_kind is not None:
+			c.append(Ball.prize_kind == self.prize_kind)
+		if self.cabinet is not None:
+			c.append(Ball.cabinet_id == self.cabinet)
+		if self.sku is not None:
+			c.append(Ball.opened_booster_id.in_(
+				select(OpenedBooster.id).where(OpenedBooster.sku == self.sku)
+			))
+		return c
+
+
 @router.get("/balls")
-async def list_balls(_: AdminIdentity = RequireAdmin):
+async def list_balls(
+	filters: Annotated[BallFilters, Depends()],
+	cursor: Optional[str] = None,
+	limit: Optional[int] = None,
+	_: AdminIdentity = RequireAdmin,
+):
+	"""Balls by serial, a page at a time."""
 	async with async_session() as db:
-		balls = (await db.execute(
-			select(Ball).order_by(Ball.serial)
-		)).scalars().all()
+		balls, next_cursor = await _keyset_page(
+			db, loaders.balls().where(*filters.conditions()),
+			(Ball.serial,), lambda b: (b.serial,), cursor, limit,
+		)
 		return {
 			"balls": [
 				{
@@ -83,12 +241,19 @@ async def list_balls(_: AdminIdentity = RequireAdmin):
 					"opened_booster_id": str(b.opened_booster_id) if b.opened_booster_id else None,
 					"opened_booster_sku": b.opened_booster.sku if b.opened_booster else None,
 					"prize_card_id": str(b.prize_card_id) if b.prize_card_id else None,
+					"cabinet_id": b.cabinet_id,
 				}
 				for b in balls
-			]
+			],
+			"next_cursor": next_cursor,
 		}
 
 
+@router.get("/balls/count")
+async def count_balls(filters: Annotated[BallFilters, Depends()], _: AdminIdentity = RequireAdmin):
+	return await _count(Ball, filters.conditions())
+
+
 class BindBody(BaseModel):
 	opened_booster_id: str
 
@@ -169,6 +334,9 @@ async def bind_ball(
 			created = False
 
 		await db.commit()
+		machine.invalidate()
+		# A (re)bound ball can resolve an inventory fault — let the scheduler look.
+		cabinets.wake_all()
 		return {
 			"ok": True,
 			"created": created,
@@ -254,6 +422,9 @@ async def bind_ball_card(
 			created = False
 
 		await db.commit()
+		machine.invalidate()
+		# A (re)bound ball can resolve an inventory fault — let the scheduler look.
+		cabinets.wake_all()
 		return {
 			"ok": True,
 			"created": created,
@@ -280,6 +451,8 @@ async def void_ball(serial: str, _: AdminIdentity = RequireAdmin):
 		except wt.BallNotAvailable as e:
 			raise HTTPException(status_code=409, detail=str(e))
 		await db.commit()
+		machine.invalidate()
+		cabinets.wake_all()
 		return {
 			"ok": True,
 			"ball": {"id": str(ball.id), "serial": ball.serial, "status": ball.status.value},
@@ -290,55 +463,77 @@ async def void_ball(serial: str, _: AdminIdentity = RequireAdmin):
 
 class CreateBallBody(BaseModel):
 	serial: str
+	# The cabinet the ball is loaded in. Defaults to the one whose antenna
+	# scanned it; None leaves it unassigned (it counts toward every cabinet).
+	cabinet: Optional[str] = None
 
 
-@router.post("/balls/enroll/start")
-async def enroll_start(_: AdminIdentity = RequireAdmin):
-	"""Open a 10s window where the next tag presented to the antenna is
-	captured into state.enroll_pending. Refuses if the cabinet isn't fully
-	idle (someone playing or anyone queued)."""
-	if _state.current_player is not None:
+async def _require_idle(cab: Cabinet) -> None:
+	"""Refuse (409) to enroll on a cabinet that isn't fully idle: someone
+	playing, or anyone queued for it."""
+	if cab.current_player is not None:
 		raise HTTPException(status_code=409, detail="A turn is in progress")
 
 	async with async_session() as db:
 		qcount = await db.scalar(
 			select(func.count()).select_from(QueueEntry).where(
-				QueueEntry.status.in_(["queued", "active"])
+				QueueEntry.status.in_(["queued", "active"]),
+				# The shared line would hand this cabinet its next player too.
+				or_(QueueEntry.cabinet_id == cab.id,
+					QueueEntry.cabinet_id.is_(None) if cabinets.pool is not None else false()),
 			)
 		)
 	if qcount and qcount > 0:
 		raise HTTPException(status_code=409, detail=f"{qcount} players still queued")
 
+
+def _single_enroll_open(cab: Cabinet) -> bool:
+	p = cab.enroll_pending
+	return bool(p and p.get("expires_at", 0) > time.time()
+		and not p.get("timed_out") and not p.get("scanned_ball_serial"))
+
+
+@router.post("/balls/enroll/start")
+@_on_leader
+async def enroll_start(cabinet: Optional[str] = None, _: AdminIdentity = RequireAdmin):
+	"""Open a 10s window where the next tag presented to the cabinet's antenna
+	is captured into its enroll_pending. Refuses if the cabinet isn't fully
+	idle (someone playing or anyone queued)."""
+	cab = _cabinet(cabinet)
+	await _require_idle(cab)
+	if enrollment.listening(cab):
+		raise HTTPException(status_code=409, detail="Batch enrollment in progress")
+
 	# Don't stack enrollments. If one's open but expired, replace it; if
 	# open and active, refuse so the admin notices the existing window.
-	now = time.time()
-	if _state.enroll_pending and _state.enroll_pending.get("expires_at", 0) > now \
-		and not _state.enroll_pending.get("timed_out") \
-		and not _state.enroll_pending.get("scanned_ball_serial"):
+	if _single_enroll_open(cab):
 		raise HTTPException(status_code=409, detail="Enrollment already in progress")
 
-	_state.enroll_pending = {
+	now = time.time()
+	cab.enroll_pending = {
 		"expires_at": now + ENROLL_WINDOW_SECONDS,
 		"scanned_ball_serial": None,
 		"timed_out": False,
 	}
 	timeout_ms = ENROLL_WINDOW_SECONDS * 1000
-	ok = await safe_pi_emit("enroll", {"timeout_ms": timeout_ms})
+	ok = await safe_pi_emit(cab, "enroll", {"timeout_ms": timeout_ms})
 	if not ok:
-		_state.enroll_pending = None
+		cab.enroll_pending = None
 		raise HTTPException(status_code=503, detail="Cabinet is offline")
+	enrollment.window_opened(cab)
 	return {"ok": True, "timeout_ms": timeout_ms}
 
 
 @router.get("/balls/enroll/status")
-async def enroll_status(_: AdminIdentity = RequireAdmin):
+@_on_leader
+async def enroll_status(cabinet: Optional[str] = None, _: AdminIdentity = RequireAdmin):
 	"""Poll target for the admin UI's enroll dialog. Statuses:
 	  - "idle"     — no enrollment open.
 	  - "waiting"  — window open, no tag yet.
 	  - "scanned"  — tag captured; serial in scanned_ball_serial.
 	  - "timeout"  — window elapsed with no scan.
 	"""
-	p = _state.enroll_pending
+	p = _cabinet(cabinet).enroll_pending
 	if p is None:
 		return {"status": "idle"}
 	now = time.time()
@@ -356,16 +551,18 @@ async def enroll_status(_: AdminIdentity = RequireAdmin):
 
 
 @router.post("/balls/enroll/cancel")
-async def enroll_cancel(_: AdminIdentity = RequireAdmin):
+@_on_leader
+async def enroll_cancel(cabinet: Optional[str] = None, _: AdminIdentity = RequireAdmin):
 	"""Clear the enroll slot. Useful if the admin closes the dialog mid-
 	window. Does not currently signal cancel to the ESP — the window will
 	just close on its own there, and any later tag_scanned for it will be
 	ignored on arrival."""
-	_state.enroll_pending = None
+	_cabinet(cabinet).enroll_pending = None
 	return {"ok": True}
 
 
 @router.post("/balls")
+@_on_leader
 async def create_ball(body: CreateBallBody, _: AdminIdentity = RequireAdmin):
 	"""Create a Ball row with no OpenedBooster bound yet. Used after a
 	successful enrollment scan — the admin then opens the "Bind tag"
@@ -378,6 +575,14 @@ async def create_ball(body: CreateBallBody, _: AdminIdentity = RequireAdmin):
 		dup = await db.scalar(select(Ball).where(Ball.serial == serial))
 		if dup is not None:
 			raise HTTPException(status_code=409, detail=f"Ball {serial} already exists")
+		cabinet_id = body.cabinet
+		if cabinet_id is None:
+			cabinet_id = next((
+				cab.id for cab in cabinets
+				if cab.enroll_pending and cab.enroll_pending.get("scanned_ball_serial") == serial
+			), None)
+		elif cabinets.get(cabinet_id) is None:
+			raise HTTPException(status_code=404, detail=f"Cabinet {cabinet_id} not found")
 		batch = await _ensure_batch(db)
 		secret = _placeholder_hash("admin-create", serial, str(datetime.utcnow()))
 		ball = Ball(
@@ -389,44 +594,315 @@ async def create_ball(body: CreateBallBody, _: AdminIdentity = RequireAdmin):
 			merkle_proof={"siblings": [], "index": 0, "note": "placeholder-unbound"},
 			batch_id=batch.id,
 			status=BallStatus.LOADED,
+			cabinet_id=cabinet_id,
 		)
 		db.add(ball)
 		await db.commit()
+		machine.invalidate()
 		# Clear the enroll slot now that we've consumed it.
-		if _state.enroll_pending and _state.enroll_pending.get("scanned_ball_serial") == serial:
-			_state.enroll_pending = None
+		for cab in cabinets:
+			if cab.enroll_pending and cab.enroll_pending.get("scanned_ball_serial") == serial:
+				cab.enroll_pending = None
 		return {
 			"ok": True,
 			"ball": {
 				"id": str(ball.id),
 				"serial": ball.serial,
 				"status": ball.status.value,
+				"cabinet_id": ball.cabinet_id,
 			},
 		}
 
 
+# ─── Batch enrollment ────────────────────────────────────────────────────
+# Load a cabinet's balls in one sitting (app/enrollment.py): scan them all,
+# then create and bind them in bulk. Progress is pushed, not polled.
+
+# How often an idle event stream sends a comment, so proxies keep it open.
+_SSE_KEEPALIVE = 15
+
+
+def _enroll_batch(cab: Cabinet) -> enrollment.EnrollBatch:
+	if cab.enroll_batch is None:
+		raise HTTPException(status_code=404, detail=f"No enrollment batch on {cab.id}")
+	return cab.enroll_batch
+
+
+def _sse(event: str, data: dict) -> str:
+	return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _uuids(values: List[str], field: str) -> List[uuid.UUID]:
+	try:
+		return [uuid.UUID(v) for v in values]
+	except ValueError:
+		raise HTTPException(status_code=400, detail=f"{field} has a value that is not a UUID")
+
+
+@router.post("/balls/enroll/batch")
+@_on_leader
+async def enroll_batch_start(cabinet: Optional[str] = None, _: AdminIdentity = RequireAdmin):
+	"""Start a batch on the cabinet's antenna, or resume a stopped one: every
+	tag presented is queued, until /stop or ENROLL_BATCH_IDLE seconds without a
+	scan. Same idle-cabinet rule as a single enrollment; the cabinet takes no
+	turns while it scans."""
+	cab = _cabinet(cabinet)
+	batch = cab.enroll_batch
+	if batch is not None and batch.scanning:
+		return {"ok": True, "batch": batch.snapshot()}
+	await _require_idle(cab)
+	if _single_enroll_open(cab):
+		raise HTTPException(status_code=409, detail="Enrollment already in progress")
+
+	if batch is None:
+		batch = cab.enroll_batch = enrollment.EnrollBatch(cab.id)
+	batch.scanning = True
+	batch.stopped_reason = None
+	batch.last_scan_at = time.time()
+	if not await arm_enroll_batch(cab):
+		raise HTTPException(status_code=503, detail="Cabinet is offline")
+	batch.publish("batch")
+	return {"ok": True, "batch": batch.snapshot()}
+
+
+@router.get("/balls/enroll/batch")
+@_on_leader
+async def enroll_batch_status(cabinet: Optional[str] = None, _: AdminIdentity = RequireAdmin):
+	return {"batch": _enroll_batch(_cabinet(cabinet)).snapshot()}
+
+
+@router.get("/balls/enroll/batch/events")
+async def enroll_batch_events(cabinet: Optional[str] = None, _: AdminIdentity = RequireAdmin):
+	"""Server-sent events for the batch, each carrying it as it now stands:
+	`batch` (first, then on every change), `scan` (a tag came in: its serial
+	and whether it was queued), `bound` (serials created and bound) and
+	`closed`, which ends the stream."""
+	cab = _cabinet(cabinet)
+	if leader.is_leader:
+		batch = _enroll_batch(cab)
+		stream = batch.subscribe()
+		first = batch.snapshot()
+		unsubscribe = functools.partial(batch.unsubscribe, stream)
+	else:
+		# The batch lives in the leader: relay the events it publishes.
+		stream = enrollment.follow(cab.id)
+		unsubscribe = functools.partial(enrollment.unfollow, cab.id, stream)
+		try:
+			first = (await enroll_batch_status(cabinet=cabinet))["batch"]
+		except HTTPException:
+			unsubscribe()
+			raise
+
+	async def events():
+		try:
+			yield _sse("batch", {"batch": first})
+			while True:
+				try:
+					event, data = await asyncio.wait_for(stream.get(), _SSE_KEEPALIVE)
+				except asyncio.TimeoutError:
+					yield ": keepalive\n\n"
+					continue
+				yield _sse(event, data)
+				if event == "closed":
+					return
+		finally:
+			unsubscribe()
+
+	return StreamingResponse(events(), media_type="text/event-stream", headers={
+		"Cache-Control": "no-cache",
+		"X-Accel-Buffering": "no",   # nginx: deliver each event as it's written
+	})
+
+
+@router.post("/balls/enroll/batch/stop")
+@_on_leader
+async def enroll_batch_stop(cabinet: Optional[str] = None, _: AdminIdentity = RequireAdmin):
+	"""Stop scanning. The queue stays, to bind or to resume scanning into."""
+	cab = _cabinet(cabinet)
+	batch = _enroll_batch(cab)
+	batch.stop("stopped")
+	cab.wake()
+	return {"ok": True, "batch": batch.snapshot()}
+
+
+@router.delete("/balls/enroll/batch")
+@_on_leader
+async def enroll_batch_discard(cabinet: Optional[str] = None, _: AdminIdentity = RequireAdmin):
+	"""Drop the batch and its unbound queue. Balls already bound stay."""
+	cab = _cabinet(cabinet)
+	batch = _enroll_batch(cab)
+	cab.enroll_batch = None
+	batch.close("discarded")
+	cab.wake()
+	return {"ok": True}
+
+
+class EnrollBatchCommitBody(BaseModel):
+	# Bound, in this order, to the queued serials oldest scan first: the
+	# boosters, then the cards.
+	opened_booster_ids: List[str] = []
+	card_ids: List[str] = []
+
+
+async def _unbindable(db, ob_ids: List[uuid.UUID], card_ids: List[uuid.UUID]) -> List[str]:
+	"""Why each prize can't be bound to a new ball — the /bind and /bind-card
+	checks, a query per kind rather than per prize."""
+	problems = []
+	if ob_ids:
+		obs = {ob.id: ob for ob in (await db.scalars(
+			select(OpenedBooster).where(OpenedBooster.id.in_(ob_ids)).options(*loaders.OPENED_BOOSTER)
+		)).all()}
+		owners = dict((await db.execute(
+			select(Ball.opened_booster_id, Ball.serial).where(Ball.opened_booster_id.in_(ob_ids))
+		)).all())
+		for i in ob_ids:
+			ob = obs.get(i)
+			if ob is None:
+				problems.append(f"OpenedBooster {i} not found")
+			elif ob.status != InventoryStatus.AVAILABLE:
+				problems.append(f"OpenedBooster {i} is {ob.status.value}, not AVAILABLE")
+			elif not ob.is_complete:
+				problems.append(f"OpenedBooster {i} is incomplete")
+			elif i in owners:
+				problems.append(f"OpenedBooster {i} already bound to ball {owners[i]}")
+	if card_ids:
+		cards = {c.id: c for c in (await db.scalars(
+			select(Card).where(Card.id.in_(card_ids)).options(*loaders.CARD)
+		)).all()}
+		owners = dict((await db.execute(
+			select(Ball.prize_card_id, Ball.serial).where(Ball.prize_card_id.in_(card_ids))
+		)).all())
+		for i in card_ids:
+			card = cards.get(i)
+			if card is None:
+				problems.append(f"Card {i} not found")
+			elif card.status != CardStatus.IN_POOL:
+				problems.append(f"Card {i} is {card.status.value}, not IN_POOL")
+			elif card.card_type is None or not card.card_type.is_complete:
+				problems.append(f"Card {i}'s type is incomplete")
+			elif i in owners:
+				problems.append(f"Card {i} already bound to ball {owners[i]}")
+	return problems
+
+
+@router.post("/balls/enroll/batch/commit")
+@_on_leader
+async def enroll_batch_commit(
+	body: EnrollBatchCommitBody,
+	cabinet: Optional[str] = None,
+	_: AdminIdentity = RequireAdmin,
+):
+	"""Create a LOADED ball, in the scanning cabinet, for each of the oldest
+	queued serials and bind it to the next prize — one ball per prize listed.
+	All or nothing; the rest of the queue waits for the next commit."""
+	cab = _cabinet(cabinet)
+	batch = _enroll_batch(cab)
+	ob_ids = _uuids(body.opened_booster_ids, "opened_booster_ids")
+	card_ids = _uuids(body.card_ids, "card_ids")
+	prizes = [(PrizeKind.BOOSTER_PAIR, i) for i in ob_ids] + [(PrizeKind.SINGLE_CARD, i) for i in card_ids]
+	if not prizes:
+		raise HTTPException(status_code=400, detail="choose the prizes to bind")
+	# Each prize goes to one ball. _unbindable checks them one by one against
+	# the database, so a prize listed twice would pass it twice.
+	seen, twice = set(), set()
+	for i in ob_ids + card_ids:
+		(twice if i in seen else seen).add(i)
+	if twice:
+		raise HTTPException(
+			status_code=400, detail=f"Listed more than once: {', '.join(sorted(map(str, twice)))}",
+		)
+
+	async with batch.lock:
+		if len(prizes) > len(batch.queued):
+			raise HTTPException(
+				status_code=409, detail=f"{len(prizes)} prizes for {len(batch.queued)} queued balls",
+			)
+		serials = batch.queued[:len(prizes)]
+		async with async_session() as db:
+			taken = set((await db.scalars(select(Ball.serial).where(Ball.serial.in_(serials)))).all())
+			if taken:
+				# Enrolled some other way since the scan: out of the queue.
+				batch.queued = [s for s in batch.queued if s not in taken]
+				batch.publish("batch")
+				raise HTTPException(
+					status_code=409,
+					detail=f"Already enrolled, dropped from the queue: {', '.join(sorted(taken))}",
+				)
+			problems = await _unbindable(db, ob_ids, card_ids)
+			if problems:
+				raise HTTPException(status_code=409, detail="; ".join(problems))
+
+			commitment_batch = await _ensure_batch(db)
+			now = str(datetime.utcnow())
+			bound = []
+			for serial, (kind, prize_id) in zip(serials, prizes):
+				secret = _placeholder_hash("admin-secret", serial, str(prize_id), now)
+				db.add(Ball(
+					serial=serial,
+					prize_kind=kind,
+					opened_booster_id=prize_id if kind == PrizeKind.BOOSTER_PAIR else None,
+					prize_card_id=prize_id if kind == PrizeKind.SINGLE_CARD else None,
+					secret=secret,
+					commitment_hash=_placeholder_hash(secret, str(prize_id)),
+					merkle_proof={"siblings": [], "index": 0, "note": "placeholder"},
+					batch_id=commitment_batch.id,
+					status=BallStatus.LOADED,
+					cabinet_id=cab.id,
+				))
+				bound.append({"serial": serial, "prize_kind": kind.value, "prize_id": str(prize_id)})
+			await db.commit()
+		del batch.queued[:len(serials)]
+
+	machine.invalidate()
+	# New loaded balls can resolve an inventory fault — let the scheduler look.
+	cabinets.wake_all()
+	batch.publish("bound", {"serials": serials})
+	return {"ok": True, "bound": bound, "batch": batch.snapshot()}
+
+
 # ─── Inventory ───────────────────────────────────────────────────────────
 
+class OpenedBoosterFilters(BaseModel):
+	status: Optional[InventoryStatus] = None
+	sku: Optional[str] = None
+	# Only AVAILABLE OpenedBoosters not yet owned by another Ball — the
+	# dropdown the bind form uses.
+	bindable: Optional[bool] = None
+
+	def conditions(self) -> list:
+		c = []
+		if self.status is not None:
+			c.append(OpenedBooster.status == self.status)
+		if self.sku is not None:
+			c.append(OpenedBooster.sku == self.sku)
+		if self.bindable:
+			ball_already_bound = select(Ball.opened_booster_id).where(
+				Ball.opened_booster_id == OpenedBooster.id
+			)
+			c.append(and_(
+				OpenedBooster.status == InventoryStatus.AVAILABLE,
+				~exists(ball_already_bound),
+			))
+		return c
+
+
+# By SKU, unnamed ones first; matches ix_opened_booster_sku_id.
+_OB_SKU = func.coalesce(OpenedBooster.sku, literal_column("''"))
+
+
 @router.get("/inventory/opened-boosters")
 async def list_opened_boosters(
-	bindable: Optional[bool] = None,
+	filters: Annotated[OpenedBoosterFilters, Depends()],
+	cursor: Optional[str] = None,
+	limit: Optional[int] = None,
 	_: AdminIdentity = RequireAdmin,
 ):
-	"""When `bindable=true`, return only AVAILABLE OpenedBoosters not yet
-	owned by another Ball — the dropdown the bind form uses."""
 	async with async_session() as db:
-		q = select(OpenedBooster).order_by(OpenedBooster.sku, OpenedBooster.id)
-		if bindable:
-			ball_already_bound = select(Ball.opened_booster_id).where(
-				Ball.opened_booster_id == OpenedBooster.id
-			)
-			q = q.where(
-				and_(
-					OpenedBooster.status == InventoryStatus.AVAILABLE,
-					~exists(ball_already_bound),
-				)
-			)
-		obs = (await db.execute(q)).scalars().all()
+		obs, next_cursor = await _keyset_page(
+			db,
+			select(OpenedBooster).where(*filters.conditions()).options(*loaders.OPENED_BOOSTER),
+			(_OB_SKU, OpenedBooster.id), lambda ob: (ob.sku or "", ob.id), cursor, limit,
+		)
 		return {
 			"opened_boosters": [
 				{
@@ -441,10 +917,19 @@ async def list_opened_boosters(
 					"is_complete": ob.is_complete,
 				}
 				for ob in obs
-			]
+			],
+			"next_cursor": next_cursor,
 		}
 
 
+@router.get("/inventory/opened-boosters/count")
+async def count_opened_boosters(
+	filters: Annotated[OpenedBoosterFilters, Depends()],
+	_: AdminIdentity = RequireAdmin,
+):
+	return await _count(OpenedBooster, filters.conditions())
+
+
 def _serialize_closed_booster(r: ClosedBooster) -> dict:
 	return {
 		"sku": r.sku,
@@ -470,12 +955,49 @@ async def list_closed_boosters(_: AdminIdentity = RequireAdmin):
 		return {"closed_boosters": [_serialize_closed_booster(r) for r in rows]}
 
 
+class CardFilters(BaseModel):
+	status: Optional[CardStatus] = None
+	sku: Optional[str] = None
+	rarity: Optional[CardRarity] = None
+	# The owner's wallet address.
+	owner: Optional[str] = None
+	acquired_from: Optional[datetime] = None
+	acquired_to: Optional[datetime] = None
+
+	def conditions(self) -> list:
+		c = []
+		if self.status is not None:
+			c.append(Card.status == self.status)
+		if self.sku is not None or self.rarity is not None:
+			types = select(CardType.id)
+			if self.sku is not None:
+				types = types.where(CardType.sku == self.sku)
+			if self.rarity is not None:
+				types = types.where(CardType.rarity == self.rarity)
+			c.append(Card.card_type_id.in_(types))
+		if self.owner is not None:
+			c.append(Card.owner_user_id.in_(
+				select(User.id).where(User.wallet_address == self.owner)
+			))
+		if self.acquired_from is not None:
+			c.append(Card.acquired_at >= _naive_utc(self.acquired_from))
+		if self.acquired_to is not None:
+			c.append(Card.acquired_at < _naive_utc(self.acquired_to))
+		return c
+
+
 @router.get("/inventory/cards")
-async def list_cards(_: AdminIdentity = RequireAdmin):
+async def list_cards(
+	filters: Annotated[CardFilters, Depends()],
+	cursor: Optional[str] = None,
+	limit: Optional[int] = None,
+	_: AdminIdentity = RequireAdmin,
+):
 	async with async_session() as db:
-		rows = (await db.execute(
-			select(Card).order_by(Card.id).limit(200)
-		)).scalars().all()
+		rows, next_cursor = await _keyset_page(
+			db, select(Card).where(*filters.conditions()).options(*loaders.CARD),
+			(Card.id,), lambda c: (c.id,), cursor, limit,
+		)
 		return {
 			"cards": [
 				{
@@ -487,10 +1009,16 @@ async def list_cards(_: AdminIdentity = RequireAdmin):
 					"status": r.status.value,
 				}
 				for r in rows
-			]
+			],
+			"next_cursor": next_cursor,
 		}
 
 
+@router.get("/inventory/cards/count")
+async def count_cards(filters: Annotated[CardFilters, Depends()], _: AdminIdentity = RequireAdmin):
+	return await _count(Card, filters.conditions())
+
+
 # ─── Inventory create / edit / import ────────────────────────────────────
 
 def _parse_dt(value: Optional[str]) -> datetime:
@@ -502,6 +1030,10 @@ def _parse_dt(value: Optional[str]) -> datetime:
 		dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
 	except ValueError:
 		raise HTTPException(status_code=400, detail=f"invalid datetime: {value}")
+	return _naive_utc(dt)
+
+
+def _naive_utc(dt: datetime) -> datetime:
 	if dt.tzinfo is not None:
 		dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
 	return dt
@@ -600,6 +1132,7 @@ async def create_opened_booster(body: CreateOpenedBoosterBody, _: AdminIdentity
 		data["closed_booster_id"] = cb.id if cb else None
 		ob = _new_opened_booster(db, data)
 		await db.commit()
+		machine.invalidate()
 		await db.refresh(ob)
 		return {"ok": True, "id": str(ob.id), "sku": ob.sku}
 
@@ -624,6 +1157,7 @@ async def create_closed_booster(body: CreateClosedBoosterBody, _: AdminIdentity
 			"card_count": body.card_count, "in_stock": body.in_stock,
 		})
 		await db.commit()
+		machine.invalidate()
 		await db.refresh(row)
 		return {"ok": True, "closed_booster": _serialize_closed_booster(row)}
 
@@ -651,6 +1185,7 @@ async def patch_closed_booster(sku: str, body: PatchClosedBoosterBody, _: AdminI
 			if v is not None:
 				setattr(row, f, v)
 		await db.commit()
+		machine.invalidate()
 		await db.refresh(row)
 
 		# A change (out of stock, or card_count no longer matching a bound opened
@@ -690,11 +1225,41 @@ def _serialize_card_type(t: CardType) -> dict:
 	}
 
 
+class CardTypeFilters(BaseModel):
+	rarity: Optional[CardRarity] = None
+	set: Optional[str] = None
+	# SKUs starting with this.
+	sku: Optional[str] = None
+
+	def conditions(self) -> list:
+		c = []
+		if self.rarity is not None:
+			c.append(CardType.rarity == self.rarity)
+		if self.set is not None:
+			c.append(CardType.set == self.set)
+		if self.sku:
+			c.append(CardType.sku.startswith(self.sku, autoescape=True))
+		return c
+
+
 @router.get("/inventory/card-types")
-async def list_card_types(_: AdminIdentity = RequireAdmin):
+async def list_card_types(
+	filters: Annotated[CardTypeFilters, Depends()],
+	cursor: Optional[str] = None,
+	limit: Optional[int] = None,
+	_: AdminIdentity = RequireAdmin,
+):
 	async with async_session() as db:
-		rows = (await db.execute(select(CardType).order_by(CardType.sku))).scalars().all()
-		return {"card_types": [_serialize_card_type(t) for t in rows]}
+		rows, next_cursor = await _keyset_page(
+			db, select(CardType).where(*filters.conditions()),
+			(CardType.sku,), lambda t: (t.sku,), cursor, limit,
+		)
+		return {"card_types": [_serialize_card_type(t) for t in rows], "next_cursor": next_cursor}
+
+
+@router.get("/inventory/card-types/count")
+async def count_card_types(filters: Annotated[CardTypeFilters, Depends()], _: AdminIdentity = RequireAdmin):
+	return await _count(CardType, filters.conditions())
 
 
 class CardTypeBody(BaseModel):
@@ -727,6 +1292,7 @@ async def create_card_type(body: CardTypeBody, _: AdminIdentity = RequireAdmin):
 			stmt = stmt.on_conflict_do_nothing(index_elements=["sku"])
 		await db.execute(stmt)
 		await db.commit()
+		machine.invalidate()
 		row = await db.scalar(select(CardType).where(CardType.sku == sku))
 		return {"ok": True, "card_type": _serialize_card_type(row)}
 
@@ -751,6 +1317,7 @@ async def patch_card_type(sku: str, body: PatchCardTypeBody, _: AdminIdentity =
 			if v is not None:
 				setattr(row, f, _parse_rarity(v) if f == "rarity" else v)
 		await db.commit()
+		machine.invalidate()
 		await db.refresh(row)
 		return {"ok": True, "card_type": _serialize_card_type(row)}
 
@@ -775,6 +1342,7 @@ async def create_card(body: CreateCardBody, _: AdminIdentity = RequireAdmin):
 			data["opened_booster_id"] = uuid.UUID(data["opened_booster_id"])
 		card = await _new_card(db, data)
 		await db.commit()
+		machine.invalidate()
 		return {"ok": True, "id": str(card.id)}
 
 
@@ -802,6 +1370,7 @@ async def patch_card(card_id: str, body: PatchCardBody, _: AdminIdentity = Requi
 		if body.position is not None:
 			card.position = body.position
 		await db.commit()
+		machine.invalidate()
 		return {"ok": True, "id": str(card.id)}
 
 
@@ -837,6 +1406,7 @@ async def patch_opened_booster(ob_id: str, body: PatchOpenedBoosterBody, _: Admi
 		if body.filmed_at is not None:
 			ob.filmed_at = _parse_dt(body.filmed_at)
 		await db.commit()
+		machine.invalidate()
 		return {"ok": True, "id": str(ob.id)}
 
 
@@ -897,6 +1467,7 @@ async def add_ob_card(ob_id: str, body: AddObCardBody, _: AdminIdentity = Requir
 		)
 		db.add(card)
 		await db.commit()
+		machine.invalidate()
 		return {"ok": True, "id": str(card.id)}
 
 
@@ -914,6 +1485,7 @@ async def delete_card(card_id: str, _: AdminIdentity = RequireAdmin):
 			raise HTTPException(status_code=409, detail=f"Card is {card.status.value}, not deletable")
 		await db.delete(card)
 		await db.commit()
+		machine.invalidate()
 		return {"ok": True}
 
 
@@ -932,29 +1504,71 @@ async def reorder_ob_cards(ob_id: str, body: ReorderCardsBody, _: AdminIdentity
 			if c is not None:
 				c.position = pos
 		await db.commit()
+		machine.invalidate()
 		return {"ok": True}
 
 
+# Streamed bodies, by Content-Type; a plain JSON array is read whole.
+_IMPORT_SOURCES = {
+	"application/x-ndjson": importer.ndjson_rows,
+	"application/jsonl": importer.ndjson_rows,
+	"text/csv": importer.csv_rows,
+}
+
+
 @router.post("/inventory/import")
-async def import_inventory(items: List[dict], _: AdminIdentity = RequireAdmin):
-	"""Bulk-create inventory in one transaction. Each item is a dict with a
-	`type` of "card" | "opened_booster" | "closed_booster" plus that type's
-	fields. All-or-nothing: a bad row rolls back the whole batch."""
-	counts = {"card": 0, "opened_booster": 0, "closed_booster": 0}
+async def import_inventory(
+	request: Request,
+	dry_run: bool = False,
+	kind: Optional[str] = None,
+	_: AdminIdentity = RequireAdmin,
+):
+	"""Bulk-load inventory (app/admin/importer.py). The body is NDJSON
+	(application/x-ndjson) or CSV with a header line (text/csv), streamed; rows
+	are card | opened_booster | closed_booster | card_type, named by each row's
+	`type` or, for an upload of one kind, by `kind`. A bad row is reported by
+	line and skipped. A JSON array (application/json) still works as before:
+	all-or-nothing, a bad item fails the request. `dry_run` checks everything
+	and writes nothing."""
+	if kind is not None and kind not in importer.KINDS:
+		raise HTTPException(status_code=400, detail=f"kind must be one of {list(importer.KINDS)}")
+	content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+	atomic = content_type == "application/json"
+	if atomic:
+		try:
+			items = await request.json()
+		except ValueError:
+			raise HTTPException(status_code=400, detail="body is not valid JSON")
+		if not isinstance(items, list):
+			raise HTTPException(status_code=400, detail="body must be a JSON array of items")
+		rows = importer.json_rows(items)
+	elif content_type in _IMPORT_SOURCES:
+		rows = _IMPORT_SOURCES[content_type](request.stream())
+	else:
+		raise HTTPException(status_code=415, detail=f"unsupported Content-Type {content_type!r}")
+
 	async with async_session() as db:
-		for i, item in enumerate(items):
-			kind = (item or {}).get("type")
-			if kind == "card":
-				await _new_card(db, item)
-			elif kind == "opened_booster":
-				_new_opened_booster(db, item)
-			elif kind == "closed_booster":
-				await _upsert_closed_booster(db, item)
-			else:
-				raise HTTPException(status_code=400, detail=f"item {i}: unknown type {kind!r}")
-			counts[kind] += 1
-		await db.commit()
-	return {"ok": True, "counts": counts}
+		try:
+			imp = await importer.run(db, rows, kind)
+		except UnicodeDecodeError:
+			raise HTTPException(status_code=400, detail="body is not UTF-8")
+		if atomic and imp.errors:
+			first = imp.errors[0]
+			raise HTTPException(status_code=400, detail=f"item {first['line']}: {first['error']}")
+		if dry_run:
+			await db.rollback()
+		else:
+			await db.commit()
+			machine.invalidate()
+	if not dry_run:
+		cabinets.wake_all()
+	return {
+		"ok": True,
+		"dry_run": dry_run,
+		"counts": imp.counts,
+		"error_count": imp.error_count,
+		"errors": imp.errors,
+	}
 
 
 # ─── Plays history ───────────────────────────────────────────────────────
@@ -990,23 +1604,51 @@ def _describe_prize(w: Win) -> dict:
 	return info
 
 
+class PlayFilters(BaseModel):
+	status: Optional[str] = None
+	address: Optional[str] = None
+	# Only plays that won (True) or didn't (False).
+	won: Optional[bool] = None
+	created_from: Optional[datetime] = None
+	created_to: Optional[datetime] = None
+
+	def conditions(self) -> list:
+		c = []
+		if self.status is not None:
+			c.append(QueueEntry.status == self.status)
+		if self.address is not None:
+			c.append(QueueEntry.address == self.address)
+		if self.won is not None:
+			has_win = exists(select(Win.id).where(Win.queue_entry_id == QueueEntry.id))
+			c.append(has_win if self.won else ~has_win)
+		if self.created_from is not None:
+			c.append(QueueEntry.created_at >= _naive_utc(self.created_from))
+		if self.created_to is not None:
+			c.append(QueueEntry.created_at < _naive_utc(self.created_to))
+		return c
+
+
 @router.get("/plays")
-async def list_plays(limit: int = 100, _: AdminIdentity = RequireAdmin):
-	"""Recent plays (turns). Each row is a QueueEntry; a play is 'won' iff a Win
-	row settled against it (a bound ball was grabbed), otherwise 'lost'. Wins
-	carry their prize."""
-	limit = max(1, min(limit, 500))
+async def list_plays(
+	filters: Annotated[PlayFilters, Depends()],
+	cursor: Optional[str] = None,
+	limit: Optional[int] = None,
+	_: AdminIdentity = RequireAdmin,
+):
+	"""Recent plays (turns), newest first. Each row is a QueueEntry; a play is
+	'won' iff a Win row settled against it (a bound ball was grabbed), otherwise
+	'lost'. Wins carry their prize. Paged on the entry id, which grows with
+	created_at and, unlike it, is never NULL."""
 	async with async_session() as db:
-		entries = (await db.execute(
-			select(QueueEntry).order_by(QueueEntry.created_at.desc()).limit(limit)
-		)).scalars().all()
+		entries, next_cursor = await _keyset_page(
+			db, select(QueueEntry).where(*filters.conditions()),
+			(QueueEntry.id,), lambda e: (e.id,), cursor, limit, descending=True,
+		)
 
 		win_by_q: dict = {}
 		qids = [e.id for e in entries]
 		if qids:
-			wins = (await db.execute(
-				select(Win).where(Win.queue_entry_id.in_(qids))
-			)).scalars().all()
+			wins = (await db.execute(loaders.wins_for_entries(qids))).scalars().all()
 			win_by_q = {w.queue_entry_id: w for w in wins}
 
 		plays = []
@@ -1031,63 +1673,131 @@ async def list_plays(limit: int = 100, _: AdminIdentity = RequireAdmin):
 				"outcome": outcome,
 				"prize": _describe_prize(w) if w is not None else None,
 			})
-		return {"plays": plays}
+		return {"plays": plays, "next_cursor": next_cursor}
+
+
+@router.get("/plays/count")
+async def count_plays(filters: Annotated[PlayFilters, Depends()], _: AdminIdentity = RequireAdmin):
+	return await _count(QueueEntry, filters.conditions())
 
 
 # ─── Cabinet ops ─────────────────────────────────────────────────────────
 
+@router.get("/cabinets")
+async def list_cabinets(_: AdminIdentity = RequireAdmin):
+	"""Every cabinet this backend drives, the default first, with the headline
+	of its status. /cabinet/* endpoints take one of these ids as `cabinet`."""
+	return {
+		"cabinets": [
+			{
+				"id": cab.id,
+				"pi_connected": cab.pi_connected,
+				"current_player": cab.current_player,
+				"queue_length": len(cab.queue),
+				"loaded_stock": await machine.loaded_stock(cab),
+				"fault": cab.version_fault or cab.cabinet_fault or _state.inventory_fault,
+			}
+			for cab in cabinets
+		],
+		# QUEUE_DISPATCH "pool": the shared line every cabinet serves.
+		"pool_length": len(cabinets.pool) if cabinets.pool is not None else None,
+	}
+
+
 @router.get("/cabinet/status")
-async def cabinet_status(_: AdminIdentity = RequireAdmin):
+@_on_leader
+async def cabinet_status(cabinet: Optional[str] = None, _: AdminIdentity = RequireAdmin):
 	"""Live snapshot for the ops page: Pi link health, who's playing, how many
 	are queued, and the mirrored chute fault (None == healthy)."""
-	async with async_session() as db:
-		queue_length = await db.scalar(
-			select(func.count()).select_from(QueueEntry).where(
-				QueueEntry.status == "queued"
-			)
-		)
+	cab = _cabinet(cabinet)
 	return {
-		"pi_connected": _state.pi_connected,
-		# Any of these pauses the queue until it's resolved.
-		"version_fault": _state.version_fault,
+		"cabinet": cab.id,
+		"pi_connected": cab.pi_connected,
+		# Any of these pauses the queue until it's resolved. The inventory
+		# fault is shared: it pauses every cabinet.
+		"version_fault": cab.version_fault,
 		"inventory_fault": _state.inventory_fault,
-		"current_player": _state.current_player,
-		"queue_length": int(queue_length or 0),
-		"cabinet_fault": _state.cabinet_fault,
+		"current_player": cab.current_player,
+		"queue_length": len(cab.queue),
+		# Logged-in sockets and distinct wallets behind them (app/sessions.py).
+		"sessions": sessions.counts(),
+		# Turns started, and players passed over at handoff (app/handoff.py).
+		"handoff": dict(handoff_stats),
+		# Wallet -> user id lookups served from memory vs the database.
+		"user_id_cache": wt.user_id_cache_info(),
+		"cabinet_fault": cab.cabinet_fault,
+		# A batch enrollment holds the queue while it scans.
+		"enroll_batch": cab.enroll_batch.snapshot() if cab.enroll_batch else None,
 		# The full VPS/Pi/ESP protocol chain, for the ops page. Numbers are the
 		# last-seen snapshot (present even when healthy); *_ok are the live
 		# equality verdicts. vps_proto is this process's own constant.
 		"versions": {
 			"vps_proto": PI_VPS_PROTO,
-			"pi_proto": _state.pi_proto,
-			"esp_proto": _state.esp_proto,
-			"esp_fw": _state.esp_fw,
-			"pi_fw": _state.pi_fw,
-			"pi_vps_ok": _state.pi_proto == PI_VPS_PROTO,
-			"esp_pi_ok": _state.esp_pi_ok,
+			"pi_proto": cab.pi_proto,
+			"esp_proto": cab.esp_proto,
+			"esp_fw": cab.esp_fw,
+			"pi_fw": cab.pi_fw,
+			"pi_vps_ok": cab.pi_proto == PI_VPS_PROTO,
+			"esp_pi_ok": cab.esp_pi_ok,
 		},
+		# Optional wire features negotiated with the Pi (e.g. "move_bin").
+		"pi_features": sorted(cab.pi_features),
 	}
 
 
+@router.get("/latency")
+@_on_leader
+async def latency_histograms(_: AdminIdentity = RequireAdmin):
+	"""Per-hop latency histograms since startup (or the last reset), e.g.
+	move.central.bin vs move.central.json, move.rtt, move.pi_apply — plus the
+	move pipeline's counters (received / sent / duplicate / coalesced)."""
+	return {"histograms": latency.snapshot(), "moves": dict(move_stats)}
+
+
+@router.get("/latency/turns")
+@_on_leader
+async def latency_turns(_: AdminIdentity = RequireAdmin):
+	"""Per-stage turn timings (the turn.* histograms) and the last few turns'
+	traces: central's hops relative to turn_start, and the Pi's own stage
+	durations. This is where the dead time between players shows up."""
+	return {
+		"stages": {k: v for k, v in latency.snapshot().items() if k.startswith("turn.")},
+		"turns": latency.recent_turns(),
+	}
+
+
+@router.post("/latency/reset")
+@_on_leader
+async def latency_reset(_: AdminIdentity = RequireAdmin):
+	"""Zero every histogram and turn trace — take a clean sample before/after
+	a change."""
+	latency.reset()
+	for k in move_stats:
+		move_stats[k] = 0
+	return {"ok": True}
+
+
 @router.post("/cabinet/test-arm")
-async def cabinet_test_arm(_: AdminIdentity = RequireAdmin):
+@_on_leader
+async def cabinet_test_arm(cabinet: Optional[str] = None, _: AdminIdentity = RequireAdmin):
 	"""Diagnostic 'test win': arm the chute so an operator can drop a ball and
 	see the real ESP sequence (break-beams, RFID, solenoid). Blocks until the
 	verdict or timeout. Does NOT create a Win. Refuses if a turn is in progress."""
-	if _state.current_player is not None:
+	cab = _cabinet(cabinet)
+	if cab.current_player is not None:
 		raise HTTPException(status_code=409, detail="A turn is in progress")
 	try:
-		result = await request_test_arm(timeout=20.0)
+		result = await request_test_arm(cab, timeout=20.0)
 	except Exception as e:
 		raise HTTPException(status_code=503, detail=str(e))
 	return {"ok": True, "result": result}
 
 
 @router.get("/cabinet/esp")
-async def cabinet_esp(_: AdminIdentity = RequireAdmin):
+async def cabinet_esp(cabinet: Optional[str] = None, _: AdminIdentity = RequireAdmin):
 	"""On-demand chute-ESP status — proxies the Pi server's /health (ESP link,
 	firmware, latched fault, live ping). 503 if the Pi is unreachable."""
-	url = PI_SERVER_URL.rstrip("/") + "/health"
+	url = _cabinet(cabinet).pi_url.rstrip("/") + "/health"
 	try:
 		async with httpx.AsyncClient(timeout=4.0) as client:
 			r = await client.get(url)
@@ -1098,21 +1808,27 @@ async def cabinet_esp(_: AdminIdentity = RequireAdmin):
 
 
 @router.post("/cabinet/clear_fault")
-async def clear_fault(_: AdminIdentity = RequireAdmin):
+@_on_leader
+async def clear_fault(cabinet: Optional[str] = None, _: AdminIdentity = RequireAdmin):
 	"""Relay a fault_clear to the Pi (which forwards it to the chute ESP32,
 	releasing the latch) and clear the local mirror."""
-	ok = await safe_pi_emit("fault_clear")
+	cab = _cabinet(cabinet)
+	ok = await safe_pi_emit(cab, "fault_clear")
 	if not ok:
 		raise HTTPException(status_code=503, detail="Cabinet is offline")
-	_state.cabinet_fault = None
+	cab.cabinet_fault = None
+	cab.changed()
+	cab.wake()
 	return {"ok": True}
 
 
 @router.post("/queue/force_turn_end")
-async def force_turn_end(_: AdminIdentity = RequireAdmin):
+@_on_leader
+async def force_turn_end(cabinet: Optional[str] = None, _: AdminIdentity = RequireAdmin):
 	"""Operator override to unstick the queue: run the same transition the Pi's
 	`turn_end` triggers — settle the active entry and advance to the next."""
-	if _state.current_player is None:
+	cab = _cabinet(cabinet)
+	if cab.current_player is None:
 		raise HTTPException(status_code=409, detail="No turn is in progress")
-	await turn_end()
+	await turn_end(cab)
 	return {"ok": True}
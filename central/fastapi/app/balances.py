@@ -0,0 +1,163 @@
+"""The per-user balance, materialized from the ledger.
+
+The ledger (LedgerEntry) is the record of every cent a user has won and
+withdrawn. Summing it on every read costs more the longer someone plays, and
+working out what is on chargeback hold adds a LedgerEntry -> Win -> Payment join
+on top. So each user has a UserBalance row (total and held cents) that is
+updated by the same transaction that writes the ledger row: always go through
+`post` / `unpost` here instead of adding or deleting a LedgerEntry directly.
+
+A credit traceable to a CARD-funded ticket is held until CHARGEBACK_HOLD_DAYS
+after the charge confirmed. It's stamped with `held_until` when posted, and
+`release_expired_holds` (run periodically by the balance scheduler) moves it out
+of held_cents once that time has passed.
+
+`reconcile` recomputes every balance from the ledger and reports users whose
+materialized row has drifted. It doesn't fix them — a drift is a bug in some
+write path, and the operator should see it rather than have it papered over.
+"""
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import select, update, func, case
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from .config import CHARGEBACK_HOLD_DAYS
+from .models import LedgerEntry, LedgerKind, UserBalance, Win, Payment, PaymentMethod
+
+
+# Ledger kinds that add to / subtract from the off-chain winnings balance.
+# Balance accrues ONLY from wins (resells) — never deposits — by product design.
+CREDIT_KINDS = (
+    LedgerKind.DEPOSIT, LedgerKind.RESELL, LedgerKind.AUTO_RESELL,
+    LedgerKind.CARD_RESELL, LedgerKind.BET_REFUND,
+)
+DEBIT_KINDS = (LedgerKind.WITHDRAWAL, LedgerKind.BET_PLACED)
+
+
+def _signed(entry: LedgerEntry) -> int:
+    return -entry.amount_cents if entry.kind in DEBIT_KINDS else entry.amount_cents
+
+
+async def _apply(db, user_id, total_delta: int, held_delta: int) -> None:
+    # Upsert-increment: atomic under concurrent writers, and creates the row on
+    # a user's first ledger entry.
+    stmt = pg_insert(UserBalance).values(
+        user_id=user_id, total_cents=total_delta, held_cents=held_delta,
+        updated_at=datetime.utcnow(),
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserBalance.user_id],
+        set_={
+            "total_cents": UserBalance.total_cents + stmt.excluded.total_cents,
+            "held_cents": UserBalance.held_cents + stmt.excluded.held_cents,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ))
+
+
+async def _hold_until(db, entry: LedgerEntry):
+    """When this credit's chargeback hold ends, or None if it isn't held.
+
+    Traced via its Win -> QueueEntry -> Payment. Credits with no win_id
+    (CARD_RESELL from collection) can't be traced to the funding payment and are
+    not held — the direct win->resell path (the common vector) is covered.
+    """
+    if entry.kind not in CREDIT_KINDS or entry.win_id is None:
+        return None
+    confirmed_at = await db.scalar(
+        select(Payment.confirmed_at)
+        .join(Win, Win.queue_entry_id == Payment.queue_entry_id)
+        .where(Win.id == entry.win_id)
+        .where(Payment.method == PaymentMethod.CARD)
+        .where(Payment.confirmed_at.isnot(None))
+    )
+    if confirmed_at is None:
+        return None
+    until = confirmed_at + timedelta(days=CHARGEBACK_HOLD_DAYS)
+    return until if until > datetime.utcnow() else None
+
+
+async def post(db, entry: LedgerEntry) -> LedgerEntry:
+    """Add `entry` to the ledger and apply it to the user's balance, both in
+    `db`'s transaction. The caller commits."""
+    entry.held_until = await _hold_until(db, entry)
+    db.add(entry)
+    held = entry.amount_cents if entry.held_until is not None else 0
+    await _apply(db, entry.user_id, _signed(entry), held)
+    return entry
+
+
+async def unpost(db, entry: LedgerEntry) -> None:
+    """Delete `entry` (e.g. a withdrawal debit whose payout failed) and take it
+    back out of the balance. The caller commits."""
+    held = entry.amount_cents if entry.held_until is not None else 0
+    await db.delete(entry)
+    await _apply(db, entry.user_id, -_signed(entry), -held)
+
+
+async def balance(db, user_id) -> Tuple[int, int]:
+    """(total_cents, held_cents) for the user; (0, 0) if they have no ledger."""
+    # Columns, not the ORM object: _apply writes with a Core upsert, so an
+    # identity-mapped UserBalance in this session would be stale after a post.
+    row = (await db.execute(
+        select(UserBalance.total_cents, UserBalance.held_cents)
+        .where(UserBalance.user_id == user_id)
+    )).first()
+    if row is None:
+        return 0, 0
+    return int(row.total_cents), int(row.held_cents)
+
+
+async def release_expired_holds(db) -> int:
+    """Release every credit whose chargeback hold has ended. Returns how many.
+    The caller commits."""
+    released = (await db.execute(
+        update(LedgerEntry)
+        .where(LedgerEntry.held_until.isnot(None))
+        .where(LedgerEntry.held_until <= datetime.utcnow())
+        .values(held_until=None)
+        .returning(LedgerEntry.user_id, LedgerEntry.amount_cents)
+        .execution_options(synchronize_session=False)
+    )).all()
+
+    per_user: dict = {}
+    for user_id, cents in released:
+        per_user[user_id] = per_user.get(user_id, 0) + cents
+    for user_id, cents in per_user.items():
+        await _apply(db, user_id, 0, -cents)
+    return len(released)
+
+
+async def reconcile(db) -> List[dict]:
+    """Recompute every balance from the ledger. Returns the users whose
+    materialized row disagrees: [{user_id, expected: (total, held), actual}]."""
+    signed = case(
+        (LedgerEntry.kind.in_(DEBIT_KINDS), -LedgerEntry.amount_cents),
+        else_=LedgerEntry.amount_cents,
+    )
+    held = case((LedgerEntry.held_until.isnot(None), LedgerEntry.amount_cents), else_=0)
+    expected = {
+        r.user_id: (int(r.total), int(r.held))
+        for r in (await db.execute(
+            select(
+                LedgerEntry.user_id,
+                func.sum(signed).label("total"),
+                func.sum(held).label("held"),
+            ).group_by(LedgerEntry.user_id)
+        )).all()
+    }
+    actual = {
+        r.user_id: (int(r.total_cents), int(r.held_cents))
+        for r in (await db.execute(
+            select(UserBalance.user_id, UserBalance.total_cents, UserBalance.held_cents)
+        )).all()
+    }
+
+    drift = []
+    for user_id in expected.keys() | actual.keys():
+        want = expected.get(user_id, (0, 0))
+        got = actual.get(user_id, (0, 0))
+        if want != got:
+            drift.append({"user_id": user_id, "expected": want, "actual": got})
+    return drift
@@ -0,0 +1,399 @@
+"""The claw machines this process drives.
+
+Everything about the machine used to be a module-level singleton: the player on
+it and its chute latch in state.py, the Pi websocket and move pipeline in
+pi_client, the queue index. One backend could run one cabinet. A `Cabinet` owns
+all of that for one machine — its turn, its faults and version handshake, its
+Pi link, its scheduler wakeup and transition lock, and its partition of the
+queue (QueueEntry.cabinet_id) — and pi_client, the turn scheduler, handoff and
+machine take the cabinet they act on.
+
+So one process drives every cabinet in CABINETS at once: a connect_pi and a
+turn_scheduler task per cabinet, over one DB pool and one Socket.IO server.
+Broadcasts about a machine go to its room (`cabinet:<id>`). A socket watches
+the default cabinet from connect until it asks for another (select_cabinet).
+
+Where a paid play waits depends on QUEUE_DISPATCH. With "pool" it joins the
+registry's shared line, which every cabinet also serves (`Cabinet.pool`), and
+the first fit cabinet to free up takes the head (app/handoff.py). With
+"cabinet" it queues on the cabinet the player is watching.
+
+Shared by all cabinets: the round (state.py), the prize pool — an unclaimable
+loaded ball pauses every cabinet (state.inventory_fault), though each ball
+counts toward its own cabinet's stock (Ball.cabinet_id) — and the player
+sessions. A player waits in one
+queue at a time.
+
+Only the leader process (app/leader.py) drives the cabinets. A follower's
+Cabinet is a mirror: the leader publishes what it shows — the Pi link, the turn
+in play, the faults (`mirror`) — whenever it changes (`changed`), and each
+queue's order after it moves.
+"""
+import asyncio
+import json
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from . import leader
+from . import state
+from .config import CABINETS, QUEUE_DISPATCH, TURN_CYCLE_ESTIMATE
+from .logging import log
+from .queue_index import QueueIndex
+
+
+class Cabinet:
+    def __init__(self, cabinet_id: str, pi_url: str, pool: Optional[QueueIndex] = None):
+        self.id = cabinet_id
+        self.pi_url = pi_url
+        self.room = f"cabinet:{cabinet_id}"
+
+        # The turn in play. current_turn_id is its QueueEntry id, sent to the Pi
+        # with turn_start as the turn_id that ties its trace together
+        # (app/latency.py).
+        self.current_player: Optional[str] = None
+        self.current_key: Optional[str] = None
+        self.current_turn_id: Optional[int] = None
+        self.last_start = datetime.min
+
+        # The turn that has ended and is awaiting a chute verdict.
+        #
+        # The Pi broadcasts `turn_end` as soon as the ball drops past the opto,
+        # and only THEN arms the chute and waits for the RFID verdict — so
+        # `prize_won` always arrives after the turn ended, and possibly after the
+        # next turn has begun (INTER_TURN_DELAY is only a few seconds; a slow ball
+        # or an RFID retry can outlast it). Attributing the prize to current_key
+        # would therefore credit it to whoever is playing *now*. These hold the
+        # turn that actually fired the arm. Set on turn_end, consumed once by
+        # on_chute_verdict.
+        self.awaiting_verdict_key: Optional[str] = None
+        self.awaiting_verdict_player: Optional[str] = None
+        self.awaiting_verdict_turn_id: Optional[int] = None
+
+        # Mirror of the chute ESP32's latched fault, surfaced to the admin ops
+        # page. Set by pi_client.on_pi_fault / the verdict, cleared by the admin
+        # /cabinet/clear_fault endpoint once the Pi acks. None == healthy.
+        # Shape: {"kind": str, "reason": Optional[str]}
+        self.cabinet_fault: Optional[dict] = None
+        # A protocol-version mismatch between VPS / Pi / ESP (versioning.py).
+        # Shape: {"kind": "version_mismatch", "problems": [str], "versions": {...}}
+        self.version_fault: Optional[dict] = None
+
+        # The Pi link (pi_client.connect_pi) and the last-seen protocol snapshot
+        # from its handshake (esp_status), kept even when everything AGREES so
+        # the ops page can show the whole chain. Cleared when the Pi drops.
+        self.websocket = None
+        self.pi_connected = False
+        self.pi_proto: Optional[int] = None
+        self.esp_proto: Optional[int] = None
+        self.esp_fw: Optional[str] = None
+        self.pi_fw: Optional[str] = None
+        self.esp_pi_ok: bool = True   # ESP<->Pi contract, per the Pi's own latch
+        # Optional wire features negotiated with the Pi (versioning.py).
+        self.pi_features: set = set()
+
+        # Admin tag-enrollment slot for this cabinet's antenna. Set by
+        # /admin/balls/enroll/start, populated when the Pi forwards `tag_scanned`
+        # or `enroll_timeout`. Shape:
+        #   {"expires_at": float, "scanned_ball_serial": Optional[str], "timed_out": bool}
+        self.enroll_pending: Optional[dict] = None
+        # A batch enrollment (app/enrollment.py EnrollBatch), once one is
+        # started; it keeps its queue of scanned serials until discarded.
+        self.enroll_batch = None
+        # When the ESP's enrollment window closes at the latest (0: closed).
+        self.enroll_window_until = 0.0
+
+        # Wakes this cabinet's turn scheduler. It sleeps until the next turn
+        # deadline or until something that could let a turn start happens: a
+        # play is enqueued, a turn ends, a fault clears, inventory changes.
+        self.turn_wakeup = asyncio.Event()
+        self.turn_lock = asyncio.Lock()       # serializes turn transitions
+        # Set by on_chute_verdict, awaited by turn_end; verdict_won says whether
+        # that verdict changed the loaded stock.
+        self.verdict_ready = asyncio.Event()
+        self.verdict_won = False
+        self.test_future: Optional[asyncio.Future] = None
+
+        # Move pipeline and binary move frames (pi_client.submit_move).
+        self.move_queue: deque = deque()      # (bitmask, received_at), oldest first
+        self.move_last_sent: Optional[int] = None
+        self.move_sent_at = 0.0               # monotonic time of the last send
+        self.move_sender: Optional[asyncio.Task] = None
+        self.move_seq = 0
+        self.moves_in_flight: dict = {}       # seq -> perf_counter() at send
+
+        # Plays queued on this cabinet, and the shared line it also serves
+        # (None unless QUEUE_DISPATCH is "pool"). Its own queue goes first: it
+        # holds only plays that asked for this machine.
+        self.queue = QueueIndex(cabinet_id)
+        self.pool = pool
+
+        # The global_sync payload for this cabinet's room, cached (see
+        # refresh_global_sync).
+        self._snapshot: Optional[dict] = None
+        self.sync_version = 0
+        # The mirror last published to the followers (leader only).
+        self._mirrored: Optional[dict] = None
+
+    def __repr__(self) -> str:
+        return f"<Cabinet {self.id}>"
+
+    def wake(self) -> None:
+        """Wake the turn scheduler. Sync, so plain handlers can call it."""
+        self.turn_wakeup.set()
+
+    def queues(self) -> List[QueueIndex]:
+        """The lines this cabinet takes its next player from, in order."""
+        return [self.queue] if self.pool is None else [self.queue, self.pool]
+
+    def waiting(self) -> int:
+        return sum(len(q) for q in self.queues())
+
+    def address_of(self, entry_id: int) -> Optional[str]:
+        for q in self.queues():
+            address = q.address_of(entry_id)
+            if address is not None:
+                return address
+        return None
+
+    def discard(self, entry_id: int) -> None:
+        """Drop a promoted or vanished entry from whichever line held it."""
+        for q in self.queues():
+            q.discard(entry_id)
+
+    def fit(self) -> bool:
+        """Could take a turn now, going by the in-memory faults alone — for
+        estimates. Starting a turn still goes through machine.blocked."""
+        return (self.pi_connected and not self.cabinet_fault and not self.version_fault
+                and not state.inventory_fault
+                and not (self.enroll_batch is not None and self.enroll_batch.scanning))
+
+    def reset(self) -> None:
+        """Forget the live machine — the turn in play, the Pi link, the
+        pending verdict — when this process stops driving it (app/leader.py).
+        The rows stay; whoever drives it next closes out the active entry."""
+        self.current_player = self.current_key = self.current_turn_id = None
+        self.awaiting_verdict_key = self.awaiting_verdict_player = None
+        self.awaiting_verdict_turn_id = None
+        self.websocket = None
+        self.enroll_pending = None
+        if self.enroll_batch is not None:
+            self.enroll_batch.close("leader stood down")
+            self.enroll_batch = None
+        self.enroll_window_until = 0.0
+        self.move_queue.clear()
+        self.move_last_sent = None
+        self.moves_in_flight.clear()
+        self.set_pi_status(False)
+
+    def set_pi_status(self, connected: bool) -> None:
+        """Update the flags that reflect the Pi-side socket health."""
+        self.pi_connected = connected
+        if not connected:
+            # The version snapshot describes a live Pi/ESP link; once the Pi
+            # drops it's stale. Clear it so the ops page shows "unknown", not a
+            # phantom ✓.
+            self.pi_proto = self.esp_proto = self.esp_fw = self.pi_fw = None
+            self.esp_pi_ok = True
+            self.pi_features = set()
+        self.refresh_global_sync()
+        self.changed()
+        log.info(f"\033[95m[PI STATUS] cabinet={self.id} connected={connected}\033[0m")
+
+    def mirror(self) -> dict:
+        """What a follower shows of this cabinet: its Pi link, the turn in
+        play and the faults."""
+        return {
+            "pi_connected": self.pi_connected,
+            "current_player": self.current_player,
+            "current_turn_id": self.current_turn_id,
+            "cabinet_fault": self.cabinet_fault,
+            "version_fault": self.version_fault,
+            "pi_proto": self.pi_proto,
+            "esp_proto": self.esp_proto,
+            "esp_fw": self.esp_fw,
+            "pi_fw": self.pi_fw,
+            "esp_pi_ok": self.esp_pi_ok,
+            "pi_features": sorted(self.pi_features),
+        }
+
+    def changed(self, force: bool = False) -> None:
+        """Something in `mirror` may have changed: publish it to the followers
+        if it did (or with `force`). A no-op on a follower."""
+        if not leader.is_leader:
+            return
+        mirror = self.mirror()
+        if mirror != self._mirrored or force:
+            self._mirrored = mirror
+            leader.publish("cabinet", json.dumps({"cabinet": self.id, **mirror}))
+
+    def follow(self, mirror: dict) -> None:
+        """Show the leader's state of this cabinet (a follower)."""
+        for field, value in mirror.items():
+            setattr(self, field, set(value) if field == "pi_features" else value)
+        self.refresh_global_sync()
+
+    # The global_sync payload, cached. Every socket connect gets it, so after a
+    # deploy a reconnect storm would otherwise rebuild it hundreds of times at
+    # once. It's rebuilt from in-memory state when something in it may have
+    # changed (Pi link, queue length, round/game state), and sync_version goes
+    # up only when the content actually differs, so clients and tests can tell a
+    # changed snapshot from a repeat. seconds_left is a clock reading, not
+    # state — it's stamped on at serve time.
+    def refresh_global_sync(self) -> bool:
+        """Rebuild the global_sync snapshot. True if it changed (version bumped)."""
+        snapshot = {
+            "cabinet": self.id,
+            "state": list(state.game_state),
+            "round_info": list(state.round_info),
+            "queue_length": self.waiting(),
+            "con": self.pi_connected,
+        }
+        if snapshot == self._snapshot:
+            return False
+        self._snapshot = snapshot
+        self.sync_version += 1
+        return True
+
+    def global_sync(self) -> dict:
+        """The global_sync payload: cached snapshot + version + seconds_left."""
+        if self._snapshot is None:
+            self.refresh_global_sync()
+        return {
+            **self._snapshot,
+            "seconds_left": state.seconds_left(),
+            "version": self.sync_version,
+        }
+
+
+class CabinetRegistry:
+    """Every configured cabinet by id, the shared line, and which cabinet each
+    socket watches."""
+
+    def __init__(self, specs: Dict[str, str], dispatch: str = QUEUE_DISPATCH):
+        self.pool: Optional[QueueIndex] = QueueIndex(None) if dispatch == "pool" else None
+        self._by_id: Dict[str, Cabinet] = {
+            cabinet_id: Cabinet(cabinet_id, url, self.pool) for cabinet_id, url in specs.items()
+        }
+        self.default: Cabinet = next(iter(self._by_id.values()))
+        self._watching: Dict[str, Cabinet] = {}   # sid -> cabinet
+
+    def __iter__(self) -> Iterator[Cabinet]:
+        return iter(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def get(self, cabinet_id: Optional[str] = None) -> Optional[Cabinet]:
+        """The cabinet with this id (the default one for None), or None."""
+        if cabinet_id is None:
+            return self.default
+        return self._by_id.get(cabinet_id)
+
+    def ids(self) -> List[str]:
+        return list(self._by_id)
+
+    def wake_all(self) -> None:
+        """Something every cabinet gates on changed (inventory, a fault)."""
+        for cab in self:
+            cab.wake()
+
+    def queues(self) -> List[QueueIndex]:
+        """Every line: each cabinet's own, then the shared one."""
+        indexes = [cab.queue for cab in self]
+        return indexes if self.pool is None else indexes + [self.pool]
+
+    def queue_of(self, address: Optional[str]) -> Optional[QueueIndex]:
+        """The line the address is waiting in, if any."""
+        for index in self.queues():
+            if index.position(address) > 0:
+                return index
+        return None
+
+    def position(self, address: Optional[str]) -> int:
+        """1-based position of the address in the line it's waiting in, or -1."""
+        index = self.queue_of(address)
+        return index.position(address) if index else -1
+
+    def wake_queue(self, index: QueueIndex) -> None:
+        """Wake every cabinet that serves `index`."""
+        for cab in self:
+            if index in cab.queues():
+                cab.wake()
+
+    def queue_named(self, name: str) -> Optional[QueueIndex]:
+        return next((index for index in self.queues() if index.name == name), None)
+
+    def pay_target(self, sid) -> Optional[str]:
+        """The cabinet_id a play paid from `sid` queues on: None (the shared
+        line) when dispatch is pooled, else the cabinet it watches."""
+        return None if self.pool is not None else self.watching(sid).id
+
+    def eta_seconds(self, index: QueueIndex, position: int) -> Optional[int]:
+        """Rough upper bound on the wait before position `position` of `index`
+        starts: the turns ahead of it shared among the fit cabinets serving the
+        line. None while no cabinet serving it can play."""
+        serving = sum(1 for cab in self if cab.fit() and index in cab.queues())
+        if position < 1 or not serving:
+            return None
+        return ((position - 1) // serving + 1) * TURN_CYCLE_ESTIMATE
+
+    def playing(self, address: Optional[str]) -> Optional[Cabinet]:
+        """The cabinet the address has the claw of right now, if any."""
+        if address is None:
+            return None
+        for cab in self:
+            if cab.current_player == address:
+                return cab
+        return None
+
+    # --- which cabinet each socket watches -----------------------------
+    def watch(self, sid, cab: Cabinet) -> Optional[Cabinet]:
+        """Point `sid` at `cab`. Returns the cabinet it watched before, if
+        different (the caller leaves that room)."""
+        previous = self._watching.get(sid)
+        self._watching[sid] = cab
+        return previous if previous is not cab else None
+
+    def watching(self, sid) -> Cabinet:
+        return self._watching.get(sid, self.default)
+
+    def forget(self, sid) -> None:
+        self._watching.pop(sid, None)
+
+
+cabinets = CabinetRegistry(CABINETS)
+
+
+async def _queue_nudged(name: str) -> None:
+    """A follower worker changed a queue (app/leader.py): reload it, and let
+    the cabinets serving it look again."""
+    index = cabinets.queue_named(name)
+    if index is not None:
+        await index.resync()
+        cabinets.wake_queue(index)
+
+
+async def _queue_published(arg: str) -> None:
+    """The leader's order of a queue moved: reload it and take that order."""
+    name, *order = arg.split()
+    index = cabinets.queue_named(name)
+    if index is None:
+        return
+    await index.resync()
+    index.follow([int(entry_id) for entry_id in order])
+    for cab in cabinets:
+        if index in cab.queues():
+            cab.refresh_global_sync()
+
+
+async def _cabinet_published(arg: str) -> None:
+    mirror = json.loads(arg)
+    cab = cabinets.get(mirror.pop("cabinet"))
+    if cab is not None:
+        cab.follow(mirror)
+
+
+leader.on_nudge("queue", _queue_nudged)
+leader.on_published("queue", _queue_published)
+leader.on_published("cabinet", _cabinet_published)
@@ -7,6 +7,68 @@ TURN_DURATION        = 30
 INTER_TURN_DELAY     = 3
 SYNC_PERIOD          = 15
 
+# The turn scheduler is woken by events (enqueue, turn_end, fault clear,
+# inventory change) rather than polling. These are its safety-net rechecks:
+# how long it sleeps with nothing to do, and how often it re-tests a machine
+# that is paused on a fault (a direct DB edit can fix one without waking it).
+SCHEDULER_IDLE_RECHECK    = 30
+SCHEDULER_BLOCKED_RECHECK = 5
+
+# The machine-fitness verdict (app/machine.py) is cached and dropped by the
+# writes that can change it; this is the safety-net full recheck for a change
+# made behind the app's back.
+MACHINE_FITNESS_RECHECK = 120
+
+# Wallet address -> user id is cached in process (win_transitions.user_id_for);
+# this bounds it. The mapping never changes, so it's never invalidated, only
+# evicted least-recently-used.
+USER_ID_CACHE_SIZE = 10000
+
+# The queue order is kept in memory (app/queue_index.py). Every this-many
+# seconds the sync scheduler rebuilds it from Postgres, in case a row was
+# changed behind the app's back.
+QUEUE_INDEX_RESYNC_PERIOD = 300
+
+# personal_sync (queue position) is pushed as soon as a position changes; this
+# is the slow full resend to every queued player, in case a client missed one.
+PERSONAL_SYNC_FULL_PERIOD = 60
+
+# Presence-aware handoff (app/handoff.py). The next player must have a live
+# socket and answer a `turn_ready` ping within TURN_READY_TIMEOUT seconds (0 =
+# presence only, no ping), or their entry is passed over — kept in place
+# ("keep") or sent to the back ("back"), per TURN_DEFER_POLICY. An entry passed
+# over TURN_MAX_DEFERRALS times plays regardless, so a paid turn is never held
+# forever. At most TURN_HANDOFF_LOOKAHEAD players are tried per handoff.
+TURN_READY_TIMEOUT     = 2.0
+TURN_DEFER_POLICY      = os.environ.get("TURN_DEFER_POLICY", "keep")
+TURN_MAX_DEFERRALS     = 3
+TURN_HANDOFF_LOOKAHEAD = 5
+
+# Bet / withdrawal history is paginated (newest first, keyset cursor). Login
+# carries the first page of each; clients fetch older pages on demand.
+HISTORY_PAGE_SIZE = 20
+HISTORY_PAGE_MAX  = 100   # cap on a client-requested page size
+
+# Admin listings (balls, cards, boosters, card types, plays) are keyset pages
+# too, with /count twins for totals; none returns a whole table.
+ADMIN_PAGE_SIZE = 100
+ADMIN_PAGE_MAX  = 500
+
+# Bulk inventory import (app/admin/importer.py): inventory rows go to the
+# staging tables through COPY this many at a time, and a response lists at most
+# IMPORT_MAX_ERRORS rejected rows (it always says how many there were).
+IMPORT_BATCH      = 5000
+IMPORT_MAX_ERRORS = 1000
+
+# Upper bound on logged-in sockets tracked (app/sessions.py). Only reached if
+# disconnects go missing; the oldest binding is evicted past it.
+SESSION_REGISTRY_MAX = 50_000
+
+# Joystick moves to the Pi are rate-capped: a move arriving sooner than this
+# after the last one sent waits out the gap, and anything newer that lands
+# meanwhile replaces it (latest state wins). 0.02s = at most 50 sends/s.
+MOVE_MIN_INTERVAL = 0.02
+
 DATABASE_URL     = os.environ.get("DATABASE_URL")
 PI_SERVER_URL    = os.environ.get("PI_SERVER_URL")
 BASE_RPC_HTTP    = os.environ.get("BASE_RPC_HTTP")
@@ -15,6 +77,66 @@ CLAW_ADDRESS     = os.environ.get("CLAW_CONTRACT_ADDRESS")
 CHAIN_ID         = int(os.environ.get("CHAIN_ID"))
 PRIVATE_KEY      = os.environ.get("CLAW_PRIVATE_KEY")
 
+
+def _parse_cabinets(spec: Optional[str]) -> dict:
+    """ "id=pi_url,id2=pi_url2" -> {id: pi_url}, in the order given."""
+    cabinets = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            cabinet_id, url = item.split("=", 1)
+            cabinets[cabinet_id.strip()] = url.strip()
+    return cabinets
+
+# The claw machines this process drives (app/cabinet.py), as comma-separated
+# "id=pi_url" pairs. The first is the default cabinet — the one a new socket
+# watches, and the one admin endpoints act on when none is named. Unset means a
+# single cabinet, "main", at PI_SERVER_URL. Queue rows from before cabinets
+# existed belong to "main".
+CABINETS = _parse_cabinets(os.environ.get("CABINETS")) or {"main": PI_SERVER_URL}
+
+# How plays are dealt out to the cabinets (app/handoff.py). "pool": one line
+# for the whole room, and the head player goes to whichever fit, stocked cabinet
+# frees up first. "cabinet": each cabinet has its own line and a player queues
+# on the one they're watching. Identical with a single cabinet.
+QUEUE_DISPATCH = os.environ.get("QUEUE_DISPATCH", "pool")
+
+# Share Socket.IO rooms and broadcasts between uvicorn workers over Postgres
+# LISTEN/NOTIFY (app/socket/pg_manager.py). Unset: rooms live in the process,
+# so run one worker. It must be a session-mode connection (direct, or the
+# session pooler on :5432) — LISTEN doesn't survive a transaction pooler.
+SOCKETIO_PUBSUB_URL = os.environ.get("SOCKETIO_PUBSUB_URL")
+# How long emits are buffered to share one NOTIFY, and how long a payload too
+# big for NOTIFY is kept in socketio_spill for the other workers to read.
+SOCKETIO_PUBSUB_FLUSH = 0.005
+SOCKETIO_SPILL_TTL = 60
+
+# Leader election (app/leader.py): how often a follower retries the lock — the
+# failover time when the leader dies — and how often the leader checks the
+# connection that holds it. A follower gives up on a call it forwarded to the
+# leader after LEADER_CALL_TIMEOUT; it must outlast the slowest forwarded
+# action (a test arm, a turn end waiting out its chute verdict).
+LEADER_RETRY = 2
+LEADER_HEARTBEAT = 5
+LEADER_CALL_TIMEOUT = 30.0
+
+# Socket emits tied to a commit go through the outbox (app/outbox.py): rows
+# delivered per batch, how often the dispatcher looks without being woken (a
+# safety net — every commit wakes it), and how many failed deliveries before a
+# row is dropped.
+OUTBOX_BATCH = 200
+OUTBOX_POLL = 30.0
+OUTBOX_MAX_ATTEMPTS = 5
+
+# Tag enrollment. One ESP enrollment window lasts ENROLL_WINDOW_SECONDS (the
+# ESP-side default too); a batch (app/enrollment.py) reopens it after every
+# scan and stops scanning after ENROLL_BATCH_IDLE seconds without one.
+ENROLL_WINDOW_SECONDS = 10
+ENROLL_BATCH_IDLE = 120
+
+# What one turn costs the line, start to next start, for the ETA shown with a
+# queue position: the turn, the chute verdict window, the settle gap.
+TURN_CYCLE_ESTIMATE = TURN_DURATION + 5 + INTER_TURN_DELAY
+
 # When true, the play flow skips wallet/permit/on-chain steps entirely:
 # join_queue accepts dummy bet data and creates a QueueEntry with a synthetic
 # key; on_turn_win skips notifyWin; user_account_data returns balance=0
@@ -120,6 +242,12 @@ def ticket_usdc_base_units() -> int:
 # processor's dispute window.
 CHARGEBACK_HOLD_DAYS = int(os.environ.get("CHARGEBACK_HOLD_DAYS", 7))
 
+# Balances are materialized per user (app/balances.py). Every BALANCE_SWEEP_PERIOD
+# seconds expired chargeback holds are released; every BALANCE_RECONCILE_PERIOD
+# seconds every balance is recomputed from the ledger and any drift is alerted.
+BALANCE_SWEEP_PERIOD     = 300
+BALANCE_RECONCILE_PERIOD = 6 * 3600
+
 # Resell prices per CardRarity, in cents. Placeholder — operator should
 # eventually drive this from an admin-config table or a per-card snapshot.
 RESELL_PRICE_BY_RARITY_CENTS = {
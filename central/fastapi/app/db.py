@@ -1,9 +1,25 @@
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base 
 
 from .config import DATABASE_URL
 
 
+# TCP keepalives for every long-lived connection to the database (see below).
+KEEPALIVES = {
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 5,
+}
+
+
+def libpq_dsn(url: str) -> str:
+    """A SQLAlchemy URL (postgresql+psycopg://...) as a plain libpq DSN, for
+    the few places that hold a raw psycopg connection of their own."""
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
 # Resilience against Supabase/network dropping connections ("server closed the
 # connection unexpectedly" / "SSL SYSCALL error: EOF"):
 #   - pool_pre_ping: liveness-check a pooled connection on checkout and reconnect
@@ -20,12 +36,7 @@ engine = create_async_engine(
     pool_size=5,
     pool_pre_ping=True,
     pool_recycle=300,   # 5 min
-    connect_args={
-        "keepalives": 1,
-        "keepalives_idle": 30,
-        "keepalives_interval": 10,
-        "keepalives_count": 5,
-    },
+    connect_args=KEEPALIVES,
 )
 async_session = async_sessionmaker(engine, expire_on_commit=False)
 
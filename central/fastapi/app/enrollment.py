@@ -0,0 +1,157 @@
+"""Batch tag enrollment: load a cabinet's balls in one sitting.
+
+The single enrollment (/admin/balls/enroll/*) is a round trip per ball: open a
+window, poll until the tag comes in, create the ball, bind it, open the next.
+A batch keeps the antenna listening instead. The ESP still reports one tag per
+`enroll` and goes back to IDLE, so pi_client re-arms it the moment a
+tag_scanned or enroll_timeout comes in, for as long as the batch is scanning:
+until the operator stops it, or ENROLL_BATCH_IDLE seconds pass without a scan.
+
+Every scan is checked against Ball.serial and against the batch itself; a new
+serial is queued, and each one is pushed to the admin's event stream as it
+happens. The queued serials are then created and bound in bulk
+(/admin/balls/enroll/batch/commit), a chosen list of prizes at a time.
+
+While the antenna is listening the cabinet takes no turns (`listening`,
+checked by machine.blocked): the ESP drops an arm that arrives mid-enroll. A
+stopped batch keeps its queue and doesn't hold the machine. Like the single
+enrollment, it lives in the leader, the one process that talks to the Pi. The
+leader publishes a batch's events too (app/leader.py), and a follower worker
+relays them to the admin streams it serves (`follow`).
+"""
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import exists, select
+
+from . import leader
+from .config import ENROLL_BATCH_IDLE, ENROLL_WINDOW_SECONDS
+from .deps import async_session
+from .logging import log
+from .models import Ball
+
+
+class EnrollBatch:
+    """One cabinet's batch: the serials queued for binding, in scan order, and
+    the admin streams listening to it."""
+
+    def __init__(self, cabinet_id: str):
+        self.cabinet_id = cabinet_id
+        self.queued: List[str] = []
+        self.seen: set = set()         # every serial scanned, queued or not
+        self.already_enrolled = 0      # scans of a tag that already has a Ball
+        self.scanning = False
+        self.stopped_reason: Optional[str] = None
+        self.last_scan_at = time.time()
+        self.lock = asyncio.Lock()     # one commit at a time
+        self._streams: List[asyncio.Queue] = []
+
+    def snapshot(self) -> dict:
+        return {
+            "cabinet": self.cabinet_id,
+            "scanning": self.scanning,
+            "stopped_reason": self.stopped_reason,
+            "queued": list(self.queued),
+            "already_enrolled": self.already_enrolled,
+        }
+
+    def publish(self, event: str, data: Optional[dict] = None) -> None:
+        """Send `event` to every stream, with the batch as it stands now."""
+        payload = {**(data or {}), "batch": self.snapshot()}
+        for q in self._streams:
+            q.put_nowait((event, payload))
+        leader.publish("enroll", json.dumps(
+            {"cabinet": self.cabinet_id, "event": event, "data": payload}
+        ))
+
+    def subscribe(self) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue()
+        self._streams.append(q)
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue) -> None:
+        if q in self._streams:
+            self._streams.remove(q)
+
+    def stop(self, reason: str) -> None:
+        if self.scanning:
+            self.scanning = False
+            self.stopped_reason = reason
+            log.info("Enrollment batch on %s stopped: %s", self.cabinet_id, reason)
+            self.publish("batch")
+
+    def idle(self) -> bool:
+        return time.time() - self.last_scan_at >= ENROLL_BATCH_IDLE
+
+    def close(self, reason: str) -> None:
+        """The batch is gone (discarded, or the leader stood down)."""
+        self.scanning = False
+        self.stopped_reason = reason
+        self.publish("closed")
+
+
+# A follower's admin streams, by cabinet id, fed by the leader's publishes.
+_followed: Dict[str, List[asyncio.Queue]] = {}
+
+
+def follow(cabinet_id: str) -> asyncio.Queue:
+    """Events of the leader's batch on `cabinet_id`, on a follower."""
+    q: asyncio.Queue = asyncio.Queue()
+    _followed.setdefault(cabinet_id, []).append(q)
+    return q
+
+
+def unfollow(cabinet_id: str, q: asyncio.Queue) -> None:
+    streams = _followed.get(cabinet_id, [])
+    if q in streams:
+        streams.remove(q)
+
+
+async def _relay(arg: str) -> None:
+    message = json.loads(arg)
+    for q in _followed.get(message["cabinet"], []):
+        q.put_nowait((message["event"], message["data"]))
+
+
+leader.on_published("enroll", _relay)
+
+
+def window_opened(cab) -> None:
+    """An `enroll` went to `cab`'s ESP: it listens for ENROLL_WINDOW_SECONDS."""
+    cab.enroll_window_until = time.time() + ENROLL_WINDOW_SECONDS
+
+
+def window_closed(cab) -> None:
+    """`cab`'s ESP ended its window (a tag_scanned or an enroll_timeout). If
+    nothing re-arms it, the antenna is free: the scheduler is woken to see."""
+    cab.enroll_window_until = 0.0
+    cab.wake()
+
+
+def listening(cab) -> bool:
+    """Whether `cab`'s antenna is, or is about to be, listening for tags: a
+    batch is scanning, or an ESP window is still open — a stopped batch or a
+    single enrollment leaves one open for up to ENROLL_WINDOW_SECONDS."""
+    batch = cab.enroll_batch
+    return (batch is not None and batch.scanning) or cab.enroll_window_until > time.time()
+
+
+async def record_scan(batch: EnrollBatch, serial: str) -> None:
+    """Queue a scanned serial unless it's a repeat or already a Ball. A tag
+    still on the antenna is read again on every re-arm; those repeats aren't
+    announced."""
+    if serial in batch.seen:
+        return
+    batch.seen.add(serial)
+    batch.last_scan_at = time.time()
+    async with async_session() as db:
+        enrolled = await db.scalar(select(exists().where(Ball.serial == serial)))
+    if enrolled:
+        batch.already_enrolled += 1
+    else:
+        batch.queued.append(serial)
+    log.info("Enrollment batch on %s scanned %s%s", batch.cabinet_id, serial,
+             " (already enrolled)" if enrolled else "")
+    batch.publish("scan", {"serial": serial, "queued": not enrolled})
@@ -0,0 +1,207 @@
+"""Presence-aware turn handoff: who gets the machine next.
+
+Promotion used to take the oldest queued entry, full stop. A player who paid and
+walked away still got the machine, and everyone behind them waited out a whole
+TURN_DURATION of nobody playing. At peak that's straight off the cabinet's
+throughput.
+
+So before a turn starts, `choose_next` walks the cabinet's queue from the head and picks
+the first player who is actually there: they have a logged-in socket
+(app/sessions.py) and one of their tabs answers a `turn_ready` ping within
+TURN_READY_TIMEOUT. Anyone else is passed over per TURN_DEFER_POLICY — "keep"
+leaves them where they are, so they're offered the next handoff first; "back"
+sends them to the end of the line. Their room gets a `turn_skipped` so the UI
+can say so. An entry passed over TURN_MAX_DEFERRALS times plays anyway: a paid
+turn is never held hostage, it just stops holding up the people behind it. It
+counts once per handoff, however many times that handoff is retried before a
+turn starts.
+
+The choice is made with no DB session open (a ping can take seconds, and the
+pooler kills idle connections). The caller then claims the chosen entry by
+primary key in its own transaction, locking the row (SKIP LOCKED); if the row
+moved on meanwhile, or another process is promoting it, `claim` drops it and
+returns None, and the caller wakes the scheduler to choose again.
+
+With QUEUE_DISPATCH "pool" this is also the dispatcher. Every cabinet serves the
+shared line (after its own queue), so whichever frees up first takes the head —
+and one line across N cabinets moves N times as fast as N lines a player had to
+pick between. Since each cabinet chooses on its own, and a ping can take
+seconds, a cabinet reserves the entry it's about to offer (`_reserved`) and the
+others walk past it; `claim` stamps the pooled row with the cabinet that took
+it. A cabinet with no loaded balls leaves the line to the ones that can drop a
+prize, unless none of them can.
+"""
+import asyncio
+from typing import Dict, Optional, Set, Tuple
+
+import socketio
+from sqlalchemy import select
+
+from .config import (
+    TURN_READY_TIMEOUT, TURN_DEFER_POLICY, TURN_MAX_DEFERRALS, TURN_HANDOFF_LOOKAHEAD,
+)
+from .logging import log
+from . import machine
+from .cabinet import Cabinet, cabinets
+from .models import QueueEntry
+from .queue_index import QueueIndex
+from .sessions import sessions
+from .socket.sio_instance import sio
+
+# Reported on the admin cabinet status; summed over every cabinet.
+handoff_stats = {"started": 0, "skipped_absent": 0, "skipped_unready": 0, "forced": 0}
+
+# The entry each cabinet has chosen (or is pinging) and not yet claimed:
+# cabinet_id -> (entry_id, address). Only pooled entries are contended, but
+# reserving every choice keeps one player off two cabinets at once too.
+_reserved: Dict[str, Tuple[int, str]] = {}
+
+# The entries each cabinet has passed over since its last turn started:
+# cabinet_id -> (cab.last_start, entry ids). A handoff that finds nobody is
+# retried (the scheduler wakes as turn_end lets go); the retry mustn't count
+# the same absence again, or TURN_MAX_DEFERRALS comes at half the handoffs.
+_passed: Dict[str, Tuple[object, Set[int]]] = {}
+
+
+def release(cab: Cabinet) -> None:
+    """Drop `cab`'s reservation: its staged turn won't start."""
+    _reserved.pop(cab.id, None)
+
+
+def release_all() -> None:
+    _reserved.clear()
+    _passed.clear()
+
+
+def _taken_elsewhere(cab: Cabinet, entry_id: int, address: str) -> bool:
+    for cabinet_id, (reserved_id, reserved_addr) in _reserved.items():
+        if cabinet_id != cab.id and (reserved_id == entry_id or reserved_addr == address):
+            return True
+    playing = cabinets.playing(address)
+    return playing is not None and playing is not cab
+
+
+async def _serves_pool(cab: Cabinet) -> bool:
+    """Should `cab` take from the shared line now? Not while it's empty of
+    balls and a fit cabinet that isn't can take the player instead."""
+    if await machine.loaded_stock(cab) > 0:
+        return True
+    for other in cabinets:
+        if other is not cab and other.fit() and await machine.loaded_stock(other) > 0:
+            return False
+    return True
+
+
+async def _ask(sid) -> bool:
+    try:
+        await sio.call("turn_ready", {}, to=sid, timeout=TURN_READY_TIMEOUT)
+        return True
+    except socketio.exceptions.TimeoutError:
+        return False
+    except Exception as e:
+        log.warning("turn_ready to %s failed: %s", sid, e)
+        return False
+
+
+async def is_ready(address: str) -> bool:
+    """True if any of the address's tabs acks `turn_ready` in time."""
+    sids = sessions.sids(address)
+    if not sids:
+        return False
+    if TURN_READY_TIMEOUT <= 0:
+        return True
+    for answered in asyncio.as_completed([_ask(sid) for sid in sids]):
+        if await answered:
+            return True
+    return False
+
+
+async def _pass_over(cab: Cabinet, index: QueueIndex, entry_id: int, address: str,
+                     reason: str) -> None:
+    since, passed = _passed.get(cab.id, (None, set()))
+    if since != cab.last_start:
+        passed = set()
+    if entry_id in passed:
+        return      # already passed over in this handoff
+    passed.add(entry_id)
+    _passed[cab.id] = (cab.last_start, passed)
+    count = index.defer(entry_id, to_back=(TURN_DEFER_POLICY == "back"))
+    handoff_stats[f"skipped_{reason}"] += 1
+    log.info("Handoff on %s passed over %s (%s, %d/%d)",
+             cab.id, address, reason, count, TURN_MAX_DEFERRALS)
+    await sio.emit(
+        "turn_skipped",
+        {"reason": reason, "policy": TURN_DEFER_POLICY, "cabinet": cab.id},
+        room=address,
+    )
+
+
+async def choose_next(cab: Cabinet, passed_over: Optional[list] = None) -> Optional[int]:
+    """Entry id of the player to start next on `cab`, or None if nobody within
+    TURN_HANDOFF_LOOKAHEAD of the head of its lines is there to play. Passes
+    over (and counts) the absent ones on the way — or, given `passed_over`,
+    only collects them there for `pass_over` to apply once the turn really
+    starts. The choice stays reserved for `cab` until it's claimed or released."""
+    release(cab)
+    candidates = []
+    for index in cab.queues():
+        if index is cab.pool and not await _serves_pool(cab):
+            continue
+        candidates.extend((index, entry_id, address) for entry_id, address in index.entries())
+        if len(candidates) >= TURN_HANDOFF_LOOKAHEAD:
+            break
+
+    for index, entry_id, address in candidates[:TURN_HANDOFF_LOOKAHEAD]:
+        # Re-checked per entry: other cabinets reserve while we ping.
+        if _taken_elsewhere(cab, entry_id, address):
+            continue
+        _reserved[cab.id] = (entry_id, address)
+        if index.deferrals(entry_id) >= TURN_MAX_DEFERRALS:
+            handoff_stats["forced"] += 1
+            log.info("Handoff: %s passed over %d times — their turn starts regardless",
+                     address, TURN_MAX_DEFERRALS)
+            return entry_id
+        if not sessions.is_online(address):
+            reason = "absent"
+        elif not await is_ready(address):
+            reason = "unready"
+        else:
+            return entry_id
+        if passed_over is None:
+            await _pass_over(cab, index, entry_id, address, reason)
+        else:
+            passed_over.append((index, entry_id, address, reason))
+        release(cab)
+    return None
+
+
+async def pass_over(cab: Cabinet, passed_over: list) -> None:
+    """Apply the pass-overs a choice collected (choose_next's `passed_over`)."""
+    for index, entry_id, address, reason in passed_over:
+        await _pass_over(cab, index, entry_id, address, reason)
+
+
+async def claim(db, cab: Cabinet, entry_id: Optional[int]) -> Optional[QueueEntry]:
+    """The chosen QueueEntry, loaded in `db`, if it is still queued — a pooled
+    one assigned to `cab`. The caller promotes it and, once committed, calls
+    cab.discard(entry.id)."""
+    release(cab)
+    if entry_id is None:
+        return None
+    # SKIP LOCKED: a scheduler in another process that still thinks it's the
+    # leader (app/leader.py) may be promoting this row right now. Whoever
+    # locked it first starts it; we treat it as gone.
+    entry = await db.scalar(
+        select(QueueEntry)
+        .where(QueueEntry.id == entry_id)
+        .where(QueueEntry.status == "queued")
+        .with_for_update(skip_locked=True)
+    )
+    if entry is not None:
+        if entry.cabinet_id is None:
+            entry.cabinet_id = cab.id
+        return entry
+    log.warning("Handoff choice %s on %s is no longer queued in the DB — dropping it",
+                entry_id, cab.id)
+    cab.discard(entry_id)
+    return None
@@ -1,45 +1,27 @@
 import asyncio, requests
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Optional
 from .logging import log
+from . import balances
 from .config import (
     PRIVATE_KEY, CLAW_ADDRESS, BASE_RPC_HTTP, CHAIN_ID, BYPASS_PAYMENT,
     TREASURY_ADDRESS, TREASURY_PRIVATE_KEY, USDC_TOKEN_ADDRESS, USDC_DECIMALS,
-    CHARGEBACK_HOLD_DAYS,
+    HISTORY_PAGE_SIZE,
 )
 from web3 import Web3
 from .abi import claw_abi, erc20_abi
-from .models import (
-    QueueEntry, Withdrawal, Round, User, LedgerEntry, LedgerKind,
-    Win, Payment, PaymentMethod,
-)
-
-from sqlalchemy import select, func
-
+from .models import QueueEntry, Withdrawal, Round, User, UserBalance
+from .cabinet import cabinets
 
-# Ledger kinds that add to / subtract from the off-chain winnings balance.
-# Balance accrues ONLY from wins (resells) — never deposits — by product design.
-_CREDIT_KINDS = (
-    LedgerKind.DEPOSIT, LedgerKind.RESELL, LedgerKind.AUTO_RESELL,
-    LedgerKind.CARD_RESELL, LedgerKind.BET_REFUND,
-)
-_DEBIT_KINDS = (LedgerKind.WITHDRAWAL, LedgerKind.BET_PLACED)
+from sqlalchemy import select, func, tuple_
 
 
 async def off_chain_balance_cents(db, user_id) -> int:
-    """The user's total balance in cents, summed from the ledger (credits minus
-    withdrawals). This is what they *have*; see withdrawable_balance_cents for
-    what they can withdraw right now (chargeback holds excluded)."""
-    credits = await db.scalar(
-        select(func.coalesce(func.sum(LedgerEntry.amount_cents), 0))
-        .where(LedgerEntry.user_id == user_id)
-        .where(LedgerEntry.kind.in_(_CREDIT_KINDS))
-    ) or 0
-    debits = await db.scalar(
-        select(func.coalesce(func.sum(LedgerEntry.amount_cents), 0))
-        .where(LedgerEntry.user_id == user_id)
-        .where(LedgerEntry.kind.in_(_DEBIT_KINDS))
-    ) or 0
-    return int(credits) - int(debits)
+    """The user's total balance in cents (credits minus withdrawals). This is
+    what they *have*; see withdrawable_balance_cents for what they can withdraw
+    right now (chargeback holds excluded). One row read — see app/balances.py."""
+    total, _ = await balances.balance(db, user_id)
+    return total
 
 
 async def held_balance_cents(db, user_id) -> int:
@@ -47,31 +29,17 @@ async def held_balance_cents(db, user_id) -> int:
 
     A credit is held when it's traceable (via its Win -> QueueEntry -> Payment)
     to a CARD-funded ticket whose charge confirmed less than CHARGEBACK_HOLD_DAYS
-    ago. Crypto-funded winnings are never held (irreversible payment in).
-
-    Known gap: credits with no win_id (CARD_RESELL from collection) can't be
-    traced to the funding payment and are treated as not held — the direct
-    win->resell path (the common vector) is covered.
+    ago. Crypto-funded winnings are never held (irreversible payment in). The
+    hold is worked out when the credit is posted and released by the balance
+    sweep (see app/balances.py).
     """
-    threshold = datetime.utcnow() - timedelta(days=CHARGEBACK_HOLD_DAYS)
-    held = await db.scalar(
-        select(func.coalesce(func.sum(LedgerEntry.amount_cents), 0))
-        .select_from(LedgerEntry)
-        .join(Win, Win.id == LedgerEntry.win_id)
-        .join(Payment, Payment.queue_entry_id == Win.queue_entry_id)
-        .where(LedgerEntry.user_id == user_id)
-        .where(LedgerEntry.kind.in_(_CREDIT_KINDS))
-        .where(Payment.method == PaymentMethod.CARD)
-        .where(Payment.confirmed_at.isnot(None))
-        .where(Payment.confirmed_at > threshold)
-    ) or 0
-    return int(held)
+    _, held = await balances.balance(db, user_id)
+    return held
 
 
 async def withdrawable_balance_cents(db, user_id) -> int:
     """Balance the user can withdraw right now: total minus chargeback holds."""
-    total = await off_chain_balance_cents(db, user_id)
-    held = await held_balance_cents(db, user_id)
+    total, held = await balances.balance(db, user_id)
     return max(0, total - held)
 
 
@@ -202,51 +170,135 @@ def cents_to_usdc_base_units(cents: int) -> int:
     return int(cents) * (10 ** USDC_DECIMALS) // 100
 
 
-async def user_account_data(addr, db):
-    # Balance is off-chain now (contract retired): the withdrawable winnings
-    # ledger, summed. Returned in dollars for the UI ($<balance>).
-    user = await db.scalar(select(User).where(User.wallet_address == addr))
-    balance_cents = await off_chain_balance_cents(db, user.id) if user else 0
-    balance = balance_cents / 100
-    bets_mappings = await db.execute(
+# ─── Account history (keyset-paginated) ─────────────────────────────────
+#
+# History pages run newest first and are keyed on (timestamp, id): the cursor
+# is the last row a client has, and the next page is everything strictly older.
+# Unlike OFFSET, a page costs the same however far back it is, and rows added
+# meanwhile (a new play) don't shift the pages being walked.
+
+def _encode_cursor(ts: datetime, row_id: int) -> str:
+    return f"{ts.isoformat()}~{row_id}"
+
+
+def decode_cursor(cursor: str):
+    """(timestamp, id) from a history cursor. Raises ValueError if malformed."""
+    ts, sep, row_id = cursor.rpartition("~")
+    if not sep:
+        raise ValueError(f"bad cursor {cursor!r}")
+    return datetime.fromisoformat(ts), int(row_id)
+
+
+async def bets_page(db, addr, cursor: Optional[str] = None, limit: int = HISTORY_PAGE_SIZE):
+    """One page of the address's played turns, newest first.
+    Returns (bets, next_cursor); next_cursor is None on the last page."""
+    q = (
         select(
-            QueueEntry.bet.label("bet"),
-            QueueEntry.win.label("win"),
-            QueueEntry.played_at.label("played_at"),
-            Round.multiplier.label("multiplier"),
+            QueueEntry.id, QueueEntry.bet, QueueEntry.win, QueueEntry.played_at,
+            Round.multiplier,
         )
         .join(QueueEntry.round)
         .where(QueueEntry.address == addr, QueueEntry.status == "played")
-        .order_by(QueueEntry.played_at.desc())
+        .where(QueueEntry.played_at.isnot(None))
+        .order_by(QueueEntry.played_at.desc(), QueueEntry.id.desc())
+        .limit(limit + 1)
     )
+    if cursor:
+        q = q.where(tuple_(QueueEntry.played_at, QueueEntry.id) < tuple_(*decode_cursor(cursor)))
+    rows = (await db.execute(q)).all()
 
+    more = len(rows) > limit
+    rows = rows[:limit]
     bets = [
         {
-            "bet": r["bet"],
-            "win": r["win"],
-            "played_at": int(r["played_at"].timestamp()),
-            "multiplier": r["multiplier"],
+            "bet": r.bet,
+            "win": r.win,
+            "played_at": int(r.played_at.timestamp()),
+            "multiplier": r.multiplier,
         }
-        for r in bets_mappings.mappings().all()
+        for r in rows
     ]
+    return bets, (_encode_cursor(rows[-1].played_at, rows[-1].id) if more else None)
 
-    withdrawals_mappings = await db.execute(
-        select(
-            Withdrawal.amount.label("amount"),
-            Withdrawal.timestamp.label("timestamp"),
-        )
+
+async def withdrawals_page(db, addr, cursor: Optional[str] = None, limit: int = HISTORY_PAGE_SIZE):
+    """One page of the address's withdrawals, newest first.
+    Returns (withdrawals, next_cursor); next_cursor is None on the last page."""
+    q = (
+        select(Withdrawal.id, Withdrawal.amount, Withdrawal.timestamp)
         .where(Withdrawal.address == addr)
-        .order_by(Withdrawal.timestamp.desc())
+        .order_by(Withdrawal.timestamp.desc(), Withdrawal.id.desc())
+        .limit(limit + 1)
     )
+    if cursor:
+        q = q.where(tuple_(Withdrawal.timestamp, Withdrawal.id) < tuple_(*decode_cursor(cursor)))
+    rows = (await db.execute(q)).all()
 
+    more = len(rows) > limit
+    rows = rows[:limit]
     withdrawals = [
         {
             # Withdrawal.amount is stored in cents; surface dollars to match the
             # balance the UI renders as $<value>.
-            "amount": r["amount"] / 100,
-            "timestamp": int(r["timestamp"].timestamp()),
+            "amount": r.amount / 100,
+            "timestamp": int(r.timestamp.timestamp()),
         }
-        for r in withdrawals_mappings.mappings().all()
+        for r in rows
     ]
+    return withdrawals, (_encode_cursor(rows[-1].timestamp, rows[-1].id) if more else None)
+
+
+async def login_snapshot(addr, db) -> dict:
+    """Everything wallet_connected sends, in three round-trips whatever the
+    account's age: one statement for the round's played/won counts and the
+    balance, then the first page of each history. The queue position comes
+    from the in-memory queue index and costs nothing."""
+    round_id = select(Round.id).order_by(Round.created_at.desc()).limit(1).scalar_subquery()
+    user_id = select(User.id).where(User.wallet_address == addr).scalar_subquery()
+    played_this_round = (
+        select(func.count())
+        .select_from(QueueEntry)
+        .where(QueueEntry.status == "played")
+        .where(QueueEntry.address == addr)
+        .where(QueueEntry.round_id == round_id)
+    )
+    summary = (await db.execute(select(
+        played_this_round.scalar_subquery().label("played"),
+        played_this_round.where(QueueEntry.win == True).scalar_subquery().label("won"),
+        select(UserBalance.total_cents)
+        .where(UserBalance.user_id == user_id)
+        .scalar_subquery().label("total_cents"),
+    ))).one()
+
+    bets, bets_cursor = await bets_page(db, addr)
+    withdrawals, withdrawals_cursor = await withdrawals_page(db, addr)
+    queued_in = cabinets.queue_of(addr)
+    position = queued_in.position(addr) if queued_in else -1
+    return {
+        "position": position,
+        # Which cabinet that position is in line for (null when not queued, or
+        # waiting in the shared line for whichever frees up first).
+        "queue_cabinet": queued_in.cabinet_id if queued_in else None,
+        "eta_seconds": cabinets.eta_seconds(queued_in, position) if queued_in else None,
+        # Balance is off-chain now (contract retired): the winnings ledger,
+        # materialized per user. Returned in dollars for the UI ($<balance>).
+        "balance": int(summary.total_cents or 0) / 100,
+        "played": summary.played,
+        "won": summary.won,
+        "bets": bets,
+        "bets_cursor": bets_cursor,
+        "withdrawals": withdrawals,
+        "withdrawals_cursor": withdrawals_cursor,
+    }
 
-    return balance, bets, withdrawals
+
+async def user_account_data(addr, db):
+    # Balance is off-chain now (contract retired): the winnings ledger,
+    # materialized per user. Returned in dollars for the UI ($<balance>).
+    # History is the first page of each; get_bets / get_withdrawals page back.
+    user = await db.scalar(select(User).where(User.wallet_address == addr))
+    balance_cents = await off_chain_balance_cents(db, user.id) if user else 0
+    balance = balance_cents / 100
+    bets, bets_cursor = await bets_page(db, addr)
+    withdrawals, withdrawals_cursor = await withdrawals_page(db, addr)
+    return balance, (bets, bets_cursor), (withdrawals, withdrawals_cursor)
@@ -0,0 +1,172 @@
+"""In-process latency histograms.
+
+Cheap enough to call on every joystick move: a histogram is a fixed list of
+bucket counters, observe() is a short linear scan. Nothing is exported or
+persisted — the admin /latency endpoint reads the current snapshot, and a
+restart (or POST /latency/reset) starts from zero. That's what we need to
+compare two code paths on a live cabinet, not a metrics pipeline.
+
+Names are dotted by path and hop, e.g. "move.central.bin", "move.rtt".
+
+Turns are traced too (see "Turn traces" below): each hop a turn passes
+through is stamped against its turn_id, and the gaps between hops become
+"turn.*" histograms.
+"""
+import bisect
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Bucket upper bounds in milliseconds. Sub-millisecond resolution at the low
+# end for in-process hops; the top end catches a stalled network hop.
+BUCKETS_MS = (
+    0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, math.inf,
+)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000.0
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def quantile(self, q: float) -> float:
+        """Upper bound (ms) of the bucket holding the q-quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, self.counts):
+            seen += n
+            if seen >= rank:
+                return self.max_ms if math.isinf(bound) else bound
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.quantile(0.50),
+            "p90_ms": self.quantile(0.90),
+            "p99_ms": self.quantile(0.99),
+            "buckets": {
+                ("+Inf" if math.isinf(b) else str(b)): n
+                for b, n in zip(BUCKETS_MS, self.counts) if n
+            },
+        }
+
+
+_histograms: Dict[str, Histogram] = {}
+
+
+def observe(name: str, seconds: float) -> None:
+    h = _histograms.get(name)
+    if h is None:
+        h = _histograms[name] = Histogram()
+    h.observe(seconds)
+
+
+def snapshot() -> dict:
+    return {name: h.snapshot() for name, h in sorted(_histograms.items())}
+
+
+def reset() -> None:
+    _histograms.clear()
+    _turns.clear()
+    _handoffs.clear()
+
+
+# ─── Turn traces ────────────────────────────────────────────────────────
+#
+# A turn is identified by its turn_id (the QueueEntry id), which central sends
+# with turn_start and the Pi echoes on turn_end and verdict. Central stamps its
+# own hops with mark(); the Pi times its hops on its own monotonic clock and
+# reports the durations (pi_stages). Durations only — the two clocks are not
+# comparable, so a timestamp from one side is never subtracted from the other.
+#
+#   turn.pi.start_to_pulse        turn_start received -> COIN+UP pulse done
+#   turn.pi.opto_to_turn_end      opto edge -> turn_end broadcast
+#   turn.pi.turn_end_to_arm       turn_end broadcast -> arm written to the ESP
+#   turn.pi.arm_to_verdict        arm -> the ESP's verdict (the chute sequence)
+#   turn.central.turn_end_to_verdict   the verification window, as central sees it
+#   turn.central.verdict_to_result     verdict -> player_win / turn_result emitted
+#   turn.central.handoff          turn_end -> the next turn_start on the same
+#                                 cabinet: the dead time between players. Only
+#                                 timed when someone was waiting at turn_end, so
+#                                 an idle machine isn't counted as dead time.
+
+_TURN_TRACES_MAX = 64           # recent turns kept for GET /admin/latency/turns
+
+_turns: "OrderedDict[int, dict]" = OrderedDict()
+_handoffs: Dict[str, float] = {}     # cabinet id -> its open handoff gap's turn_end
+
+
+def _trace(turn_id) -> dict:
+    trace = _turns.get(turn_id)
+    if trace is None:
+        trace = _turns[turn_id] = {"hops": {}, "pi": {}}
+        if len(_turns) > _TURN_TRACES_MAX:
+            _turns.popitem(last=False)
+    return trace
+
+
+def mark(turn_id, hop: str, cabinet: Optional[str] = None, queued: bool = False) -> None:
+    """Stamp `hop` for the turn, now. On `cabinet`, a "turn_end" with players
+    `queued` opens a handoff gap, and the next "turn_start" closes it."""
+    now = time.perf_counter()
+    if turn_id is not None:
+        _trace(turn_id)["hops"][hop] = now
+    if cabinet is None:
+        return
+    if hop == "turn_end":
+        if queued:
+            _handoffs[cabinet] = now
+        else:
+            _handoffs.pop(cabinet, None)
+    elif hop == "turn_start":
+        opened = _handoffs.pop(cabinet, None)
+        if opened is not None:
+            observe("turn.central.handoff", now - opened)
+
+
+def stage(name: str, turn_id, start_hop: str, end_hop: str) -> None:
+    """Observe `name` as the gap between two marked hops of the turn, if both
+    were marked."""
+    hops = _turns.get(turn_id, {}).get("hops", {})
+    if start_hop in hops and end_hop in hops:
+        observe(name, hops[end_hop] - hops[start_hop])
+
+
+def pi_stages(turn_id, stages: Optional[dict]) -> None:
+    """Record the per-stage durations (ms) the Pi reported for a turn."""
+    for key, ms in (stages or {}).items():
+        if isinstance(ms, (int, float)):
+            observe(f"turn.pi.{key}", ms / 1000.0)
+            if turn_id is not None:
+                _trace(turn_id)["pi"][key] = ms
+
+
+def recent_turns() -> list:
+    """The last few turns, newest first: central hops in ms after the turn's
+    first marked hop, and the Pi's stage durations in ms."""
+    out = []
+    for turn_id, trace in reversed(_turns.items()):
+        hops = trace["hops"]
+        t0 = min(hops.values()) if hops else 0.0
+        out.append({
+            "turn_id": turn_id,
+            "hops_ms": {hop: round((t - t0) * 1000.0, 3) for hop, t in hops.items()},
+            "pi_ms": dict(trace["pi"]),
+        })
+    return out
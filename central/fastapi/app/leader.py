@@ -0,0 +1,306 @@
+"""Leader election: exactly one process drives the cabinets.
+
+Every uvicorn worker used to start connect_pi, the turn schedulers and the sync
+loops at boot. With several workers (app/socket/pg_manager.py) that would be N
+websockets to each Pi and N schedulers racing to promote the same queue entry.
+
+So the cabinet-owning tasks run only in the process holding a Postgres
+session-level advisory lock (LEADER_LOCK_KEY) on a connection of its own.
+Everyone else is a follower: it serves socket and HTTP traffic and retries the
+lock every LEADER_RETRY seconds. The lock lives exactly as long as the leader's
+connection, so when the leader dies Postgres drops it and a follower takes over
+within one retry — seconds, not a restart. A leader checks its connection every
+LEADER_HEARTBEAT seconds and stands down (cancels its tasks) the moment it
+can't be sure it still holds the lock. The window where an old leader hasn't
+noticed yet is covered in the database: promotion claims its row FOR UPDATE
+SKIP LOCKED (app/handoff.py), so two schedulers can't both start it.
+
+Followers still log players in, take payments and change inventory, and the
+leader has to hear about it. `nudge` sends a NOTIFY on LEADER_CHANNEL — in the
+caller's transaction when there is one, so it's delivered only if the write
+commits — and the leader, listening on its lock connection, runs the handler
+the owning module registered (`on_nudge`): resync a queue, drop the cached
+fitness verdict, mirror a session binding so the handoff's presence check sees
+players on every worker. A newly elected leader announces itself the same way
+and followers replay what it needs (`on_elected`).
+
+The other direction runs on FOLLOWER_CHANNEL. The leader `publish`es what
+followers read but only it changes — a queue's new order after a promotion, a
+cabinet's Pi link and turn in play, enrollment progress — and each follower
+runs the handler registered for it (`on_published`). What only the leader can
+do goes to it instead: a joystick move is a nudge, and an admin command for a
+Pi is a `call`, whose `on_call` handler's reply the leader publishes back to
+whoever is waiting for it. With a single worker (no
+SOCKETIO_PUBSUB_URL) there are no followers, and nothing is published.
+
+A payload too big for one NOTIFY goes through socketio_spill, as the Socket.IO
+manager's do (app/socket/pg_manager.py).
+"""
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import psycopg
+from sqlalchemy import text
+
+from .config import (
+    DATABASE_URL, LEADER_CALL_TIMEOUT, LEADER_HEARTBEAT, LEADER_RETRY,
+    SOCKETIO_PUBSUB_URL, SOCKETIO_SPILL_TTL,
+)
+from .db import KEEPALIVES, engine, libpq_dsn
+from .logging import log
+
+# Arbitrary, but the same in every worker: "claw" in ASCII.
+LEADER_LOCK_KEY = 0x636C6177
+LEADER_CHANNEL = "claw_leader"
+FOLLOWER_CHANNEL = "claw_follower"
+
+# NOTIFY rejects payloads of 8000 bytes or more (as in app/socket/pg_manager.py).
+NOTIFY_MAX_BYTES = 7900
+
+is_leader = False
+
+# Registered by the modules that own the state: what the leader does with each
+# nudge (kind -> handler(arg)) and each call (kind -> handler(arg) -> reply),
+# what a follower does with each publish, and what it does when a leader is
+# elected.
+_nudge_handlers: dict = {}
+_call_handlers: dict = {}
+_published_handlers: dict = {}
+_elected_handlers: List[Callable[[], Awaitable[None]]] = []
+
+# Follower: calls waiting for the leader's reply (call id -> future of
+# (ok, reply)). Leader: publishes not yet sent, in order, and calls being served.
+_calls: Dict[str, asyncio.Future] = {}
+_outgoing: List[str] = []
+_publisher: Optional[asyncio.Task] = None
+_serving: set = set()
+_swept_at = 0.0
+
+
+class LeaderCallError(Exception):
+    """A forwarded call failed in the leader, or no leader answered it."""
+
+
+def on_nudge(kind: str, handler: Callable[[str], Awaitable[None]]) -> None:
+    _nudge_handlers[kind] = handler
+
+
+def on_call(kind: str, handler: Callable[[str], Awaitable[str]]) -> None:
+    _call_handlers[kind] = handler
+
+
+def on_published(kind: str, handler: Callable[[str], Awaitable[None]]) -> None:
+    _published_handlers[kind] = handler
+
+
+def on_elected(handler: Callable[[], Awaitable[None]]) -> None:
+    _elected_handlers.append(handler)
+
+
+async def _notify(conn, channel: str, payload: str) -> None:
+    """NOTIFY on `conn` (a connection or session), spilling a payload too big
+    for it to socketio_spill."""
+    global _swept_at
+    if len(payload.encode()) > NOTIFY_MAX_BYTES:
+        spill_id = (await conn.execute(
+            text("INSERT INTO socketio_spill (payload) VALUES (:payload) RETURNING id"),
+            {"payload": payload},
+        )).scalar_one()
+        payload = f"spill:{spill_id}"
+        if time.monotonic() - _swept_at >= SOCKETIO_SPILL_TTL:
+            _swept_at = time.monotonic()
+            await conn.execute(text(
+                "DELETE FROM socketio_spill"
+                " WHERE created_at < (now() AT TIME ZONE 'utc') - make_interval(secs => :ttl)"
+            ), {"ttl": SOCKETIO_SPILL_TTL})
+    await conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                       {"channel": channel, "payload": payload})
+
+
+async def _unspill(spill_id: str) -> Optional[str]:
+    async with engine.connect() as conn:
+        return await conn.scalar(
+            text("SELECT payload FROM socketio_spill WHERE id = :id"), {"id": int(spill_id)}
+        )
+
+
+async def nudge(kind: str, arg: str = "", db=None) -> None:
+    """Tell the leader `kind` changed. A no-op on the leader itself, which
+    acts on its own writes directly. With `db`, the NOTIFY is part of its
+    transaction and goes out on commit."""
+    if is_leader:
+        return
+    try:
+        if db is not None:
+            await _notify(db, LEADER_CHANNEL, f"{kind}:{arg}")
+        else:
+            async with engine.begin() as conn:
+                await _notify(conn, LEADER_CHANNEL, f"{kind}:{arg}")
+    except Exception:
+        log.exception("Could not nudge the leader about %s", kind)
+
+
+def publish(kind: str, arg: str = "") -> None:
+    """Tell the followers `kind` changed in the leader. Sync, so plain code can
+    call it; publishes go out in order, a moment later. A no-op on a follower,
+    and with a single worker."""
+    global _publisher
+    if not is_leader or not SOCKETIO_PUBSUB_URL:
+        return
+    _outgoing.append(f"{kind}:{arg}")
+    if _publisher is None or _publisher.done():
+        try:
+            _publisher = asyncio.get_running_loop().create_task(_send_published())
+        except RuntimeError:
+            _outgoing.clear()   # no loop: a script, not a worker
+
+
+async def _send_published() -> None:
+    while _outgoing:
+        pending = _outgoing[:]
+        del _outgoing[:]
+        try:
+            async with engine.begin() as conn:
+                for payload in pending:
+                    await _notify(conn, FOLLOWER_CHANNEL, payload)
+        except Exception:
+            log.exception("Could not publish %d update(s) to the followers", len(pending))
+
+
+async def call(kind: str, arg: str = "", timeout: float = LEADER_CALL_TIMEOUT) -> str:
+    """Run the leader's `kind` handler (`on_call`) on `arg` and return its
+    reply: right here on the leader, else forwarded to it. From a follower,
+    raises LeaderCallError if it fails there or no leader answers within
+    `timeout`."""
+    if is_leader:
+        return await _call_handlers[kind](arg)
+    call_id = uuid.uuid4().hex
+    reply = asyncio.get_running_loop().create_future()
+    _calls[call_id] = reply
+    try:
+        async with engine.begin() as conn:
+            await _notify(conn, LEADER_CHANNEL, f"call:{call_id} {kind} {arg}")
+        ok, result = await asyncio.wait_for(reply, timeout)
+    except asyncio.TimeoutError:
+        raise LeaderCallError(f"No leader answered {kind} within {timeout}s")
+    finally:
+        _calls.pop(call_id, None)
+    if not ok:
+        raise LeaderCallError(result)
+    return result
+
+
+async def _serve(arg: str) -> None:
+    """Run a follower's call and publish the reply, "<call id> ok|error <reply>"."""
+    call_id, kind, arg = (arg.split(" ", 2) + [""])[:3]
+    try:
+        reply = f"ok {await _call_handlers[kind](arg)}"
+    except Exception as e:
+        log.exception("Call %s from a follower failed", kind)
+        reply = f"error {e}"
+    publish("reply", f"{call_id} {reply}")
+
+
+def _replied(arg: str) -> None:
+    call_id, status, reply = (arg.split(" ", 2) + [""])[:3]
+    waiting = _calls.get(call_id)
+    if waiting is not None and not waiting.done():
+        waiting.set_result((status == "ok", reply))
+
+
+async def _on_notify(channel: str, payload: str) -> None:
+    if channel == FOLLOWER_CHANNEL and is_leader:
+        return      # our own publish
+    if channel == LEADER_CHANNEL and not is_leader and not payload.startswith("elected:"):
+        return      # a nudge or call for the leader
+    kind, _, arg = payload.partition(":")
+    if kind == "spill":
+        payload = await _unspill(arg)
+        if payload is None:
+            log.warning("Spilled leader notification %s already swept", arg)
+            return
+        kind, _, arg = payload.partition(":")
+
+    if channel == FOLLOWER_CHANNEL:
+        if kind == "reply":
+            _replied(arg)
+            return
+        if kind not in _published_handlers:
+            log.warning("Follower got an unknown publish %r", payload[:200])
+            return
+        handlers = [_published_handlers[kind](arg)]
+    elif kind == "elected":
+        # Our own announcement comes back to us too.
+        handlers = [] if is_leader else [h() for h in _elected_handlers]
+    elif kind == "call":
+        # Some (a test arm, a turn end) take seconds: don't hold up the nudges.
+        task = asyncio.create_task(_serve(arg))
+        _serving.add(task)
+        task.add_done_callback(_serving.discard)
+        return
+    elif kind in _nudge_handlers:
+        handlers = [_nudge_handlers[kind](arg)]
+    else:
+        log.warning("Leader got an unknown nudge %r", payload[:200])
+        return
+    for handler in handlers:
+        try:
+            await handler
+        except Exception:
+            log.exception("Failed to handle leader notification %r", payload)
+
+
+async def _wait_for_lock(conn: psycopg.AsyncConnection) -> None:
+    """Retry the lock every LEADER_RETRY seconds, following whoever holds it
+    meanwhile: its `elected`, its publishes and its replies."""
+    while not (await (await conn.execute(
+        "SELECT pg_try_advisory_lock(%s)", (LEADER_LOCK_KEY,)
+    )).fetchone())[0]:
+        async for notify in conn.notifies(timeout=LEADER_RETRY):
+            await _on_notify(notify.channel, notify.payload)
+
+
+async def _hold(conn: psycopg.AsyncConnection) -> None:
+    """Serve nudges and calls until the lock connection stops answering."""
+    while True:
+        async for notify in conn.notifies(timeout=LEADER_HEARTBEAT):
+            await _on_notify(notify.channel, notify.payload)
+        await asyncio.wait_for(conn.execute("SELECT 1"), LEADER_HEARTBEAT)
+
+
+async def elect(lead: Callable[[], Awaitable[List[asyncio.Task]]],
+                stand_down: Optional[Callable[[], None]] = None) -> None:
+    """Run forever: wait for the lock, then run `lead()`'s tasks while it's
+    held. If it's lost, cancel them, call `stand_down` and go back to waiting."""
+    global is_leader
+    dsn = libpq_dsn(DATABASE_URL)
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(dsn, autocommit=True, **KEEPALIVES) as conn:
+                await conn.execute(f'LISTEN "{LEADER_CHANNEL}"')
+                await conn.execute(f'LISTEN "{FOLLOWER_CHANNEL}"')
+                await _wait_for_lock(conn)
+
+                log.info("Won the leader lock — this process drives the cabinets")
+                is_leader = True
+                tasks: List[asyncio.Task] = []
+                try:
+                    tasks = await lead()
+                    await conn.execute("SELECT pg_notify(%s, 'elected:')", (LEADER_CHANNEL,))
+                    await _hold(conn)
+                finally:
+                    is_leader = False
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    if stand_down is not None:
+                        stand_down()
+                    log.warning("Lost the leader lock — cabinet tasks stopped")
+        except (psycopg.OperationalError, asyncio.TimeoutError) as e:
+            log.warning("Leader lock connection failed (%s) — retrying in %ss", e, LEADER_RETRY)
+            await asyncio.sleep(LEADER_RETRY)
+        except Exception:
+            log.exception("Leader election crashed — retrying in %ss", LEADER_RETRY)
+            await asyncio.sleep(LEADER_RETRY)
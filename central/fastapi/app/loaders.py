@@ -0,0 +1,81 @@
+"""Eager loading for the read paths: what each serializer touches, loaded up
+front in a fixed number of statements however many rows come back.
+
+The mappers' defaults don't give that. Most relationships are lazy="selectin",
+which cascades — a Win pulls in its user and queue entry, its ball, the ball's
+commitment batch, the booster's cards and every card's type — and the rest are
+plain lazy loads, which under asyncio don't so much cost a query per row as
+fail (MissingGreenlet) the first time a serializer touches one.
+
+So each option set below names exactly the paths its serializer reads and
+raiseloads everything else. A serializer that starts reading a new
+relationship fails loudly until it's added here, rather than quietly going
+back to the database per row; sim/tests/test_query_counts.py pins the
+statement counts.
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+from .models import Ball, Card, CardStatus, OpenedBooster, Win, WinStatus
+
+# A card and its catalog entry: events_inventory._serialize_card, the admin
+# card lists.
+CARD = (joinedload(Card.card_type).raiseload("*"), raiseload("*"))
+
+# A pending win as the player's inventory shows it
+# (events_inventory._serialize_pending_win): the ball's serial, the opened
+# booster, or the card with its type.
+PENDING_WIN = (
+    joinedload(Win.ball).raiseload("*"),
+    joinedload(Win.opened_booster).raiseload("*"),
+    joinedload(Win.prize_card).options(*CARD),
+    raiseload("*"),
+)
+
+# A win in the admin play history (admin._describe_prize): the booster is read
+# through the ball's binding, which outlives the win's reservation.
+PLAYED_WIN = (
+    joinedload(Win.ball).options(joinedload(Ball.opened_booster).raiseload("*"), raiseload("*")),
+    joinedload(Win.prize_card).options(*CARD),
+    raiseload("*"),
+)
+
+# A ball in the admin list: its binding's SKU.
+BALL = (joinedload(Ball.opened_booster).raiseload("*"), raiseload("*"))
+
+# An opened booster in the admin list: its sealed SKU and how many cards it
+# has so far (is_complete reads both).
+OPENED_BOOSTER = (
+    joinedload(OpenedBooster.closed_booster).raiseload("*"),
+    selectinload(OpenedBooster.cards).raiseload("*"),
+    raiseload("*"),
+)
+
+
+def pending_wins(user_id):
+    """The user's unsettled wins, newest first."""
+    return (
+        select(Win)
+        .where(Win.user_id == user_id, Win.status == WinStatus.PENDING)
+        .order_by(Win.created_at.desc())
+        .options(*PENDING_WIN)
+    )
+
+
+def collection_cards(user_id):
+    """The cards the user holds in their collection, newest first."""
+    return (
+        select(Card)
+        .where(Card.owner_user_id == user_id, Card.status == CardStatus.IN_COLLECTION)
+        .order_by(Card.acquired_at.desc())
+        .options(*CARD)
+    )
+
+
+def wins_for_entries(entry_ids):
+    """The wins settled against these queue entries (the play history)."""
+    return select(Win).where(Win.queue_entry_id.in_(entry_ids)).options(*PLAYED_WIN)
+
+
+def balls():
+    return select(Ball).order_by(Ball.serial).options(*BALL)
@@ -2,9 +2,10 @@
 
 Two independent reasons it might not be:
 
-  - the chute is jammed (state.cabinet_fault, set from the ESP verdict), or
-  - a ball in the machine has a prize we couldn't actually hand over
-    (state.inventory_fault).
+  - its chute is jammed (cab.cabinet_fault, set from the ESP verdict), or
+  - a loaded ball has a prize we couldn't actually hand over
+    (state.inventory_fault). Balls aren't tied to a cabinet, so this one
+    pauses every cabinet.
 
 Both pause the queue the same way and stay paused until an operator resolves
 them. Treating the inventory problem as just another "machine not fit" fault —
@@ -15,29 +16,103 @@ The inventory check looks at STATE, not at transitions: it asks "is every loaded
 ball winnable right now", so it catches every way the machine could have got into
 that condition, including ones nobody has guarded (a direct DB edit, a bulk
 import, an endpoint written next year).
+
+That check is a four-table join over every loaded ball, and the gate is asked
+before every turn and on every scheduler pass — while the inventory changes a
+few times a day. So its verdict is cached, and dropped (`invalidate`) by the
+writes that can change it: the admin inventory routes, and any win_transitions
+function (record_win, settlements, void_ball), whose session is flagged and
+invalidates on commit. The state-not-transitions guarantee is kept by a full
+recheck at least every MACHINE_FITNESS_RECHECK seconds regardless — a write
+nobody flagged is caught then, not never.
+
+The pooled dispatcher (app/handoff.py) also asks how many balls each cabinet
+has loaded (`loaded_stock`), under the same cache and invalidation.
 """
-from typing import Optional
+import asyncio
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
 
+from . import enrollment
+from . import leader
 from . import state
 from . import win_transitions as wt
+from .cabinet import Cabinet, cabinets
+from .config import MACHINE_FITNESS_RECHECK
 from .deps import async_session
 from .logging import log
+from .models import Ball, BallStatus
 from .notifier import alertBot
 from .socket.sio_instance import sio
 
 
+# The cached inventory verdict is state.inventory_fault, current as of
+# _checked_generation. Every invalidate() bumps _generation; a refresh records
+# the generation it started at, so a write that lands mid-refresh leaves the
+# cache stale rather than marking a pre-write answer as fresh.
+_generation = 0
+_checked_generation = -1
+_checked_at = 0.0
+
+
+# LOADED balls per Ball.cabinet_id (None: not assigned to a cabinet), as of
+# _stock_generation.
+_stock: Dict[Optional[str], int] = {}
+_stock_generation = -1
+_stock_at = 0.0
+
+
+def invalidate() -> None:
+    """Inventory changed: the next gate check recomputes — in the leader too,
+    when this is a follower worker (app/leader.py)."""
+    global _generation
+    _generation += 1
+    if not leader.is_leader:
+        try:
+            asyncio.get_running_loop().create_task(leader.nudge("inventory"))
+        except RuntimeError:
+            pass   # no loop: a script, not a worker
+
+
+async def _inventory_nudged(_arg: str) -> None:
+    invalidate()
+    cabinets.wake_all()
+
+
+leader.on_nudge("inventory", _inventory_nudged)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session) -> None:
+    if session.info.pop(wt.INVENTORY_CHANGED, False):
+        invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session) -> None:
+    session.info.pop(wt.INVENTORY_CHANGED, None)
+
+
 async def refresh_inventory_fault() -> Optional[dict]:
     """Recompute the inventory fault. Returns it, or None if the machine is fit.
 
     Emits (and alerts) only on a change, so a paused machine doesn't spam.
     """
+    global _checked_generation, _checked_at
+    generation = _generation
     async with async_session() as db:
         bad = await wt.unclaimable_loaded_balls(db)
+    _checked_generation = generation
+    _checked_at = time.monotonic()
 
     if not bad:
         if state.inventory_fault:
             log.info("Inventory fault cleared — every loaded ball is claimable again")
             state.inventory_fault = None
+            cabinets.wake_all()
             await sio.emit("cabinet_fault", None)
         return None
 
@@ -61,14 +136,39 @@ async def refresh_inventory_fault() -> Optional[dict]:
     return fault
 
 
-async def blocked() -> Optional[dict]:
-    """Why the machine must not start another turn — None if it's fit.
+async def loaded_stock(cab: Cabinet) -> int:
+    """LOADED balls `cab` could drop: its own plus the unassigned ones."""
+    global _stock, _stock_generation, _stock_at
+    if (_stock_generation != _generation
+            or time.monotonic() - _stock_at >= MACHINE_FITNESS_RECHECK):
+        generation = _generation
+        async with async_session() as db:
+            rows = await db.execute(
+                select(Ball.cabinet_id, func.count())
+                .where(Ball.status == BallStatus.LOADED)
+                .group_by(Ball.cabinet_id)
+            )
+            _stock = dict(rows.all())
+        _stock_generation = generation
+        _stock_at = time.monotonic()
+    return _stock.get(cab.id, 0) + _stock.get(None, 0)
+
+
+async def blocked(cab: Cabinet) -> Optional[dict]:
+    """Why `cab` must not start another turn — None if it's fit.
 
     Call this immediately before starting a turn. A player must never be able to
-    pay for a play the machine cannot honour.
+    pay for a play the machine cannot honour. A memory read unless the
+    inventory changed, or the last full check is MACHINE_FITNESS_RECHECK old.
     """
-    if state.version_fault:
-        return state.version_fault
-    if state.cabinet_fault:
-        return state.cabinet_fault
+    if cab.version_fault:
+        return cab.version_fault
+    if cab.cabinet_fault:
+        return cab.cabinet_fault
+    if enrollment.listening(cab):
+        # The ESP would drop an arm while it listens for tags.
+        return {"kind": "enrolling", "reason": "tag enrollment in progress"}
+    if (_checked_generation == _generation
+            and time.monotonic() - _checked_at < MACHINE_FITNESS_RECHECK):
+        return state.inventory_fault
     return await refresh_inventory_fault()
@@ -1,7 +1,7 @@
 import enum
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, BigInteger, UniqueConstraint, Index, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, BigInteger, UniqueConstraint, Index, Enum, text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 
@@ -32,8 +32,23 @@ class QueueEntry(Base):
     win          = Column(Boolean, default=False)
     key          = Column(String(66))
     round_id     = Column(Integer, ForeignKey("round.id"))
+    # The claw machine this play is on (app/cabinet.py); each cabinet's queue
+    # is its partition of this table. NULL while a pooled play waits in the
+    # shared line — the dispatcher sets it when a cabinet claims the entry.
+    cabinet_id   = Column(String)
     
     round        = relationship("Round", back_populates="entries")
+
+    __table_args__ = (
+        # A cabinet's waiting line, oldest first (queue_index.QueueIndex.resync).
+        Index("ix_queue_cabinet_status_created", "cabinet_id", "status", "created_at"),
+        # Bet history: one address's played turns, newest first (keyset pages
+        # on played_at, id — see helpers.bets_page).
+        Index("ix_queue_address_status_played", "address", "status", "played_at"),
+        # Admin play history, newest first, filtered (admin.list_plays).
+        Index("ix_queue_status_id", "status", "id"),
+        Index("ix_queue_address_id", "address", "id"),
+    )
     
 
 class Withdrawal(Base):
@@ -42,7 +57,11 @@ class Withdrawal(Base):
     address      = Column(String, index=True)
     timestamp    = Column(DateTime, index=True)
     amount       = Column(Integer, index=True)
-    
+
+    __table_args__ = (
+        Index("ix_withdrawal_address_timestamp", "address", "timestamp"),
+    )
+
 
 # class Block(Base):
 #     __tablename__ = "chain_block"
@@ -79,7 +98,7 @@ class Withdrawal(Base):
 # QueueEntry above is the "ticket" (Bet). When QueueEntry.win = True we also
 # create a Win row below holding the prize details and state machine. The
 # legacy `address` column on QueueEntry/Withdrawal stays as-is; new tables
-# FK to a User row created lazily by win_transitions.get_or_create_user.
+# FK to a User row created lazily by win_transitions.user_id_for.
 
 
 class KycStatus(str, enum.Enum):
@@ -219,12 +238,20 @@ class Ball(Base):
 
     status              = Column(Enum(BallStatus, name="ball_status"), default=BallStatus.LOADED, nullable=False)
     voided_at           = Column(DateTime)
+    # The cabinet the ball is loaded in — its stock (machine.loaded_stock). NULL
+    # means not assigned to one, and counts toward every cabinet.
+    cabinet_id          = Column(String, index=True)
 
     opened_booster      = relationship("OpenedBooster", foreign_keys=[opened_booster_id], back_populates="ball", uselist=False, lazy="selectin")
     prize_card          = relationship("Card", foreign_keys=[prize_card_id], back_populates="ball", uselist=False, lazy="selectin")
     batch               = relationship("CommitmentBatch", lazy="selectin")
     win                 = relationship("Win", back_populates="ball", uselist=False)
 
+    __table_args__ = (
+        # Admin ball list by status, in serial order (admin.list_balls).
+        Index("ix_ball_status_serial", "status", "serial"),
+    )
+
 
 class ClosedBooster(Base):
     """Catalog of sealed packs, one row per SKU.
@@ -301,6 +328,9 @@ class OpenedBooster(Base):
 
     __table_args__ = (
         Index("ix_opened_booster_sku_status", "sku", "status"),
+        # Admin list order, all and by status (admin.list_opened_boosters).
+        Index("ix_opened_booster_sku_id", text("coalesce(sku, '')"), "id"),
+        Index("ix_opened_booster_status_sku_id", "status", text("coalesce(sku, '')"), "id"),
     )
 
 
@@ -324,6 +354,14 @@ class CardType(Base):
     def is_complete(self) -> bool:
         return bool(self.sku and self.name and self.image_url and self.type and self.rarity)
 
+    __table_args__ = (
+        # Admin catalog filters, in SKU order (admin.list_card_types); the
+        # pattern index serves the SKU-prefix search.
+        Index("ix_card_type_rarity_sku", "rarity", "sku"),
+        Index("ix_card_type_set_sku", "set", "sku"),
+        Index("ix_card_type_sku_pattern", "sku", postgresql_ops={"sku": "text_pattern_ops"}),
+    )
+
 
 class Card(Base):
     """A specific card instance (a 'won card'): references its CardType (the
@@ -354,6 +392,9 @@ class Card(Base):
 
     __table_args__ = (
         Index("ix_card_owner_status", "owner_user_id", "status"),
+        # Admin card list by status, and by acquisition date (admin.list_cards).
+        Index("ix_card_status_id", "status", "id"),
+        Index("ix_card_acquired_at", "acquired_at"),
     )
 
 
@@ -430,15 +471,36 @@ class LedgerEntry(Base):
     shipment_id         = Column(UUID(as_uuid=True), ForeignKey("shipment.id"))
     withdrawal_tx_hash  = Column(String)
 
+    # Set on a credit that is on chargeback hold (traceable to a CARD-funded
+    # ticket): when the hold ends. The balance sweep releases it from
+    # UserBalance.held_cents and clears this. Null == not held.
+    held_until          = Column(DateTime)
+
     created_at          = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     user                = relationship("User")
 
     __table_args__ = (
         Index("ix_ledger_user_created", "user_id", "created_at"),
+        Index("ix_ledger_held_until", "held_until", postgresql_where=held_until.isnot(None)),
     )
 
 
+class UserBalance(Base):
+    """The user's balance, materialized from the ledger (see app/balances.py).
+
+    Updated in the same transaction as every LedgerEntry write, so a balance
+    read is one primary-key lookup no matter how long the user's history is.
+    The ledger stays the source of truth: a reconciliation job recomputes it and
+    reports any drift.
+    """
+    __tablename__ = "user_balance"
+    user_id      = Column(UUID(as_uuid=True), ForeignKey("user_account.id"), primary_key=True)
+    total_cents  = Column(BigInteger, nullable=False, default=0)
+    held_cents   = Column(BigInteger, nullable=False, default=0)   # on chargeback hold
+    updated_at   = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
 class Payment(Base):
     """A single pay-to-play ticket payment, via either rail (crypto or card).
 
@@ -469,6 +531,11 @@ class Payment(Base):
     # PENDING (Postgres allows multiple NULLs under a UNIQUE index).
     ref            = Column(String, unique=True)
 
+    # The cabinet the play is for, chosen at payment time (NULL: the shared
+    # line); confirm_payment enqueues it there (a card charge can confirm later,
+    # from the webhook).
+    cabinet_id     = Column(String)
+
     created_at     = Column(DateTime, default=datetime.utcnow, nullable=False)
     confirmed_at   = Column(DateTime)
 
@@ -477,4 +544,28 @@ class Payment(Base):
 
     __table_args__ = (
         Index("ix_payment_status_created", "status", "created_at"),
-    )
\ No newline at end of file
+    )
+
+class SocketSpill(Base):
+    """A Socket.IO pub/sub batch too big for one NOTIFY (app/socket/pg_manager.py).
+
+    The NOTIFY carries only the id; each worker reads the payload back. Written
+    and swept by the manager over its own connection, never through the ORM —
+    the model is here so the schema has one home.
+    """
+    __tablename__ = "socketio_spill"
+    id          = Column(BigInteger, primary_key=True)
+    payload     = Column(Text, nullable=False)
+    created_at  = Column(DateTime, server_default=text("(now() AT TIME ZONE 'utc')"), nullable=False, index=True)
+
+
+class SocketOutbox(Base):
+    """A Socket.IO emit recorded in the transaction whose commit it announces
+    (app/outbox.py). Deleted once the dispatcher has delivered it."""
+    __tablename__ = "socket_outbox"
+    id          = Column(BigInteger, primary_key=True)
+    event       = Column(String, nullable=False)
+    room        = Column(String)            # NULL: broadcast to everyone
+    payload     = Column(JSONB)
+    attempts    = Column(Integer, nullable=False, default=0)
+    created_at  = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,153 @@
+"""Transactional outbox for socket emits.
+
+Emits that announce a state change used to be interleaved with commits by
+hand: commit, then `sio.emit`. A crash (or a cancelled task) between the two
+lost the event — a player queued with nobody told, a prize reserved with no
+player_win — and the emit ran inline, so a slow fan-out held up the handler
+that had already done its work.
+
+Now `emit(db, ...)` adds the event to `socket_outbox` in the caller's
+transaction: it exists if and only if the state change committed. The commit
+wakes the dispatcher (a Session after_commit hook, or a leader nudge when the
+commit happened on a follower worker), which delivers rows in id order, in
+batches of OUTBOX_BATCH, and deletes them. It runs only in the leader
+(app/leader.py), so there's one delivery order.
+
+Delivery is at least once: a crash after the emit and before the delete
+re-sends the batch on the next pass. A row that fails to emit stays put and is
+retried, and the rest of its room's rows wait behind it so a room never sees
+events out of order; after OUTBOX_MAX_ATTEMPTS it's dropped and logged.
+Unrelated rooms carry on.
+
+A turn's announcements that have no write of their own to ride on — a lost
+turn's result, a chute fault — go through `send`, an outbox row in a
+transaction of its own: they keep their place behind the turn_end that came
+before them in the room, and outlive a crash before they're delivered.
+
+Emits that don't announce a change — turn_ready pings, global_sync
+snapshots, acks — still go straight to `sio`.
+"""
+import asyncio
+from typing import Optional
+
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from . import leader
+from .config import OUTBOX_BATCH, OUTBOX_MAX_ATTEMPTS, OUTBOX_POLL
+from .deps import async_session
+from .logging import log
+from .models import SocketOutbox
+from .socket.sio_instance import sio
+
+# Set in a session whose transaction wrote to the outbox; its commit wakes the
+# dispatcher.
+OUTBOX_PENDING = "outbox_pending"
+
+_wakeup = asyncio.Event()
+
+
+async def emit(db, event_name: str, data=None, room: Optional[str] = None) -> None:
+    """Emit `event_name` to `room` (everyone, for None) once `db`'s
+    transaction commits. Nothing is sent if it rolls back."""
+    db.add(SocketOutbox(event=event_name, room=room, payload=data, attempts=0))
+    if not db.info.get(OUTBOX_PENDING):
+        db.info[OUTBOX_PENDING] = True
+        await leader.nudge("outbox", "", db)
+
+
+async def send(event_name: str, data=None, room: Optional[str] = None) -> None:
+    """`emit`, committed on its own."""
+    async with async_session() as db:
+        await emit(db, event_name, data, room)
+        await db.commit()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_on_commit(session) -> None:
+    if session.info.pop(OUTBOX_PENDING, False):
+        _wakeup.set()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session) -> None:
+    session.info.pop(OUTBOX_PENDING, None)
+
+
+async def _nudged(_arg: str) -> None:
+    _wakeup.set()
+
+
+leader.on_nudge("outbox", _nudged)
+
+
+async def _deliver_batch() -> tuple:
+    """One pass over the head of the outbox. Returns (rows read, delivered).
+
+    No session is held across the emits (a checked-out connection left idle
+    is what the pooler kills, see schedulers.py): the rows are read in one
+    short transaction and settled in another. Only the leader delivers, and a
+    row emitted but not yet deleted is simply re-sent, as after a crash."""
+    async with async_session() as db:
+        rows = (await db.execute(
+            select(SocketOutbox.id, SocketOutbox.event, SocketOutbox.room,
+                   SocketOutbox.payload, SocketOutbox.attempts)
+            .order_by(SocketOutbox.id)
+            .limit(OUTBOX_BATCH)
+        )).all()
+        await db.commit()
+
+    done, failed, stuck_rooms = [], [], set()
+    for row in rows:
+        if row.room in stuck_rooms:
+            continue
+        try:
+            await sio.emit(row.event, row.payload, room=row.room)
+            done.append(row.id)
+        except Exception:
+            attempts = row.attempts + 1
+            if attempts >= OUTBOX_MAX_ATTEMPTS:
+                log.exception("Outbox: dropping %s to %s after %d attempts",
+                              row.event, row.room or "everyone", attempts)
+                done.append(row.id)
+            else:
+                log.warning("Outbox: %s to %s failed (attempt %d) — retrying",
+                            row.event, row.room or "everyone", attempts)
+                failed.append(row.id)
+                stuck_rooms.add(row.room)
+
+    if done or failed:
+        async with async_session() as db:
+            if done:
+                await db.execute(delete(SocketOutbox).where(SocketOutbox.id.in_(done)))
+            if failed:
+                await db.execute(
+                    update(SocketOutbox)
+                    .where(SocketOutbox.id.in_(failed))
+                    .values(attempts=SocketOutbox.attempts + 1)
+                )
+            await db.commit()
+    return len(rows), len(done)
+
+
+async def dispatcher() -> None:
+    """Deliver the outbox. Leader-only (app/__init__.py). Every commit that
+    wrote to it wakes this (directly, or by a follower's nudge); the
+    OUTBOX_POLL timeout is only a safety net for a wake-up that got lost."""
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=OUTBOX_POLL)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        try:
+            while True:
+                read, delivered = await _deliver_batch()
+                # A full batch that all went out: there may be more behind it.
+                if read < OUTBOX_BATCH or delivered < read:
+                    break
+        except OperationalError:
+            log.warning("Outbox dispatcher: DB connection dropped — retrying next tick")
+        except Exception:
+            log.exception("Outbox dispatcher pass failed")
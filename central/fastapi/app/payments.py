@@ -11,11 +11,16 @@ off-chain balance accrues only from winnings (resold prizes), never from
 deposits — so the `payment` table is itself the audit record of ticket revenue.
 """
 from datetime import datetime
+from typing import Optional
 
-from sqlalchemy import select, func
+from sqlalchemy import select
 
+from . import leader
+from . import outbox
+from .cabinet import cabinets
+from .logging import log
 from .models import QueueEntry, Round, Payment, PaymentStatus
-from .socket.sio_instance import sio
+from .queue_index import QueueIndex
 
 
 async def current_round(db):
@@ -23,7 +28,8 @@ async def current_round(db):
 
 
 async def already_in_queue(db, addr, round_id) -> bool:
-    """True if addr already has a queued/active entry this round (double-entry guard)."""
+    """True if addr already has a queued/active entry this round, on any cabinet
+    (double-entry guard: a player waits in one queue at a time)."""
     existing = await db.scalar(
         select(QueueEntry)
         .where(QueueEntry.round_id == round_id)
@@ -33,8 +39,9 @@ async def already_in_queue(db, addr, round_id) -> bool:
     return existing is not None
 
 
-async def initiate_payment(db, addr, method, amount_cents) -> Payment:
-    """Create a PENDING payment for one play. Flushes so the id is available.
+async def initiate_payment(db, addr, method, amount_cents, cabinet_id: Optional[str]) -> Payment:
+    """Create a PENDING payment for one play on `cabinet_id` (None: the shared
+    line, see cabinets.pay_target). Flushes so the id is available.
 
     The caller commits (synchronous crypto path) or commits separately so the
     PENDING row survives until an async confirmation (card webhook).
@@ -44,6 +51,7 @@ async def initiate_payment(db, addr, method, amount_cents) -> Payment:
         method=method,
         amount_cents=amount_cents,
         status=PaymentStatus.PENDING,
+        cabinet_id=cabinet_id,
     )
     db.add(payment)
     await db.flush()
@@ -54,22 +62,49 @@ async def confirm_payment(db, payment, key) -> int:
     """Single convergence point for both rails.
 
     Marks `payment` CONFIRMED, creates the paid-for QueueEntry into the current
-    round, links the two, commits, and broadcasts `player_queued`. Returns the
-    queued count (the player's position). The caller owns the session.
+    round in the payment's line (its cabinet's, or the shared one), links the
+    two, records `player_queued` to their rooms in the outbox, commits, appends
+    it to that queue index and wakes the turn schedulers serving it (an idle
+    machine starts the turn right away). Returns the player's position. The
+    caller owns the session.
     """
+    index = _queue_for(payment)
     round_ = await current_round(db)
-    entry = QueueEntry(address=payment.address, round_id=round_.id, key=key.hex())
+    entry = QueueEntry(address=payment.address, round_id=round_.id, key=key.hex(),
+                       cabinet_id=index.cabinet_id)
     db.add(entry)
     await db.flush()
 
     payment.status = PaymentStatus.CONFIRMED
     payment.confirmed_at = datetime.utcnow()
     payment.queue_entry_id = entry.id
+    # On a follower worker, the leader's copy of the queue learns of the entry
+    # when this commits.
+    await leader.nudge("queue", index.name, db)
+    for cab in cabinets:
+        if index in cab.queues():
+            await outbox.emit(db, "player_queued", {"cabinet": cab.id}, room=cab.room)
 
     await db.commit()
-
-    qcount = await db.scalar(
-        select(func.count()).select_from(QueueEntry).where(QueueEntry.status == "queued")
-    )
-    await sio.emit("player_queued")
-    return qcount
+    index.push(entry.id, entry.address)
+    position = index.position_of(entry.id)
+    cabinets.wake_queue(index)
+    return position
+
+
+def _queue_for(payment) -> QueueIndex:
+    if payment.cabinet_id is None:
+        if cabinets.pool is not None:
+            return cabinets.pool
+        # Paid into the shared line, confirmed after QUEUE_DISPATCH went
+        # per-cabinet (a card charge confirming late). Give it on the default.
+        return cabinets.default.queue
+    cab = cabinets.get(payment.cabinet_id)
+    if cab is None:
+        # Paid for a cabinet that has since been taken out of CABINETS. The
+        # play is owed; give it wherever plays go now.
+        fallback = cabinets.pool or cabinets.default.queue
+        log.warning("Payment %s is for unknown cabinet %s — queueing in %s",
+                    payment.id, payment.cabinet_id, fallback.name)
+        return fallback
+    return cab.queue
@@ -4,9 +4,8 @@ from typing import Optional
 from eth_utils import to_bytes
 import os, threading
 from web3 import Web3
-import app.state as state
 from .socket.sio_instance import sio
-from .config import BASE_RPC_HTTP, CLAW_ADDRESS, PI_SERVER_URL, INTER_TURN_DELAY, PRIVATE_KEY, CHAIN_ID, BYPASS_PAYMENT
+from .config import BASE_RPC_HTTP, CLAW_ADDRESS, INTER_TURN_DELAY, PRIVATE_KEY, CHAIN_ID, BYPASS_PAYMENT, MOVE_MIN_INTERVAL, ENROLL_WINDOW_SECONDS
 from .abi import claw_abi
 from .logging import log
 from sqlalchemy import select, func
@@ -15,65 +14,74 @@ from .models import QueueEntry, PrizeKind
 from . import win_transitions as wt
 from . import machine
 from . import versioning
-import asyncio, websockets, json
+from .cabinet import Cabinet
+from .sessions import sessions
+from . import handoff
+from . import latency
+from . import outbox
+from . import enrollment
+import asyncio, websockets, json, struct, time
 
-PI_WEBSOCKET_URL = PI_SERVER_URL.replace('http://', 'ws://').replace('https://', 'wss://')
+# One Pi per cabinet (app/cabinet.py): every function here takes the cabinet
+# whose link, turn and move pipeline it acts on.
 
-pi_websocket = None
-# log.info(f"[pi_client create] PID={os.getpid()} TID={threading.get_ident()} pi_client_id={id(pi_client)}")
+
+def _websocket_url(cab: Cabinet) -> str:
+    return cab.pi_url.replace('http://', 'ws://').replace('https://', 'wss://')
 
 # Connection event handlers (equivalent to socketio decorators)
-async def on_connect():
+async def on_connect(cab: Cabinet):
     """Called when WebSocket connects successfully"""
-    state.set_pi_status(True)
-    await sio.emit("claw_connection_change", {"con": True})
-    log.info("Pi socket CONNECTED (reconnect OK)")
+    cab.set_pi_status(True)
+    cab.moves_in_flight.clear()
+    reset_move_pipeline(cab)
+    await sio.emit("claw_connection_change", {"con": True, "cabinet": cab.id}, room=cab.room)
+    log.info("Pi socket CONNECTED for cabinet %s (reconnect OK)", cab.id)
 
-async def on_connect_error(error_data):
+async def on_connect_error(cab: Cabinet, error_data):
     """Called when WebSocket connection fails"""
-    state.set_pi_status(False)
-    await sio.emit("claw_connection_change", {"con": False})
-    log.warning(f"Pi socket CONNECTION FAILED because of: {error_data}")
+    cab.set_pi_status(False)
+    await sio.emit("claw_connection_change", {"con": False, "cabinet": cab.id}, room=cab.room)
+    log.warning(f"Pi socket for cabinet {cab.id} CONNECTION FAILED because of: {error_data}")
 
-async def on_disconnect(reason):
+async def on_disconnect(cab: Cabinet, reason):
     """Called when WebSocket disconnects"""
-    state.set_pi_status(False)
-    await sio.emit("claw_connection_change", {"con": False})
-    log.warning(f"Pi socket DISCONNECTED because of: {reason} – will retry...")
+    cab.set_pi_status(False)
+    await sio.emit("claw_connection_change", {"con": False, "cabinet": cab.id}, room=cab.room)
+    log.warning(f"Pi socket for cabinet {cab.id} DISCONNECTED because of: {reason} – will retry...")
 
-async def _attempt_connection():
+async def _attempt_connection(cab: Cabinet):
     """Single connection attempt"""
-    global pi_websocket
-    
-    # log.info(f"[pi connect] PID={os.getpid()} pi_client_id={id(pi_websocket)}")
-    pi_websocket = await websockets.connect(PI_WEBSOCKET_URL)
+    cab.websocket = await websockets.connect(_websocket_url(cab))
     
 
-async def handle_pi_messages():
-    """Handle incoming messages from Pi WebSocket"""
-    global pi_websocket
+async def handle_pi_messages(cab: Cabinet):
+    """Handle incoming messages from the cabinet's Pi WebSocket"""
     try:
         while True:  # Keep listening indefinitely
-            message = await pi_websocket.recv()  # This blocks until message received
+            message = await cab.websocket.recv()  # This blocks until message received
+            if isinstance(message, bytes):
+                _on_binary_frame(cab, message)
+                continue
             try:
                 data = json.loads(message)
                 message_type = data.get("type")
-                log.info(f"Received message type: {message_type}")
+                log.info(f"Received message type from {cab.id}: {message_type}")
                 
                 if message_type == "turn_end":
-                    asyncio.create_task(turn_end())
+                    asyncio.create_task(turn_end(cab, data.get("data") or {}))
                 elif message_type == "verdict":
-                    asyncio.create_task(on_chute_verdict(data.get("data") or {}))
+                    asyncio.create_task(on_chute_verdict(cab, data.get("data") or {}))
                 elif message_type == "fault":
-                    asyncio.create_task(on_pi_fault(data.get("data") or {}))
+                    asyncio.create_task(on_pi_fault(cab, data.get("data") or {}))
                 elif message_type == "tag_scanned":
-                    on_tag_scanned(data.get("data") or {})
+                    on_tag_scanned(cab, data.get("data") or {})
                 elif message_type == "enroll_timeout":
-                    on_enroll_timeout()
+                    on_enroll_timeout(cab)
                 elif message_type == "test_result":
-                    on_test_result(data.get("data") or {})
+                    on_test_result(cab, data.get("data") or {})
                 elif message_type == "esp_status":
-                    on_esp_status(data.get("data") or {})
+                    on_esp_status(cab, data.get("data") or {})
                 else:
                     log.warning(f"Unknown message type from Pi: {message_type}")
                     
@@ -81,75 +89,207 @@ async def handle_pi_messages():
                 log.warning(f"Invalid JSON from Pi: {message}")
                 
     except websockets.exceptions.ConnectionClosed as e:
-        await on_disconnect(f"Connection closed: {e}")
+        await on_disconnect(cab, f"Connection closed: {e}")
         raise  # Re-raise to trigger reconnect
     except Exception as e:
-        await on_disconnect(f"Handler error: {e}")
+        await on_disconnect(cab, f"Handler error: {e}")
         raise  # Re-raise to trigger reconnect
     
-async def connect_pi():
-    """Main connection loop that handles reconnects"""
-    global pi_websocket
-    
+async def connect_pi(cab: Cabinet):
+    """Main connection loop that handles reconnects. One task per cabinet."""
     while True:
         try:
-            await _attempt_connection()
+            await _attempt_connection(cab)
             # If we get here, connection was successful
-            await on_connect()
+            await on_connect(cab)
             
             # Handle messages until connection drops - this blocks here
-            await handle_pi_messages()
+            await handle_pi_messages(cab)
             
         except Exception as e:
-            await on_connect_error(str(e))
-            log.warning("Pi connect error: %s", e)
-            pi_websocket = None
+            await on_connect_error(cab, str(e))
+            log.warning("Pi connect error (cabinet %s): %s", cab.id, e)
+            cab.websocket = None
             await asyncio.sleep(5)  # Wait before retry
     
-           
-_turn_lock = asyncio.Lock()   # serialize turn transitions
 
-async def safe_pi_emit(event, data=None):
+async def safe_pi_emit(cab: Cabinet, event, data=None):
     """
-    Emit to the Pi client only when the connection is healthy.
+    Emit to the cabinet's Pi only when the connection is healthy.
     Returns True on success, False otherwise.
     """
-    # log.info(f"[{event}] PID={os.getpid()} pi_client_id={id(pi_client)} connected={state.pi_connected} ns_ok={state.pi_namespace_ok}")
-
-    if state.pi_connected:
+    if cab.pi_connected:
         try:
-            await pi_websocket.send(json.dumps({"type": event, "data": data}))
+            await cab.websocket.send(json.dumps({"type": event, "data": data}))
             return True
         except Exception as e:
-            log.warning("pi_websocket emit failed: %s", e)
-    log.warning(f"pi_websocket emit failed due to connectivity issues. Connected: {state.pi_connected}.")
+            log.warning("pi_websocket emit to %s failed: %s", cab.id, e)
+    log.warning(f"pi_websocket emit to {cab.id} failed due to connectivity issues. Connected: {cab.pi_connected}.")
     return False
 
- 
-_test_future: Optional[asyncio.Future] = None
 
+# ─── Joystick moves ─────────────────────────────────────────────────────
+#
+# The most latency-sensitive thing we send. When the Pi advertises "move_bin"
+# (versioning.negotiate_features) a move is a 6-byte binary frame — tag, seq,
+# bitmask — that the Pi applies straight to the outputs and acks with the seq
+# and its own apply time. Otherwise it's the JSON {"type": "move"} frame, which
+# every Pi build understands.
+#
+# Per-hop latency histograms (app/latency.py, GET /admin/latency):
+#   move.central.{bin,json}  socket.io handler entry -> websocket send done
+#   move.rtt                 binary send -> ack back from the Pi
+#   move.pi_apply            decode + GPIO writes on the Pi, from the ack
+
+_MOVE_FRAME = struct.Struct(versioning.MOVE_FRAME_FORMAT)
+_MOVE_ACK_FRAME = struct.Struct(versioning.MOVE_ACK_FRAME_FORMAT)
+_MOVES_IN_FLIGHT_MAX = 256      # unacked seqs we keep a send time for (per cabinet)
+
+
+async def send_move(cab: Cabinet, bitmask: int, received_at: Optional[float] = None) -> bool:
+    """Send a joystick bitmask to the cabinet's Pi. `received_at` is the
+    perf_counter() reading when the move reached us, for the central-hop
+    histogram. Returns True on success, False otherwise."""
+    if received_at is None:
+        received_at = time.perf_counter()
+    if versioning.FEATURE_MOVE_BIN not in cab.pi_features:
+        ok = await safe_pi_emit(cab, "move", {"bitmask": bitmask})
+        if ok:
+            latency.observe("move.central.json", time.perf_counter() - received_at)
+        return ok
+
+    if not cab.pi_connected:
+        return False
+    cab.move_seq = (cab.move_seq + 1) & 0xFFFFFFFF
+    seq = cab.move_seq
+    try:
+        sent_at = time.perf_counter()
+        await cab.websocket.send(_MOVE_FRAME.pack(versioning.FRAME_MOVE, seq, int(bitmask) & 0xFF))
+    except Exception as e:
+        log.warning("pi_websocket move send to %s failed: %s", cab.id, e)
+        return False
+    latency.observe("move.central.bin", time.perf_counter() - received_at)
+
+    cab.moves_in_flight[seq] = sent_at
+    if len(cab.moves_in_flight) > _MOVES_IN_FLIGHT_MAX:
+        # Acks that never came (a Pi that dropped mid-turn): forget the oldest.
+        del cab.moves_in_flight[next(iter(cab.moves_in_flight))]
+    return True
+
+
+# ─── Move pipeline ──────────────────────────────────────────────────────
+#
+# A player mashing keys sends dozens of moves a second, most of them the state
+# the claw is already in. The socket handler hands each one to submit_move,
+# which never waits on the network:
+#
+#   - a bitmask equal to the last one sent (with nothing queued) is dropped;
+#   - the first move after a quiet spell goes out at once;
+#   - moves arriving within MOVE_MIN_INTERVAL of the last send queue up, and a
+#     newer one replaces the queued one (latest state wins), so the Pi sees at
+#     most one send per interval.
+#
+# Replacing is only safe for held directions. A tap — a bit that was set and
+# cleared before the press went out — would vanish, and a GRAB tap is the
+# whole point of the turn. So a queued mask whose newly pressed bits the next
+# mask releases is kept, and the release queues behind it.
+#
+# The pipeline is per cabinet and per turn: reset_move_pipeline() drops anything
+# queued when a turn starts or ends and on reconnect (the Pi's pins start from
+# zero again). move_stats adds up every cabinet.
+
+_MOVE_QUEUE_MAX = 4             # queued masks; past this the tail is replaced
+
+move_stats = {"received": 0, "sent": 0, "duplicate": 0, "coalesced": 0, "failed": 0}
+
+
+def reset_move_pipeline(cab: Cabinet) -> None:
+    # A sender mid-send finishes that one move and then finds the queue empty;
+    # cancelling it could cut a websocket frame in half.
+    cab.move_queue.clear()
+    cab.move_last_sent = None
+
+
+def submit_move(cab: Cabinet, bitmask: int, received_at: Optional[float] = None) -> bool:
+    """Queue a joystick bitmask for the cabinet's Pi. Returns False only if the
+    Pi is offline (the move is dropped); a coalesced or duplicate move is True."""
+    if not cab.pi_connected:
+        return False
+    bitmask = int(bitmask) & 0xFF
+    if received_at is None:
+        received_at = time.perf_counter()
+    move_stats["received"] += 1
+
+    queue = cab.move_queue
+    tail = queue[-1][0] if queue else cab.move_last_sent
+    if bitmask == tail:
+        move_stats["duplicate"] += 1
+        return True
+
+    if queue:
+        below = queue[-2][0] if len(queue) > 1 else (cab.move_last_sent or 0)
+        unsent_press = tail & ~below
+        if not (unsent_press & ~bitmask) or len(queue) >= _MOVE_QUEUE_MAX:
+            queue[-1] = (bitmask, received_at)
+            move_stats["coalesced"] += 1
+            return True
+    queue.append((bitmask, received_at))
+
+    if cab.move_sender is None or cab.move_sender.done():
+        cab.move_sender = asyncio.create_task(_drain_moves(cab))
+    return True
+
+
+async def _drain_moves(cab: Cabinet) -> None:
+    queue = cab.move_queue
+    while queue:
+        wait = cab.move_sent_at + MOVE_MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            # Anything that lands meanwhile coalesces into the queue's tail.
+            await asyncio.sleep(wait)
+            if not queue:
+                break
+        bitmask, received_at = queue.popleft()
+        cab.move_sent_at = time.monotonic()
+        if await send_move(cab, bitmask, received_at):
+            cab.move_last_sent = bitmask
+            move_stats["sent"] += 1
+        else:
+            move_stats["failed"] += 1
+
+
+def _on_binary_frame(cab: Cabinet, frame: bytes) -> None:
+    if len(frame) == _MOVE_ACK_FRAME.size and frame[0] == versioning.FRAME_MOVE_ACK:
+        _, seq, apply_us = _MOVE_ACK_FRAME.unpack(frame)
+        sent_at = cab.moves_in_flight.pop(seq, None)
+        if sent_at is not None:
+            latency.observe("move.rtt", time.perf_counter() - sent_at)
+        latency.observe("move.pi_apply", apply_us / 1e6)
+    else:
+        log.warning("Unknown binary frame from Pi %s (%d bytes, tag %s)",
+                    cab.id, len(frame), frame[:1].hex())
 
-async def request_test_arm(timeout: float = 20.0) -> dict:
-    """Trigger a chute drop-test on the Pi and await its verdict. Diagnostic
-    only — the Pi runs the real ESP sequence but reports via `test_result`, so
-    no Win is created."""
-    global _test_future
-    if not state.pi_connected:
+
+async def request_test_arm(cab: Cabinet, timeout: float = 20.0) -> dict:
+    """Trigger a chute drop-test on the cabinet's Pi and await its verdict.
+    Diagnostic only — the Pi runs the real ESP sequence but reports via
+    `test_result`, so no Win is created."""
+    if not cab.pi_connected:
         raise RuntimeError("cabinet offline")
-    _test_future = asyncio.get_event_loop().create_future()
-    ok = await safe_pi_emit("test_arm")
+    cab.test_future = asyncio.get_event_loop().create_future()
+    ok = await safe_pi_emit(cab, "test_arm")
     if not ok:
-        _test_future = None
+        cab.test_future = None
         raise RuntimeError("cabinet offline")
     try:
-        return await asyncio.wait_for(_test_future, timeout)
+        return await asyncio.wait_for(cab.test_future, timeout)
     except asyncio.TimeoutError:
         raise RuntimeError("no test_result from the Pi within the window")
     finally:
-        _test_future = None
+        cab.test_future = None
 
 
-def on_esp_status(data: Optional[dict] = None):
+def on_esp_status(cab: Cabinet, data: Optional[dict] = None):
     """Chute-latch + version sync sent by the Pi on every (re)connect, so the
     central mirror is correct even when the state predates the connection.
 
@@ -166,34 +306,41 @@ def on_esp_status(data: Optional[dict] = None):
     esp_version_bad = (latched == "esp_version_mismatch")
     physical_latch = latched if (latched and not esp_version_bad) else None
 
-    state.cabinet_fault = {"kind": physical_latch, "reason": "latched"} if physical_latch else None
+    cab.cabinet_fault = {"kind": physical_latch, "reason": "latched"} if physical_latch else None
 
     # Keep the raw version snapshot for the ops page — available even when the
-    # chain is healthy (version_fault is null then). See state.py.
-    state.pi_proto = pi_proto
-    state.esp_proto = versions.get("esp_proto")
-    state.esp_fw = versions.get("esp_fw")
-    state.pi_fw = versions.get("pi_fw")
-    state.esp_pi_ok = not esp_version_bad
+    # chain is healthy (version_fault is null then). See cabinet.py.
+    cab.pi_proto = pi_proto
+    cab.esp_proto = versions.get("esp_proto")
+    cab.esp_fw = versions.get("esp_fw")
+    cab.pi_fw = versions.get("pi_fw")
+    cab.esp_pi_ok = not esp_version_bad
+    cab.pi_features = versioning.negotiate_features(data.get("features"))
 
-    log.info("ESP status sync: latched=%s pi_proto=%s versions=%s",
-             physical_latch, pi_proto, versions)
+    log.info("ESP status sync (%s): latched=%s pi_proto=%s versions=%s features=%s",
+             cab.id, physical_latch, pi_proto, versions, sorted(cab.pi_features))
 
     # Version check is async (it may alert) — schedule it.
-    asyncio.create_task(versioning.on_handshake(pi_proto, esp_version_bad, versions))
+    asyncio.create_task(versioning.on_handshake(cab, pi_proto, esp_version_bad, versions))
+
+    # The esp_status after a fault_clear is what un-latches the mirror above, so
+    # it can unpause the queue.
+    cab.changed()
+    cab.wake()
 
 
-def on_test_result(data: Optional[dict] = None):
-    global _test_future
-    if _test_future is not None and not _test_future.done():
-        _test_future.set_result(data or {})
+def on_test_result(cab: Cabinet, data: Optional[dict] = None):
+    if cab.test_future is not None and not cab.test_future.done():
+        cab.test_future.set_result(data or {})
     else:
-        log.info("test_result with no pending request: %s", data)
+        log.info("test_result from %s with no pending request: %s", cab.id, data)
 
 
-# Set by on_chute_verdict; awaited by turn_end. This is what makes the dead time
-# between turns *the chute sequence* rather than a fixed guess.
-_verdict_ready = asyncio.Event()
+# cab.verdict_ready is set by on_chute_verdict and awaited by turn_end. This is
+# what makes the dead time between turns *the chute sequence* rather than a
+# fixed guess. cab.verdict_won says whether that verdict was a win — a win
+# changes the loaded stock, so the staged fitness check must be redone before
+# the next turn.
 
 # Ceiling on the verification window. Must exceed the Pi's ESP_VERDICT_TIMEOUT
 # (15s) so the Pi gets to report an internal_error itself before we give up.
@@ -211,7 +358,7 @@ _VERDICT_TABLE = {
 _VERDICT_FAULT = {"no_read": "rfid_failed", "no_exit": "exit_timeout"}
 
 
-async def on_chute_verdict(data: Optional[dict] = None):
+async def on_chute_verdict(cab: Cabinet, data: Optional[dict] = None):
     """The chute's single verdict for the turn that just ended.
 
     One message answers both questions: did the player win, and can we keep
@@ -222,14 +369,21 @@ async def on_chute_verdict(data: Optional[dict] = None):
     outcome = data.get("outcome")
     ball_serial = data.get("ball_serial")
 
-    key_str = state.awaiting_verdict_key
-    winner = state.awaiting_verdict_player
-    state.awaiting_verdict_key = None
-    state.awaiting_verdict_player = None
+    key_str = cab.awaiting_verdict_key
+    winner = cab.awaiting_verdict_player
+    turn_id = cab.awaiting_verdict_turn_id
+    cab.awaiting_verdict_key = None
+    cab.awaiting_verdict_player = None
+    cab.awaiting_verdict_turn_id = None
+
+    latency.mark(turn_id, "verdict")
+    latency.stage("turn.central.turn_end_to_verdict", turn_id, "turn_end", "verdict")
+    latency.pi_stages(turn_id, data.get("stages"))
 
     won, healthy = _VERDICT_TABLE.get(outcome, (False, False))
-    log.info("Chute verdict %s (ball=%s) for %s — won=%s healthy=%s",
-             outcome, ball_serial, winner, won, healthy)
+    cab.verdict_won = won
+    log.info("Chute verdict %s on %s (ball=%s) for %s — won=%s healthy=%s",
+             outcome, cab.id, ball_serial, winner, won, healthy)
 
     try:
         if not key_str:
@@ -240,58 +394,103 @@ async def on_chute_verdict(data: Optional[dict] = None):
             await _record_win(key_str, winner, ball_serial)
         else:
             # A loss is now REPORTED, not inferred from a timeout downstream.
-            await sio.emit(
+            await outbox.send(
                 "turn_result",
                 {"won": False, "outcome": outcome},
                 room=winner,
             )
+        latency.mark(turn_id, "result")
+        latency.stage("turn.central.verdict_to_result", turn_id, "verdict", "result")
 
         if not healthy:
             kind = _VERDICT_FAULT.get(outcome, "internal_error")
-            state.cabinet_fault = {"kind": kind, "reason": outcome}
-            await sio.emit("cabinet_fault", state.cabinet_fault)
-            log.warning("Chute blocked (%s) — queue paused until operator clears it", kind)
+            cab.cabinet_fault = {"kind": kind, "reason": outcome}
+            cab.changed()
+            await outbox.send("cabinet_fault", cab.cabinet_fault, room=cab.room)
+            log.warning("Chute of %s blocked (%s) — queue paused until operator clears it", cab.id, kind)
     finally:
         # Always release turn_end, even if handling blew up — otherwise the
         # machine would hang for the full grace period.
-        _verdict_ready.set()
+        cab.verdict_ready.set()
+
+
+async def _stage_next_turn(cab: Cabinet):
+    """Everything about the next turn that doesn't depend on the verdict, run
+    while the chute is still deciding: the fitness precheck, and choosing the
+    next player (which may wait on their turn_ready ping — it doubles as the
+    "get ready" nudge). Returns (why_blocked, entry_id, passed_over).
+
+    The stage lives in memory only, and has no lasting effects. Claiming the
+    entry in the DB here would mean a crash mid-window leaves an 'active' row
+    with nobody playing, which the scheduler then closes out as played —
+    burning a paid turn. Likewise the players passed over on the way are only
+    collected: their deferral counts, turn_skipped and (TURN_DEFER_POLICY
+    "back") move to the end of the line are applied when the turn starts. So
+    rolling a stage back is just dropping it.
+    """
+    why = await machine.blocked(cab)
+    if why:
+        return why, None, []
+    passed_over: list = []
+    return None, await handoff.choose_next(cab, passed_over), passed_over
 
 
-async def _start_next_turn():
-    """Hand the machine to the next player in the queue, if there is one."""
+async def _start_next_turn(cab: Cabinet, staged=None, recheck_inventory: bool = True):
+    """Hand the machine to the next player in its queue, if there is one.
+
+    `staged` is a (why_blocked, entry_id, passed_over) from _stage_next_turn;
+    without one the turn is prepared from scratch. Either way the in-memory
+    faults are checked again now — the verdict can have set one. The stage's
+    pass-overs take effect only once the turn is going ahead.
+    """
+    why, candidate, passed_over = (
+        staged if staged is not None else await _stage_next_turn(cab)
+    )
     # Never start a turn the machine can't honour. A jammed chute, or a loaded
     # ball whose prize can't be handed over, both mean: don't take their money.
-    why = await machine.blocked()
+    # A win changes the loaded stock, so the inventory check reruns after one.
+    if not why:
+        why = cab.version_fault or cab.cabinet_fault
+    if not why and staged is not None and recheck_inventory:
+        why = await machine.refresh_inventory_fault()
     if why:
-        log.warning("Machine not fit to play (%s) — not starting a turn", why.get("kind"))
+        log.warning("%s not fit to play (%s) — not starting a turn", cab.id, why.get("kind"))
+        handoff.release(cab)
         return
+    await handoff.pass_over(cab, passed_over)
+
+    if candidate is not None and not sessions.is_online(cab.address_of(candidate)):
+        # The staged player left during the window; choose again.
+        candidate = await handoff.choose_next(cab)
 
     async with async_session() as db:
-        new_entry = await db.scalar(
-            select(QueueEntry)
-            .where(QueueEntry.status == "queued")
-            .order_by(QueueEntry.created_at.asc())
-        )
+        new_entry = await handoff.claim(db, cab, candidate)
         if not new_entry:
-            log.info("No pending turn")
+            log.info("No pending turn on %s", cab.id)
             return
 
         new_entry.status = "active"
+        await outbox.emit(db, "turn_start", {"cabinet": cab.id}, room=cab.room)
         await db.commit()
+        cab.discard(new_entry.id)
 
-        state.current_player = new_entry.address
-        state.current_key = new_entry.key
-        state.last_start = datetime.utcnow()
+        cab.current_player = new_entry.address
+        cab.current_key = new_entry.key
+        cab.current_turn_id = new_entry.id
+        cab.last_start = datetime.utcnow()
+        cab.changed()
+        handoff.handoff_stats["started"] += 1
+        reset_move_pipeline(cab)
 
-        await sio.emit("turn_start")
-        await safe_pi_emit("turn_start")
+        latency.mark(new_entry.id, "turn_start", cab.id)
+        await safe_pi_emit(cab, "turn_start", {"turn_id": new_entry.id})
 
         new_entry.played_at = datetime.utcnow()
         await db.commit()
-        log.info(f"Started turn {state.current_key} by player {state.current_player}")
+        log.info(f"Started turn {cab.current_key} on {cab.id} by player {cab.current_player}")
 
 
-async def turn_end(*_):
+async def turn_end(cab: Cabinet, data: Optional[dict] = None):
   """The claw let go. The turn is over, but the OUTCOME is not known yet.
 
   The Pi broadcasts turn_end the moment the ball passes the opto, and only then
@@ -302,60 +501,95 @@ async def turn_end(*_):
 
   So the dead time IS the chute sequence — we wait for the verdict, then decide
   whether the machine is fit to keep going.
+
+  `data` is the Pi's turn_end payload: the turn_id it was started with and its
+  own stage timings for the turn so far (empty for an admin force-end).
   """
-  log.info("Pi informed turn end")
+  data = data or {}
+  log.info("Pi of %s informed turn end", cab.id)
+  reset_move_pipeline(cab)
+
+  turn_id = cab.current_turn_id
+  if data.get("turn_id") is not None and data.get("turn_id") != turn_id:
+      log.warning("turn_end for turn %s but turn %s is in play", data.get("turn_id"), turn_id)
+  latency.mark(turn_id, "turn_end", cab.id, queued=cab.waiting() > 0)
+  latency.pi_stages(turn_id, data.get("stages"))
 
   # The verdict belongs to THIS turn. Stash its identity before current_* is
   # reassigned; on_chute_verdict consumes it.
-  state.awaiting_verdict_key = state.current_key
-  state.awaiting_verdict_player = state.current_player
-  _verdict_ready.clear()
-
-  async with _turn_lock:         # prevent overlapping turn transitions
-    async with async_session() as db:
-      old_entry = await db.scalar(
-          select(QueueEntry)
-          .where(QueueEntry.status == "active")
-          .where(QueueEntry.address == state.current_player)
-      )
-      if not old_entry:
-          log.warning("turn_end reported by pi but no player was active. Maybe someone is playing live.")
-      else:
-          old_entry.ended_at = datetime.utcnow()
-          old_entry.status = "played"
-          await db.commit()
-
-    # Clients update the queue; the player who just played sees "analysing…"
-    # until the verdict resolves it.
-    await sio.emit("turn_end")
-
-    # --- the verification window ---
-    try:
-        await asyncio.wait_for(_verdict_ready.wait(), timeout=VERDICT_GRACE)
-    except asyncio.TimeoutError:
-        # The Pi should have sent an internal_error fault by now; if we're here
-        # the cabinet is silent. Treat as unsafe rather than blindly continuing.
-        log.warning("No chute verdict within %ss — pausing the queue", VERDICT_GRACE)
-        if not state.cabinet_fault:
-            state.cabinet_fault = {"kind": "internal_error", "reason": "verdict_timeout"}
-            await sio.emit("cabinet_fault", state.cabinet_fault)
-
-    state.current_player = None
-    state.current_key = None
-
-    # A blocked chute must not be handed another ball. The queue stays paused
-    # until an operator clears the fault (admin /cabinet/clear_fault), which is
-    # also what the turn scheduler now honours.
-    if state.cabinet_fault:
-        log.warning("Cabinet faulted (%s) — queue paused", state.cabinet_fault)
-        return
-
-    # Brief settle so the player sees the result before the next turn begins.
-    await asyncio.sleep(INTER_TURN_DELAY)
-    await _start_next_turn()
-
+  cab.awaiting_verdict_key = cab.current_key
+  cab.awaiting_verdict_player = cab.current_player
+  cab.awaiting_verdict_turn_id = turn_id
+  cab.verdict_ready.clear()
+  cab.verdict_won = False
+
+  try:
+    async with cab.turn_lock:      # prevent overlapping turn transitions
+      async with async_session() as db:
+        old_entry = await db.scalar(
+            select(QueueEntry)
+            .where(QueueEntry.status == "active")
+            .where(QueueEntry.cabinet_id == cab.id)
+            .where(QueueEntry.address == cab.current_player)
+        )
+        if not old_entry:
+            log.warning("turn_end reported by pi but no player was active. Maybe someone is playing live.")
+        else:
+            old_entry.ended_at = datetime.utcnow()
+            old_entry.status = "played"
+        # Clients update the queue; the player who just played sees "analysing…"
+        # until the verdict resolves it.
+        await outbox.emit(db, "turn_end", {"cabinet": cab.id}, room=cab.room)
+        await db.commit()
 
-async def on_pi_fault(data: Optional[dict] = None):
+      # --- the verification window ---
+      # The next turn is staged alongside it (_stage_next_turn), so once a
+      # healthy verdict lands all that's left is the settle and one UPDATE.
+      staging = asyncio.create_task(_stage_next_turn(cab))
+      try:
+          await asyncio.wait_for(cab.verdict_ready.wait(), timeout=VERDICT_GRACE)
+      except asyncio.TimeoutError:
+          # The Pi should have sent an internal_error fault by now; if we're here
+          # the cabinet is silent. Treat as unsafe rather than blindly continuing.
+          log.warning("No chute verdict from %s within %ss — pausing its queue", cab.id, VERDICT_GRACE)
+          if not cab.cabinet_fault:
+              cab.cabinet_fault = {"kind": "internal_error", "reason": "verdict_timeout"}
+              await outbox.send("cabinet_fault", cab.cabinet_fault, room=cab.room)
+
+      cab.current_player = None
+      cab.current_key = None
+      cab.current_turn_id = None
+      cab.changed()
+
+      verdict_at = time.monotonic()
+
+      # A blocked chute must not be handed another ball. The queue stays paused
+      # until an operator clears the fault (admin /cabinet/clear_fault), which is
+      # also what the turn scheduler now honours. The staged turn is rolled back
+      # (dropped); the staged player keeps their place.
+      if cab.cabinet_fault:
+          log.warning("Cabinet %s faulted (%s) — queue paused", cab.id, cab.cabinet_fault)
+          staging.cancel()
+          handoff.release(cab)
+          return
+
+      try:
+          staged = await staging
+      except Exception:
+          log.exception("Staging the next turn failed — preparing it afresh")
+          staged = None
+
+      # Brief settle so the player sees the result before the next turn begins,
+      # counted from the verdict: time spent above comes out of it.
+      await asyncio.sleep(max(0.0, INTER_TURN_DELAY - (time.monotonic() - verdict_at)))
+      await _start_next_turn(cab, staged, recheck_inventory=cab.verdict_won)
+  finally:
+    # Whatever happened — next turn started, queue empty, cabinet faulted —
+    # the scheduler re-evaluates now that the transition lock is free.
+    cab.wake()
+
+
+async def on_pi_fault(cab: Cabinet, data: Optional[dict] = None):
     """Handler for Pi's `fault` message (forwarded from the chute ESP32).
 
     Wire shape: {"kind": "rfid_failed" | "exit_timeout" | "internal_error",
@@ -376,36 +610,73 @@ async def on_pi_fault(data: Optional[dict] = None):
     data = data or {}
     kind = data.get("kind") or "unknown"
     reason = data.get("reason")
-    log.warning("Pi reported cabinet fault: kind=%s reason=%s", kind, reason)
+    log.warning("Pi of %s reported cabinet fault: kind=%s reason=%s", cab.id, kind, reason)
     # Mirror the latch for the admin ops page. `still_blocked` is a re-emit on
     # arm while already latched, so it doesn't change the stored kind.
     if reason != "still_blocked":
-        state.cabinet_fault = {"kind": kind, "reason": reason}
-    if state.current_player:
-        await sio.emit("cabinet_fault", data, room=state.current_player)
+        cab.cabinet_fault = {"kind": kind, "reason": reason}
+        cab.changed()
+    if cab.current_player:
+        await outbox.send("cabinet_fault", data, room=cab.current_player)
 
 
-def on_tag_scanned(data: Optional[dict] = None):
-    """Pi-forwarded ESP `tag_scanned` — drop the UID into state.enroll_pending
-    so the admin status endpoint can return it. Silently no-ops if no enroll
+def on_tag_scanned(cab: Cabinet, data: Optional[dict] = None):
+    """Pi-forwarded ESP `tag_scanned` — queue the UID in the cabinet's
+    enrollment batch while it's scanning, or drop it into enroll_pending so the
+    admin status endpoint can return it. A stopped batch takes no more tags: a
+    single enrollment may be running next to it. Silently no-ops if no enroll
     is pending (e.g., a stale event after timeout)."""
     data = data or {}
     serial = data.get("ball_serial")
     if not serial:
         log.warning("tag_scanned with no ball_serial; ignoring")
         return
-    if not state.enroll_pending:
-        log.info("tag_scanned but no enrollment pending; ignoring (%s)", serial)
+    enrollment.window_closed(cab)
+    if cab.enroll_batch is not None and cab.enroll_batch.scanning:
+        asyncio.create_task(_batch_scanned(cab, cab.enroll_batch, serial))
         return
-    state.enroll_pending["scanned_ball_serial"] = serial
-    log.info("Enrollment scan recorded: %s", serial)
+    if not cab.enroll_pending:
+        log.info("tag_scanned on %s but no enrollment pending; ignoring (%s)", cab.id, serial)
+        return
+    cab.enroll_pending["scanned_ball_serial"] = serial
+    log.info("Enrollment scan recorded on %s: %s", cab.id, serial)
 
 
-def on_enroll_timeout():
-    if not state.enroll_pending:
+def on_enroll_timeout(cab: Cabinet):
+    enrollment.window_closed(cab)
+    if cab.enroll_batch is not None and cab.enroll_batch.scanning:
+        asyncio.create_task(arm_enroll_batch(cab))
+        return
+    if not cab.enroll_pending:
         return
-    state.enroll_pending["timed_out"] = True
-    log.info("Enrollment timed out")
+    cab.enroll_pending["timed_out"] = True
+    log.info("Enrollment on %s timed out", cab.id)
+
+
+async def _batch_scanned(cab: Cabinet, batch: enrollment.EnrollBatch, serial: str):
+    try:
+        await enrollment.record_scan(batch, serial)
+    except Exception:
+        log.exception("Could not record enrollment scan %s on %s", serial, cab.id)
+    await arm_enroll_batch(cab)
+
+
+async def arm_enroll_batch(cab: Cabinet) -> bool:
+    """Open the ESP's next enrollment window for the cabinet's batch, if it's
+    still scanning. It stops instead once ENROLL_BATCH_IDLE passes without a
+    scan, or when the Pi can't be reached; either way the antenna is then free
+    and the scheduler is woken to see it."""
+    batch = cab.enroll_batch
+    if batch is not None and batch.scanning:
+        if batch.idle():
+            batch.stop("idle")
+        elif await safe_pi_emit(cab, "enroll", {"timeout_ms": ENROLL_WINDOW_SECONDS * 1000}):
+            enrollment.window_opened(cab)
+            return True
+        else:
+            batch.stop("cabinet offline")
+    cab.wake()
+    return False
 
 
 async def _record_win(key_str: str, winner: Optional[str], ball_serial: str):
@@ -416,52 +687,46 @@ async def _record_win(key_str: str, winner: Optional[str], ball_serial: str):
     """
     log.info(f"Prize won by {winner}. Turn key: 0x{key_str}. Ball: {ball_serial}")
 
-    # Mark the win off-chain. This replaces the old on-chain round-trip
-    # (notifyWin -> PlayerWin event -> listeners._player_win set entry.win):
-    # the contract is retired, so the backend is the source of truth.
-    async with async_session() as db:
-        entry = await db.scalar(select(QueueEntry).where(QueueEntry.key == key_str))
-        if entry is None:
-            log.warning("_record_win: no QueueEntry for key %s — cannot mark win", key_str)
-        else:
-            entry.win = True
-            await db.commit()
-    entry_id = entry.id if entry is not None else None
-
-    # Reserve the actual prize in its own session so a reserve_win failure
-    # (ball not available / pool exhausted) can't roll back the win mark.
+    # Mark the win off-chain and reserve the prize, in one transaction. The
+    # won flag replaces the old on-chain round-trip (notifyWin -> PlayerWin
+    # event -> listeners._player_win set entry.win): the contract is retired, so
+    # the backend is the source of truth. record_win reserves the prize under a
+    # savepoint, so when that fails (ball not available / pool exhausted) the
+    # won flag and GRABBED still commit.
     win_payload: Optional[dict] = None
-    if entry_id is not None and ball_serial and winner:
-        try:
-            async with async_session() as db:
-                win = await wt.reserve_win(
-                    db,
-                    ball_serial=ball_serial,
-                    wallet_address=winner,
-                    queue_entry_id=entry_id,
+    try:
+        async with async_session() as db:
+            try:
+                win = await wt.record_win(
+                    db, queue_key=key_str, ball_serial=ball_serial, wallet_address=winner,
                 )
-                await db.commit()
-                win_payload = {
+            except wt.BallNotAvailable as e:
+                win = None
+                log.warning("_record_win: ball not available: %s", e)
+            except wt.PoolExhausted as e:
+                # Should be unreachable: a turn must not start while any loaded ball
+                # has an unclaimable prize. If we're here, that invariant is broken.
+                # TODO: refund the ticket (LedgerKind.BET_REFUND) and alert the operator.
+                win = None
+                log.error("_record_win: pool exhausted: %s", e)
+            if win is not None:
+                payload = {
                     "win_id": str(win.id),
                     "prize_kind": win.prize_kind.value,
                     "expires_at": int(win.expires_at.timestamp()),
                     "resell_price_cents": win.resell_price_cents,
                 }
-                log.info(f"reserve_win OK: win_id={win.id} prize_kind={win.prize_kind.value}")
-        except wt.BallNotAvailable as e:
-            log.warning("_record_win: ball not available: %s", e)
-        except wt.PoolExhausted as e:
-            # Should be unreachable: a turn must not start while any loaded ball
-            # has an unclaimable prize. If we're here, that invariant is broken.
-            # TODO: refund the ticket (LedgerKind.BET_REFUND) and alert the operator.
-            log.error("_record_win: pool exhausted: %s", e)
-        except Exception:
-            log.exception("_record_win: reserve_win failed")
-
-    if win_payload:
-        # Targeted to the player's room (set up at wallet_connected).
-        await sio.emit("player_win", win_payload, room=winner)
-    else:
+                # Targeted to the player's room (set up at wallet_connected),
+                # and sent only if the reservation commits.
+                await outbox.emit(db, "player_win", payload, room=winner)
+            await db.commit()
+            if win is not None:
+                win_payload = payload
+                log.info(f"record_win OK: win_id={win.id} prize_kind={win.prize_kind.value}")
+    except Exception:
+        log.exception("_record_win: record_win failed")
+
+    if not win_payload:
         # The ball dropped and we read its tag, but we could not hand over a
         # prize. Never announce this as a win: emitting `player_win` with a null
         # payload made the UI celebrate — confetti and "🎉 You won!" — while
@@ -470,11 +735,10 @@ async def _record_win(key_str: str, winner: Optional[str], ball_serial: str):
             "No prize for a winning grab (ball=%s, player=%s) — player owed a refund",
             ball_serial, winner,
         )
-        await sio.emit(
-            "turn_result",
-            {"won": False, "outcome": "prize_unavailable"},
-            room=winner,
-        )
+        async with async_session() as db:
+            await outbox.emit(db, "turn_result",
+                              {"won": False, "outcome": "prize_unavailable"}, room=winner)
+            await db.commit()
     
     
 # @pi_client.event
@@ -0,0 +1,222 @@
+"""Process-local index of the waiting queue.
+
+Every "where am I in line" used to be a `COUNT(*) ... WHERE status='queued' AND
+created_at < ?` against Postgres — on login, on every payment, and for every
+queued player on every sync tick. With a few hundred people waiting that is the
+hottest read in the system, and it answers a question this process already
+knows: it is the only writer of the queue.
+
+So the order lives here, one index per cabinet (app/cabinet.py) — each
+cabinet's queue is its partition of the table (QueueEntry.cabinet_id) — plus
+the shared line pooled plays wait in (cabinet_id NULL, app/handoff.py). It is
+hydrated from the database at startup and kept current by the paths that
+change it — enqueue (payments.confirm_payment),
+promote (the turn scheduler and pi_client._start_next_turn) and cancel — each
+AFTER its transaction commits, so a rolled-back write never shows up. Position,
+queue length and "who's next" are then plain dict/deque lookups.
+
+The database stays the source of truth for the rows themselves. Promotion
+(app/handoff.py) loads the chosen entry by primary key and drops it from the
+index if the row has moved on behind our back (a direct DB edit, a wiped
+table); `resync` rebuilds the
+whole index and reports any drift, and the sync scheduler runs it now and then
+as a safety net.
+
+Only the leader process (app/leader.py) promotes, so a follower's index would
+fall behind; the leader publishes a queue's order whenever it moved, and the
+follower reloads and `follow`s it.
+"""
+import asyncio
+from collections import deque
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from .db import async_session
+from .logging import log
+from .models import QueueEntry
+
+
+# Set on every change to any cabinet's order; the sync scheduler waits on it
+# to push new positions (personal_sync) the moment a queue moves.
+queue_changed = asyncio.Event()
+
+
+class QueueIndex:
+    """FIFO of one cabinet's queued entry ids (or the shared line's, for
+    cabinet_id None) with O(1) position, length and head lookups.
+
+    Each entry is stamped with a slot number as it's appended; its position is
+    its slot minus the head's. Promoting from the head (the common case) just
+    moves the head, so nobody's slot changes. Removing from the middle (a
+    cancel) renumbers the remaining entries — O(n), but rare.
+    """
+
+    def __init__(self, cabinet_id: Optional[str]):
+        self.cabinet_id = cabinet_id
+        self.name = cabinet_id or "pool"
+        self._ids: deque = deque()          # entry ids, first-come-first-served
+        self._slot: dict = {}               # entry id -> slot
+        self._addr: dict = {}               # entry id -> address
+        self._by_addr: dict = {}            # address -> entry id
+        self._deferrals: dict = {}          # entry id -> times passed over (app/handoff.py)
+        self._next_slot = 0
+        # Changed since the leader last published this order to the followers.
+        self.unpublished = False
+        # One per resync in flight: entry id -> True if pushed, False if
+        # dropped, since its query started (the last change wins).
+        self._changes_during_resync: list = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, entry_id) -> bool:
+        return entry_id in self._slot
+
+    def clear(self) -> None:
+        self._ids.clear()
+        self._slot.clear()
+        self._addr.clear()
+        self._by_addr.clear()
+        self._deferrals.clear()
+        self._next_slot = 0
+
+    def push(self, entry_id: int, address: str) -> None:
+        """Append a newly queued entry. Idempotent."""
+        if entry_id in self._slot:
+            return
+        self._ids.append(entry_id)
+        self._slot[entry_id] = self._next_slot
+        self._addr[entry_id] = address
+        self._by_addr[address] = entry_id
+        self._next_slot += 1
+        for changes in self._changes_during_resync:
+            changes[entry_id] = True
+        self.unpublished = True
+        queue_changed.set()
+
+    def discard(self, entry_id: int) -> None:
+        """Drop an entry that was promoted or cancelled. No-op if unknown."""
+        if entry_id not in self._slot:
+            return
+        if self._ids[0] == entry_id:
+            self._ids.popleft()
+        else:
+            self._ids.remove(entry_id)
+            for i, eid in enumerate(self._ids):
+                self._slot[eid] = i
+            self._next_slot = len(self._ids)
+        del self._slot[entry_id]
+        address = self._addr.pop(entry_id)
+        if self._by_addr.get(address) == entry_id:
+            del self._by_addr[address]
+        self._deferrals.pop(entry_id, None)
+        for changes in self._changes_during_resync:
+            changes[entry_id] = False
+        self.unpublished = True
+        queue_changed.set()
+
+    def defer(self, entry_id: int, to_back: bool = False) -> int:
+        """Count a handoff that passed this entry over; with `to_back`, also
+        move it to the end of the queue. Returns its deferral count."""
+        if entry_id not in self._slot:
+            return 0
+        count = self._deferrals.get(entry_id, 0) + 1
+        if to_back:
+            address = self._addr[entry_id]
+            self.discard(entry_id)
+            self.push(entry_id, address)
+        self._deferrals[entry_id] = count
+        return count
+
+    def deferrals(self, entry_id: int) -> int:
+        return self._deferrals.get(entry_id, 0)
+
+    def head(self) -> Optional[int]:
+        """Id of the entry that plays next, or None if nobody is waiting."""
+        return self._ids[0] if self._ids else None
+
+    def position_of(self, entry_id: int) -> int:
+        """1-based position of an entry, or -1 if it isn't queued."""
+        slot = self._slot.get(entry_id)
+        if slot is None:
+            return -1
+        return slot - self._slot[self._ids[0]] + 1
+
+    def address_of(self, entry_id: int) -> Optional[str]:
+        return self._addr.get(entry_id)
+
+    def position(self, address: str) -> int:
+        """1-based position of the address's queued entry, or -1 if none."""
+        entry_id = self._by_addr.get(address)
+        return -1 if entry_id is None else self.position_of(entry_id)
+
+    def entries(self) -> Iterator[Tuple[int, str]]:
+        """(entry_id, address) pairs, in queue order."""
+        for entry_id in self._ids:
+            yield entry_id, self._addr[entry_id]
+
+    def follow(self, order: List[int]) -> None:
+        """Take the leader's order (a follower's index). Entries it lists that
+        this index doesn't hold are skipped; ones it doesn't list (queued here
+        since) keep their order, behind it."""
+        listed = set(order)
+        entries = [(eid, self._addr[eid]) for eid in order if eid in self._slot]
+        entries += [(eid, address) for eid, address in self.entries() if eid not in listed]
+        self.clear()
+        for eid, address in entries:
+            self.push(eid, address)
+
+    async def resync(self) -> int:
+        """Rebuild from the database. Returns how many entries had drifted
+        (present on one side only) — 0 when the index was right.
+
+        Pushes and discards that land while the query is out are newer than
+        its snapshot: they win over it, so a payment confirmed meanwhile
+        isn't dropped and an entry promoted meanwhile doesn't come back."""
+        changes: dict = {}
+        self._changes_during_resync.append(changes)
+        try:
+            async with async_session() as db:
+                rows = (await db.execute(
+                    select(QueueEntry.id, QueueEntry.address)
+                    .where(QueueEntry.status == "queued")
+                    .where(QueueEntry.cabinet_id == self.cabinet_id
+                           if self.cabinet_id is not None else QueueEntry.cabinet_id.is_(None))
+                    .order_by(QueueEntry.created_at.asc(), QueueEntry.id.asc())
+                )).all()
+        finally:
+            self._changes_during_resync.remove(changes)
+
+        rows = [r for r in rows if changes.get(r.id, True)]
+        live = {r.id for r in rows} | {eid for eid, pushed in changes.items() if pushed}
+        drift = len(set(self._slot) ^ live)
+        # Keep our own order for entries we already know (it's the order we
+        # promise to promote in); anything only the DB knows goes on the end.
+        known = [(eid, self._addr[eid]) for eid in self._ids]
+        deferrals = dict(self._deferrals)
+        self.clear()
+        for eid, address in known:
+            if eid in live:
+                self.push(eid, address)
+                if eid in deferrals:
+                    self._deferrals[eid] = deferrals[eid]
+        for r in rows:
+            self.push(r.id, r.address)
+        return drift
+
+
+async def hydrate(index: QueueIndex) -> None:
+    """Load a queue at startup, before anything can read a position."""
+    index.clear()
+    await index.resync()
+    log.info("Queue index %s hydrated: %d waiting", index.name, len(index))
+
+
+async def resync(index: QueueIndex) -> None:
+    """Safety-net rebuild. Logs if the index had drifted from the database."""
+    drift = await index.resync()
+    if drift:
+        log.warning("Queue index %s drifted from the DB by %d entr(ies) — resynced",
+                    index.name, drift)
+
@@ -14,37 +14,96 @@ from .errors import NewRoundError
 from .models import Round
 from .socket.sio_instance import sio
 from .logging import log
-from .pi_client import safe_pi_emit
+from .pi_client import safe_pi_emit, reset_move_pipeline
+from .cabinet import Cabinet, cabinets
 from . import machine
+from . import balances
+from . import latency
+from .notifier import alertBot
+from .queue_index import queue_changed, resync as resync_queue_index
+from . import handoff
+from . import leader
 from .config import (
     TURN_DURATION,
     INTER_TURN_DELAY,
     SYNC_PERIOD,
+    QUEUE_INDEX_RESYNC_PERIOD,
+    PERSONAL_SYNC_FULL_PERIOD,
+    BALANCE_SWEEP_PERIOD,
+    BALANCE_RECONCILE_PERIOD,
+    SCHEDULER_IDLE_RECHECK,
+    SCHEDULER_BLOCKED_RECHECK,
     BASE_RPC_HTTP,
     CLAW_ADDRESS,
     CHAIN_ID,
     PRIVATE_KEY,
 )
-from .state import global_sync
 
 
-async def _turn_scheduler_loop():
+async def _sleep_until_woken(cab: Cabinet, timeout: float) -> None:
+    """Sleep until `timeout` elapses or something wakes the cabinet's
+    scheduler (cab.wake), whichever comes first."""
+    try:
+        await asyncio.wait_for(cab.turn_wakeup.wait(), timeout=max(0.0, timeout))
+    except asyncio.TimeoutError:
+        pass
+    cab.turn_wakeup.clear()
 
-    # Rest while a turn is in flight, a round is changing, or the machine isn't
-    # fit to play. "Not fit" covers a jammed chute AND a loaded ball whose prize
-    # can't be handed over — both pause the queue until an operator resolves it,
-    # so nobody can pay for a play the machine cannot honour. turn_end applies
-    # the same gate, so the machine simply stays idle.
-    if await machine.blocked():
-        await asyncio.sleep(1)
+
+async def _turn_scheduler_loop(cab: Cabinet):
+    # Event-driven: every early return below sleeps until either the next
+    # deadline or a wake-up (enqueue, turn_end, fault clear, inventory change).
+    # The old 1s poll cost a fitness join plus a queue query every second, all
+    # day, on the pool shared with player traffic.
+
+    # A round change, or a turn_end transition that's still running (awaiting
+    # the chute verdict / starting the next turn itself). turn_end wakes us when
+    # it lets go of the lock.
+    if state.changing_round:
+        await _sleep_until_woken(cab, 1)
+        return
+    if cab.turn_lock.locked():
+        await _sleep_until_woken(cab, SCHEDULER_IDLE_RECHECK)
         return
 
-    if (
-        datetime.utcnow() - state.last_start
-    ).total_seconds() < TURN_DURATION + INTER_TURN_DELAY or state.changing_round:
-        await asyncio.sleep(1)
+    # Rest while a turn is in flight — precisely until its deadline, not in 1s
+    # steps. Once turn_end has closed the turn (current_player cleared, settle
+    # gap already slept under the lock) there is no deadline left to honour: a
+    # player who pays into an idle machine starts right away.
+    if cab.current_player is not None:
+        remaining = TURN_DURATION + INTER_TURN_DELAY - (
+            datetime.utcnow() - cab.last_start
+        ).total_seconds()
+        if remaining > 0:
+            await _sleep_until_woken(cab, remaining)
+            return
+
+    # ...or the machine isn't fit to play. "Not fit" covers a jammed chute AND a
+    # loaded ball whose prize can't be handed over — both pause the queue until
+    # an operator resolves it, so nobody can pay for a play the machine cannot
+    # honour. turn_end applies the same gate, so the machine simply stays idle.
+    # The operator's fix wakes us (and drops the cached verdict); a fix made
+    # behind our back (a direct DB edit) is seen within MACHINE_FITNESS_RECHECK.
+    if await machine.blocked(cab):
+        await _sleep_until_woken(cab, SCHEDULER_BLOCKED_RECHECK)
         return
 
+    # Taken under the turn lock, like turn_end's own handoff: choosing may wait
+    # several seconds on presence pings, and a turn_end that started meanwhile
+    # would stage (and release) its own choice and start a second turn. The
+    # turn we saw go by above must also still be the one in play.
+    turn_id = cab.current_turn_id
+    async with cab.turn_lock:
+        if cab.current_turn_id != turn_id:
+            return
+        started = await _claim_and_start(cab)
+    if not started:
+        await _sleep_until_woken(cab, SCHEDULER_IDLE_RECHECK)
+
+
+async def _claim_and_start(cab: Cabinet) -> bool:
+    """Choose, claim and start the next turn. Returns False if nobody was
+    queued. Called with cab.turn_lock held."""
     # Last game was over TURN_DURATION seconds ago? Close out any entry left
     # pending and claim the next queued one — in ONE tight transaction.
     #
@@ -52,61 +111,76 @@ async def _turn_scheduler_loop():
     # emits below: a checked-out connection idling for a few seconds is exactly
     # what Supabase's pooler kills, and the next use then fails with
     # "SSL SYSCALL error: EOF detected". So we pull out the plain values we need,
-    # commit, close the session, and only then wait / emit.
+    # commit, close the session, and only then wait / emit. For the same reason
+    # the next player is chosen first: the presence check may wait on a ping.
+    candidate = await handoff.choose_next(cab)
     async with async_session() as db:
         old_entry = await db.scalar(
             select(QueueEntry)
             .where(QueueEntry.status == "active")
-            .where(QueueEntry.address == state.current_player)
+            .where(QueueEntry.cabinet_id == cab.id)
+            .where(QueueEntry.address == cab.current_player)
         )
         if old_entry:
-            log.info("Cleaning up old entry in scheduler... This should not happen")
+            log.info("Cleaning up old entry in scheduler of %s... This should not happen", cab.id)
             old_entry.ended_at = datetime.utcnow()
             old_entry.status = "played"
 
-        new_entry = await db.scalar(
-            select(QueueEntry)
-            .where(QueueEntry.status == "queued")
-            .order_by(QueueEntry.created_at.asc())
-        )
+        new_entry = await handoff.claim(db, cab, candidate)
         had_old = old_entry is not None
         next_addr = next_key = next_id = None
         if new_entry:
             new_entry.status = "active"
             next_addr, next_key, next_id = new_entry.address, new_entry.key, new_entry.id
+        if had_old or new_entry:
+            # Clients update the queue (the pre-turn broadcast before a turn_start).
+            await outbox.emit(db, "turn_end", {"cabinet": cab.id}, room=cab.room)
         await db.commit()
+    if next_id is not None:
+        cab.discard(next_id)
+    elif candidate is not None:
+        # The chosen entry moved on under us; choose again straight away.
+        cab.wake()
 
-    # --- nothing queued: go idle (no DB connection held across the sleep) ---
+    # --- nothing queued: the caller goes idle until an enqueue wakes it ---
     if next_id is None:
-        if had_old:
-            await sio.emit("turn_end")
-        state.current_player = None
-        state.current_key = None
-        await asyncio.sleep(INTER_TURN_DELAY)
-        return
+        cab.current_player = None
+        cab.current_key = None
+        cab.current_turn_id = None
+        cab.changed()
+        return False
 
     # --- start the next turn; no session held across these waits/emits ---
-    await sio.emit("turn_end")
-    await asyncio.sleep(INTER_TURN_DELAY)  # wait between turns
-
-    state.current_player = next_addr
-    state.current_key = next_key
-    state.last_start = datetime.utcnow()
-    await sio.emit("turn_start")
-    await safe_pi_emit("turn_start")
+    if had_old:
+        # Only a turn we just closed out needs the settle gap. An idle machine
+        # already sat out its INTER_TURN_DELAY inside the deadline above, so
+        # sleeping again would just be dead air before the next player.
+        await asyncio.sleep(INTER_TURN_DELAY)
 
+    cab.current_player = next_addr
+    cab.current_key = next_key
+    cab.current_turn_id = next_id
+    cab.last_start = datetime.utcnow()
+    cab.changed()
+    handoff.handoff_stats["started"] += 1
+    reset_move_pipeline(cab)
     async with async_session() as db:
         await db.execute(
             update(QueueEntry).where(QueueEntry.id == next_id).values(played_at=datetime.utcnow())
         )
+        await outbox.emit(db, "turn_start", {"cabinet": cab.id}, room=cab.room)
         await db.commit()
+    latency.mark(next_id, "turn_start", cab.id)
+    await safe_pi_emit(cab, "turn_start", {"turn_id": next_id})
 
     log.info(
-        f"Started turn {state.current_key} by player {state.current_player} from the scheduler"
+        f"Started turn {cab.current_key} on {cab.id} by player {cab.current_player} from the scheduler"
     )
+    return True
 
 
-async def turn_scheduler():  # clean up any partially-played entry
+async def turn_scheduler(cab: Cabinet):  # clean up any partially-played entry
+    # One per cabinet, started at boot (app/__init__.py).
     # Crash recovery: mark any entry left "active" by a previous run as "played".
     # Wrapped in try/except because a transient DB blip HERE (e.g. Supabase
     # dropped the connection at boot) would otherwise throw straight out of this
@@ -116,12 +190,14 @@ async def turn_scheduler():  # clean up any partially-played entry
         try:
             async with async_session() as db:
                 entry = await db.scalar(
-                    select(QueueEntry).where(QueueEntry.status == "active")
+                    select(QueueEntry)
+                    .where(QueueEntry.status == "active")
+                    .where(QueueEntry.cabinet_id == cab.id)
                 )
                 if entry:
                     entry.status, entry.ended_at = "played", datetime.utcnow()
                     await db.commit()
-                    log.info("Cleaned old entry on startup")
+                    log.info("Cleaned old entry of %s on startup", cab.id)
                 else:
                     break
         except OperationalError:
@@ -134,46 +210,96 @@ async def turn_scheduler():  # clean up any partially-played entry
     # main loop
     while True:
         try:
-            await _turn_scheduler_loop()
+            await _turn_scheduler_loop(cab)
         except OperationalError:
             # Transient DB drop (Supabase closing a pooled connection). The next
             # loop reconnects (pool_pre_ping) — one tick is skipped, ~1s, which
             # players never notice. Log a calm one-liner, not a fatal-looking
             # 40-line traceback.
-            log.warning("turn_scheduler: DB connection dropped — retrying next tick")
+            log.warning("turn_scheduler %s: DB connection dropped — retrying next tick", cab.id)
             await asyncio.sleep(1)
         except Exception as e:
-            log.exception(f"turn_scheduler crashed: {e}")
+            log.exception(f"turn_scheduler {cab.id} crashed: {e}")
             await asyncio.sleep(1)  # brief pause before retrying
 
 
+# The last (position, eta_seconds) each queued address was sent (personal_sync).
+# They're pushed only when they change — the moment a player joins, a turn
+# starts, or a cabinet serving their line goes down or comes back — so emit
+# volume follows queue churn, not queue size. A full resend every
+# PERSONAL_SYNC_FULL_PERIOD covers a client that missed one.
+_sent_positions: dict = {}
+
+
+async def _push_personal_sync(full: bool) -> None:
+    # A player waits in one line at a time, so addresses don't clash.
+    positions = {
+        address: (i + 1, cabinets.eta_seconds(index, i + 1))
+        for index in cabinets.queues()
+        for i, (_, address) in enumerate(list(index.entries()))
+    }
+    for address, (position, eta) in positions.items():
+        if full or _sent_positions.get(address) != (position, eta):
+            await sio.emit("personal_sync", {"position": position, "eta_seconds": eta}, room=address)
+    # Addresses that left the queue (promoted, cancelled) are forgotten: a
+    # re-join starts from scratch and is always sent.
+    _sent_positions.clear()
+    _sent_positions.update(positions)
+
+
 async def sync_scheduler():
+    last_global = last_full = 0.0
+    last_resync = time.time()   # on_startup just hydrated the index
     while True:
         # One transient DB drop (Supabase closing a connection mid-query) must
         # NOT kill this loop — an unhandled exception here silently stops all
         # queue-position updates until the next restart. Catch, log, retry.
         try:
-            start_time = time.time()
-
-            # --- Global sync to every socket connection ---
-            await sio.emit("global_sync", await global_sync())
-
-            # --- Personal sync to every address in queue ---
-            async with async_session() as db:
-                result = await db.execute(
-                    select(QueueEntry)
-                    .where(QueueEntry.status == "queued")
-                    .order_by(QueueEntry.created_at.asc())
-                )
-                queue = result.scalars().all()
-
-            for i, entry in enumerate(queue):
-                await sio.emit("personal_sync", {"position": i + 1}, room=entry.address)
-
-            spent_time = time.time() - start_time
-            if spent_time < SYNC_PERIOD:
-                # log.info("Sleeping for %ds" % (SYNC_PERIOD - spent_time))
-                await asyncio.sleep(SYNC_PERIOD - spent_time)
+            now = time.time()
+
+            # --- Global sync to each cabinet's watchers ---
+            # Pushed as soon as a snapshot changes (a queue move lands here via
+            # queue_changed), and re-sent every SYNC_PERIOD anyway.
+            resend = now - last_global >= SYNC_PERIOD
+            for cab in cabinets:
+                if cab.refresh_global_sync() or resend:
+                    await sio.emit("global_sync", cab.global_sync(), room=cab.room)
+            if resend:
+                last_global = now
+
+            # --- Safety net: rebuild the queue indexes from the DB now and then ---
+            if now - last_resync >= QUEUE_INDEX_RESYNC_PERIOD:
+                for index in cabinets.queues():
+                    await resync_queue_index(index)
+                last_resync = now
+
+            # --- Personal sync: changed positions only, everyone now and then ---
+            # Clear BEFORE reading the queue, so a change that lands while we
+            # emit wakes us straight back up instead of being missed.
+            queue_changed.clear()
+
+            # --- Follower workers mirror the queues and cabinets (app/leader.py) ---
+            # A queue's order when it moved, and everything now and then, so a
+            # follower that just started (or missed one) catches up.
+            for index in cabinets.queues():
+                if index.unpublished or resend:
+                    index.unpublished = False
+                    leader.publish("queue", " ".join([index.name, *(str(eid) for eid, _ in index.entries())]))
+            if resend:
+                for cab in cabinets:
+                    cab.changed(force=True)
+
+            full = now - last_full >= PERSONAL_SYNC_FULL_PERIOD
+            await _push_personal_sync(full)
+            if full:
+                last_full = now
+
+            # Sleep until the next periodic job is due or the queue moves.
+            timeout = min(last_global + SYNC_PERIOD, last_full + PERSONAL_SYNC_FULL_PERIOD) - time.time()
+            try:
+                await asyncio.wait_for(queue_changed.wait(), timeout=max(0.0, timeout))
+            except asyncio.TimeoutError:
+                pass
         except OperationalError:
             log.warning("sync_scheduler: DB connection dropped — retrying")
             await asyncio.sleep(1)
@@ -182,6 +308,43 @@ async def sync_scheduler():
             await asyncio.sleep(1)
 
 
+async def balance_scheduler():
+    """Ledger upkeep for the materialized balances (app/balances.py): release
+    chargeback holds that have run out, and now and then recompute every
+    balance from the ledger and shout if any has drifted."""
+    last_reconcile = 0.0
+    while True:
+        try:
+            async with async_session() as db:
+                released = await balances.release_expired_holds(db)
+                await db.commit()
+            if released:
+                log.info("Released %d ledger credit(s) from chargeback hold", released)
+
+            if time.time() - last_reconcile >= BALANCE_RECONCILE_PERIOD:
+                async with async_session() as db:
+                    drift = await balances.reconcile(db)
+                last_reconcile = time.time()
+                if drift:
+                    detail = ", ".join(
+                        f"{d['user_id']} ledger={d['expected']} balance={d['actual']}"
+                        for d in drift[:10]
+                    )
+                    log.error("user_balance drifted from the ledger for %d user(s): %s",
+                              len(drift), detail)
+                    try:
+                        await alertBot.send_plain(
+                            f"Garra: {len(drift)} user balance(s) disagree with the ledger.\n\n{detail}"
+                        )
+                    except Exception:
+                        log.exception("Could not send the balance drift alert")
+        except OperationalError:
+            log.warning("balance_scheduler: DB connection dropped — retrying next sweep")
+        except Exception:
+            log.exception("balance_scheduler iteration failed — retrying next sweep")
+        await asyncio.sleep(BALANCE_SWEEP_PERIOD)
+
+
 async def round_end_scheduler():
     while True:
         now = datetime.now(timezone.utc)
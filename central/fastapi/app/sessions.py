@@ -0,0 +1,136 @@
+"""Which socket belongs to which wallet.
+
+A socket id (sid) is bound to an address by wallet_connected, unbound by
+wallet_disconnected (the socket stays open, logged out) and forgotten by
+disconnect. This used to be a plain `sid_to_addr` dict whose entries were set to
+None rather than deleted, so every sid ever seen stayed in memory for the life of
+the process, and "is this address online" meant scanning all of them.
+
+The registry keeps the reverse index too — address -> its sids, one per open tab
+— so presence is a dict lookup. It is bounded as a safety net against a
+disconnect that never arrives: past SESSION_REGISTRY_MAX the oldest binding is
+evicted (and logged; that socket must wallet_connect again).
+
+With several workers each registry holds its own sockets, so followers mirror
+their bindings to the leader (app/leader.py), whose handoff checks presence:
+`bind`/`unbind` nudges as they happen, and every binding again when a new
+leader is elected.
+"""
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Optional, Set
+
+from . import leader
+from .config import SESSION_REGISTRY_MAX
+from .logging import log
+
+
+class SessionRegistry:
+    def __init__(self, max_sessions: int = SESSION_REGISTRY_MAX):
+        self.max_sessions = max_sessions
+        self._addr: "OrderedDict[str, str]" = OrderedDict()   # sid -> address, oldest first
+        self._sids: Dict[str, Set[str]] = {}                  # address -> sids
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._addr)
+
+    def get(self, sid) -> Optional[str]:
+        """The address bound to `sid`, or None if it isn't logged in."""
+        return self._addr.get(sid)
+
+    def bind(self, sid, address: str) -> Optional[str]:
+        """Bind `sid` to `address`. Returns the address it was bound to before,
+        if different (the caller leaves that room)."""
+        previous = self.unbind(sid)
+        self._addr[sid] = address
+        self._sids.setdefault(address, set()).add(sid)
+        while len(self._addr) > self.max_sessions:
+            old_sid, old_address = next(iter(self._addr.items()))
+            log.warning("Session registry full (%d) — evicting sid %s (%s)",
+                        self.max_sessions, old_sid, old_address)
+            self.unbind(old_sid)
+            self.evicted += 1
+        return previous if previous != address else None
+
+    def unbind(self, sid) -> Optional[str]:
+        """Forget `sid`'s binding (logout or disconnect). Returns the address
+        it was bound to, if any."""
+        address = self._addr.pop(sid, None)
+        if address is not None:
+            sids = self._sids.get(address)
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._sids[address]
+        return address
+
+    def sids(self, address: str) -> FrozenSet[str]:
+        """Every sid logged in as `address` (one per open tab)."""
+        return frozenset(self._sids.get(address, ()))
+
+    def is_online(self, address: Optional[str]) -> bool:
+        return address in self._sids
+
+    def counts(self) -> dict:
+        return {
+            "sessions": len(self._addr),
+            "addresses": len(self._sids),
+            "evicted": self.evicted,
+        }
+
+    def bindings(self):
+        """(sid, address) for every logged-in socket, oldest first."""
+        return list(self._addr.items())
+
+    def summary(self, sid) -> str:
+        """One-line description of `sid` for logs — constant cost, unlike
+        formatting the whole table."""
+        address = self._addr.get(sid)
+        tabs = len(self._sids.get(address, ())) if address else 0
+        return (f"sid={sid} addr={address} tabs={tabs} "
+                f"({len(self._addr)} sessions / {len(self._sids)} addresses)")
+
+
+sessions = SessionRegistry()
+
+
+# --- mirroring to the leader ---------------------------------------------
+# A NOTIFY payload is capped under 8000 bytes; a re-announce goes in chunks.
+_ANNOUNCE_CHUNK = 7000
+
+
+async def announce_bind(sid, address: str) -> None:
+    await leader.nudge("bind", f"{sid} {address}")
+
+
+async def announce_unbind(sid) -> None:
+    await leader.nudge("unbind", str(sid))
+
+
+async def _bound_elsewhere(arg: str) -> None:
+    for line in arg.splitlines():
+        sid, _, address = line.partition(" ")
+        if address:
+            sessions.bind(sid, address)
+
+
+async def _unbound_elsewhere(sid: str) -> None:
+    sessions.unbind(sid)
+
+
+async def _announce_all() -> None:
+    chunk, size = [], 0
+    for sid, address in sessions.bindings():
+        line = f"{sid} {address}"
+        if chunk and size + len(line) + 1 > _ANNOUNCE_CHUNK:
+            await leader.nudge("bind", "\n".join(chunk))
+            chunk, size = [], 0
+        chunk.append(line)
+        size += len(line) + 1
+    if chunk:
+        await leader.nudge("bind", "\n".join(chunk))
+
+
+leader.on_nudge("bind", _bound_elsewhere)
+leader.on_nudge("unbind", _unbound_elsewhere)
+leader.on_elected(_announce_all)
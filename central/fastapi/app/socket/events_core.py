@@ -1,16 +1,40 @@
 from .sio_instance import sio
 from ..logging import log
-from ..state import sid_to_addr, global_sync
+from ..cabinet import cabinets
+from ..sessions import sessions, announce_unbind
 
 @sio.event
 async def connect(sid, environ):
-    log.info("Sending global sync on connect")
-    await sio.emit("global_sync", data=await global_sync(), to=sid)
+    # Every socket watches a cabinet (app/cabinet.py): the default one until it
+    # picks another. Served from the cached snapshot — a connect never touches
+    # the DB.
+    cab = cabinets.default
+    cabinets.watch(sid, cab)
+    await sio.enter_room(sid, cab.room)
+    await sio.emit("global_sync", data=cab.global_sync(), to=sid)
 
 
 @sio.event
 async def disconnect(sid):
-    old_address = sid_to_addr.get(sid)
+    cabinets.forget(sid)
+    old_address = sessions.unbind(sid)
     if old_address:
+        await announce_unbind(sid)
         await sio.leave_room(sid, old_address)
-    sid_to_addr[sid] = None
+
+
+@sio.on("select_cabinet")
+async def select_cabinet(sid, data=None):
+    """Watch another cabinet: its room's broadcasts (turns, queue, Pi link)
+    replace the old one's. With QUEUE_DISPATCH "cabinet", plays paid from this
+    socket go to its queue; pooled, they go to whichever frees up first.
+    Acks with its global_sync and the ids of every cabinet."""
+    cab = cabinets.get((data or {}).get("cabinet"))
+    if cab is None:
+        return {"status": "error", "error": "unknown cabinet", "cabinets": cabinets.ids()}
+    previous = cabinets.watch(sid, cab)
+    if previous:
+        await sio.leave_room(sid, previous.room)
+    await sio.enter_room(sid, cab.room)
+    log.info("%s now watching cabinet %s", sessions.summary(sid), cab.id)
+    return {"status": "ok", "data": cab.global_sync(), "cabinets": cabinets.ids()}
@@ -1,14 +1,51 @@
-import app.state as state
+import asyncio
+import time
 
 from .sio_instance import sio
-# from ..state import current_player, sid_to_addr
-from ..pi_client import safe_pi_emit
+from .. import leader
+from ..cabinet import cabinets
+from ..pi_client import submit_move
+from ..sessions import sessions
 from ..logging import log
 
+# Moves forwarded to the leader go out one at a time, so it gets them in the
+# order they came in.
+_forwarding = asyncio.Lock()
+
+
 @sio.on("move")
 async def move(sid, data):
-    if state.sid_to_addr.get(sid) == state.current_player:
-        if not await safe_pi_emit("move", data):
-            log.warning("Pi offline: 'move' not sent")
-    else:
-        log.info(f"Current address missmatch, current player: {state.current_player}, sid to addr: {state.sid_to_addr}, sid: {sid}")
+    received_at = time.perf_counter()
+    # The move drives whichever cabinet this player has the claw of.
+    address = sessions.get(sid)
+    cab = cabinets.playing(address)
+    if cab is None:
+        log.info("Move from a player with no turn in play: %s", sessions.summary(sid))
+        return
+    bitmask = (data or {}).get("bitmask", 0)
+    if not leader.is_leader:
+        # Only the leader holds the Pi link (app/leader.py); our cabinet is a
+        # mirror of its own.
+        if not cab.pi_connected:
+            log.warning("Pi of %s offline: 'move' not sent", cab.id)
+            return
+        async with _forwarding:
+            await leader.nudge("move", f"{cab.id} {address} {int(bitmask)}")
+        return
+    if not submit_move(cab, bitmask, received_at):
+        log.warning("Pi of %s offline: 'move' not sent", cab.id)
+
+
+async def _move_forwarded(arg: str) -> None:
+    """A follower's player moved. Timed from here: the hop from the follower
+    isn't in the move latency histograms."""
+    received_at = time.perf_counter()
+    cabinet_id, address, bitmask = arg.split()
+    cab = cabinets.get(cabinet_id)
+    if cab is None or cab.current_player != address:
+        return      # the turn ended while it was on its way
+    if not submit_move(cab, int(bitmask), received_at):
+        log.warning("Pi of %s offline: 'move' not sent", cab.id)
+
+
+leader.on_nudge("move", _move_forwarded)
@@ -24,13 +24,14 @@ from sqlalchemy import select
 
 from .sio_instance import sio
 from ..deps import async_session
-from ..state import sid_to_addr
+from ..sessions import sessions
 from ..logging import log
 from ..config import RESELL_PRICE_BY_RARITY_CENTS
 from ..models import (
-	User, Win, Card, OpenedBooster, Shipment,
-	WinStatus, CardStatus, PrizeKind,
+	Win, Card, OpenedBooster, Shipment,
+	PrizeKind,
 )
+from .. import loaders
 from .. import win_transitions as wt
 
 
@@ -45,17 +46,17 @@ def _ok(**data):
 
 
 async def _require_addr(sid) -> Optional[str]:
-	addr = sid_to_addr.get(sid)
+	addr = sessions.get(sid)
 	if not addr:
 		return None
 	return addr
 
 
-async def _user_for_sid(session, sid) -> Optional[User]:
-	addr = sid_to_addr.get(sid)
+async def _user_id_for_sid(session, sid) -> Optional[uuid.UUID]:
+	addr = sessions.get(sid)
 	if not addr:
 		return None
-	return await wt.get_or_create_user(session, addr)
+	return await wt.user_id_for(session, addr)
 
 
 def _serialize_card(c: Card) -> dict:
@@ -114,9 +115,9 @@ async def open_booster_win(sid, data):
 
 	try:
 		async with async_session() as db:
-			user = await wt.get_or_create_user(db, addr)
+			user_id = await wt.user_id_for(db, addr)
 			win = await db.get(Win, uuid.UUID(win_id))
-			if win is None or win.user_id != user.id:
+			if win is None or win.user_id != user_id:
 				return _err("win not found", "not_found")
 			# Capture the booster id before the transition mutates state.
 			opened_id = win.opened_booster.id if win.opened_booster else None
@@ -125,8 +126,8 @@ async def open_booster_win(sid, data):
 			res = await db.execute(
 				select(Card).where(
 					Card.opened_booster_id == opened_id,
-					Card.owner_user_id == user.id,
-				)
+					Card.owner_user_id == user_id,
+				).options(*loaders.CARD)
 			)
 			cards = res.scalars().all()
 		return _ok(settled=True, cards=[_serialize_card(c) for c in cards])
@@ -148,9 +149,9 @@ async def resell_booster_win(sid, data):
 
 	try:
 		async with async_session() as db:
-			user = await wt.get_or_create_user(db, addr)
+			user_id = await wt.user_id_for(db, addr)
 			win = await db.get(Win, uuid.UUID(win_id))
-			if win is None or win.user_id != user.id:
+			if win is None or win.user_id != user_id:
 				return _err("win not found", "not_found")
 			credited = win.resell_price_cents
 			await wt.resell_booster_win(db, win.id)
@@ -175,9 +176,9 @@ async def ship_booster_win(sid, data):
 
 	try:
 		async with async_session() as db:
-			user = await wt.get_or_create_user(db, addr)
+			user_id = await wt.user_id_for(db, addr)
 			win = await db.get(Win, uuid.UUID(win_id))
-			if win is None or win.user_id != user.id:
+			if win is None or win.user_id != user_id:
 				return _err("win not found", "not_found")
 			shipment = await wt.ship_booster_win(db, win.id, address)
 			await db.commit()
@@ -202,9 +203,9 @@ async def keep_card_win(sid, data):
 
 	try:
 		async with async_session() as db:
-			user = await wt.get_or_create_user(db, addr)
+			user_id = await wt.user_id_for(db, addr)
 			win = await db.get(Win, uuid.UUID(win_id))
-			if win is None or win.user_id != user.id:
+			if win is None or win.user_id != user_id:
 				return _err("win not found", "not_found")
 			await wt.keep_card_win(db, win.id)
 			await db.commit()
@@ -228,9 +229,9 @@ async def resell_card_win(sid, data):
 
 	try:
 		async with async_session() as db:
-			user = await wt.get_or_create_user(db, addr)
+			user_id = await wt.user_id_for(db, addr)
 			win = await db.get(Win, uuid.UUID(win_id))
-			if win is None or win.user_id != user.id:
+			if win is None or win.user_id != user_id:
 				return _err("win not found", "not_found")
 			credited = win.resell_price_cents
 			await wt.resell_card_win(db, win.id)
@@ -255,9 +256,9 @@ async def ship_card_win(sid, data):
 
 	try:
 		async with async_session() as db:
-			user = await wt.get_or_create_user(db, addr)
+			user_id = await wt.user_id_for(db, addr)
 			win = await db.get(Win, uuid.UUID(win_id))
-			if win is None or win.user_id != user.id:
+			if win is None or win.user_id != user_id:
 				return _err("win not found", "not_found")
 			shipment = await wt.ship_card_win(db, win.id, address)
 			await db.commit()
@@ -283,9 +284,9 @@ async def ship_card_from_collection(sid, data):
 
 	try:
 		async with async_session() as db:
-			user = await wt.get_or_create_user(db, addr)
+			user_id = await wt.user_id_for(db, addr)
 			shipment = await wt.ship_card_from_collection(
-				db, card_id=uuid.UUID(card_id), user_id=user.id, address=address
+				db, card_id=uuid.UUID(card_id), user_id=user_id, address=address
 			)
 			await db.commit()
 		return _ok(shipment_id=str(shipment.id))
@@ -307,13 +308,13 @@ async def resell_card_from_collection(sid, data):
 
 	try:
 		async with async_session() as db:
-			user = await wt.get_or_create_user(db, addr)
+			user_id = await wt.user_id_for(db, addr)
 			card = await db.get(Card, uuid.UUID(card_id))
-			if card is None or card.owner_user_id != user.id:
+			if card is None or card.owner_user_id != user_id:
 				return _err("card not found", "not_found")
 			price = _resell_price_for_card(card)
 			await wt.resell_card_from_collection(
-				db, card_id=card.id, user_id=user.id, resell_price_cents=price,
+				db, card_id=card.id, user_id=user_id, resell_price_cents=price,
 			)
 			await db.commit()
 		return _ok(credited_cents=price)
@@ -335,19 +336,10 @@ async def get_inventory(sid, data=None):
 
 	try:
 		async with async_session() as db:
-			user = await wt.get_or_create_user(db, addr)
+			user_id = await wt.user_id_for(db, addr)
 
-			pending = (await db.execute(
-				select(Win)
-				.where(Win.user_id == user.id, Win.status == WinStatus.PENDING)
-				.order_by(Win.created_at.desc())
-			)).scalars().all()
-
-			cards = (await db.execute(
-				select(Card)
-				.where(Card.owner_user_id == user.id, Card.status == CardStatus.IN_COLLECTION)
-				.order_by(Card.acquired_at.desc())
-			)).scalars().all()
+			pending = (await db.execute(loaders.pending_wins(user_id))).scalars().all()
+			cards = (await db.execute(loaders.collection_cards(user_id))).scalars().all()
 
 		return _ok(
 			pending_wins=[_serialize_pending_win(w) for w in pending],
@@ -367,10 +359,10 @@ async def get_shipments(sid, data=None):
 
 	try:
 		async with async_session() as db:
-			user = await wt.get_or_create_user(db, addr)
+			user_id = await wt.user_id_for(db, addr)
 			shipments = (await db.execute(
 				select(Shipment)
-				.where(Shipment.user_id == user.id)
+				.where(Shipment.user_id == user_id)
 				.order_by(Shipment.created_at.desc())
 			)).scalars().all()
 		return _ok(shipments=[
@@ -14,8 +14,9 @@ from ..deps import async_session
 from ..logging import log
 from ..models import Round, PaymentMethod
 from ..payments import already_in_queue, initiate_payment
-from ..state import sid_to_addr
-from ..win_transitions import get_or_create_user
+from ..cabinet import cabinets
+from ..sessions import sessions
+from ..win_transitions import user_id_for
 from ..stripe_rail import (
     stripe_enabled, ensure_customer, confirm_card_payment,
     fail_card_payment, _in_executor, _create_setup_intent,
@@ -31,7 +32,7 @@ def _err(msg):
 async def card_setup(sid, data=None):
     """Prepare card capture: returns a SetupIntent client_secret for Stripe
     Elements, plus the already-saved card (brand/last4) if there is one."""
-    addr = sid_to_addr.get(sid)
+    addr = sessions.get(sid)
     if not addr:
         return _err("not connected")
     if not stripe_enabled():
@@ -39,8 +40,8 @@ async def card_setup(sid, data=None):
 
     try:
         async with async_session() as db:
-            user = await get_or_create_user(db, addr)
-            customer_id = await ensure_customer(db, user)
+            user_id = await user_id_for(db, addr)
+            customer_id = await ensure_customer(db, user_id, addr)
 
         client_secret = await _in_executor(_create_setup_intent, customer_id)
         saved = await _in_executor(_saved_card, customer_id)
@@ -59,7 +60,7 @@ async def pay_card(sid, data=None):
     the ack is {"status": "processing"} and the player gets a targeted
     `payment_confirmed` / `payment_failed` room event from the webhook.
     """
-    addr = sid_to_addr.get(sid)
+    addr = sessions.get(sid)
     if not addr:
         return _err("not connected")
     if free_play():
@@ -75,8 +76,8 @@ async def pay_card(sid, data=None):
             log.warning("Rejected player %s for double entry" % addr)
             return _err("user already in queue")
 
-        user = await get_or_create_user(db, addr)
-        customer_id = await ensure_customer(db, user)
+        user_id = await user_id_for(db, addr)
+        customer_id = await ensure_customer(db, user_id, addr)
 
         saved = await _in_executor(_saved_card, customer_id)
         if not saved:
@@ -84,8 +85,9 @@ async def pay_card(sid, data=None):
 
         # Commit the PENDING row before charging so the webhook can find it
         # even if we crash right after the Stripe call.
-        payment = await initiate_payment(db, addr, PaymentMethod.CARD, TICKET_PRICE_CENTS)
-        payment.user_id = user.id
+        payment = await initiate_payment(db, addr, PaymentMethod.CARD, TICKET_PRICE_CENTS,
+                                         cabinets.pay_target(sid))
+        payment.user_id = user_id
         await db.commit()
         payment_id = payment.id
 
@@ -110,14 +112,8 @@ async def pay_card(sid, data=None):
         position, _ = await confirm_card_payment(payment_id, pi["id"])
         if position is None:
             # The webhook beat us to it — the row is already CONFIRMED and the
-            # player_queued broadcast went out; report the current queue depth.
-            from ..models import QueueEntry
-            from sqlalchemy import func
-            async with async_session() as db:
-                position = await db.scalar(
-                    select(func.count()).select_from(QueueEntry)
-                    .where(QueueEntry.status == "queued")
-                )
+            # player_queued broadcast went out; report where they stand now.
+            position = cabinets.position(addr)
         return {"status": "ok", "position": position}
 
     if pi["status"] == "processing":
@@ -1,78 +1,54 @@
 import asyncio
 import secrets
 
-from sqlalchemy import select, func
+from sqlalchemy import select
 from datetime import datetime
 
-from ..config import BYPASS_PAYMENT, FREE_PLAY, TICKET_PRICE_CENTS, ticket_usdc_base_units, free_play
+from ..config import (
+    BYPASS_PAYMENT, FREE_PLAY, TICKET_PRICE_CENTS, HISTORY_PAGE_SIZE, HISTORY_PAGE_MAX,
+    ticket_usdc_base_units, free_play,
+)
 from ..models import (
-    QueueEntry, Round, Withdrawal, Payment, PaymentMethod,
+    Round, Withdrawal, Payment, PaymentMethod,
     User, LedgerEntry, LedgerKind,
 )
 from ..deps import async_session
+from .. import balances
+from .. import leader
 from .sio_instance import sio
-from ..state import sid_to_addr
+from ..sessions import sessions, announce_bind, announce_unbind
+from ..cabinet import cabinets
 from ..helpers import (
-    safe_verify_usdc_transfer, user_account_data,
+    safe_verify_usdc_transfer, user_account_data, login_snapshot,
+    bets_page, withdrawals_page,
     off_chain_balance_cents, withdrawable_balance_cents,
     safe_send_usdc, cents_to_usdc_base_units,
 )
 from ..payments import already_in_queue, initiate_payment, confirm_payment
-from ..win_transitions import get_or_create_user
+from ..win_transitions import user_id_for
 from ..logging import log
 
 
 @sio.on("wallet_connected")
 async def wallet_connected(sid, data):
     addr = data["address"]
-    sid_to_addr[sid] = addr
+    previous = sessions.bind(sid, addr)
+    await announce_bind(sid, addr)
+    if previous:
+        await sio.leave_room(sid, previous)
     await sio.enter_room(sid, addr)
     log.info(f"Player {addr} joined")
-
+    queued_in = cabinets.queue_of(addr)
+    if queued_in:
+        # They may have been passed over while away (app/handoff.py).
+        cabinets.wake_queue(queued_in)
+        await leader.nudge("queue", queued_in.name)
+
+    # One snapshot: round counts and balance in a single statement, the first
+    # page of each history, and the position from the in-memory queue index.
+    # Older history is fetched a page at a time with the returned cursors.
     async with async_session() as db:
-        # Get current round
-        round_ = await db.scalar(select(Round).order_by(Round.created_at.desc()))
-
-        # Get amount of turns played and won this round
-        played = await db.scalar(
-            select(func.count())
-            .select_from(QueueEntry)
-            .where(QueueEntry.status == "played")
-            .where(QueueEntry.address == addr)
-            .where(QueueEntry.round_id == round_.id)
-        )
-        won = await db.scalar(
-            select(func.count())
-            .select_from(QueueEntry)
-            .where(QueueEntry.status == "played")
-            .where(QueueEntry.address == addr)
-            .where(QueueEntry.round_id == round_.id)
-            .where(QueueEntry.win == True)
-        )
-
-        # Get any existing queued bet
-        user_entry = await db.scalar(
-            select(QueueEntry).where(
-                QueueEntry.status == "queued", QueueEntry.address == addr
-            )
-        )
-
-        if user_entry:
-            position = (
-                await db.scalar(
-                    select(func.count())
-                    .select_from(QueueEntry)
-                    .where(
-                        QueueEntry.status == "queued",
-                        QueueEntry.created_at < user_entry.created_at,
-                    )
-                )
-                + 1
-            )
-        else:
-            position = -1
-
-        balance, bets, withdrawals = await user_account_data(addr, db)
+        snapshot = await login_snapshot(addr, db)
 
     return {
         "status": "ok",
@@ -80,22 +56,17 @@ async def wallet_connected(sid, data):
             # The client learns this at login, so monetization can be switched
             # on with a backend restart — no frontend rebuild.
             "free_play": free_play(),
-            "position": position,
-            "balance": balance,
-            "played": played,
-            "won": won,
-            "bets": bets,
-            "withdrawals": withdrawals,
+            **snapshot,
         },
     }
 
 
 @sio.on("wallet_disconnected")
 async def wallet_disconnected(sid, data):
-    old_address = sid_to_addr.get(sid)
+    old_address = sessions.unbind(sid)
     if old_address:
+        await announce_unbind(sid)
         await sio.leave_room(sid, old_address)
-    sid_to_addr[sid] = None
 
 
 @sio.on("withdraw")
@@ -105,7 +76,7 @@ async def withdraw(sid, data=None):
     lock, so concurrent withdrawals can't double-spend), pay out from the
     treasury, then reverse the debit if the payout fails.
     """
-    addr = sid_to_addr[sid]
+    addr = sessions.get(sid)
     if not addr:
         return {"status": "error", "error": "not connected"}
     log.info(f"Player {addr} is issuing a withdrawal of funds")
@@ -113,20 +84,19 @@ async def withdraw(sid, data=None):
         # 1) Reserve: lock the user, compute the *withdrawable* balance (total
         #    minus card-chargeback holds), write the WITHDRAWAL debit.
         async with async_session() as db:
-            user = await get_or_create_user(db, addr)
-            await db.scalar(select(User).where(User.id == user.id).with_for_update())
-            total_cents = await off_chain_balance_cents(db, user.id)
-            balance_cents = await withdrawable_balance_cents(db, user.id)
+            user_id = await user_id_for(db, addr)
+            await db.scalar(select(User.id).where(User.id == user_id).with_for_update())
+            total_cents = await off_chain_balance_cents(db, user_id)
+            balance_cents = await withdrawable_balance_cents(db, user_id)
             if total_cents <= 0:
                 return {"status": "error", "error": "no funds to withdraw"}
             if balance_cents <= 0:
                 # They have winnings, but all of it is card-funded and still
                 # inside the chargeback window.
                 return {"status": "error", "error": "funds on hold (card payment clearing)"}
-            debit = LedgerEntry(
-                user_id=user.id, kind=LedgerKind.WITHDRAWAL, amount_cents=balance_cents,
-            )
-            db.add(debit)
+            debit = await balances.post(db, LedgerEntry(
+                user_id=user_id, kind=LedgerKind.WITHDRAWAL, amount_cents=balance_cents,
+            ))
             await db.commit()
             debit_id = debit.id
 
@@ -148,7 +118,7 @@ async def withdraw(sid, data=None):
             row = await db.scalar(select(LedgerEntry).where(LedgerEntry.id == debit_id))
             if not ok:
                 if row:
-                    await db.delete(row)   # payout failed → un-debit
+                    await balances.unpost(db, row)   # payout failed → un-debit
                     await db.commit()
                 return {"status": "error", "error": "payout transaction failed"}
             row.withdrawal_tx_hash = tx_hash
@@ -164,21 +134,71 @@ async def withdraw(sid, data=None):
 
 @sio.on("ckeck_balance")
 async def check_balance(sid, data):
-    addr = sid_to_addr[sid]
+    addr = sessions.get(sid)
 
     try:
         async with async_session() as db:
-            balance, bets, withdrawals = await user_account_data(addr, db)
+            balance, (bets, bets_cursor), (withdrawals, withdrawals_cursor) = (
+                await user_account_data(addr, db)
+            )
         return {
             "status": "ok",
             "balance": balance,
             "bets": bets,
+            "bets_cursor": bets_cursor,
             "withdrawals": withdrawals,
+            "withdrawals_cursor": withdrawals_cursor,
         }
     except:
         return {"status": "error", "balance": -1, "bets": None, "withdrawals": None}
 
 
+def _page_args(data):
+    """(cursor, limit) from a history request, limit clamped to HISTORY_PAGE_MAX.
+    Raises ValueError if the cursor isn't a string (or null)."""
+    data = data or {}
+    try:
+        limit = int(data.get("limit") or HISTORY_PAGE_SIZE)
+    except (TypeError, ValueError):
+        limit = HISTORY_PAGE_SIZE
+    cursor = data.get("cursor")
+    if cursor is not None and not isinstance(cursor, str):
+        raise ValueError(f"bad cursor {cursor!r}")
+    return cursor, max(1, min(limit, HISTORY_PAGE_MAX))
+
+
+@sio.on("get_bets")
+async def get_bets(sid, data=None):
+    """One page of the player's bet history, newest first. Send back the
+    `cursor` from the previous page (or login's `bets_cursor`) for the next,
+    older one; a null cursor in the reply means there is nothing older."""
+    addr = sessions.get(sid)
+    if not addr:
+        return {"status": "error", "error": "not connected"}
+    try:
+        cursor, limit = _page_args(data)
+        async with async_session() as db:
+            bets, next_cursor = await bets_page(db, addr, cursor, limit)
+    except ValueError:
+        return {"status": "error", "error": "bad cursor"}
+    return {"status": "ok", "bets": bets, "cursor": next_cursor}
+
+
+@sio.on("get_withdrawals")
+async def get_withdrawals(sid, data=None):
+    """One page of the player's withdrawals, newest first. Paged like get_bets."""
+    addr = sessions.get(sid)
+    if not addr:
+        return {"status": "error", "error": "not connected"}
+    try:
+        cursor, limit = _page_args(data)
+        async with async_session() as db:
+            withdrawals, next_cursor = await withdrawals_page(db, addr, cursor, limit)
+    except ValueError:
+        return {"status": "error", "error": "bad cursor"}
+    return {"status": "ok", "withdrawals": withdrawals, "cursor": next_cursor}
+
+
 # NOTE: the legacy `join_queue` handler (EIP-712 permit -> on-chain escrow
 # bet()) has been removed. The escrow contract is retired; pay-to-play is now a
 # direct USDC transfer verified in `pay_crypto` below. `helpers.place_bet`/
@@ -200,7 +220,7 @@ async def pay_free(sid, data=None):
     if not free_play():
         return {"status": "error", "position": -1, "error": "free play is not enabled"}
 
-    addr = sid_to_addr[sid]
+    addr = sessions.get(sid)
     if not addr:
         return {"status": "error", "position": -1, "error": "not connected"}
 
@@ -210,7 +230,8 @@ async def pay_free(sid, data=None):
             log.warning("Rejected player %s for double entry" % addr)
             return {"status": "error", "position": -1, "error": "user already in queue"}
 
-        payment = await initiate_payment(db, addr, PaymentMethod.COMP, 0)
+        payment = await initiate_payment(db, addr, PaymentMethod.COMP, 0,
+                                         cabinets.pay_target(sid))
         position = await confirm_payment(db, payment, secrets.token_bytes(32))
 
     log.info("FREE_PLAY: comped play for %s (position %s)", addr, position)
@@ -227,7 +248,7 @@ async def pay_crypto(sid, data):
     synthetic turn id — there's no contract round-trip behind it. In bypass mode
     there's no transfer: the backend mints a synthetic key and skips the check.
     """
-    addr = sid_to_addr[sid]
+    addr = sessions.get(sid)
 
     # Never take money while plays are comped. (BYPASS_PAYMENT is demo mode and
     # still routes through here with a synthetic key — the simulation relies on
@@ -263,7 +284,8 @@ async def pay_crypto(sid, data):
                 return {"status": "error", "position": -1, "error": "payment not verified"}
             key = secrets.token_bytes(32)
 
-        payment = await initiate_payment(db, addr, PaymentMethod.CRYPTO, TICKET_PRICE_CENTS)
+        payment = await initiate_payment(db, addr, PaymentMethod.CRYPTO, TICKET_PRICE_CENTS,
+                                         cabinets.pay_target(sid))
         payment.ref = tx_hash
         position = await confirm_payment(db, payment, key)
 
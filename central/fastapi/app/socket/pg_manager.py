@@ -0,0 +1,155 @@
+"""Socket.IO client manager over Postgres LISTEN/NOTIFY.
+
+The default manager keeps rooms in the process, so an emit reaches only the
+sockets connected to that one uvicorn worker and the backend couldn't run more
+than one. python-socketio's pub/sub managers fix that by publishing every emit
+(and room change, disconnect, ack) on a channel all workers listen to; this is
+one on the database we already run, instead of adding Redis to the VPS.
+
+Two limits of NOTIFY shape it:
+
+  - Each NOTIFY is a statement and a round trip. A sync tick emits once per
+    queued player, so messages are buffered for SOCKETIO_PUBSUB_FLUSH seconds
+    and sent as JSON arrays, as many per NOTIFY as fit.
+  - A payload must stay under 8000 bytes. A message too big for one (a large
+    player_win or inventory push) is written to `socketio_spill` and the NOTIFY
+    carries only its id; listeners read it back. Rows are swept once they're
+    older than SOCKETIO_SPILL_TTL.
+
+Batches go out in publish order on one connection, and Postgres delivers
+notifications in commit order, so every worker sees emits in the order they
+were made. LISTEN needs a session-mode connection (a transaction pooler drops
+it), which is why SOCKETIO_PUBSUB_URL is separate from DATABASE_URL.
+
+Only the socket layer is shared here. Cabinets, the queue index and the
+session registry are per-process state; the leader keeps the followers' copies
+current itself (app/leader.py).
+"""
+import asyncio
+import time
+from typing import List, Optional
+
+import psycopg
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+from ..config import SOCKETIO_PUBSUB_FLUSH, SOCKETIO_SPILL_TTL
+from ..db import KEEPALIVES, libpq_dsn
+from ..logging import log
+
+# NOTIFY rejects payloads of 8000 bytes or more; leave room for the brackets.
+NOTIFY_MAX_BYTES = 7900
+
+
+class AsyncPostgresManager(AsyncPubSubManager):
+    name = "asyncpostgres"
+
+    def __init__(self, url: str, channel: str = "socketio", write_only: bool = False,
+                 logger=None, json=None, flush_interval: float = SOCKETIO_PUBSUB_FLUSH):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.dsn = libpq_dsn(url)
+        self.flush_interval = flush_interval
+        self._pending: List[str] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._conn: Optional[psycopg.AsyncConnection] = None
+        self._conn_lock = asyncio.Lock()
+        self._swept_at = 0.0
+
+    async def _connection(self) -> psycopg.AsyncConnection:
+        if self._conn is None or self._conn.closed:
+            self._conn = await psycopg.AsyncConnection.connect(self.dsn, autocommit=True, **KEEPALIVES)
+        return self._conn
+
+    # --- publishing ----------------------------------------------------
+    async def _publish(self, data) -> None:
+        self._pending.append(self.json.dumps(data))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_soon())
+
+    async def _flush_soon(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        pending, self._pending = self._pending, []
+        try:
+            await self._send(pending)
+        except Exception:
+            log.exception("socketio pubsub: dropped %d message(s)", len(pending))
+            self._conn = None
+        if self._pending:
+            # Published while we sent; they'd otherwise wait for the next emit.
+            self._flusher = asyncio.create_task(self._flush_soon())
+
+    @staticmethod
+    def _batches(messages: List[str]) -> List[str]:
+        """JSON arrays of the messages, in order, each under NOTIFY_MAX_BYTES
+        unless a single message is bigger on its own."""
+        batches, batch, size = [], [], 2
+        for message in messages:
+            n = len(message.encode()) + 1
+            if batch and size + n > NOTIFY_MAX_BYTES:
+                batches.append("[" + ",".join(batch) + "]")
+                batch, size = [], 2
+            batch.append(message)
+            size += n
+        if batch:
+            batches.append("[" + ",".join(batch) + "]")
+        return batches
+
+    async def _send(self, messages: List[str]) -> None:
+        async with self._conn_lock:
+            conn = await self._connection()
+            for payload in self._batches(messages):
+                if len(payload.encode()) > NOTIFY_MAX_BYTES:
+                    cur = await conn.execute(
+                        "INSERT INTO socketio_spill (payload) VALUES (%s) RETURNING id", (payload,)
+                    )
+                    spill_id = (await cur.fetchone())[0]
+                    payload = self.json.dumps({"spill": spill_id})
+                    await self._sweep(conn)
+                await conn.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+
+    async def _sweep(self, conn) -> None:
+        now = time.monotonic()
+        if now - self._swept_at < SOCKETIO_SPILL_TTL:
+            return
+        self._swept_at = now
+        await conn.execute(
+            "DELETE FROM socketio_spill"
+            " WHERE created_at < (now() AT TIME ZONE 'utc') - make_interval(secs => %s)",
+            (SOCKETIO_SPILL_TTL,),
+        )
+
+    async def _unspill(self, spill_id: int) -> Optional[str]:
+        async with self._conn_lock:
+            conn = await self._connection()
+            cur = await conn.execute("SELECT payload FROM socketio_spill WHERE id = %s", (spill_id,))
+            row = await cur.fetchone()
+        return row[0] if row else None
+
+    # --- listening -----------------------------------------------------
+    async def _listen(self):
+        retry = 1
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.dsn, autocommit=True, **KEEPALIVES) as conn:
+                    await conn.execute(f'LISTEN "{self.channel}"')
+                    retry = 1
+                    async for notify in conn.notifies():
+                        for message in await self._messages(notify.payload):
+                            yield message
+            except psycopg.OperationalError as e:
+                log.warning("socketio pubsub: listener dropped (%s) — reconnecting in %ss", e, retry)
+                await asyncio.sleep(retry)
+                retry = min(retry * 2, 30)
+
+    async def _messages(self, payload: str) -> list:
+        try:
+            data = self.json.loads(payload)
+            if isinstance(data, dict) and "spill" in data:
+                spilled = await self._unspill(data["spill"])
+                if spilled is None:
+                    log.warning("socketio pubsub: spilled payload %s already swept", data["spill"])
+                    return []
+                data = self.json.loads(spilled)
+        except Exception:
+            log.exception("socketio pubsub: unreadable payload")
+            return []
+        return data if isinstance(data, list) else [data]
@@ -1,7 +1,18 @@
 import socketio
 from fastapi import FastAPI
 
-sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
+from ..config import SOCKETIO_PUBSUB_URL
+
+# With SOCKETIO_PUBSUB_URL set, every worker shares rooms and broadcasts
+# through Postgres (pg_manager.py); otherwise they stay in this process.
+if SOCKETIO_PUBSUB_URL:
+    from .pg_manager import AsyncPostgresManager
+    client_manager = AsyncPostgresManager(SOCKETIO_PUBSUB_URL)
+else:
+    client_manager = None
+
+sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*",
+                           client_manager=client_manager)
 
 def sio_app(fastapi_app: FastAPI):
     return socketio.ASGIApp(sio, other_asgi_app=fastapi_app)
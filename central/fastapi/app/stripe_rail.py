@@ -27,7 +27,7 @@ from typing import Optional, Tuple
 
 import stripe
 from fastapi import APIRouter, Request, Response
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from .config import STRIPE_SECRET_KEY, STRIPE_WEBHOOK_SECRET
 from .db import async_session
@@ -140,12 +140,13 @@ async def fail_card_payment(payment_id: uuid.UUID, pi_id: Optional[str] = None)
 
 # ─── Customer plumbing used by the socket handlers ──────────────────────
 
-async def ensure_customer(db, user: User) -> str:
+async def ensure_customer(db, user_id: uuid.UUID, wallet_address: str) -> str:
     """Get or lazily create the user's Stripe Customer id (commits on create)."""
-    if user.stripe_customer_id:
-        return user.stripe_customer_id
-    customer_id = await _in_executor(_create_customer, user.wallet_address)
-    user.stripe_customer_id = customer_id
+    customer_id = await db.scalar(select(User.stripe_customer_id).where(User.id == user_id))
+    if customer_id:
+        return customer_id
+    customer_id = await _in_executor(_create_customer, wallet_address)
+    await db.execute(update(User).where(User.id == user_id).values(stripe_customer_id=customer_id))
     await db.commit()
     return customer_id
 
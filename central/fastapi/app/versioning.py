@@ -9,11 +9,12 @@ bumped only on an incompatible change:
     PI_VPS_PROTO   Pi     <-> VPS (websocket: turn_end / verdict / move)
 
 Each is checked at its own handshake and must be EQUAL — no range negotiation
-(that's machinery for running many cabinets at scattered versions; we don't).
-This module owns the VPS end: it validates what the Pi reports on connect, and a
-mismatch rides the same "machine not fit to play" gate as a jammed chute — the
-queue pauses (see machine.blocked) and the operator is told on Telegram, once
-immediately and then periodically until it's fixed (a reflash / redeploy).
+(every cabinet is rolled together; we don't run them at scattered versions).
+This module owns the VPS end: it validates what each cabinet's Pi reports on
+connect, and a mismatch rides the same "machine not fit to play" gate as a
+jammed chute — that cabinet's queue pauses (see machine.blocked) and the
+operator is told on Telegram, once immediately and then periodically until it's
+fixed (a reflash / redeploy).
 
 To bump: change the constant here AND in raspberry/server/protocol_version.py
 (and the ESP firmware for ESP_PI_PROTO). The repo test keeps the two ends of
@@ -23,7 +24,7 @@ each interface honest at commit time; this handshake catches deploy-time drift
 import asyncio
 from typing import Optional
 
-from . import state
+from .cabinet import Cabinet, cabinets
 from .logging import log
 from .notifier import alertBot
 
@@ -31,6 +32,18 @@ from .notifier import alertBot
 # raspberry/server/protocol_version.py.
 PI_VPS_PROTO = 1
 
+# Optional wire features (see raspberry/server/protocol_version.py PI_FEATURES).
+# Additive, so they don't bump PI_VPS_PROTO: we use one only when the Pi
+# advertises it in esp_status, and fall back to the JSON frames otherwise.
+FEATURE_MOVE_BIN = "move_bin"
+SUPPORTED_FEATURES = {FEATURE_MOVE_BIN}
+
+# "move_bin" frame layouts — must equal raspberry/server/protocol_version.py.
+MOVE_FRAME_FORMAT     = ">BIB"
+MOVE_ACK_FRAME_FORMAT = ">BIH"
+FRAME_MOVE     = 0x01
+FRAME_MOVE_ACK = 0x81
+
 # Re-nag interval while a mismatch persists.
 VERSION_RENAG_SECONDS = 1800  # 30 min
 
@@ -61,29 +74,38 @@ def evaluate(pi_proto: Optional[int], esp_version_bad: bool, versions: dict) ->
     return {"kind": "version_mismatch", "problems": problems, "versions": versions}
 
 
-async def on_handshake(pi_proto: Optional[int], esp_version_bad: bool, versions: dict) -> None:
-    """Called from pi_client.on_esp_status on every (re)connect."""
-    await _set(evaluate(pi_proto, esp_version_bad, versions))
+def negotiate_features(advertised) -> set:
+    """The optional features both ends speak: what the Pi advertised, minus
+    anything this VPS build doesn't know."""
+    return SUPPORTED_FEATURES & set(advertised or ())
+
+
+async def on_handshake(cab: Cabinet, pi_proto: Optional[int], esp_version_bad: bool,
+                       versions: dict) -> None:
+    """Called from pi_client.on_esp_status on every (re)connect of `cab`'s Pi."""
+    await _set(cab, evaluate(pi_proto, esp_version_bad, versions))
 
 
-async def _set(fault: Optional[dict]) -> None:
-    prev = state.version_fault
-    state.version_fault = fault
+async def _set(cab: Cabinet, fault: Optional[dict]) -> None:
+    prev = cab.version_fault
+    cab.version_fault = fault
+    cab.changed()
     if fault and fault != prev:
-        await _alert(fault)          # first time we see this exact mismatch
+        await _alert(cab, fault)     # first time we see this exact mismatch
     elif prev and not fault:
-        log.info("Versions back in sync")
+        log.info("Versions back in sync on %s", cab.id)
+        cab.wake()
         try:
-            await alertBot.send_plain("Garra: versions back in sync ✓ — queue resumed.")
+            await alertBot.send_plain(f"Garra [{cab.id}]: versions back in sync ✓ — queue resumed.")
         except Exception:
             log.exception("could not send version-resolved alert")
 
 
-async def _alert(fault: dict) -> None:
-    body = "Garra: QUEUE PAUSED — version mismatch.\n\n" + "\n".join(
+async def _alert(cab: Cabinet, fault: dict) -> None:
+    body = f"Garra [{cab.id}]: QUEUE PAUSED — version mismatch.\n\n" + "\n".join(
         f"- {p}" for p in fault["problems"]
     )
-    log.error("VERSION MISMATCH — queue paused: %s", fault["problems"])
+    log.error("VERSION MISMATCH on %s — queue paused: %s", cab.id, fault["problems"])
     try:
         await alertBot.send_plain(body)
     except Exception:
@@ -95,5 +117,6 @@ async def version_watch() -> None:
     about is worse than a repeated ping."""
     while True:
         await asyncio.sleep(VERSION_RENAG_SECONDS)
-        if state.version_fault:
-            await _alert(state.version_fault)
+        for cab in cabinets:
+            if cab.version_fault:
+                await _alert(cab, cab.version_fault)
@@ -10,17 +10,24 @@ The win lifecycle and trust model are documented in the project memory at
 
 import uuid
 import logging
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, TypedDict, Literal
+from typing import NamedTuple, Optional, TypedDict, Literal
 
-from sqlalchemy import select, update
+from sqlalchemy import case, event, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
 
-from .config import RESELL_PRICE_BY_RARITY_CENTS, RESELL_PRICE_BY_BOOSTER_SKU_CENTS
+from . import balances
+from .config import (
+    RESELL_PRICE_BY_RARITY_CENTS, RESELL_PRICE_BY_BOOSTER_SKU_CENTS, USER_ID_CACHE_SIZE,
+)
 from .models import (
     User, Win, Ball, ClosedBooster, OpenedBooster, Card, Shipment, LedgerEntry,
-    QueueEntry,
-    WinStatus, BallStatus, InventoryStatus, CardStatus, PrizeKind,
+    QueueEntry, CardType,
+    WinStatus, BallStatus, InventoryStatus, CardStatus, PrizeKind, KycStatus, CardRarity,
     SettlementKind, ShipmentStatus, LedgerKind,
 )
 
@@ -48,28 +55,108 @@ class ShippingAddress(TypedDict, total=False):
     country: str
 
 
+# Flag on a session whose transaction changes a ball, booster or card — i.e.
+# what the machine-fitness check looks at. app/machine.py drops its cached
+# verdict when that transaction commits.
+INVENTORY_CHANGED = "inventory_changed"
+
+
+def _inventory_changed(session: AsyncSession) -> None:
+    session.info[INVENTORY_CHANGED] = True
+
+
 def _expiry_from_now() -> datetime:
     return datetime.utcnow() + timedelta(days=RESELL_DEADLINE_DAYS)
 
 
 # ─── Identity ───────────────────────────────────────────────────────────
 
-async def get_or_create_user(session: AsyncSession, wallet_address: str) -> User:
-    """Look up or lazily create a User row for a wallet address.
+# Wallet address -> user id, most recently used last. Nearly every socket
+# handler needs the player's user id, and the mapping never changes once the row
+# exists, so it's kept here, bounded to USER_ID_CACHE_SIZE addresses. Only ids
+# of committed rows go in: one inserted by a transaction is published by its
+# commit (_publish_user_ids), so a rollback can't leave a dangling id behind.
+_user_ids: "OrderedDict[str, uuid.UUID]" = OrderedDict()
+user_id_cache_stats = {"hits": 0, "misses": 0}
+
+# Set in a session that inserted user rows: {address: id}, cached on commit.
+NEW_USER_IDS = "new_user_ids"
+
+
+def _user_upsert(wallet_address: str):
+    """INSERT the user unless the address already has one, RETURNING its id
+    (no row when it already existed)."""
+    return (
+        pg_insert(User)
+        .values(id=uuid.uuid4(), wallet_address=wallet_address,
+                kyc_status=KycStatus.NONE, created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=[User.wallet_address])
+        .returning(User.id)
+    )
+
+
+def _remember_user_id(wallet_address: str, user_id: uuid.UUID) -> None:
+    _user_ids[wallet_address] = user_id
+    _user_ids.move_to_end(wallet_address)
+    if len(_user_ids) > USER_ID_CACHE_SIZE:
+        _user_ids.popitem(last=False)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_user_ids(session) -> None:
+    for wallet_address, user_id in session.info.pop(NEW_USER_IDS, {}).items():
+        _remember_user_id(wallet_address, user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_user_ids(session) -> None:
+    session.info.pop(NEW_USER_IDS, None)
+
+
+def user_id_cache_info() -> dict:
+    return {"size": len(_user_ids), "capacity": USER_ID_CACHE_SIZE, **user_id_cache_stats}
+
+
+async def user_id_for(session: AsyncSession, wallet_address: str) -> uuid.UUID:
+    """The User id for a wallet address, creating the row lazily.
 
     The legacy QueueEntry/Withdrawal tables key off `address` directly. New
     tables (Win, Card, Shipment, LedgerEntry) FK to User. This is the
-    bridge — call it any time you need a user row for a wallet.
+    bridge — call it any time you need a user for a wallet.
+
+    Served from the in-process cache when it can be; otherwise one statement
+    (INSERT ... ON CONFLICT DO NOTHING, falling back to the existing row), so
+    two first requests from the same wallet can't race each other into a
+    unique-violation.
     """
-    res = await session.execute(
-        select(User).where(User.wallet_address == wallet_address)
-    )
-    user = res.scalar_one_or_none()
-    if user is None:
-        user = User(wallet_address=wallet_address)
-        session.add(user)
-        await session.flush()
-    return user
+    user_id = _user_ids.get(wallet_address)
+    if user_id is not None:
+        user_id_cache_stats["hits"] += 1
+        _user_ids.move_to_end(wallet_address)
+        return user_id
+    user_id_cache_stats["misses"] += 1
+
+    new_user = _user_upsert(wallet_address).cte("new_user")
+    row = (await session.execute(
+        select(new_user.c.id, literal(True).label("created"))
+        .union_all(
+            select(User.id, literal(False))
+            .where(User.wallet_address == wallet_address)
+        )
+    )).first()
+    if row is None:
+        # Another transaction inserted it after this statement's snapshot was
+        # taken: ON CONFLICT waited for it to commit, the fallback couldn't see
+        # it. A fresh statement can.
+        row = (await session.execute(
+            select(User.id, literal(False)).where(User.wallet_address == wallet_address)
+        )).one()
+    user_id, created = row
+    if created:
+        session.info.setdefault(NEW_USER_IDS, {})[wallet_address] = user_id
+    else:
+        _remember_user_id(wallet_address, user_id)
+    return user_id
 
 
 # ─── Machine fitness ────────────────────────────────────────────────────
@@ -122,143 +209,192 @@ async def unclaimable_loaded_balls(session: AsyncSession) -> list[dict]:
 
 # ─── Win creation (at grab time) ────────────────────────────────────────
 
-async def reserve_win(
+class RecordedWin(NamedTuple):
+    """What the player is told about a win they just made (player_win)."""
+    id: uuid.UUID
+    prize_kind: PrizeKind
+    expires_at: datetime
+    resell_price_cents: int
+
+
+async def record_win(
     session: AsyncSession,
     *,
-    ball_serial: str,
-    wallet_address: str,
-    queue_entry_id: int,
-) -> Win:
-    """Called when the claw confirms a grab.
+    queue_key: str,
+    ball_serial: Optional[str],
+    wallet_address: Optional[str],
+) -> Optional[RecordedWin]:
+    """Called when the chute confirms a winning grab: the whole win, in the
+    caller's transaction, in two statements.
 
     Pre-conditions assumed by the caller:
     - The RFID secret + prize_id read from the ball has been verified
       against its on-chain commitment.
-    - The QueueEntry exists and corresponds to this player's turn.
-
-    Atomically:
-    - Marks the ball GRABBED.
-    - For BOOSTER_PAIR: reserves the bound OpenedBooster (single-row) and
-      confirms a sealed pack of the same SKU is in stock (ClosedBooster
-      is a per-SKU availability flag — fungible, nothing to decrement).
-    - For SINGLE_CARD: reserves the bound Card.
-    - Creates the Win row in PENDING with a 30d expiry, snapshotting the
-      resell price computed from the ball's bound prize.
-
-    Does NOT flip QueueEntry.win — that stays driven by the on-chain
-    PlayerWin event handled in listeners.py, which is the authoritative
-    on-chain confirmation.
-
-    Raises PoolExhausted if any required inventory is missing — the caller
-    should refund the bet (BET_REFUND ledger entry) per its own policy.
+    - `queue_key` is the key of the turn that fired the arm.
+
+    1. One statement (data-modifying CTEs): flags the turn's QueueEntry as won,
+       marks the ball LOADED -> GRABBED (its prize kind and binding come back
+       via RETURNING), and resolves the winner's user id, inserting the row if
+       it's new.
+    2. Inside a SAVEPOINT, one more: reserves the bound prize and inserts the
+       Win with it, PENDING with a 30d expiry and the resell price snapshotted.
+       - BOOSTER_PAIR: the OpenedBooster goes AVAILABLE -> RESERVED, but only
+         while a sealed pack of its SKU is in stock (ClosedBooster is a per-SKU
+         availability flag — fungible, nothing to decrement).
+       - SINGLE_CARD: the Card goes IN_POOL -> RESERVED.
+
+    The ball has physically fallen down the chute — that is a fact about the
+    world, not a consequence of the prize bookkeeping working out. So a failure
+    in step 2 (PoolExhausted, a constraint violation, anything but a dead
+    connection) rolls back to the savepoint only and surfaces as PoolExhausted:
+    the caller still commits the won flag and GRABBED. Otherwise the database
+    would insist a ball is in the machine that is sitting in the prize bin —
+    counted as available, and awardable a second time if its serial is ever
+    read again. GRABBED also
+    keeps the double-grab guard: a second verdict for the same serial finds no
+    LOADED ball and raises BallNotAvailable.
+
+    Returns None, having recorded what it could, when there is no ball or
+    winner to reserve for or no QueueEntry for the key. Raises PoolExhausted if
+    the prize is gone — the caller should refund the bet (BET_REFUND ledger
+    entry) per its own policy. Either way the caller commits.
     """
-    res = await session.execute(
-        select(Ball).where(Ball.serial == ball_serial).with_for_update()
+    _inventory_changed(session)
+    entry = (
+        update(QueueEntry).where(QueueEntry.key == queue_key).values(win=True)
+        .returning(QueueEntry.id).cte("entry")
+    )
+    if not (ball_serial and wallet_address):
+        await session.execute(select(entry.c.id))
+        return None
+
+    grabbed = (
+        update(Ball)
+        .where(Ball.serial == ball_serial, Ball.status == BallStatus.LOADED)
+        .values(status=BallStatus.GRABBED)
+        .returning(Ball.id, Ball.prize_kind, Ball.opened_booster_id, Ball.prize_card_id)
+        .cte("grabbed")
     )
-    ball: Optional[Ball] = res.scalar_one_or_none()
-    if ball is None or ball.status != BallStatus.LOADED:
+    new_user = _user_upsert(wallet_address).cte("new_user")
+    row = (await session.execute(
+        select(
+            select(entry.c.id).scalar_subquery().label("entry_id"),
+            grabbed.c.id.label("ball_id"),
+            grabbed.c.prize_kind,
+            grabbed.c.opened_booster_id,
+            grabbed.c.prize_card_id,
+            func.coalesce(
+                select(new_user.c.id).scalar_subquery(),
+                select(User.id).where(User.wallet_address == wallet_address).scalar_subquery(),
+            ).label("user_id"),
+        ).select_from(grabbed)
+    )).one_or_none()
+    if row is None:
         raise BallNotAvailable(f"Ball {ball_serial} is not LOADED")
-
-    user = await get_or_create_user(session, wallet_address)
-
-    # The ball has physically fallen down the chute — that is a fact about the
-    # world, not a consequence of the prize bookkeeping working out. Commit it
-    # on its own, BEFORE we try to reserve the prize.
-    #
-    # Otherwise any failure below (PoolExhausted, a constraint violation, a
-    # transient DB error — everything the caller's `except Exception` catches)
-    # rolls the whole transaction back and returns the ball to LOADED. The
-    # database would then insist a ball is in the machine that is sitting in the
-    # prize bin: it gets counted as available, and could be awarded a second
-    # time if its serial is ever read again.
-    #
-    # Committing here also strengthens the double-grab guard: a concurrent
-    # reserve_win for the same serial now sees GRABBED and raises BallNotAvailable.
-    ball.status = BallStatus.GRABBED
-    await session.commit()
-
-    if ball.prize_kind == PrizeKind.BOOSTER_PAIR:
-        opened_id = ball.opened_booster_id
-        r1 = await session.execute(
-            update(OpenedBooster)
-            .where(
-                OpenedBooster.id == opened_id,
-                OpenedBooster.status == InventoryStatus.AVAILABLE,
-            )
-            .values(status=InventoryStatus.RESERVED)
-        )
-        if r1.rowcount == 0:
-            raise PoolExhausted(f"OpenedBooster {opened_id} not available")
-
-        sku = (await session.execute(
-            select(OpenedBooster.sku).where(OpenedBooster.id == opened_id)
-        )).scalar_one()
-
-        # Sealed packs are fungible-by-SKU: just confirm we still have one of
-        # this SKU to ship. No per-unit reservation — ClosedBooster is an
-        # availability flag the operator manages by hand.
-        in_stock = await session.scalar(
-            select(ClosedBooster.in_stock).where(ClosedBooster.sku == sku)
-        )
-        if not in_stock:
-            raise PoolExhausted(f"No sealed pack in stock for SKU {sku}")
-
-        win = Win(
-            user_id=user.id,
-            queue_entry_id=queue_entry_id,
-            ball_id=ball.id,
-            prize_kind=ball.prize_kind,
-            expires_at=_expiry_from_now(),
-            resell_price_cents=_booster_resell_price(sku),
+    if row.entry_id is None:
+        log.warning("record_win: no QueueEntry for key %s — ball %s marked GRABBED, no Win",
+                    queue_key, ball_serial)
+        return None
+
+    win = dict(
+        id=uuid.uuid4(),
+        user_id=row.user_id,
+        queue_entry_id=row.entry_id,
+        ball_id=row.ball_id,
+        prize_kind=row.prize_kind,
+        status=WinStatus.PENDING,
+        expires_at=_expiry_from_now(),
+        created_at=datetime.utcnow(),
+    )
+    try:
+        async with session.begin_nested():
+            if row.prize_kind == PrizeKind.BOOSTER_PAIR:
+                price = await _reserve_booster(session, row.opened_booster_id, win)
+            else:
+                price = await _reserve_card(session, row.prize_card_id, win)
+    except OperationalError:
+        raise
+    except SQLAlchemyError as e:
+        # Rolled back to the savepoint; the caller commits GRABBED all the same.
+        raise PoolExhausted(f"Reserving the prize of ball {ball_serial} failed: {e}") from e
+    return RecordedWin(win["id"], row.prize_kind, win["expires_at"], price)
+
+
+def _insert_win(win: dict, source, price, **extra):
+    """INSERT INTO win ... SELECT from `source` (a reservation CTE), so no
+    Win is written unless the reservation matched a row."""
+    values = {**win, **extra}
+    columns = [Win.__table__.c[name] for name in values] + [Win.__table__.c.resell_price_cents]
+    return (
+        insert(Win)
+        .from_select(
+            [c.name for c in columns],
+            select(*[literal(v, Win.__table__.c[k].type) for k, v in values.items()], price)
+            .select_from(source),
         )
-        session.add(win)
-        await session.flush()  # populate win.id
+        .returning(Win.resell_price_cents)
+        .cte("new_win")
+    )
 
-        await session.execute(
-            update(OpenedBooster)
-            .where(OpenedBooster.id == opened_id)
-            .values(reserved_by_win_id=win.id)
+
+async def _reserve_booster(session: AsyncSession, opened_id, win: dict) -> int:
+    reserved = (
+        update(OpenedBooster)
+        .where(
+            OpenedBooster.id == opened_id,
+            OpenedBooster.status == InventoryStatus.AVAILABLE,
+            ClosedBooster.sku == OpenedBooster.sku,
+            ClosedBooster.in_stock.is_(True),
         )
-        return win
-
-    # SINGLE_CARD
-    card_id = ball.prize_card_id
-    card_row = (await session.execute(
-        select(Card).where(Card.id == card_id)
-    )).scalar_one_or_none()
-    if card_row is None:
-        raise PoolExhausted(f"Card {card_id} not found")
-    r = await session.execute(
+        .values(status=InventoryStatus.RESERVED, reserved_by_win_id=win["id"])
+        .returning(OpenedBooster.sku)
+        .cte("reserved")
+    )
+    new_win = _insert_win(win, reserved, _booster_resell_price(reserved.c.sku))
+    price = await session.scalar(select(new_win.c.resell_price_cents))
+    if price is not None:
+        return price
+
+    # Say which precondition failed; this path is rare, so it can afford the read.
+    status, in_stock, sku = (await session.execute(
+        select(OpenedBooster.status, ClosedBooster.in_stock, OpenedBooster.sku)
+        .outerjoin(ClosedBooster, ClosedBooster.sku == OpenedBooster.sku)
+        .where(OpenedBooster.id == opened_id)
+    )).one_or_none() or (None, None, None)
+    if status != InventoryStatus.AVAILABLE:
+        raise PoolExhausted(f"OpenedBooster {opened_id} not available")
+    raise PoolExhausted(f"No sealed pack in stock for SKU {sku}")
+
+
+async def _reserve_card(session: AsyncSession, card_id, win: dict) -> int:
+    reserved = (
         update(Card)
         .where(Card.id == card_id, Card.status == CardStatus.IN_POOL)
         .values(status=CardStatus.RESERVED)
+        .returning(Card.card_type_id)
+        .cte("reserved")
     )
-    if r.rowcount == 0:
+    source = reserved.outerjoin(CardType, CardType.id == reserved.c.card_type_id)
+    new_win = _insert_win(win, source, _card_resell_price(CardType.rarity),
+                          prize_card_id=card_id)
+    price = await session.scalar(select(new_win.c.resell_price_cents))
+    if price is None:
         raise PoolExhausted(f"Card {card_id} not available")
-
-    win = Win(
-        user_id=user.id,
-        queue_entry_id=queue_entry_id,
-        ball_id=ball.id,
-        prize_kind=ball.prize_kind,
-        expires_at=_expiry_from_now(),
-        resell_price_cents=_card_resell_price(card_row),
-        prize_card_id=card_id,
-    )
-    session.add(win)
-    await session.flush()
-    return win
+    return price
 
 
-def _booster_resell_price(sku: str) -> int:
-    return RESELL_PRICE_BY_BOOSTER_SKU_CENTS.get(
-        sku, RESELL_PRICE_BY_BOOSTER_SKU_CENTS["default"]
-    )
+def _booster_resell_price(sku):
+    """Resell price (cents) of a booster SKU, as SQL over a sku column."""
+    default = RESELL_PRICE_BY_BOOSTER_SKU_CENTS["default"]
+    by_sku = {k: v for k, v in RESELL_PRICE_BY_BOOSTER_SKU_CENTS.items() if k != "default"}
+    return case(by_sku, value=sku, else_=default) if by_sku else literal(default)
 
 
-def _card_resell_price(card: Card) -> int:
-    ct = card.card_type
-    return RESELL_PRICE_BY_RARITY_CENTS.get(ct.rarity.value, 0) if ct and ct.rarity else 0
+def _card_resell_price(rarity):
+    """Resell price (cents) of a card, as SQL over its card_type.rarity
+    column; 0 for an unpriced rarity or a card with no type."""
+    prices = {CardRarity(k): v for k, v in RESELL_PRICE_BY_RARITY_CENTS.items()}
+    return func.coalesce(case(prices, value=rarity, else_=0), 0)
 
 
 # ─── Booster-pair settlements ───────────────────────────────────────────
@@ -267,6 +403,7 @@ async def open_booster_win(session: AsyncSession, win_id: uuid.UUID) -> None:
     """User opens a booster digitally — consume the opened (filmed) booster and
     transfer its cards to the user's collection. The sealed pack stays in the
     SKU pool (nothing to release — availability is operator-managed)."""
+    _inventory_changed(session)
     win = await _load_pending_booster_win(session, win_id)
 
     await session.execute(
@@ -297,6 +434,7 @@ async def ship_booster_win(
     win_id: uuid.UUID,
     address: ShippingAddress,
 ) -> Shipment:
+    _inventory_changed(session)
     win = await _load_pending_booster_win(session, win_id)
     # Capture the SKU before releasing the opened booster — it's what the
     # operator physically pulls and mails.
@@ -325,6 +463,7 @@ async def _settle_booster_as_resell(
     win_id: uuid.UUID,
     settled_by: SettlementKind,
 ) -> None:
+    _inventory_changed(session)
     win = await _load_pending_booster_win(session, win_id)
 
     await session.execute(
@@ -332,7 +471,7 @@ async def _settle_booster_as_resell(
         .where(OpenedBooster.id == win.opened_booster.id)
         .values(status=InventoryStatus.AVAILABLE, reserved_by_win_id=None)
     )
-    session.add(LedgerEntry(
+    await balances.post(session, LedgerEntry(
         user_id=win.user_id,
         kind=(LedgerKind.AUTO_RESELL if settled_by == SettlementKind.AUTO_RESELL else LedgerKind.RESELL),
         amount_cents=win.resell_price_cents,
@@ -349,6 +488,7 @@ async def _settle_booster_as_resell(
 # ─── Single-card settlements ────────────────────────────────────────────
 
 async def keep_card_win(session: AsyncSession, win_id: uuid.UUID) -> None:
+    _inventory_changed(session)
     win = await _load_pending_card_win(session, win_id)
     await session.execute(
         update(Card)
@@ -373,6 +513,7 @@ async def ship_card_win(
     win_id: uuid.UUID,
     address: ShippingAddress,
 ) -> Shipment:
+    _inventory_changed(session)
     win = await _load_pending_card_win(session, win_id)
 
     shipment = Shipment(user_id=win.user_id, shipping_address=dict(address))
@@ -402,12 +543,13 @@ async def _settle_card_as_resell(
     win_id: uuid.UUID,
     settled_by: SettlementKind,
 ) -> None:
+    _inventory_changed(session)
     win = await _load_pending_card_win(session, win_id)
 
     await session.execute(
         update(Card).where(Card.id == win.prize_card_id).values(status=CardStatus.IN_POOL)
     )
-    session.add(LedgerEntry(
+    await balances.post(session, LedgerEntry(
         user_id=win.user_id,
         kind=(LedgerKind.AUTO_RESELL if settled_by == SettlementKind.AUTO_RESELL else LedgerKind.RESELL),
         amount_cents=win.resell_price_cents,
@@ -430,6 +572,7 @@ async def ship_card_from_collection(
     user_id: uuid.UUID,
     address: ShippingAddress,
 ) -> Shipment:
+    _inventory_changed(session)
     card = await session.get(Card, card_id)
     if card is None:
         raise CardNotActionable(f"Card {card_id} not found")
@@ -457,6 +600,7 @@ async def resell_card_from_collection(
     user_id: uuid.UUID,
     resell_price_cents: int,
 ) -> None:
+    _inventory_changed(session)
     card = await session.get(Card, card_id)
     if card is None:
         raise CardNotActionable(f"Card {card_id} not found")
@@ -468,7 +612,7 @@ async def resell_card_from_collection(
     await session.execute(
         update(Card).where(Card.id == card_id).values(status=CardStatus.RESOLD)
     )
-    session.add(LedgerEntry(
+    await balances.post(session, LedgerEntry(
         user_id=user_id,
         kind=LedgerKind.CARD_RESELL,
         amount_cents=resell_price_cents,
@@ -481,6 +625,7 @@ async def void_ball(session: AsyncSession, ball_id: uuid.UUID) -> None:
     """Operator-side. Releases the bound prize back to the pool. The ball's
     secret should be published off-chain alongside this call so anyone
     tracking commitments can verify the prize wasn't reassigned silently."""
+    _inventory_changed(session)
     ball = await session.get(Ball, ball_id)
     if ball is None:
         raise BallNotAvailable(f"Ball {ball_id} not found")
@@ -1,7 +1,7 @@
 "use client";
 
 import { useCallback, useEffect, useState } from "react";
-import { apiFetch, ApiError } from "@/lib/api";
+import { apiEvents, apiFetch, ApiError, pagePath, type Page } from "@/lib/api";
 import { Help } from "@/components/HelpTip";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
@@ -56,17 +56,26 @@ type CardRow = {
 
 export default function BallsPage() {
   const [balls, setBalls] = useState<Ball[] | null>(null);
+  const [total, setTotal] = useState<number | null>(null);
+  const [next, setNext] = useState<string | null>(null);
   const [error, setError] = useState<string | null>(null);
   const [bindOpen, setBindOpen] = useState(false);
   const [bindCardOpen, setBindCardOpen] = useState(false);
   const [enrollOpen, setEnrollOpen] = useState(false);
+  const [batchOpen, setBatchOpen] = useState(false);
   const [voiding, setVoiding] = useState<string | null>(null);
   const [hideVoided, setHideVoided] = useState(true);
 
+  // The first page again, and the total; "Load more" appends the rest.
   const refresh = useCallback(async () => {
     try {
-      const r = await apiFetch<{ balls: Ball[] }>("/admin/balls");
+      const [r, c] = await Promise.all([
+        apiFetch<{ balls: Ball[] } & Page>("/admin/balls"),
+        apiFetch<{ count: number }>("/admin/balls/count"),
+      ]);
       setBalls(r.balls);
+      setNext(r.next_cursor);
+      setTotal(c.count);
       setError(null);
     } catch (e) {
       setError(e instanceof ApiError ? e.message : String(e));
@@ -74,6 +83,18 @@ export default function BallsPage() {
     }
   }, []);
 
+  const loadMore = async () => {
+    try {
+      const r = await apiFetch<{ balls: Ball[] } & Page>(
+        pagePath("/admin/balls", next),
+      );
+      setBalls((prev) => [...(prev ?? []), ...r.balls]);
+      setNext(r.next_cursor);
+    } catch (e) {
+      setError(e instanceof ApiError ? e.message : String(e));
+    }
+  };
+
   useEffect(() => {
     refresh();
   }, [refresh]);
@@ -116,6 +137,9 @@ export default function BallsPage() {
           <Button variant="outline" onClick={() => setEnrollOpen(true)}>
             Add ball physically
           </Button>
+          <Button variant="outline" onClick={() => setBatchOpen(true)}>
+            Load balls in bulk
+          </Button>
           <Button variant="outline" onClick={() => setBindCardOpen(true)}>
             Bind card
           </Button>
@@ -129,7 +153,9 @@ export default function BallsPage() {
             <CardTitle className="text-base">
               {balls === null
                 ? "Loading…"
-                : `${visible.length} balls${
+                : `${visible.length}${
+                    total !== null && next ? ` of ${total}` : ""
+                  } balls${
                     hideVoided && voidedCount
                       ? ` · ${voidedCount} voided hidden`
                       : ""
@@ -197,6 +223,13 @@ export default function BallsPage() {
               </Table>
             )
           )}
+          {next && (
+            <div className="mt-4 flex justify-center">
+              <Button variant="outline" size="sm" onClick={loadMore}>
+                Load more
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
 
@@ -226,6 +259,12 @@ export default function BallsPage() {
           refresh();
         }}
       />
+
+      <BatchEnrollDialog
+        open={batchOpen}
+        onClose={() => setBatchOpen(false)}
+        onBound={refresh}
+      />
     </div>
   );
 }
@@ -442,6 +481,272 @@ function EnrollDialog({
   );
 }
 
+type EnrollBatch = {
+  cabinet: string;
+  scanning: boolean;
+  stopped_reason: string | null;
+  queued: string[];
+  already_enrolled: number;
+};
+
+type BatchEvent = {
+  batch: EnrollBatch;
+  serial?: string;
+  queued?: boolean;
+};
+
+function BatchEnrollDialog({
+  open,
+  onClose,
+  onBound,
+}: {
+  open: boolean;
+  onClose: () => void;
+  onBound: () => void;
+}) {
+  // The batch lives on the backend: closing the dialog keeps it (and its
+  // queue), reopening resumes it. Scans are pushed over the event stream.
+  const [batch, setBatch] = useState<EnrollBatch | null>(null);
+  const [lastScan, setLastScan] = useState<string | null>(null);
+  const [kind, setKind] = useState<"boosters" | "cards">("boosters");
+  const [boosters, setBoosters] = useState<OpenedBooster[]>([]);
+  const [cards, setCards] = useState<CardRow[]>([]);
+  const [chosen, setChosen] = useState<string[]>([]);
+  const [busy, setBusy] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+
+  const fail = (e: unknown) =>
+    setError(e instanceof ApiError ? e.message : String(e));
+
+  // Start (or resume) scanning, then follow the batch until the dialog closes.
+  useEffect(() => {
+    if (!open) {
+      setBatch(null);
+      setLastScan(null);
+      setChosen([]);
+      setError(null);
+      return;
+    }
+    const stream = new AbortController();
+    (async () => {
+      try {
+        const r = await apiFetch<{ batch: EnrollBatch }>(
+          "/admin/balls/enroll/batch",
+          { method: "POST" },
+        );
+        setBatch(r.batch);
+        await apiEvents(
+          "/admin/balls/enroll/batch/events",
+          (event, data) => {
+            const e = data as BatchEvent;
+            setBatch(event === "closed" ? null : e.batch);
+            if (event === "scan" && e.serial) {
+              setLastScan(
+                e.queued ? e.serial : `${e.serial} (already enrolled)`,
+              );
+            }
+          },
+          stream.signal,
+        );
+      } catch (e) {
+        if (!stream.signal.aborted) fail(e);
+      }
+    })();
+    return () => stream.abort();
+  }, [open]);
+
+  useEffect(() => {
+    if (!open) return;
+    setChosen([]);
+    const load =
+      kind === "boosters"
+        ? apiFetch<{ opened_boosters: OpenedBooster[] }>(
+            "/admin/inventory/opened-boosters?bindable=true&limit=500",
+          ).then((r) => setBoosters(r.opened_boosters))
+        : apiFetch<{ cards: CardRow[] }>(
+            "/admin/inventory/cards?status=IN_POOL&limit=500",
+          ).then((r) => setCards(r.cards));
+    load.catch(fail);
+  }, [open, kind]);
+
+  const act = async (path: string, method: string) => {
+    setBusy(true);
+    setError(null);
+    try {
+      await apiFetch(path, { method });
+    } catch (e) {
+      fail(e);
+    } finally {
+      setBusy(false);
+    }
+  };
+
+  const bind = async () => {
+    setBusy(true);
+    setError(null);
+    try {
+      await apiFetch("/admin/balls/enroll/batch/commit", {
+        method: "POST",
+        body: JSON.stringify(
+          kind === "boosters"
+            ? { opened_booster_ids: chosen }
+            : { card_ids: chosen },
+        ),
+      });
+      setChosen([]);
+      setBoosters((prev) => prev.filter((b) => !chosen.includes(b.id)));
+      setCards((prev) => prev.filter((c) => !chosen.includes(c.id)));
+      onBound();
+    } catch (e) {
+      fail(e);
+    } finally {
+      setBusy(false);
+    }
+  };
+
+  const queued = batch?.queued.length ?? 0;
+  const options =
+    kind === "boosters"
+      ? boosters.map((b) => ({ id: b.id, label: b.sku }))
+      : cards.map((c) => ({
+          id: c.id,
+          label: `${c.set} ${c.number} · ${c.rarity}`,
+        }));
+  const toggle = (id: string) =>
+    setChosen((prev) =>
+      prev.includes(id)
+        ? prev.filter((x) => x !== id)
+        : prev.length < queued
+          ? [...prev, id]
+          : prev,
+    );
+
+  return (
+    <Dialog open={open} onOpenChange={(o) => !o && onClose()}>
+      <DialogHeader>
+        <DialogTitle>Load balls in bulk</DialogTitle>
+        <DialogDescription>
+          Present the tags to the antenna one after another; each new one is
+          queued. Then pick prizes: the oldest queued balls are bound to them,
+          in order. The cabinet takes no turns while scanning.
+        </DialogDescription>
+      </DialogHeader>
+
+      <div className="space-y-3">
+        <div className="flex items-center justify-between text-sm">
+          <span>
+            {batch === null
+              ? "Starting…"
+              : batch.scanning
+                ? "Scanning…"
+                : `Stopped (${batch.stopped_reason ?? "—"})`}
+          </span>
+          <span className="text-muted-foreground">
+            {queued} queued
+            {batch?.already_enrolled
+              ? ` · ${batch.already_enrolled} already enrolled`
+              : ""}
+          </span>
+        </div>
+        {lastScan && (
+          <p className="font-mono text-sm">Last scan: {lastScan}</p>
+        )}
+        {queued > 0 && (
+          <p className="max-h-16 overflow-y-auto font-mono text-xs text-muted-foreground">
+            {batch?.queued.join(" · ")}
+          </p>
+        )}
+
+        <div className="flex items-center gap-2 text-sm">
+          <select
+            value={kind}
+            onChange={(e) => setKind(e.target.value as "boosters" | "cards")}
+            className="h-9 rounded-md border border-input bg-background px-2 text-sm"
+          >
+            <option value="boosters">Opened boosters</option>
+            <option value="cards">Single cards</option>
+          </select>
+          <span className="text-muted-foreground">
+            {chosen.length} of {queued} chosen
+          </span>
+          <Button
+            type="button"
+            variant="outline"
+            size="sm"
+            onClick={() =>
+              setChosen(options.slice(0, queued).map((o) => o.id))
+            }
+            disabled={!queued}
+          >
+            First {queued}
+          </Button>
+        </div>
+        <div className="max-h-48 space-y-1 overflow-y-auto rounded-md border border-input p-2">
+          {options.length === 0 ? (
+            <p className="text-xs text-muted-foreground">Nothing bindable.</p>
+          ) : (
+            options.map((o) => (
+              <label
+                key={o.id}
+                className="flex cursor-pointer items-center gap-2 text-xs"
+              >
+                <input
+                  type="checkbox"
+                  checked={chosen.includes(o.id)}
+                  onChange={() => toggle(o.id)}
+                />
+                <span className="font-mono">{o.label}</span>
+                <span className="text-muted-foreground">{o.id.slice(0, 8)}</span>
+              </label>
+            ))
+          )}
+        </div>
+        {error && <p className="text-sm text-destructive">{error}</p>}
+      </div>
+
+      <DialogFooter>
+        <Button
+          type="button"
+          variant="outline"
+          onClick={async () => {
+            await act("/admin/balls/enroll/batch", "DELETE");
+            onClose();
+          }}
+          disabled={busy}
+        >
+          Discard batch
+        </Button>
+        {batch?.scanning ? (
+          <Button
+            type="button"
+            variant="outline"
+            onClick={() => act("/admin/balls/enroll/batch/stop", "POST")}
+            disabled={busy}
+          >
+            Stop scanning
+          </Button>
+        ) : (
+          <Button
+            type="button"
+            variant="outline"
+            onClick={() => act("/admin/balls/enroll/batch", "POST")}
+            disabled={busy || batch === null}
+          >
+            Resume scanning
+          </Button>
+        )}
+        <Button
+          type="button"
+          onClick={bind}
+          disabled={busy || chosen.length === 0}
+        >
+          Bind {chosen.length || ""}
+        </Button>
+      </DialogFooter>
+    </Dialog>
+  );
+}
+
 function BindDialog({
   open,
   onClose,
@@ -467,7 +772,7 @@ function BindDialog({
       return;
     }
     apiFetch<{ opened_boosters: OpenedBooster[] }>(
-      "/admin/inventory/opened-boosters?bindable=true",
+      "/admin/inventory/opened-boosters?bindable=true&limit=500",
     )
       .then((r) => setObs(r.opened_boosters))
       .catch((e) => setError(e instanceof ApiError ? e.message : String(e)));
@@ -568,8 +873,8 @@ function BindCardDialog({
   const [submitting, setSubmitting] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
-  // Fetch IN_POOL cards when the dialog opens. The cards endpoint returns the
-  // whole pool (capped); filter to bindable ones client-side.
+  // Fetch IN_POOL cards when the dialog opens: the first (largest) page of the
+  // pool, filtered server-side.
   useEffect(() => {
     if (!open) {
       setSerial("");
@@ -577,8 +882,10 @@ function BindCardDialog({
       setError(null);
       return;
     }
-    apiFetch<{ cards: CardRow[] }>("/admin/inventory/cards")
-      .then((r) => setCards(r.cards.filter((c) => c.status === "IN_POOL")))
+    apiFetch<{ cards: CardRow[] }>(
+      "/admin/inventory/cards?status=IN_POOL&limit=500",
+    )
+      .then((r) => setCards(r.cards))
       .catch((e) => setError(e instanceof ApiError ? e.message : String(e)));
   }, [open]);
 
@@ -1,7 +1,7 @@
 "use client";
 
 import { useCallback, useEffect, useState } from "react";
-import { apiFetch, ApiError } from "@/lib/api";
+import { apiFetch, ApiError, pagePath, type Page } from "@/lib/api";
 import { uploadAsset } from "@/lib/upload";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
@@ -112,6 +112,10 @@ export default function InventoryPage() {
   const [opened, setOpened] = useState<OpenedBooster[] | null>(null);
   const [closed, setClosed] = useState<ClosedBooster[] | null>(null);
   const [cards, setCards] = useState<CardRow[] | null>(null);
+  // The opened and card-type lists are paged: the current tab's total, and
+  // where its next page starts.
+  const [total, setTotal] = useState<number | null>(null);
+  const [next, setNext] = useState<string | null>(null);
   const [error, setError] = useState<string | null>(null);
 
   const [newOpen, setNewOpen] = useState(false);
@@ -140,20 +144,27 @@ export default function InventoryPage() {
   );
 
   const refresh = useCallback(async () => {
+    // The cursor belongs to the tab it came from.
+    setNext(null);
     try {
       if (tab === "opened") {
         // Also load the closed-booster catalog so the create/edit dialog's
         // picker is populated on this tab.
-        const [r, cb, ct] = await Promise.all([
-          apiFetch<{ opened_boosters: OpenedBooster[] }>(
+        const [r, c, cb, ct] = await Promise.all([
+          apiFetch<{ opened_boosters: OpenedBooster[] } & Page>(
             "/admin/inventory/opened-boosters",
           ),
+          apiFetch<{ count: number }>("/admin/inventory/opened-boosters/count"),
           apiFetch<{ closed_boosters: ClosedBooster[] }>(
             "/admin/inventory/closed-boosters",
           ),
-          apiFetch<{ card_types: CardRow[] }>("/admin/inventory/card-types"),
+          apiFetch<{ card_types: CardRow[] }>(
+            "/admin/inventory/card-types?limit=500",
+          ),
         ]);
         setOpened(r.opened_boosters);
+        setNext(r.next_cursor);
+        setTotal(c.count);
         setClosed(cb.closed_boosters);
         setCards(ct.card_types);
       } else if (tab === "closed") {
@@ -161,11 +172,18 @@ export default function InventoryPage() {
           "/admin/inventory/closed-boosters",
         );
         setClosed(r.closed_boosters);
+        setNext(null);
+        setTotal(r.closed_boosters.length);
       } else {
-        const r = await apiFetch<{ card_types: CardRow[] }>(
-          "/admin/inventory/card-types",
-        );
+        const [r, c] = await Promise.all([
+          apiFetch<{ card_types: CardRow[] } & Page>(
+            "/admin/inventory/card-types",
+          ),
+          apiFetch<{ count: number }>("/admin/inventory/card-types/count"),
+        ]);
         setCards(r.card_types);
+        setNext(r.next_cursor);
+        setTotal(c.count);
       }
       setError(null);
     } catch (e) {
@@ -177,7 +195,27 @@ export default function InventoryPage() {
     refresh();
   }, [refresh]);
 
-  const count =
+  const loadMore = async () => {
+    try {
+      if (tab === "opened") {
+        const r = await apiFetch<{ opened_boosters: OpenedBooster[] } & Page>(
+          pagePath("/admin/inventory/opened-boosters", next),
+        );
+        setOpened((prev) => [...(prev ?? []), ...r.opened_boosters]);
+        setNext(r.next_cursor);
+      } else if (tab === "cards") {
+        const r = await apiFetch<{ card_types: CardRow[] } & Page>(
+          pagePath("/admin/inventory/card-types", next),
+        );
+        setCards((prev) => [...(prev ?? []), ...r.card_types]);
+        setNext(r.next_cursor);
+      }
+    } catch (e) {
+      setError(e instanceof ApiError ? e.message : String(e));
+    }
+  };
+
+  const shown =
     tab === "opened"
       ? opened?.length
       : tab === "closed"
@@ -222,7 +260,11 @@ export default function InventoryPage() {
         <CardHeader>
           <div className="flex items-center gap-2">
             <CardTitle className="text-base">
-              {count === undefined ? "Loading…" : `${count} rows`}
+              {shown === undefined || total === null
+                ? "Loading…"
+                : next
+                  ? `${shown} of ${total} rows`
+                  : `${shown} rows`}
             </CardTitle>
             {tab === "opened" && <Help term="opened-booster" />}
             {tab === "closed" && <Help term="closed-booster" />}
@@ -363,6 +405,13 @@ export default function InventoryPage() {
               </TableBody>
             </Table>
           )}
+          {next && tab !== "closed" && (
+            <div className="mt-4 flex justify-center">
+              <Button variant="outline" size="sm" onClick={loadMore}>
+                Load more
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
 
@@ -1067,6 +1116,13 @@ const IMPORT_EXAMPLE = `[
   { "type": "opened_booster", "closed_booster_sku": "pkmn-151", "video_url": "https://…/151.mp4" }
 ]`;
 
+type ImportResult = {
+  dry_run: boolean;
+  counts: Record<string, number>;
+  error_count: number;
+  errors: { line: number; error: string }[];
+};
+
 function ImportDialog({
   open,
   onClose,
@@ -1077,18 +1133,51 @@ function ImportDialog({
   onDone: () => void;
 }) {
   const [text, setText] = useState("");
+  // An NDJSON or CSV file is uploaded as is (streamed and checked row by
+  // row); pasted JSON goes in all-or-nothing.
+  const [file, setFile] = useState<File | null>(null);
+  const [result, setResult] = useState<ImportResult | null>(null);
   const [submitting, setSubmitting] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
     if (!open) {
       setText("");
+      setFile(null);
+      setResult(null);
       setError(null);
       setSubmitting(false);
     }
   }, [open]);
 
+  const upload = async (dryRun: boolean) => {
+    if (!file) return;
+    setError(null);
+    setSubmitting(true);
+    try {
+      const r = await apiFetch<ImportResult>(
+        `/admin/inventory/import?dry_run=${dryRun}`,
+        {
+          method: "POST",
+          headers: {
+            "Content-Type": file.name.toLowerCase().endsWith(".csv")
+              ? "text/csv"
+              : "application/x-ndjson",
+          },
+          body: file,
+        },
+      );
+      setResult(r);
+      if (!dryRun && r.error_count === 0) onDone();
+    } catch (e) {
+      setError(e instanceof ApiError ? e.message : String(e));
+    } finally {
+      setSubmitting(false);
+    }
+  };
+
   const submit = async () => {
+    if (file) return upload(false);
     setError(null);
     let parsed: unknown;
     try {
@@ -1103,11 +1192,10 @@ function ImportDialog({
     }
     setSubmitting(true);
     try {
-      const r = await apiFetch<{ ok: boolean; counts: Record<string, number> }>(
-        "/admin/inventory/import",
-        { method: "POST", body: JSON.stringify(parsed) },
-      );
-      void r;
+      await apiFetch<ImportResult>("/admin/inventory/import", {
+        method: "POST",
+        body: JSON.stringify(parsed),
+      });
       onDone();
     } catch (e) {
       setError(e instanceof ApiError ? e.message : String(e));
@@ -1121,25 +1209,81 @@ function ImportDialog({
       <DialogHeader>
         <DialogTitle>Import inventory</DialogTitle>
         <DialogDescription>
-          Paste a JSON array. Each item needs a <code>type</code> of card,
-          opened_booster, or closed_booster. All-or-nothing.
+          Each item needs a <code>type</code> of card, card_type,
+          opened_booster, or closed_booster. Paste a JSON array (all-or-nothing),
+          or upload an NDJSON or CSV file: bad rows are reported by line and
+          skipped, and a dry run checks the file without importing it.
         </DialogDescription>
       </DialogHeader>
       <div className="space-y-2">
-        <textarea
-          value={text}
-          onChange={(e) => setText(e.target.value)}
-          placeholder={IMPORT_EXAMPLE}
-          spellCheck={false}
-          className="h-56 w-full rounded-md border border-input bg-background p-3 font-mono text-xs"
+        <input
+          type="file"
+          accept=".ndjson,.jsonl,.csv"
+          onChange={(e) => {
+            setFile(e.target.files?.[0] ?? null);
+            setResult(null);
+          }}
+          className="block w-full text-sm"
         />
+        {!file && (
+          <textarea
+            value={text}
+            onChange={(e) => setText(e.target.value)}
+            placeholder={IMPORT_EXAMPLE}
+            spellCheck={false}
+            className="h-56 w-full rounded-md border border-input bg-background p-3 font-mono text-xs"
+          />
+        )}
+        {result && (
+          <div className="space-y-1 text-sm">
+            <p>
+              {result.dry_run ? "Would import" : "Imported"}{" "}
+              {Object.entries(result.counts)
+                .filter(([, n]) => n > 0)
+                .map(([k, n]) => `${n} ${k}`)
+                .join(", ") || "nothing"}
+              {result.error_count > 0 &&
+                ` · ${result.error_count} rows rejected`}
+            </p>
+            {result.errors.length > 0 && (
+              <ul className="max-h-40 overflow-y-auto font-mono text-xs text-destructive">
+                {result.errors.map((e) => (
+                  <li key={`${e.line}-${e.error}`}>
+                    line {e.line}: {e.error}
+                  </li>
+                ))}
+              </ul>
+            )}
+          </div>
+        )}
         {error && <p className="text-sm text-destructive">{error}</p>}
       </div>
       <DialogFooter>
-        <Button type="button" variant="outline" onClick={onClose}>
-          Cancel
-        </Button>
-        <Button type="button" onClick={submit} disabled={submitting || !text}>
+        {result && !result.dry_run ? (
+          // Some rows went in: refresh the lists on the way out.
+          <Button type="button" variant="outline" onClick={onDone}>
+            Close
+          </Button>
+        ) : (
+          <Button type="button" variant="outline" onClick={onClose}>
+            Cancel
+          </Button>
+        )}
+        {file && (
+          <Button
+            type="button"
+            variant="outline"
+            onClick={() => upload(true)}
+            disabled={submitting}
+          >
+            Dry run
+          </Button>
+        )}
+        <Button
+          type="button"
+          onClick={submit}
+          disabled={submitting || (!file && !text)}
+        >
           {submitting ? "Importing…" : "Import"}
         </Button>
       </DialogFooter>
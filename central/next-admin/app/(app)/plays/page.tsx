@@ -1,7 +1,7 @@
 "use client";
 
 import { useCallback, useEffect, useState } from "react";
-import { apiFetch, ApiError } from "@/lib/api";
+import { apiFetch, ApiError, pagePath, type Page } from "@/lib/api";
 import { Button } from "@/components/ui/button";
 import {
   Card,
@@ -44,12 +44,23 @@ type Play = {
 
 export default function PlaysPage() {
   const [plays, setPlays] = useState<Play[] | null>(null);
+  const [totals, setTotals] = useState<{ plays: number; won: number } | null>(
+    null,
+  );
+  const [next, setNext] = useState<string | null>(null);
   const [error, setError] = useState<string | null>(null);
 
+  // The newest page and the totals; "Load more" walks back in time.
   const refresh = useCallback(async () => {
     try {
-      const r = await apiFetch<{ plays: Play[] }>("/admin/plays");
+      const [r, all, won] = await Promise.all([
+        apiFetch<{ plays: Play[] } & Page>("/admin/plays"),
+        apiFetch<{ count: number }>("/admin/plays/count"),
+        apiFetch<{ count: number }>("/admin/plays/count?won=true"),
+      ]);
       setPlays(r.plays);
+      setNext(r.next_cursor);
+      setTotals({ plays: all.count, won: won.count });
       setError(null);
     } catch (e) {
       setError(e instanceof ApiError ? e.message : String(e));
@@ -61,7 +72,17 @@ export default function PlaysPage() {
     refresh();
   }, [refresh]);
 
-  const wins = plays?.filter((p) => p.outcome === "won").length ?? 0;
+  const loadMore = async () => {
+    try {
+      const r = await apiFetch<{ plays: Play[] } & Page>(
+        pagePath("/admin/plays", next),
+      );
+      setPlays((prev) => [...(prev ?? []), ...r.plays]);
+      setNext(r.next_cursor);
+    } catch (e) {
+      setError(e instanceof ApiError ? e.message : String(e));
+    }
+  };
 
   return (
     <div className="space-y-4">
@@ -80,9 +101,9 @@ export default function PlaysPage() {
       <Card>
         <CardHeader>
           <CardTitle className="text-base">
-            {plays === null
+            {plays === null || totals === null
               ? "Loading…"
-              : `${plays.length} plays · ${wins} won`}
+              : `${totals.plays} plays · ${totals.won} won`}
           </CardTitle>
           {error && (
             <CardDescription className="text-destructive">
@@ -137,6 +158,13 @@ export default function PlaysPage() {
               </Table>
             )
           )}
+          {next && (
+            <div className="mt-4 flex justify-center">
+              <Button variant="outline" size="sm" onClick={loadMore}>
+                Load more
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
     </div>
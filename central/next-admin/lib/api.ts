@@ -15,10 +15,7 @@ class ApiError extends Error {
   }
 }
 
-export async function apiFetch<T = unknown>(
-  path: string,
-  init: RequestInit = {},
-): Promise<T> {
+async function authorized(init: RequestInit): Promise<Headers> {
   const supabase = getSupabase();
   const { data } = await supabase.auth.getSession();
   const token = data.session?.access_token;
@@ -27,6 +24,14 @@ export async function apiFetch<T = unknown>(
   }
   const headers = new Headers(init.headers);
   headers.set("Authorization", `Bearer ${token}`);
+  return headers;
+}
+
+export async function apiFetch<T = unknown>(
+  path: string,
+  init: RequestInit = {},
+): Promise<T> {
+  const headers = await authorized(init);
   if (init.body && !headers.has("Content-Type")) {
     headers.set("Content-Type", "application/json");
   }
@@ -45,4 +50,48 @@ export async function apiFetch<T = unknown>(
   return res.json();
 }
 
+// The admin listings come a page at a time: `next_cursor` is null on the last
+// one, otherwise pass it back as `?cursor=` for the rows after it.
+export type Page = { next_cursor: string | null };
+
+export function pagePath(path: string, cursor: string | null): string {
+  if (!cursor) return path;
+  const sep = path.includes("?") ? "&" : "?";
+  return `${path}${sep}cursor=${encodeURIComponent(cursor)}`;
+}
+
+// Server-sent events from an admin endpoint, until the server ends the stream
+// or `signal` aborts it. Read through fetch because EventSource can't send the
+// Authorization header.
+export async function apiEvents(
+  path: string,
+  onEvent: (event: string, data: unknown) => void,
+  signal: AbortSignal,
+): Promise<void> {
+  const headers = await authorized({});
+  const res = await fetch(`${ADMIN_API_BASE}${path}`, { headers, signal });
+  if (!res.ok || !res.body) {
+    throw new ApiError(res.status, res.statusText);
+  }
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buf = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buf += value;
+    let end;
+    while ((end = buf.indexOf("\n\n")) >= 0) {
+      const block = buf.slice(0, end);
+      buf = buf.slice(end + 2);
+      let event = "message";
+      const data: string[] = [];
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data.push(line.slice(6));
+      }
+      if (data.length) onEvent(event, JSON.parse(data.join("\n")));
+    }
+  }
+}
+
 export { ApiError };
@@ -1,5 +1,5 @@
 "use client";
-import { Box, Drawer, VStack, HStack, Text, Tabs, IconButton, Portal, Skeleton, Flex, Icon } from "@chakra-ui/react"
+import { Box, Button, Drawer, VStack, HStack, Text, Tabs, IconButton, Portal, Skeleton, Flex, Icon } from "@chakra-ui/react"
 import { useState } from "react";
 import { useClaw } from "./providers";
 import { ScrollArea } from '@/components/ui/scroll-area';
@@ -151,7 +151,10 @@ export const AccountManager = (
 	const [drawerOpen, setDrawerOpen] = useState(false);
 	const isMobile = useIsMobile();
 
-	const { accountBalance, withdraw, withdrawing, accountBets, accountWithdrawals } = useClaw();
+	const {
+		accountBalance, withdraw, withdrawing, accountBets, accountWithdrawals,
+		hasMoreBets, hasMoreWithdrawals, loadMoreBets, loadMoreWithdrawals,
+	} = useClaw();
 	if (!isConnected) return <Box w={"40px"} />
 
 	return (
@@ -278,6 +281,8 @@ export const AccountManager = (
 																}</Text>
 															</HStack>
 														)}
+												{hasMoreBets &&
+													<Button size="xs" variant="ghost" onClick={loadMoreBets}>Load more</Button>}
 											</VStack>
 										</ScrollArea>
 									</Tabs.Content>
@@ -301,6 +306,8 @@ export const AccountManager = (
 																<Text>${w.amount}</Text>
 															</HStack>
 														)}
+												{hasMoreWithdrawals &&
+													<Button size="xs" variant="ghost" onClick={loadMoreWithdrawals}>Load more</Button>}
 											</VStack>
 										</ScrollArea>
 									</Tabs.Content>
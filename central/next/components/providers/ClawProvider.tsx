@@ -66,6 +66,7 @@ interface GlobalSyncData {
 	queue_length: number;
 	con: boolean;
 	seconds_left: number;
+	version: number; // bumps only when the snapshot content changes
 }
 
 interface PersonalSyncData {
@@ -78,8 +79,12 @@ interface WalletConnectedData {
 	balance: number;
 	played: number;
 	won: number;
+	// Newest page of each history; the cursor (null on the last page) fetches
+	// the next, older page.
 	bets: PlayedRound[],
+	bets_cursor: string | null,
 	withdrawals: Withdrawal[]
+	withdrawals_cursor: string | null,
 }
 
 interface clawConnectionData {
@@ -89,7 +94,9 @@ interface clawConnectionData {
 interface AccountBalanceData {
 	balance: number,
 	bets: PlayedRound[],
+	bets_cursor: string | null,
 	withdrawals: Withdrawal[]
+	withdrawals_cursor: string | null,
 }
 
 interface RoundStartData {
@@ -159,6 +166,12 @@ interface ClawCtx {
 	accountBalance: number;
 	accountBets: PlayedRound[] | null;
 	accountWithdrawals: Withdrawal[] | null;
+	// History arrives a page at a time (newest first); these append the next,
+	// older page. hasMore* is false once the last page is in.
+	hasMoreBets: boolean;
+	hasMoreWithdrawals: boolean;
+	loadMoreBets: () => void;
+	loadMoreWithdrawals: () => void;
 	clawSocketOn: boolean;
 	roundPlayed: number;
 	roundWon: number;
@@ -242,6 +255,8 @@ export const ClawProvider: React.FC<{ children: React.ReactNode }> = ({ children
 	const [accountBalance, setAccountBalance] = useState<number>(0)
 	const [accountBets, setAccountBets] = useState<PlayedRound[] | null>(null)
 	const [accountWithdrawals, setAccountWithdrawals] = useState<Withdrawal[] | null>(null)
+	const [betsCursor, setBetsCursor] = useState<string | null>(null)
+	const [withdrawalsCursor, setWithdrawalsCursor] = useState<string | null>(null)
 	const toastId = useRef<string | null>(null);        // keep the id we get back
 	const timerId = useRef<ReturnType<typeof setTimeout> | null>(null);
 	const [clawSocketOn, setClawSocketOn] = useState(false);
@@ -277,7 +292,9 @@ export const ClawProvider: React.FC<{ children: React.ReactNode }> = ({ children
 					setPosition(res.data.position);
 					setAccountBalance(res.data.balance);
 					setAccountBets(res.data.bets);
+					setBetsCursor(res.data.bets_cursor);
 					setAccountWithdrawals(res.data.withdrawals);
+					setWithdrawalsCursor(res.data.withdrawals_cursor);
 					setRoundPlayed(res.data.played);
 					setRoundWon(res.data.won);
 				}
@@ -364,11 +381,13 @@ export const ClawProvider: React.FC<{ children: React.ReactNode }> = ({ children
 			setRoundInfo(data.round_info);
 			socket.emit(
 				'check_balance',
-				(r: { status: string; balance: number, bets: PlayedRound[], withdrawals: Withdrawal[] }) => {
+				(r: { status: string } & AccountBalanceData) => {
 					if (r.status === 'ok') {
 						setAccountBalance(r.balance);
 						setAccountBets(r.bets);
+						setBetsCursor(r.bets_cursor);
 						setAccountWithdrawals(r.withdrawals);
+						setWithdrawalsCursor(r.withdrawals_cursor);
 					}
 				},
 			);
@@ -376,7 +395,9 @@ export const ClawProvider: React.FC<{ children: React.ReactNode }> = ({ children
 		const onAccountBalance = (data: AccountBalanceData) => {
 			setAccountBalance(data.balance);
 			setAccountBets(data.bets);
+			setBetsCursor(data.bets_cursor);
 			setAccountWithdrawals(data.withdrawals);
+			setWithdrawalsCursor(data.withdrawals_cursor);
 		}
 
 		// Backend emits player_win room-targeted to the winning player only,
@@ -436,6 +457,23 @@ export const ClawProvider: React.FC<{ children: React.ReactNode }> = ({ children
 			resolveResult("The machine needs attention. We're on it.", 'error', 6000);
 		};
 
+		// Presence check before our turn is handed to us (app/handoff.py).
+		// The ack is the answer — an open tab means we're here to play.
+		const onTurnReady = (_data: unknown, ack?: () => void) => {
+			ack?.();
+		};
+		// We weren't there when the machine came free, so the next player
+		// went first. With the default policy we keep our place in line.
+		const onTurnSkipped = (data: { reason: string; policy: string }) => {
+			toaster.create({
+				description: data?.policy === 'back'
+					? "You missed your turn, so you've moved to the back of the queue."
+					: "You missed your turn — you keep your place and we'll try you again next.",
+				type: 'warning',
+				duration: 5000,
+			});
+		};
+
 		// Card rail: when a charge confirms via the Stripe webhook rather than
 		// synchronously (processing status / 3DS), the backend targets these to
 		// the player's room. The synchronous pay_card ack handles the fast path.
@@ -465,6 +503,8 @@ export const ClawProvider: React.FC<{ children: React.ReactNode }> = ({ children
 		socket.on('cabinet_fault', onCabinetFault);
 		socket.on('payment_confirmed', onPaymentConfirmed);
 		socket.on('payment_failed', onPaymentFailed);
+		socket.on('turn_ready', onTurnReady);
+		socket.on('turn_skipped', onTurnSkipped);
 
 		return () => {
 			socket.off('player_win', onPlayerWin);
@@ -480,6 +520,8 @@ export const ClawProvider: React.FC<{ children: React.ReactNode }> = ({ children
 			socket.off('cabinet_fault', onCabinetFault);
 			socket.off('payment_confirmed', onPaymentConfirmed);
 			socket.off('payment_failed', onPaymentFailed);
+			socket.off('turn_ready', onTurnReady);
+			socket.off('turn_skipped', onTurnSkipped);
 		};
 	}, [socket, updateSeconds]);
 
@@ -719,6 +761,24 @@ export const ClawProvider: React.FC<{ children: React.ReactNode }> = ({ children
 		}
 	}, [socket, address, chainId])
 
+	const loadMoreBets = useCallback(() => {
+		if (!betsCursor) return;
+		socket.emit('get_bets', { cursor: betsCursor }, (r: { status: string, bets: PlayedRound[], cursor: string | null }) => {
+			if (r.status !== 'ok') return;
+			setAccountBets((prev) => [...(prev ?? []), ...r.bets]);
+			setBetsCursor(r.cursor);
+		});
+	}, [socket, betsCursor])
+
+	const loadMoreWithdrawals = useCallback(() => {
+		if (!withdrawalsCursor) return;
+		socket.emit('get_withdrawals', { cursor: withdrawalsCursor }, (r: { status: string, withdrawals: Withdrawal[], cursor: string | null }) => {
+			if (r.status !== 'ok') return;
+			setAccountWithdrawals((prev) => [...(prev ?? []), ...r.withdrawals]);
+			setWithdrawalsCursor(r.cursor);
+		});
+	}, [socket, withdrawalsCursor])
+
 	const value: ClawCtx = {
 		queueCount,
 		position,
@@ -731,6 +791,10 @@ export const ClawProvider: React.FC<{ children: React.ReactNode }> = ({ children
 		accountBalance,
 		accountBets,
 		accountWithdrawals,
+		hasMoreBets: betsCursor !== null,
+		hasMoreWithdrawals: withdrawalsCursor !== null,
+		loadMoreBets,
+		loadMoreWithdrawals,
 		clawSocketOn,
 		roundPlayed,
 		roundWon,
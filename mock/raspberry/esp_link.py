@@ -78,10 +78,11 @@ class EspLink:
         """The esp_status payload the Pi reports to central. EVERY esp_status
         must go through here — omitting pi_proto makes central read the Pi as
         version-unaware and pause the queue."""
-        from protocol_version import PI_VPS_PROTO, PI_FW
+        from protocol_version import PI_VPS_PROTO, PI_FW, PI_FEATURES
         return {
             "latched_fault": self.effective_fault(),
             "pi_proto": PI_VPS_PROTO,
+            "features": PI_FEATURES,
             "versions": {"esp_fw": self.fw, "esp_proto": self.esp_proto, "pi_fw": PI_FW},
         }
 
@@ -7,12 +7,15 @@ FSM, just with simulated sensors and a fake serial link.
 
 Inbound (central → mock):
     {"type": "move",        "data": {"bitmask": int}}
-    {"type": "turn_start",  "data": ...}
+    {"type": "turn_start",  "data": {"turn_id": ...}}
     {"type": "fault_clear", "data": ...}
+    binary move frame (feature "move_bin"): tag 0x01, seq, bitmask — see
+    protocol_version.py; acked with a binary move_ack (tag 0x81, seq, apply us)
 
 Outbound (mock → central):
-    {"type": "turn_end"}
-    {"type": "verdict",  "data": {"outcome": "no_fall|no_read|no_exit|ok", "ball_serial": "<hex>"|null}}
+    {"type": "turn_end", "data": {"turn_id": ..., "stages": {...}}}
+    {"type": "verdict",  "data": {"outcome": "no_fall|no_read|no_exit|ok", "ball_serial": "<hex>"|null,
+                                  "turn_id": ..., "stages": {...}}}
     {"type": "fault",     "data": {"kind": "...", "reason"?: "..."}}
 
 Scenario HTTP controls (curl-friendly):
@@ -32,12 +35,14 @@ Full-turn end-to-end loop (drives a real Win in the central backend):
     2. create + bind the ball to an OpenedBooster / Card
     3. POST /scenarios/next-tag/<that-serial>
     4. POST /scenarios/odds {"win_rate": 1}
-    5. queue up / start a turn -> prize_won(<serial>) -> central reserve_win
+    5. queue up / start a turn -> prize_won(<serial>) -> central record_win
 """
 
 import asyncio
 import json
 import logging
+import struct
+import time
 import os
 from contextlib import asynccontextmanager
 from typing import Optional
@@ -47,7 +52,9 @@ from fastapi import (
     WebSocketException,
 )
 
-from protocol_version import PI_VPS_PROTO, PI_FW
+from protocol_version import (
+    PI_VPS_PROTO, PI_FW, MOVE_FRAME_FORMAT, MOVE_ACK_FRAME_FORMAT, FRAME_MOVE, FRAME_MOVE_ACK,
+)
 from esp_link import EspLink
 from fsm import FSM, FSMHooks, State, EV_TURN_START, EV_FAULT_CLEAR
 from mock_hardware import (
@@ -137,8 +144,29 @@ async def on_move(_ws, message):
     claw.apply_move_bitmask((message or {}).get("bitmask", 0))
 
 
-async def on_turn_start(_ws, _message):
+_MOVE_FRAME = struct.Struct(MOVE_FRAME_FORMAT)
+_MOVE_ACK_FRAME = struct.Struct(MOVE_ACK_FRAME_FORMAT)
+
+
+async def on_binary_frame(ws: WebSocket, frame: bytes) -> None:
+    """Binary frames (feature "move_bin", advertised in esp_status). A move goes
+    straight to the outputs — no JSON, no handler table — and is acked with its
+    seq and how long the apply took here, so central can split the round trip
+    into network and Pi time."""
+    t0 = time.perf_counter()
+    if len(frame) == _MOVE_FRAME.size and frame[0] == FRAME_MOVE:
+        _, seq, mask = _MOVE_FRAME.unpack(frame)
+        claw.apply_move_bitmask(mask)
+        apply_us = min(int((time.perf_counter() - t0) * 1e6), 0xFFFF)
+        await ws.send_bytes(_MOVE_ACK_FRAME.pack(FRAME_MOVE_ACK, seq, apply_us))
+    else:
+        log.warning("Unknown binary frame (%d bytes, tag %s)", len(frame), frame[:1].hex())
+
+
+async def on_turn_start(_ws, message):
     log.info("turn_start received")
+    if fsm is not None:
+        fsm.note_turn_start((message or {}).get("turn_id"))
     events.put_nowait(EV_TURN_START)
 
 
@@ -223,7 +251,13 @@ async def websocket_endpoint(ws: WebSocket):
         log.warning("esp_status send failed: %s", e)
     try:
         while True:
-            data = await ws.receive_text()
+            frame = await ws.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            if frame.get("bytes") is not None:
+                await on_binary_frame(ws, frame["bytes"])
+                continue
+            data = frame.get("text")
             try:
                 message = json.loads(data)
                 mtype = message.get("type")
@@ -409,6 +443,7 @@ async def scenario_state():
         "chute_delay_sec": state.chute_delay_sec,
         "fsm_state": fsm.state.value if fsm else None,
         "fault_kind": esp.latched_fault,
+        "move_mask": claw.mask,
     }
 
 
@@ -72,9 +72,19 @@ class MockClawOutputs:
     def __init__(self, state: MockState, events: "asyncio.Queue[str]"):
         self.state = state
         self.events = events
+        self._mask = 0
 
     def apply_move_bitmask(self, mask: int) -> None:
-        log.debug("move bitmask=%06b", mask)
+        # Mirrors ClawOutputs: only the bits that changed would be written.
+        changed = mask ^ self._mask
+        if changed:
+            log.debug("move bitmask=%06b (changed %06b)", mask, changed)
+            self._mask = mask
+
+    @property
+    def mask(self) -> int:
+        """The joystick bitmask the outputs hold now."""
+        return self._mask
 
     async def start_turn_pulse(self) -> None:
         asyncio.create_task(self._simulate_opto())
@@ -11,4 +11,18 @@ drift (one piece updated, another not).
 ESP_PI_PROTO = 1   # ESP32 <-> Pi   (UART JSON: arm / verdict / ready)
 PI_VPS_PROTO = 1   # Pi    <-> VPS  (websocket: turn_end / verdict / move)
 
+# Optional Pi<->VPS wire features this build supports, advertised to central in
+# every esp_status. Additive, so no PI_VPS_PROTO bump: central only uses a
+# feature the Pi advertised, and everything still works over the JSON frames.
+PI_FEATURES = ["move_bin"]
+
+# "move_bin": joystick moves as a binary websocket frame instead of JSON.
+# struct formats, must equal central/fastapi/app/versioning.py:
+#   move      VPS -> Pi   tag 0x01, seq u32, bitmask u8                (6 bytes)
+#   move_ack  Pi  -> VPS  tag 0x81, seq u32, Pi apply time in us, u16  (7 bytes)
+MOVE_FRAME_FORMAT     = ">BIB"
+MOVE_ACK_FRAME_FORMAT = ">BIH"
+FRAME_MOVE     = 0x01
+FRAME_MOVE_ACK = 0x81
+
 PI_FW = "garra-pi-0.1.0"   # human build id, informational only
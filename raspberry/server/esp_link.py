@@ -7,6 +7,10 @@ on the Pi shows the same shape of frames you'd see in the central log.
 Pi  → ESP:  arm | fault_clear | ping
 ESP → Pi :  ready | verdict | fault | pong | log
 
+`arm` carries the turn_id it is for, so a serial capture lines up with the
+central trace. The firmware ignores the field (no protocol bump); the Pi
+tags the verdict with it, since only one arm is ever outstanding.
+
 The chute sub-FSM (T_FALL/T_ID/T_EXIT, CHUTE_BLOCKED latch) lives entirely
 on the ESP32. This module is a transport with reconnect — it does not
 own state beyond a mirror of the latch so the Pi-side FSM can short-circuit
@@ -86,10 +90,11 @@ class EspLink:
         """The esp_status payload the Pi reports to central. EVERY esp_status
         must go through here — omitting pi_proto makes central read the Pi as
         version-unaware and pause the queue."""
-        from protocol_version import PI_VPS_PROTO, PI_FW
+        from protocol_version import PI_VPS_PROTO, PI_FW, PI_FEATURES
         return {
             "latched_fault": self.effective_fault(),
             "pi_proto": PI_VPS_PROTO,
+            "features": PI_FEATURES,
             "versions": {"esp_fw": self.fw, "esp_proto": self.esp_proto, "pi_fw": PI_FW},
         }
 
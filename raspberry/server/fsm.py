@@ -16,17 +16,22 @@ The CHUTE_BLOCKED latch lives on the ESP32. The Pi reads `esp.latched_fault`
 to refuse `turn_start` while latched, emitting a fault re-broadcast so the
 operator gets prompted again instead of burning a turn.
 
-Outbound protocol (Pi → central) is unchanged:
-  {"type": "turn_end"}
-  {"type": "verdict",   "data": {"outcome": "...", "ball_serial": "<hex>"|null}}
+Outbound protocol (Pi → central):
+  {"type": "turn_end",  "data": {"turn_id": ..., "stages": {...}}}
+  {"type": "verdict",   "data": {"outcome": "...", "ball_serial": "<hex>"|null,
+                                 "turn_id": ..., "stages": {...}}}
   {"type": "fault",     "data": {"kind": "...", "reason"?: "..."}}
 
-Inbound protocol (central → Pi) is unchanged:
-  turn_start, fault_clear, move.
+turn_id is whatever central sent with turn_start (see note_turn_start);
+"stages" are this side's hop durations in ms, on the Pi's monotonic clock.
+
+Inbound protocol (central → Pi):
+  turn_start (with turn_id), fault_clear, move.
 """
 
 import asyncio
 import logging
+import time
 from dataclasses import dataclass
 from enum import Enum
 from typing import Awaitable, Callable, Optional
@@ -36,6 +41,10 @@ from esp_link import EspLink, EspMessage
 log = logging.getLogger("rpi.fsm")
 
 
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000.0, 3)
+
+
 class State(Enum):
     IDLE     = "idle"
     PLAYING  = "playing"
@@ -75,6 +84,10 @@ class FSM:
         self.esp = esp
         self.hooks = hooks
         self.state = State.IDLE
+        # (turn_id, monotonic time) of the last turn_start received; taken by
+        # the turn that it starts.
+        self._turn_start = (None, None)
+        self.turn_id = None
 
     async def run(self) -> None:
         log.info("FSM start")
@@ -89,6 +102,11 @@ class FSM:
                     "data": {"kind": "internal_error"},
                 })
 
+    def note_turn_start(self, turn_id) -> None:
+        """Record the turn_id (and arrival time) of a turn_start, ahead of its
+        EV_TURN_START going on the event queue."""
+        self._turn_start = (turn_id, time.monotonic())
+
     @property
     def fault_kind(self) -> Optional[str]:
         # Compatibility shim: legacy callers (e.g. mock state endpoint)
@@ -126,17 +144,34 @@ class FSM:
 
     async def _run_turn(self) -> None:
         self.state = State.PLAYING
+        self.turn_id, received_at = self._turn_start
+        self._turn_start = (None, None)
+        received_at = received_at or time.monotonic()
         await self.hooks.start_turn_pulse()
+        pulsed_at = time.monotonic()
 
         # Opto rising edge can take as long as the player wants — no timeout.
         await self._await_opto()
+        opto_at = time.monotonic()
         log.info("opto fired -> broadcasting turn_end, arming chute ESP")
-        await self.hooks.broadcast({"type": "turn_end"})
+        await self.hooks.broadcast({
+            "type": "turn_end",
+            "data": {
+                "turn_id": self.turn_id,
+                "stages": {
+                    "start_to_pulse": _ms(pulsed_at - received_at),
+                    "opto_to_turn_end": _ms(time.monotonic() - opto_at),
+                },
+            },
+        })
+        turn_end_at = time.monotonic()
 
         self.state = State.AWAITING
-        armed = await self.esp.send("arm")
+        armed = await self.esp.send("arm", {"turn_id": self.turn_id})
+        armed_at = time.monotonic()
         log.info("arm sent to chute ESP (delivered=%s); awaiting verdict", armed)
-        await self._await_verdict()
+        await self._await_verdict(
+            armed_at, {"turn_end_to_arm": _ms(armed_at - turn_end_at)})
 
     async def _await_opto(self) -> None:
         while True:
@@ -145,14 +180,15 @@ class FSM:
                 return
             log.debug("drop %s in PLAYING", ev)
 
-    async def _await_verdict(self) -> None:
+    async def _await_verdict(self, armed_at: float, stages: dict) -> None:
         """Block until the ESP32 reports its single verdict for this arm, or the
         ceiling elapses.
 
         The ESP emits exactly one `verdict` per arm, carrying the outcome and —
         whenever a tag was actually read — the ball_serial. Central needs two
         facts (did the player win, is the chute still usable) and derives both
-        from that one message, so we forward it untouched.
+        from that one message, so we forward it as-is, tagged with the turn_id and
+        this turn's stage timings.
 
         Note a loss is now *reported* (outcome=no_fall) rather than left to be
         inferred downstream from a timeout, and outcome=no_exit carries the
@@ -173,9 +209,12 @@ class FSM:
 
         log.info("chute verdict: %s %s", msg.type, msg.data or "")
         if msg.type == "verdict":
+            # The ESP doesn't echo turn_id (it ignores the extra arm field);
+            # exactly one arm is outstanding, so the verdict is this turn's.
+            stages["arm_to_verdict"] = _ms(time.monotonic() - armed_at)
             await self.hooks.broadcast({
                 "type": "verdict",
-                "data": msg.data,
+                "data": {**msg.data, "turn_id": self.turn_id, "stages": stages},
             })
         elif msg.type == "fault":
             # Not the outcome of an arm (still_blocked / internal_error).
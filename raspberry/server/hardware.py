@@ -36,6 +36,7 @@ OUTPUT_PINS = {
     1 << 4: GRAB,
     1 << 5: COIN,
 }
+_PIN_BIT = {pin: bit for bit, pin in OUTPUT_PINS.items()}
 
 # --- Claw optocoupler -------------------------------------------------------
 # Pin / edge / pull are env-overridable so a polarity change (e.g. after a PSU
@@ -125,10 +126,18 @@ class ClawOutputs:
         self.h = h
         for pin in OUTPUT_PINS.values():
             lgpio.gpio_claim_output(h, pin, 0)
+        # Last mask written to the pins (all claimed low above). Lets a move
+        # touch only the pins whose bit changed — usually one, not six.
+        self._mask = 0
 
     def apply_move_bitmask(self, mask: int) -> None:
+        changed = mask ^ self._mask
+        if not changed:
+            return
         for bit, pin in OUTPUT_PINS.items():
-            lgpio.gpio_write(self.h, pin, 1 if mask & bit else 0)
+            if changed & bit:
+                lgpio.gpio_write(self.h, pin, 1 if mask & bit else 0)
+        self._mask = mask
 
     async def start_turn_pulse(self) -> None:
         lgpio.gpio_write(self.h, COIN, 1)
@@ -138,3 +147,6 @@ class ClawOutputs:
         lgpio.gpio_write(self.h, W, 1)
         await asyncio.sleep(0.1)
         lgpio.gpio_write(self.h, W, 0)
+        # The pulse wrote COIN and W behind apply_move_bitmask's back; both
+        # are low now, so record that or the next move would skip them.
+        self._mask &= ~(_PIN_BIT[COIN] | _PIN_BIT[W])
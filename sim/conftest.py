@@ -1,9 +1,15 @@
 import asyncio
+import importlib
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 import pytest_asyncio
 
 from harness.cabinet import Cabinet
+from harness.config import DB_DSN
 from harness.player import VirtualPlayer
 from harness.world import World
 
@@ -13,6 +19,29 @@ def world() -> World:
     return World()
 
 
+@pytest.fixture(scope="session")
+def backend():
+    """The backend's modules, imported in process against the dev database, for
+    the few tests that call its code directly. Needs the backend's own
+    requirements (central/fastapi/requirements.txt)."""
+    pytest.importorskip("fastapi", reason="backend requirements not installed")
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "central/fastapi"))
+    os.environ.setdefault("DATABASE_URL", DB_DSN.replace("postgresql://", "postgresql+psycopg://", 1))
+    os.environ.setdefault("CHAIN_ID", "1")
+    os.environ.setdefault("PI_SERVER_URL", "http://localhost:5001")
+    # app.admin re-exports its APIRouter as `router`, shadowing the module.
+    admin = importlib.import_module("app.admin.router")
+    from app import pi_client
+    from app.admin import importer
+    from app.cabinet import Cabinet as BackendCabinet
+    from app.db import async_session, engine
+    from app.sessions import sessions
+    from app.socket import events_inventory
+    return SimpleNamespace(admin=admin, importer=importer, async_session=async_session,
+                           engine=engine, sessions=sessions, inventory=events_inventory,
+                           pi_client=pi_client, Cabinet=BackendCabinet)
+
+
 @pytest_asyncio.fixture(autouse=True)
 async def fresh_world(request, world):
     # Static tests (e.g. protocol-version agreement) read source files only and
@@ -87,8 +116,8 @@ async def players(world):
     """Factory for extra players (queue-ordering tests)."""
     made = []
 
-    async def _make(name: str) -> VirtualPlayer:
-        p = VirtualPlayer(name=name)
+    async def _make(name: str, **kwargs) -> VirtualPlayer:
+        p = VirtualPlayer(name=name, **kwargs)
         await p.connect()
         made.append(p)
         return p
@@ -16,6 +16,10 @@ import os
 
 BACKEND_URL = os.environ.get("SIM_BACKEND_URL", "http://localhost:5000")
 CABINET_URL = os.environ.get("SIM_CABINET_URL", "http://localhost:5001")
+# A second backend worker next to the first, on the same database and Pi, with
+# SOCKETIO_PUBSUB_URL set on both. One of the two holds the leader lock and
+# drives the cabinet. Unset: the tests that need two workers skip.
+SECOND_BACKEND_URL = os.environ.get("SIM_SECOND_BACKEND_URL")
 
 # Host-side DSN for the dev Postgres (published by docker-compose.dev.yml).
 DB_DSN = os.environ.get(
@@ -15,6 +15,10 @@ from .config import BACKEND_URL, TURN_TIMEOUT
 # Movement bit-mask, mirroring KEYMAP in ClawProvider.tsx
 LEFT, RIGHT, UP, DOWN, GRAB = 0b0001, 0b0010, 0b0100, 0b1000, 0b0001_0000
 
+# How long an unready player sits on turn_ready: longer than the backend's
+# TURN_READY_TIMEOUT (2s), so the handoff gives up on them.
+UNREADY_ACK_DELAY = 5.0
+
 
 def guest_address() -> str:
     """A synthetic wallet address, same shape the frontend mints in bypass mode."""
@@ -22,9 +26,14 @@ def guest_address() -> str:
 
 
 class VirtualPlayer:
-    def __init__(self, address: Optional[str] = None, name: str = "player"):
+    def __init__(self, address: Optional[str] = None, name: str = "player",
+                 ready: bool = True, url: str = BACKEND_URL):
         self.address = address or guest_address()
         self.name = name
+        self.url = url          # the backend worker this player's socket is on
+        # False: connected, but never at the keyboard — turn_ready goes
+        # unanswered past the backend's TURN_READY_TIMEOUT.
+        self.ready = ready
         self.sio = socketio.AsyncClient(logger=False, engineio_logger=False)
         self.events: List[Dict[str, Any]] = []
         self._arrived = asyncio.Event()
@@ -37,7 +46,10 @@ class VirtualPlayer:
             "player_queued", "turn_start", "turn_end", "player_win",
             "turn_result", "personal_sync", "global_sync", "balance",
             "payment_confirmed", "payment_failed", "claw_connection_change",
-            "cabinet_fault",
+            "cabinet_fault", "turn_skipped",
+            # Acked automatically (the handler returns) — that ack is what
+            # tells the handoff this player is at the keyboard.
+            "turn_ready",
         ):
             self.sio.on(name_, self._recorder(name_))
 
@@ -50,6 +62,8 @@ class VirtualPlayer:
             elif event in ("personal_sync", "payment_confirmed") and isinstance(data, dict):
                 self.position = data.get("position", self.position)
             self._arrived.set()
+            if event == "turn_ready" and not self.ready:
+                await asyncio.sleep(UNREADY_ACK_DELAY)
         return handler
 
     def mark(self) -> int:
@@ -89,7 +103,7 @@ class VirtualPlayer:
 
     # --- session --------------------------------------------------------
     async def connect(self) -> dict:
-        await self.sio.connect(BACKEND_URL, transports=["websocket"])
+        await self.sio.connect(self.url, transports=["websocket"])
         res = await self.sio.call("wallet_connected", {"address": self.address}, timeout=10)
         if res.get("status") == "ok":
             data = res["data"]
@@ -102,6 +116,10 @@ class VirtualPlayer:
         if self.sio.connected:
             await self.sio.disconnect()
 
+    async def select_cabinet(self, cabinet: str) -> dict:
+        """Watch another cabinet; plays paid from here on queue there."""
+        return await self.sio.call("select_cabinet", {"cabinet": cabinet}, timeout=10)
+
     # --- paying ---------------------------------------------------------
     async def pay_crypto(self, tx_hash: Optional[str] = None) -> dict:
         """Crypto rail. In BYPASS_PAYMENT the backend skips the receipt check,
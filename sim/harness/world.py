@@ -108,6 +108,72 @@ class World:
         )
         return int(row["cents"]) if row else 0
 
+    # --- read-path fixtures ----------------------------------------------
+    def make_user(self, address: str) -> str:
+        row = self._one(
+            """INSERT INTO user_account (id, wallet_address, kyc_status, created_at)
+               VALUES (gen_random_uuid(), %s, 'NONE', now() AT TIME ZONE 'utc')
+               RETURNING id""",
+            (address,),
+        )
+        return str(row["id"])
+
+    def give_cards(self, address: str, n: int) -> int:
+        """Put up to `n` cards in the user's collection. Returns how many."""
+        return len(self._q(
+            """UPDATE card SET status = 'IN_COLLECTION', acquired_at = now() AT TIME ZONE 'utc',
+                      owner_user_id = (SELECT id FROM user_account WHERE wallet_address = %s)
+               WHERE id IN (SELECT id FROM card ORDER BY id LIMIT %s)
+               RETURNING id""",
+            (address, n),
+        ))
+
+    def give_pending_wins(self, address: str, n: int) -> int:
+        """Up to `n` PENDING wins for the user, one per ball nobody has won yet,
+        each on a played queue entry of its own — as if they'd won and not
+        settled. Returns how many. No payment stands behind them, so don't mix
+        with tests that check invariants."""
+        return len(self._q(
+            """WITH b AS (
+                   SELECT id, prize_kind, prize_card_id, row_number() OVER (ORDER BY serial) AS rn
+                   FROM ball WHERE id NOT IN (SELECT ball_id FROM win)
+                   ORDER BY serial LIMIT %s
+               ), q AS (
+                   INSERT INTO queue (address, status, created_at, win)
+                   SELECT %s, 'played', now() AT TIME ZONE 'utc', true FROM b
+                   RETURNING id
+               ), qn AS (
+                   SELECT id, row_number() OVER (ORDER BY id) AS rn FROM q
+               )
+               INSERT INTO win (id, user_id, queue_entry_id, ball_id, prize_kind, status,
+                                expires_at, prize_card_id, resell_price_cents, created_at)
+               SELECT gen_random_uuid(),
+                      (SELECT id FROM user_account WHERE wallet_address = %s),
+                      qn.id, b.id, b.prize_kind, 'PENDING',
+                      now() AT TIME ZONE 'utc' + interval '30 days',
+                      b.prize_card_id, 100, now() AT TIME ZONE 'utc'
+               FROM b JOIN qn USING (rn)
+               RETURNING id""",
+            (n, address, address),
+        ))
+
+    def give_history(self, address: str, n: int) -> None:
+        """`n` played turns and `n` withdrawals for the address, all stamped
+        with the same instant: the history pages' first sort key ties on every
+        row, so only the id keeps them apart. The i-th of each bets i, or
+        withdraws i dollars."""
+        self._q(
+            """INSERT INTO queue (address, status, created_at, played_at, ended_at, bet, win, round_id)
+               SELECT %s, 'played', t, t, t, i, false, 1
+               FROM generate_series(1, %s) i, (SELECT now() AT TIME ZONE 'utc' AS t) now""",
+            (address, n),
+        )
+        self._q(
+            """INSERT INTO withdrawal (address, timestamp, amount)
+               SELECT %s, now() AT TIME ZONE 'utc', 100 * i FROM generate_series(1, %s) i""",
+            (address, n),
+        )
+
     # --- waiting --------------------------------------------------------
     def wait_until(self, predicate, timeout: float = 20.0, what: str = "condition"):
         """Poll until `predicate(self)` returns truthy. The backend broadcasts
@@ -190,8 +256,8 @@ class World:
                 # leave the machine unfit (and therefore paused) for the next one.
                 cur.execute("UPDATE closed_booster_stock SET in_stock = true")
                 # Then the transactional rows, children first.
-                for table in ("ledger_entry", "payment", "win", "shipment",
-                              "withdrawal", "queue", "user_account"):
+                for table in ("ledger_entry", "user_balance", "payment", "win",
+                              "shipment", "withdrawal", "queue", "user_account"):
                     cur.execute(f"DELETE FROM {table}")
 
     # --- invariants -----------------------------------------------------
@@ -268,5 +334,21 @@ class World:
         if rows:
             problems.append(f"{len(rows)} WITHDRAWAL ledger row(s) with no tx hash")
 
+        # 8. The materialized balance agrees with the ledger it's derived from.
+        rows = self._q(
+            f"""SELECT l.user_id,
+                   SUM(CASE WHEN l.kind = ANY(%s) THEN -l.amount_cents ELSE l.amount_cents END) AS total,
+                   SUM(CASE WHEN l.held_until IS NOT NULL THEN l.amount_cents ELSE 0 END) AS held,
+                   b.total_cents, b.held_cents
+                FROM ledger_entry l LEFT JOIN user_balance b ON b.user_id = l.user_id
+                GROUP BY l.user_id, b.total_cents, b.held_cents
+                HAVING b.total_cents IS NULL
+                    OR SUM(CASE WHEN l.kind = ANY(%s) THEN -l.amount_cents ELSE l.amount_cents END) <> b.total_cents
+                    OR SUM(CASE WHEN l.held_until IS NOT NULL THEN l.amount_cents ELSE 0 END) <> b.held_cents""",
+            (list(DEBIT_KINDS), list(DEBIT_KINDS)),
+        )
+        if rows:
+            problems.append(f"{len(rows)} user_balance row(s) disagree with the ledger")
+
         if problems:
             raise AssertionError("INVARIANT VIOLATION:\n  - " + "\n  - ".join(problems))
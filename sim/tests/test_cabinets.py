@@ -0,0 +1,36 @@
+"""One backend, several claw machines (app/cabinet.py).
+
+The sim stack runs one mock Pi, so this pins what a single-cabinet deployment
+must keep doing on the multi-cabinet code: a socket watches the default
+cabinet from connect, a paid play waits in the shared line (QUEUE_DISPATCH
+"pool") and is dealt to that cabinet once it's free, and a cabinet that isn't
+configured is refused rather than silently ignored.
+"""
+import pytest
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_a_pooled_play_is_dealt_to_the_free_cabinet(player, cabinet, world):
+    await cabinet.always_lose()
+    sync = await player.wait_for("global_sync", timeout=5, since=0)
+    default = sync["cabinet"]
+
+    res = await player.select_cabinet(default)
+    assert res["status"] == "ok"
+    assert default in res["cabinets"]
+
+    mark = player.mark()
+    assert (await player.pay_crypto())["status"] == "ok"
+    started = await player.wait_for("turn_start", timeout=10, since=mark)
+    assert started["cabinet"] == default
+
+    # The row is stamped with the cabinet that took it.
+    entries = world.queue_entries(player.address)
+    assert [e["cabinet_id"] for e in entries] == [default]
+
+
+async def test_an_unknown_cabinet_is_refused(player):
+    res = await player.select_cabinet("no-such-cabinet")
+    assert res["status"] == "error"
+    assert res["cabinets"], "the refusal should list the cabinets there are"
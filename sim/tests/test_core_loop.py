@@ -36,6 +36,16 @@ async def test_double_entry_is_rejected(player, world):
     assert len(world.payments(player.address)) == 1
 
 
+async def test_an_idle_machine_starts_a_paid_turn_right_away(player, cabinet):
+    """Enqueueing wakes the turn scheduler: the first player into an idle
+    machine doesn't wait out a poll tick or a finished turn's deadline."""
+    await cabinet.always_lose()
+
+    mark = player.mark()
+    assert (await player.pay_crypto())["status"] == "ok"
+    await player.wait_for("turn_start", timeout=3, since=mark)
+
+
 async def test_win_a_booster_and_resell_it(player, cabinet, world):
     await cabinet.win_with(BOOSTER_BALL)
 
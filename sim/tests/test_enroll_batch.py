@@ -0,0 +1,40 @@
+"""Binding an enrollment batch: one ball per prize, checked up front.
+
+In process: app/admin/router.py's commit handler, against an in-memory batch.
+A prize listed twice would otherwise get two Ball rows and fail on the unique
+binding at commit (a 500); it must be a 400 before the database is touched.
+"""
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+pytestmark = [pytest.mark.static, pytest.mark.asyncio]
+
+
+async def test_a_prize_listed_twice_is_rejected(backend, monkeypatch):
+    from app import enrollment, leader
+    from app.cabinet import cabinets
+
+    admin = backend.admin
+    cab = next(iter(cabinets))
+    batch = enrollment.EnrollBatch(cab.id)
+    batch.queued = ["BATCH-1", "BATCH-2", "BATCH-3"]
+    monkeypatch.setattr(cab, "enroll_batch", batch)
+    # The batch lives in the leader; a follower would forward the commit there.
+    monkeypatch.setattr(leader, "is_leader", True)
+
+    def no_db():
+        raise AssertionError("the duplicate should be caught before the database")
+    monkeypatch.setattr(admin, "async_session", no_db)
+
+    prize = str(uuid.uuid4())
+    for body in (
+        admin.EnrollBatchCommitBody(opened_booster_ids=[prize, prize.upper()]),
+        admin.EnrollBatchCommitBody(card_ids=[str(uuid.uuid4()), prize, prize]),
+    ):
+        with pytest.raises(HTTPException) as e:
+            await admin.enroll_batch_commit(body, cabinet=cab.id, _=None)
+        assert e.value.status_code == 400
+        assert prize in e.value.detail
+    assert batch.queued == ["BATCH-1", "BATCH-2", "BATCH-3"]
@@ -0,0 +1,80 @@
+"""The bulk inventory import loads the good rows and reports the bad ones.
+
+In process, like test_query_counts.py: app/admin/importer.py runs against the
+dev Postgres in a transaction that's rolled back at the end — a dry run — so
+the upload leaves nothing behind.
+"""
+import json
+import uuid
+
+import pytest
+
+MANY = 200
+
+
+async def _chunks(body: bytes, size: int = 64):
+    # Small chunks, so rows straddle them the way a real upload's do.
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+async def _dry_run(backend, rows, prefix):
+    """Run the import, then hand back it and the cards it made whose type's SKU
+    starts with `prefix`."""
+    from sqlalchemy import text
+
+    try:
+        async with backend.async_session() as db:
+            imp = await backend.importer.run(db, rows)
+            cards = (await db.execute(text(
+                "SELECT t.sku, t.rarity::text FROM card c JOIN card_type t ON t.id = c.card_type_id"
+                " WHERE t.sku LIKE :prefix ORDER BY t.sku"
+            ), {"prefix": prefix + "%"})).all()
+            await db.rollback()
+    finally:
+        # The pool's connections belong to this test's event loop.
+        await backend.engine.dispose()
+    return imp, cards
+
+
+@pytest.mark.asyncio
+async def test_ndjson_import_loads_a_new_set_and_skips_bad_rows(backend):
+    importer = backend.importer
+    prefix = f"import-{uuid.uuid4().hex[:8]}-"
+    rows = [{"type": "card_type", "sku": f"{prefix}{n:04}", "rarity": "COMMON"} for n in range(MANY)]
+    rows += [{"type": "card", "card_type_sku": f"{prefix}{n:04}"} for n in range(MANY)]
+    bad = [
+        {"type": "card", "card_type_sku": f"{prefix}missing"},
+        {"type": "card_type", "sku": f"{prefix}shiny", "rarity": "SHINY"},
+        {"type": "booster"},
+    ]
+    body = "\n".join(json.dumps(r) for r in rows + bad).encode() + b"\n{not json\n"
+
+    imp, cards = await _dry_run(backend, importer.ndjson_rows(_chunks(body)), prefix)
+
+    # Card types resolve within the upload: every card found its type.
+    assert imp.counts["card_type"] == MANY and imp.counts["card"] == MANY
+    assert len(cards) == MANY and {rarity for _, rarity in cards} == {"COMMON"}
+    first_bad = 2 * MANY + 1
+    assert [e["line"] for e in imp.errors] == list(range(first_bad, first_bad + 4)), imp.errors
+    assert "unknown card_type_sku" in imp.errors[0]["error"]
+    assert imp.error_count == 4
+
+
+@pytest.mark.static
+@pytest.mark.asyncio
+async def test_csv_rows_are_numbered_by_the_line_they_start_on(backend):
+    body = (
+        "﻿type,sku,name,card_count\n"
+        'closed_booster,pack-a,"Pack A, first print",10\n'
+        'closed_booster,pack-b,"two\nlines",\n'
+        "\n"
+        "closed_booster,pack-c,,ten\n"
+        'closed_booster,pack-d,"never closed\n'
+    ).encode()
+    got = [r async for r in backend.importer.csv_rows(_chunks(body, size=5))]
+
+    assert [line for line, _ in got] == [2, 3, 6, 7]
+    assert got[0][1] == {"type": "closed_booster", "sku": "pack-a", "name": "Pack A, first print", "card_count": "10"}
+    assert got[1][1] == {"type": "closed_booster", "sku": "pack-b", "name": "two\nlines"}
+    assert isinstance(got[3][1], ValueError)
@@ -0,0 +1,108 @@
+"""Walking a listing page by page returns every row once, in order, and as
+many rows as its /count says.
+
+In process, like test_query_counts.py: the admin listings
+(app/admin/router.py _keyset_page) and the player's history pages
+(helpers.bets_page / withdrawals_page) against the dev Postgres, with a small
+limit so a walk spans many pages. The rows are seeded so the first sort key
+ties — opened boosters share SKUs, history rows share one timestamp — which is
+where a keyset cursor that doesn't carry the tiebreaker skips or repeats rows.
+"""
+import uuid
+
+import pytest
+
+pytestmark = pytest.mark.asyncio
+
+LIMIT = 3
+MANY = 10
+
+
+@pytest.fixture
+async def db(backend):
+    async with backend.async_session() as session:
+        yield session
+    # The pool's connections belong to this test's event loop.
+    await backend.engine.dispose()
+
+
+async def _walk(list_page, key):
+    """Every row of a listing, following next_cursor; also checks each page
+    is full but the last."""
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, cursor = await list_page(cursor)
+        pages += 1
+        assert len(page) <= LIMIT
+        rows.extend(page)
+        if cursor is None:
+            break
+        assert len(page) == LIMIT, "a page short of the limit must be the last"
+    keys = [key(r) for r in rows]
+    assert len(keys) == len(set(keys)), "a row came back on two pages"
+    return rows, pages
+
+
+async def test_admin_listings_page_through_ties_and_match_their_counts(backend, world):
+    admin = backend.admin
+    address = "0x" + uuid.uuid4().hex.ljust(40, "0")
+    world.make_user(address)
+    assert world.give_cards(address, MANY) == MANY
+    assert world.give_pending_wins(address, MANY) > LIMIT
+
+    async def walk_and_count(name, list_endpoint, count_endpoint, filters, key):
+        async def page(cursor):
+            res = await list_endpoint(filters, cursor=cursor, limit=LIMIT, _=None)
+            return res[name], res["next_cursor"]
+        rows, pages = await _walk(page, key)
+        counted = (await count_endpoint(filters, _=None))["count"]
+        assert len(rows) == counted, f"{name}: walked {len(rows)}, /count says {counted}"
+        return rows, pages
+
+    # Opened boosters sort by (sku, id): most of the seed shares a handful of SKUs.
+    obs, pages = await walk_and_count(
+        "opened_boosters", admin.list_opened_boosters, admin.count_opened_boosters,
+        admin.OpenedBoosterFilters(), lambda ob: ob["id"],
+    )
+    assert pages > 1, "the seed has too few opened boosters to tell"
+    skus = [ob["sku"] or "" for ob in obs]
+    assert skus == sorted(skus) and len(set(skus)) < len(skus)
+
+    await walk_and_count(
+        "opened_boosters", admin.list_opened_boosters, admin.count_opened_boosters,
+        admin.OpenedBoosterFilters(status="AVAILABLE", bindable=True), lambda ob: ob["id"],
+    )
+    cards, _ = await walk_and_count(
+        "cards", admin.list_cards, admin.count_cards,
+        admin.CardFilters(owner=address), lambda c: c["id"],
+    )
+    assert len(cards) == MANY
+    await walk_and_count(
+        "balls", admin.list_balls, admin.count_balls,
+        admin.BallFilters(status="LOADED"), lambda b: b["serial"],
+    )
+
+    # Plays run newest first, whichever filter narrows them.
+    for filters in (admin.PlayFilters(address=address), admin.PlayFilters(address=address, won=True)):
+        plays, _ = await walk_and_count("plays", admin.list_plays, admin.count_plays,
+                                        filters, lambda p: p["id"])
+        ids = [p["id"] for p in plays]
+        assert ids == sorted(ids, reverse=True)
+    assert (await admin.count_plays(admin.PlayFilters(address=address, won=False), _=None))["count"] == 0
+
+
+async def test_history_pages_walk_rows_that_share_a_timestamp(backend, world, db):
+    from app import helpers
+
+    address = "0x" + uuid.uuid4().hex.ljust(40, "0")
+    world.give_history(address, MANY)
+
+    # The i-th row inserted bets i / withdraws $i; newest (highest id) first.
+    for page_of, value in ((helpers.bets_page, lambda r: r["bet"]),
+                           (helpers.withdrawals_page, lambda r: r["amount"])):
+        async def page(cursor):
+            return await page_of(db, address, cursor, LIMIT)
+
+        rows, pages = await _walk(page, value)
+        assert [value(r) for r in rows] == list(range(MANY, 0, -1)), page_of.__name__
+        assert pages == -(-MANY // LIMIT)
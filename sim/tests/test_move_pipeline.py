@@ -0,0 +1,85 @@
+"""Joystick moves are coalesced, but never a GRAB tap.
+
+In process: pi_client.submit_move against an in-memory cabinet whose Pi link is
+replaced by a recorder, so what the pipeline would have put on the wire can be
+read back frame by frame. A burst of held directions collapses to the latest
+state, one send per MOVE_MIN_INTERVAL; a tap (pressed and released before the
+press went out) is sent as both frames, in order.
+"""
+import asyncio
+import time
+
+import pytest
+
+from harness.player import GRAB, LEFT, RIGHT, UP
+
+pytestmark = [pytest.mark.static, pytest.mark.asyncio]
+
+INTERVAL = 0.05
+
+
+@pytest.fixture
+def wire(backend, monkeypatch):
+    """A connected cabinet and the (bitmask, monotonic time) of every send."""
+    pi_client = backend.pi_client
+    cab = backend.Cabinet("move-pipeline", "http://localhost:0")
+    cab.pi_connected = True
+    sent = []
+
+    async def send_move(cab, bitmask, received_at=None):
+        sent.append((bitmask, time.monotonic()))
+        return True
+
+    monkeypatch.setattr(pi_client, "send_move", send_move)
+    monkeypatch.setattr(pi_client, "MOVE_MIN_INTERVAL", INTERVAL)
+    return pi_client, cab, sent
+
+
+async def _drained(cab):
+    while cab.move_queue or (cab.move_sender is not None and not cab.move_sender.done()):
+        await asyncio.sleep(INTERVAL / 5)
+
+
+async def test_held_directions_coalesce_to_the_latest(wire):
+    pi_client, cab, sent = wire
+    pi_client.submit_move(cab, LEFT)
+    await asyncio.sleep(0)          # the first move after a quiet spell goes at once
+    assert [m for m, _ in sent] == [LEFT]
+
+    for mask in (LEFT | UP, UP, UP | RIGHT):
+        assert pi_client.submit_move(cab, mask)
+    await _drained(cab)
+
+    assert [m for m, _ in sent] == [LEFT, UP | RIGHT]
+    assert sent[1][1] - sent[0][1] >= INTERVAL * 0.9
+
+    # The state the claw is already in isn't sent again.
+    pi_client.submit_move(cab, UP | RIGHT)
+    await _drained(cab)
+    assert len(sent) == 2
+
+
+async def test_a_grab_tap_is_never_coalesced_away(wire):
+    pi_client, cab, sent = wire
+    pi_client.submit_move(cab, LEFT)
+    await asyncio.sleep(0)
+
+    # Pressed and released inside one interval, then more movement behind it.
+    for mask in (LEFT | GRAB, LEFT, 0, RIGHT):
+        pi_client.submit_move(cab, mask)
+    await _drained(cab)
+
+    # The press goes out on its own; the release and the moves after it
+    # coalesce behind it into the latest state.
+    masks = [m for m, _ in sent]
+    assert masks == [LEFT, LEFT | GRAB, RIGHT], f"the GRAB tap was coalesced away: {masks}"
+    gaps = [b - a for (_, a), (_, b) in zip(sent, sent[1:])]
+    assert min(gaps) >= INTERVAL * 0.9, gaps
+
+
+async def test_an_offline_pi_drops_the_move(wire):
+    pi_client, cab, sent = wire
+    cab.pi_connected = False
+    assert not pi_client.submit_move(cab, GRAB)
+    await asyncio.sleep(0)
+    assert sent == []
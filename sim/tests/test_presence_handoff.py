@@ -0,0 +1,59 @@
+"""A player who paid and walked away must not hold up the people behind them.
+
+At handoff the backend checks the next player is actually there (a logged-in
+socket that acks turn_ready). If not, their entry is passed over — it keeps its
+place under the default policy — and the next present player gets the machine.
+"""
+import asyncio
+
+import pytest
+
+from harness.player import UNREADY_ACK_DELAY
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_an_absent_player_is_passed_over(player, players, cabinet, world):
+    await cabinet.always_lose()
+    away = await players("away")
+    p3 = await players("p3")
+
+    mark = player.mark()
+    assert (await player.pay_crypto())["status"] == "ok"
+    await player.wait_for("turn_start", timeout=10, since=mark)
+
+    # Queued second, then gone before the machine comes free.
+    assert (await away.pay_crypto())["status"] == "ok"
+    await away.disconnect()
+    mark = p3.mark()
+    assert (await p3.pay_crypto())["status"] == "ok"
+
+    # p1's turn ends; the machine goes to p3, not to the empty seat.
+    await p3.wait_for("turn_start", timeout=60, since=mark)
+
+    entries = world.queue_entries(away.address)
+    assert len(entries) == 1
+    assert entries[0]["status"] == "queued", "the absent player's paid turn was burned"
+
+
+async def test_a_handoff_passes_a_player_over_once(player, players, cabinet, world):
+    await cabinet.always_lose()
+    lazy = await players("lazy", ready=False)
+
+    mark = player.mark()
+    assert (await player.pay_crypto())["status"] == "ok"
+    await player.wait_for("turn_start", timeout=10, since=mark)
+
+    # Queued behind p1 and connected, but never answers turn_ready.
+    skipped = lazy.mark()
+    assert (await lazy.pay_crypto())["status"] == "ok"
+
+    # p1's turn ends and the handoff finds nobody at the keyboard. The
+    # scheduler retries it straight away; that must not count as a second
+    # pass-over, or TURN_MAX_DEFERRALS comes twice as fast.
+    await lazy.wait_for("turn_skipped", timeout=60, since=skipped)
+    await asyncio.sleep(3 * UNREADY_ACK_DELAY)     # time for the retry's ping
+    assert [e["event"] for e in lazy.events[skipped:]].count("turn_skipped") == 1
+
+    entries = world.queue_entries(lazy.address)
+    assert len(entries) == 1 and entries[0]["status"] == "queued"
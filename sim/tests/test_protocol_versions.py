@@ -6,6 +6,7 @@ other. A half-bump can't merge.
 
   ESP_PI_PROTO : esp firmware  vs  raspberry/server  vs  mock/raspberry
   PI_VPS_PROTO : raspberry/server  vs  central/fastapi
+  move_bin frame layouts : raspberry/server  vs  central/fastapi  vs  mock/raspberry
 """
 import re
 from pathlib import Path
@@ -43,3 +44,30 @@ def test_pi_vps_proto_agrees_across_pi_vps_and_mock():
         f"Pi<->VPS protocol out of sync: pi={pi}, vps={vps}, mock={mock}. "
         "Bump both ends in the same commit."
     )
+
+
+def _str_const(path: Path, name: str) -> str:
+    m = re.search(rf"{name}\s*=\s*[\"']([^\"']+)[\"']", path.read_text())
+    assert m, f"{name} not found in {path.relative_to(REPO)}"
+    return m.group(1)
+
+
+def _hex_const(path: Path, name: str) -> int:
+    m = re.search(rf"^{name}\s*=\s*(0x[0-9a-fA-F]+|\d+)", path.read_text(), re.M)
+    assert m, f"{name} not found in {path.relative_to(REPO)}"
+    return int(m.group(1), 0)
+
+
+@pytest.mark.parametrize("name", ["MOVE_FRAME_FORMAT", "MOVE_ACK_FRAME_FORMAT", "FRAME_MOVE", "FRAME_MOVE_ACK"])
+def test_binary_move_frame_agrees_across_pi_vps_and_mock(name):
+    """The "move_bin" feature is additive (no proto bump), so nothing at runtime
+    would notice the two ends packing the frame differently — only this."""
+    files = {
+        "pi": REPO / "raspberry/server/protocol_version.py",
+        "vps": REPO / "central/fastapi/app/versioning.py",
+        "mock": REPO / "mock/raspberry/protocol_version.py",
+    }
+    read = _str_const if name.endswith("FORMAT") else _hex_const
+    values = {side: read(path, name) for side, path in files.items()}
+    assert len(set(values.values())) == 1, f"{name} out of sync: {values}"
+
@@ -0,0 +1,84 @@
+"""The read paths cost a fixed number of SQL statements, however many rows.
+
+This goes IN PROCESS (the `backend` fixture): it imports the backend's handlers
+and runs them against the dev Postgres, counting the statements its engine sends.
+From the outside an N+1 is only a slower response — a collector with 300 cards
+used to cost hundreds of round trips per get_inventory — so this is the only
+way to pin it. Each path is measured with one row and with many; the counts
+must match, and match what app/loaders.py says the path costs.
+"""
+import uuid
+
+import pytest
+
+pytestmark = pytest.mark.asyncio
+
+MANY = 50
+
+
+@pytest.fixture
+async def statements(backend):
+    from sqlalchemy import event
+
+    engine = backend.engine
+    seen = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    yield seen
+    event.remove(engine.sync_engine, "before_cursor_execute", count)
+    # The pool's connections belong to this test's event loop.
+    await engine.dispose()
+
+
+async def _count(statements, call):
+    del statements[:]
+    result = await call()
+    return len(statements), result
+
+
+def _player(backend, world, cards: int, wins: int):
+    address = "0x" + uuid.uuid4().hex.ljust(40, "0")
+    world.make_user(address)
+    got = (world.give_cards(address, cards), world.give_pending_wins(address, wins))
+    sid = "query-count-" + address
+    backend.sessions.bind(sid, address)
+    return sid, got
+
+
+async def test_get_inventory_is_two_statements_however_big_the_inventory(backend, world, statements):
+    get_inventory = backend.inventory.get_inventory
+    counts = []
+    for n in (1, MANY):
+        sid, (cards, wins) = _player(backend, world, n, n)
+        try:
+            await get_inventory(sid)   # resolves (and caches) the user id
+            n_statements, res = await _count(statements, lambda: get_inventory(sid))
+        finally:
+            backend.sessions.unbind(sid)
+        assert res["status"] == "ok", res
+        assert len(res["cards"]) == cards and len(res["pending_wins"]) == wins
+        counts.append(n_statements)
+    assert cards > 1 and wins > 1, "the seed has too little inventory to tell"
+    # Pending wins (with ball, booster, card and card type joined in), then cards.
+    assert counts == [2, 2], counts
+
+
+async def test_admin_balls_and_plays_do_not_grow_with_rows(backend, world, statements):
+    admin = backend.admin
+    sid, (_, wins) = _player(backend, world, 0, MANY)
+    backend.sessions.unbind(sid)
+    assert wins > 1, "the seed has too little inventory to tell"
+
+    n_statements, res = await _count(
+        statements, lambda: admin.list_balls(admin.BallFilters(), limit=500, _=None))
+    assert len(res["balls"]) >= wins
+    assert n_statements == 1
+
+    n_statements, res = await _count(
+        statements, lambda: admin.list_plays(admin.PlayFilters(), limit=500, _=None))
+    assert sum(1 for p in res["plays"] if p["prize"]) == wins
+    # The entries, then their wins with each prize joined in.
+    assert n_statements == 2
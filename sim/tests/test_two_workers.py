@@ -0,0 +1,83 @@
+"""Two backend workers on one database: only the leader drives the cabinet.
+
+One worker holds the leader lock, the Pi link and the turn scheduler; the other
+follows (central/fastapi/app/leader.py). A follower forwards its players' moves
+to the leader and mirrors the leader's queues, so a player sees the same game
+whichever worker their socket landed on.
+
+Needs the second worker (SIM_SECOND_BACKEND_URL). Which of the two leads isn't
+known up front, so each test goes through both: one of them is the follower.
+"""
+import asyncio
+
+import pytest
+
+from harness.config import SECOND_BACKEND_URL
+from harness.player import LEFT, RIGHT, VirtualPlayer
+
+pytestmark = [
+    pytest.mark.asyncio,
+    pytest.mark.skipif(not SECOND_BACKEND_URL, reason="SIM_SECOND_BACKEND_URL not set"),
+]
+
+
+async def _mask_reaches_the_pi(cabinet, mask: int, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while (await cabinet.state())["move_mask"] != mask:
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError(f"the Pi never got move {mask:#07b}")
+        await asyncio.sleep(0.05)
+
+
+async def test_a_move_through_either_worker_reaches_the_pi(player, cabinet, world):
+    await cabinet.always_lose()
+    # The same wallet, logged in on the other worker too.
+    twin = VirtualPlayer(address=player.address, name="p1-second", url=SECOND_BACKEND_URL)
+    await twin.connect()
+    try:
+        mark = player.mark()
+        assert (await player.pay_crypto())["status"] == "ok"
+        await player.wait_for("turn_start", timeout=10, since=mark)
+
+        await player.move(RIGHT)
+        await _mask_reaches_the_pi(cabinet, RIGHT)
+        await twin.move(LEFT)
+        await _mask_reaches_the_pi(cabinet, LEFT)
+        await twin.move(0)
+        await _mask_reaches_the_pi(cabinet, 0)
+    finally:
+        await twin.disconnect()
+    world.check_invariants()
+
+
+async def test_both_workers_agree_on_queue_positions(players, cabinet):
+    """Queued on one worker and promoted by the leader: a login on either
+    worker reads the same position."""
+    await cabinet.always_lose()
+    first = await players("first")
+    second = await players("second")
+    mark = first.mark()
+    assert (await first.pay_crypto())["status"] == "ok"
+    await first.wait_for("turn_start", timeout=10, since=mark)
+    assert (await second.pay_crypto())["status"] == "ok"
+
+    # The first play left the line when its turn started; the second is next.
+    # The other worker hears of the payment a moment later, by way of the leader.
+    for url in (second.url, SECOND_BACKEND_URL):
+        assert await _position_seen_from(url, second.address) == 1, url
+
+
+async def _position_seen_from(url: str, address: str, timeout: float = 5.0) -> int:
+    """The position a login on `url` reports, once it stops being -1."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        view = VirtualPlayer(address=address, name=f"view@{url}", url=url)
+        try:
+            res = await view.connect()
+        finally:
+            await view.disconnect()
+        assert res["status"] == "ok", res
+        position = res["data"]["position"]
+        if position != -1 or asyncio.get_running_loop().time() > deadline:
+            return position
+        await asyncio.sleep(0.2)